@@ -3,15 +3,18 @@ Admin para predicciones de IA
 """
 
 from django.contrib import admin
-from .models import PredictionModel, PredictionResult, TeamStats
+from .models import (
+    PredictionModel, PredictionResult, TeamStats, DixonColesFit, TrainingJob, LeagueStatsSnapshot,
+    TeamRating, TeamRatingHistory, TeamRatingState, DecayedTeamStat, DecayedStatsState,
+)
 
 
 @admin.register(PredictionModel)
 class PredictionModelAdmin(admin.ModelAdmin):
-    list_display = ['name', 'model_type', 'prediction_type', 'league', 'accuracy', 'r2_score', 'trained_at', 'is_active']
-    list_filter = ['model_type', 'prediction_type', 'league', 'is_active']
+    list_display = ['name', 'model_type', 'prediction_type', 'league', 'accuracy', 'r2_score', 'samples_count', 'data_version', 'trained_at', 'is_active']
+    list_filter = ['model_type', 'prediction_type', 'registry_key', 'league', 'is_active']
     search_fields = ['name', 'league__name']
-    readonly_fields = ['trained_at', 'last_updated']
+    readonly_fields = ['trained_at', 'last_updated', 'registry_key', 'artifact_path', 'training_window', 'data_version']
     ordering = ['-trained_at']
 
 
@@ -31,3 +34,72 @@ class TeamStatsAdmin(admin.ModelAdmin):
     search_fields = ['team_name', 'league__name']
     readonly_fields = ['updated_at']
     ordering = ['team_name']
+
+
+@admin.register(DixonColesFit)
+class DixonColesFitAdmin(admin.ModelAdmin):
+    list_display = ['league', 'season', 'rho', 'home_advantage', 'matches_count', 'converged', 'data_version', 'fitted_at']
+    list_filter = ['league', 'converged']
+    search_fields = ['league__name', 'season']
+    readonly_fields = ['fitted_at']
+    ordering = ['-fitted_at']
+
+
+@admin.register(TrainingJob)
+class TrainingJobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'registry_key', 'league', 'prediction_type', 'status', 'samples_count', 'duration_seconds', 'created_at', 'finished_at']
+    list_filter = ['status', 'registry_key', 'league', 'reason']
+    search_fields = ['league__name', 'prediction_type']
+    ordering = ['-created_at']
+    readonly_fields = ['created_at', 'started_at', 'finished_at', 'worker', 'attempts', 'metrics', 'prediction_model']
+
+
+@admin.register(LeagueStatsSnapshot)
+class LeagueStatsSnapshotAdmin(admin.ModelAdmin):
+    list_display = ['league', 'matches_count', 'btts_rate', 'avg_goals', 'data_version', 'computed_at']
+    search_fields = ['league__name']
+    readonly_fields = ['computed_at', 'stats']
+    ordering = ['league__name']
+
+
+@admin.register(TeamRating)
+class TeamRatingAdmin(admin.ModelAdmin):
+    list_display = ['team', 'league', 'matches_count', 'last_date', 'updated_at']
+    list_filter = ['league']
+    search_fields = ['team', 'league__name']
+    readonly_fields = ['updated_at', 'ratings', 'league_means']
+    ordering = ['league__name', 'team']
+
+
+@admin.register(TeamRatingHistory)
+class TeamRatingHistoryAdmin(admin.ModelAdmin):
+    list_display = ['team', 'league', 'date', 'matches_count']
+    list_filter = ['league']
+    search_fields = ['team', 'league__name']
+    readonly_fields = ['ratings', 'league_means']
+    ordering = ['-date']
+
+
+@admin.register(TeamRatingState)
+class TeamRatingStateAdmin(admin.ModelAdmin):
+    list_display = ['league', 'matches_count', 'last_date', 'data_version', 'updated_at']
+    search_fields = ['league__name']
+    readonly_fields = ['updated_at', 'league_means', 'checksum', 'last_match_id']
+    ordering = ['league__name']
+
+
+@admin.register(DecayedTeamStat)
+class DecayedTeamStatAdmin(admin.ModelAdmin):
+    list_display = ['team', 'league', 'venue', 'stat', 'matches_count', 'last_date', 'updated_at']
+    list_filter = ['league', 'venue', 'stat']
+    search_fields = ['team', 'league__name']
+    readonly_fields = ['updated_at', 'sums']
+    ordering = ['league__name', 'team', 'venue', 'stat']
+
+
+@admin.register(DecayedStatsState)
+class DecayedStatsStateAdmin(admin.ModelAdmin):
+    list_display = ['league', 'half_lives', 'matches_count', 'last_date', 'data_version', 'updated_at']
+    search_fields = ['league__name']
+    readonly_fields = ['updated_at', 'checksum', 'last_match_id']
+    ordering = ['league__name']
@@ -6,9 +6,11 @@ import numpy as np
 import logging
 from typing import Dict, List, Tuple
 from datetime import timedelta, datetime
-from django.utils import timezone
 from django.db.models import Avg, StdDev, Count, Q
 from football_data.models import Match, League
+from .match_context import uses_match_context
+from .team_history import current_team_history
+from .team_ratings import MIN_RATED_MATCHES, team_rating_service
 
 logger = logging.getLogger('ai_predictions')
 
@@ -22,14 +24,15 @@ class AdvancedFeatureExtractor:
     def get_team_form_analysis(self, team_name: str, league: League, is_home: bool, days_back: int = 365) -> Dict:
         """Análisis de forma del equipo con múltiples métricas"""
         try:
-            cutoff_date = timezone.now().date() - timedelta(days=days_back)
+            history = current_team_history()
+            cutoff_date = history.reference_date() - timedelta(days=days_back)
             
             if is_home:
-                matches = Match.objects.filter(
+                matches = history.bounded(Match.objects.filter(
                     league=league,
                     home_team=team_name,
                     date__gte=cutoff_date
-                ).order_by('-date')[:30]
+                )).order_by('-date')[:30]
                 
                 # Datos de goles y remates
                 goals_data = [m.fthg for m in matches if m.fthg is not None]
@@ -42,11 +45,11 @@ class AdvancedFeatureExtractor:
                 draws = sum(1 for m in matches if m.fthg and m.ftag and m.fthg == m.ftag)
                 losses = sum(1 for m in matches if m.fthg and m.ftag and m.fthg < m.ftag)
             else:
-                matches = Match.objects.filter(
+                matches = history.bounded(Match.objects.filter(
                     league=league,
                     away_team=team_name,
                     date__gte=cutoff_date
-                ).order_by('-date')[:30]
+                )).order_by('-date')[:30]
                 
                 goals_data = [m.ftag for m in matches if m.ftag is not None]
                 shots_data = [m.as_field for m in matches if m.as_field is not None]
@@ -116,12 +119,13 @@ class AdvancedFeatureExtractor:
         """Análisis de enfrentamientos directos entre equipos"""
         try:
             # Buscar enfrentamientos directos en los últimos 3 años
-            cutoff_date = timezone.now().date() - timedelta(days=1095)
+            history = current_team_history()
+            cutoff_date = history.reference_date() - timedelta(days=1095)
             
-            matches = Match.objects.filter(
+            matches = history.bounded(Match.objects.filter(
                 league=league,
                 date__gte=cutoff_date
-            ).filter(
+            )).filter(
                 Q(home_team=home_team, away_team=away_team) |
                 Q(home_team=away_team, away_team=home_team)
             ).order_by('-date')[:10]
@@ -207,12 +211,13 @@ class AdvancedFeatureExtractor:
         """Contexto de la liga para normalizar predicciones"""
         try:
             # Estadísticas generales de la liga en los últimos 2 años
-            cutoff_date = timezone.now().date() - timedelta(days=730)
+            history = current_team_history()
+            cutoff_date = history.reference_date() - timedelta(days=730)
             
-            matches = Match.objects.filter(
+            matches = history.bounded(Match.objects.filter(
                 league=league,
                 date__gte=cutoff_date
-            ).exclude(
+            )).exclude(
                 Q(fthg__isnull=True) | Q(ftag__isnull=True) |
                 Q(hs__isnull=True) | Q(as_field__isnull=True)
             )
@@ -258,8 +263,15 @@ class AdvancedFeatureExtractor:
             return self._default_league_context()
     
     def get_team_strength_rating(self, team_name: str, league: League, is_home: bool) -> Dict:
-        """Rating de fortaleza del equipo basado en múltiples factores"""
+        """
+        Rating de fortaleza del equipo. Con ratings online (team_ratings.py) se lee
+        una sola fila; si no, se compone a partir del análisis de forma.
+        """
         try:
+            rating = team_rating_service.team_rating(league, team_name)
+            if rating is not None and rating['matches_count'] >= MIN_RATED_MATCHES:
+                return self._rating_from_team_ratings(rating, is_home)
+            
             form_data = self.get_team_form_analysis(team_name, league, is_home)
             
             # Calcular rating compuesto
@@ -297,6 +309,30 @@ class AdvancedFeatureExtractor:
             logger.error(f"Error calculando rating de {team_name}: {e}")
             return self._default_rating_features()
     
+    def _rating_from_team_ratings(self, rating: Dict, is_home: bool) -> Dict:
+        """
+        Ratings de fortaleza a partir de los ratings online de la sede, en la misma
+        escala que _default_rating_features (5 = media de la liga): ataque y defensa
+        de goles, y dominio territorial (remates y corners) como rating de forma.
+        """
+        venue = 'home' if is_home else 'away'
+        ratings = rating['ratings']
+        
+        offensive_rating = 5.0 * np.exp(ratings['goals'][f'attack_{venue}'])
+        defensive_rating = 5.0 * np.exp(ratings['goals'][f'defence_{venue}'])
+        form_rating = 5.0 * np.exp(np.mean([
+            ratings[stat][f'attack_{venue}'] - ratings[stat][f'defence_{venue}'] for stat in ('shots', 'corners')
+        ]))
+        
+        return {
+            'offensive_rating': float(offensive_rating),
+            'defensive_rating': float(defensive_rating),
+            'form_rating': float(form_rating),
+            'overall_rating': float(offensive_rating * 0.4 + defensive_rating * 0.3 + form_rating * 0.3),
+            'matches_analyzed': rating['matches_count']
+        }
+    
+    @uses_match_context
     def prepare_advanced_features(self, home_team: str, away_team: str, league: League, 
                                  prediction_type: str) -> List[float]:
         """Prepara vector de características avanzadas para el modelo"""
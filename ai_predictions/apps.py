@@ -5,3 +5,6 @@ class AiPredictionsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'ai_predictions'
     verbose_name = 'Predicciones IA'
+
+    def ready(self):
+        from . import signals  # noqa: F401  (registra los receptores)
@@ -0,0 +1,308 @@
+"""
+Estadísticas de equipo con decaimiento exponencial en el tiempo
+
+Para cada liga, equipo, sede y estadística (goles, remates, remates a puerta y
+corners del propio equipo) se mantienen, para varias vidas medias h (en días) a
+la vez, las sumas ponderadas con w = 0.5^(días desde el partido / h):
+
+    Σw, Σw·x, Σw·x², Σw², Σw·a, Σw·a², Σw·a·x
+
+donde a es la edad del partido en partidos de esa sede (0 = el último). Con
+ellas salen en O(1) la media y la desviación ponderadas, los partidos efectivos
+(Σw)² / Σw² y la pendiente de la regresión ponderada de x sobre a, la misma
+convención que la regresión sobre los últimos partidos a la que sustituye. Un
+partido nuevo decae todas las sumas, envejece un partido las anteriores y añade
+el suyo; el paso del tiempo sin partidos multiplica todas las sumas por el mismo
+factor y no cambia ninguna de esas cantidades.
+
+Las sumas se guardan en DecayedTeamStat y se actualizan tras cada importación
+con la marca de agua de DecayedStatsState (match_stream.py); si cambió algún
+partido ya procesado o las vidas medias configuradas, se reconstruyen en una
+sola pasada. Con un historial en fecha (as_of) se recalculan con los partidos
+del equipo anteriores a esa fecha.
+"""
+
+import logging
+import math
+import time
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from django.conf import settings
+from django.db import transaction
+
+from football_data.models import League, Match
+from .match_stream import advance, pending_matches, prefix_unchanged, stream_rows
+from .models import DecayedStatsState, DecayedTeamStat
+from .team_history import STAT_COLUMNS, current_team_history
+
+logger = logging.getLogger('ai_predictions')
+
+DECAYED_STATS = ('goals', 'shots', 'shots_on_target', 'corners')
+
+# Columnas (local, visitante) de cada estadística, en el orden de DECAYED_STATS
+DECAYED_COLUMNS = tuple(column for stat in DECAYED_STATS for column in STAT_COLUMNS[stat])
+
+DEFAULT_HALF_LIVES = (21.0, 60.0, 180.0)
+
+# Partidos efectivos mínimos para estimar una pendiente
+MIN_SLOPE_MATCHES = 3
+
+
+def _key(half_life: float) -> str:
+    return f'{half_life:g}'
+
+
+class DecayedAggregate:
+    """
+    Sumas con decaimiento de una estadística de un equipo en una sede.
+
+    Args:
+        half_lives: Vidas medias en días, de corta a larga
+        sums: Sumas guardadas {vida media: [Σw, Σw·x, Σw·x², Σw², Σw·a, Σw·a², Σw·a·x]}
+        matches_count: Partidos acumulados
+        last_day: Ordinal de la fecha del último partido
+    """
+
+    def __init__(self, half_lives: Sequence[float], sums: Optional[Dict] = None,
+                 matches_count: int = 0, last_day: Optional[int] = None):
+        self.half_lives = tuple(half_lives)
+        self.sums = {_key(half_life): [0.0] * 7 for half_life in self.half_lives}
+        for key, values in (sums or {}).items():
+            if key in self.sums:
+                self.sums[key] = [float(value) for value in values]
+        self.matches_count = matches_count
+        self.last_day = last_day
+
+    @classmethod
+    def from_values(cls, half_lives: Sequence[float], days: Iterable[int],
+                    values: Iterable[float]) -> 'DecayedAggregate':
+        """Agregado de una serie en orden cronológico (ordinales de fecha y valores)"""
+        aggregate = cls(half_lives)
+        for day, value in zip(days, values):
+            aggregate.update(int(day), float(value))
+        return aggregate
+
+    @classmethod
+    def combined(cls, aggregates: Sequence['DecayedAggregate'], day: int) -> 'DecayedAggregate':
+        """Suma de varios agregados decaídos a la misma fecha (media y dispersión conjuntas)"""
+        result = cls(aggregates[0].half_lives, last_day=day)
+        for aggregate in aggregates:
+            elapsed = day - aggregate.last_day if aggregate.last_day is not None else 0
+            for half_life in result.half_lives:
+                decay = 0.5 ** (max(elapsed, 0) / half_life)
+                weight, total, square, weight_square = aggregate.sums[_key(half_life)][:4]
+                target = result.sums[_key(half_life)]
+                target[0] += weight * decay
+                target[1] += total * decay
+                target[2] += square * decay
+                target[3] += weight_square * decay * decay
+            result.matches_count += aggregate.matches_count
+        return result
+
+    def update(self, day: int, value: float):
+        """Añade un partido (ordinal de su fecha y valor) posterior a los ya acumulados"""
+        elapsed = day - self.last_day if self.last_day is not None else 0
+        for half_life in self.half_lives:
+            key = _key(half_life)
+            weight, total, square, weight_square, age, age_square, age_value = self.sums[key]
+            # Los partidos anteriores envejecen un partido: a → a + 1
+            age_square += 2 * age + weight
+            age += weight
+            age_value += total
+            decay = 0.5 ** (elapsed / half_life)
+            self.sums[key] = [
+                weight * decay + 1.0,
+                total * decay + value,
+                square * decay + value * value,
+                weight_square * decay * decay + 1.0,
+                age * decay,
+                age_square * decay,
+                age_value * decay,
+            ]
+        self.matches_count += 1
+        self.last_day = day
+
+    def mean(self, half_life: float) -> Optional[float]:
+        weight, total = self.sums[_key(half_life)][:2]
+        return total / weight if weight > 0 else None
+
+    def std(self, half_life: float) -> Optional[float]:
+        weight, total, square = self.sums[_key(half_life)][:3]
+        if weight <= 0:
+            return None
+        return math.sqrt(max(square / weight - (total / weight) ** 2, 0.0))
+
+    def effective_matches(self, half_life: float) -> float:
+        weight, weight_square = self.sums[_key(half_life)][0], self.sums[_key(half_life)][3]
+        return weight * weight / weight_square if weight_square > 0 else 0.0
+
+    def slope(self, half_life: float) -> float:
+        """Pendiente de la regresión ponderada del valor sobre la edad en partidos"""
+        weight, total, _, _, age, age_square, age_value = self.sums[_key(half_life)]
+        denominator = weight * age_square - age * age
+        if self.effective_matches(half_life) < MIN_SLOPE_MATCHES or denominator <= 1e-9:
+            return 0.0
+        return (weight * age_value - age * total) / denominator
+
+    @property
+    def short_half_life(self) -> float:
+        return self.half_lives[0]
+
+    @property
+    def medium_half_life(self) -> float:
+        return self.half_lives[len(self.half_lives) // 2]
+
+    @property
+    def long_half_life(self) -> float:
+        return self.half_lives[-1]
+
+    def trend(self) -> float:
+        """Pendiente con la vida media más larga (positiva si los valores antiguos eran mayores)"""
+        return self.slope(self.long_half_life)
+
+    def momentum(self) -> float:
+        """Media con la vida media corta menos la media con la intermedia"""
+        if self.short_half_life == self.medium_half_life or self.mean(self.short_half_life) is None:
+            return 0.0
+        return self.mean(self.short_half_life) - self.mean(self.medium_half_life)
+
+
+class DecayedStatsService:
+    """Actualiza (tras cada importación) y sirve las estadísticas con decaimiento"""
+
+    @property
+    def half_lives(self) -> Tuple[float, ...]:
+        configured = getattr(settings, 'DECAYED_STATS_HALF_LIVES', None) or DEFAULT_HALF_LIVES
+        return tuple(sorted(float(half_life) for half_life in configured))
+
+    def update_league(self, league: League) -> Dict:
+        """
+        Procesa los partidos nuevos de la liga en orden cronológico. Si cambió algún
+        partido ya procesado o las vidas medias, reconstruye las sumas desde cero.
+        """
+        state = DecayedStatsState.objects.filter(league=league).first()
+        if (state is None or [float(half_life) for half_life in state.half_lives] != list(self.half_lives)
+                or not prefix_unchanged(league, state, DECAYED_COLUMNS)):
+            return self.rebuild(league)
+
+        started = time.perf_counter()
+        rows = list(stream_rows(pending_matches(league, state), DECAYED_COLUMNS))
+        if not rows:
+            return {'mode': 'unchanged', 'matches': 0, 'teams': 0}
+
+        teams = {row[2] for row in rows} | {row[3] for row in rows}
+        aggregates = {
+            (stored.team, stored.venue, stored.stat): DecayedAggregate(
+                self.half_lives, stored.sums, stored.matches_count,
+                stored.last_date.toordinal() if stored.last_date else None,
+            )
+            for stored in DecayedTeamStat.objects.filter(league=league, team__in=teams)
+        }
+
+        with transaction.atomic():
+            result = self._stream(league, aggregates, rows, state)
+        result.update(mode='incremental', seconds=time.perf_counter() - started)
+        logger.info(
+            f"📉 Estadísticas con decaimiento {league.name}: {result['matches']} partidos nuevos, "
+            f"{result['teams']} equipos actualizados en {result['seconds']:.2f}s"
+        )
+        return result
+
+    def rebuild(self, league: League) -> Dict:
+        """Recalcula todas las sumas de la liga en una sola pasada cronológica (backfill)"""
+        started = time.perf_counter()
+        rows = stream_rows(Match.objects.filter(league=league), DECAYED_COLUMNS)
+        with transaction.atomic():
+            DecayedTeamStat.objects.filter(league=league).delete()
+            DecayedStatsState.objects.filter(league=league).delete()
+            state = DecayedStatsState(league=league)
+            result = self._stream(league, {}, rows, state)
+        result.update(mode='rebuild', seconds=time.perf_counter() - started)
+        logger.info(
+            f"📉 Estadísticas con decaimiento {league.name} reconstruidas: {result['matches']} partidos, "
+            f"{result['teams']} equipos en {result['seconds']:.2f}s"
+        )
+        return result
+
+    def _stream(self, league: League, aggregates: Dict[Tuple[str, str, str], DecayedAggregate],
+                rows: Iterable[tuple], state: DecayedStatsState) -> Dict:
+        """Aplica los partidos (pk, fecha, local, visitante, valores...) en orden y guarda las sumas"""
+        touched = set()
+        matches = 0
+
+        for pk, match_date, home_team, away_team, *values in rows:
+            day = match_date.toordinal()
+            for position, stat in enumerate(DECAYED_STATS):
+                for team, venue, value in (
+                    (home_team, 'home', values[2 * position]), (away_team, 'away', values[2 * position + 1]),
+                ):
+                    if value is None:
+                        continue
+                    key = (team, venue, stat)
+                    if key not in aggregates:
+                        aggregates[key] = DecayedAggregate(self.half_lives)
+                    aggregates[key].update(day, value)
+                    touched.add(key)
+            advance(state, pk, match_date, values)
+            matches += 1
+
+        DecayedTeamStat.objects.bulk_create(
+            [
+                DecayedTeamStat(
+                    league=league, team=team, venue=venue, stat=stat,
+                    sums=aggregates[(team, venue, stat)].sums,
+                    matches_count=aggregates[(team, venue, stat)].matches_count,
+                    last_date=date.fromordinal(aggregates[(team, venue, stat)].last_day),
+                )
+                for team, venue, stat in sorted(touched)
+            ],
+            update_conflicts=True,
+            unique_fields=['league', 'team', 'venue', 'stat'],
+            update_fields=['sums', 'matches_count', 'last_date', 'updated_at'],
+        )
+        state.half_lives = list(self.half_lives)
+        state.data_version = league.data_version
+        state.save()
+        league.bump_model_version()
+        return {'matches': matches, 'teams': len({key[0] for key in touched})}
+
+    def aggregate(self, league: League, team: str, venue: str, stat: str) -> Optional[DecayedAggregate]:
+        """
+        Sumas del equipo en la sede (una lectura por clave única, memorizada en el
+        historial activo) o None si no tiene partidos. Con as_of se recalculan con
+        los partidos del equipo anteriores a esa fecha.
+        """
+        history = current_team_history()
+        as_of = history.as_of
+
+        def load() -> Optional[DecayedAggregate]:
+            if as_of is None:
+                stored = DecayedTeamStat.objects.filter(
+                    league=league, team=team, venue=venue, stat=stat,
+                ).values('sums', 'matches_count', 'last_date').first()
+                if stored is None:
+                    return None
+                return DecayedAggregate(
+                    self.half_lives, stored['sums'], stored['matches_count'], stored['last_date'].toordinal(),
+                )
+
+            column = STAT_COLUMNS[stat][0 if venue == 'home' else 1]
+            rows: List[tuple] = list(
+                history.bounded(Match.objects.filter(
+                    league=league, **{f'{venue}_team': team, f'{column}__isnull': False},
+                ))
+                .order_by('date', 'pk')
+                .values_list('date', column)
+            )
+            if not rows:
+                return None
+            return DecayedAggregate.from_values(
+                self.half_lives, (match_date.toordinal() for match_date, _ in rows), (value for _, value in rows),
+            )
+
+        return history.memoized(('decayed_stat', league.pk, team, venue, stat, as_of), load)
+
+
+# Instancia global
+decayed_stats_service = DecayedStatsService()
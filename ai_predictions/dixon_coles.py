@@ -5,16 +5,114 @@ Mejora el modelo Poisson tradicional aplicando correcciones para marcadores bajo
 
 import numpy as np
 from scipy.stats import poisson
-from scipy.optimize import minimize
 import logging
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
 from datetime import timedelta
-from django.utils import timezone
 from django.db import models as django_models
 from football_data.models import Match, League
+from .dixon_coles_fit import dixon_coles_fit_service, encode_teams, fit_dixon_coles
+from .match_context import uses_match_context
+from .team_history import current_team_history, drop_missing
 
 logger = logging.getLogger('ai_predictions')
 
+# Umbrales over_N y tamaño de la rejilla de marcadores según el tipo de predicción
+GOAL_THRESHOLDS = (1, 2, 3, 4, 5)
+SHOT_THRESHOLDS = (10, 15, 20, 25, 30)
+MAX_GOALS = 8
+MAX_SHOTS = 35
+
+
+class ScoreMatrix:
+    """
+    Rejilla de probabilidades de marcadores exactos de Dixon-Coles.
+
+    grid[..., i, j] es P(local = i, visitante = j) para 0 <= i, j <= max_goals:
+    el producto exterior de las pmf de Poisson de ambos equipos con la corrección
+    tau aplicada al bloque 2×2 de marcadores bajos. Las lambdas pueden ser
+    escalares o arrays (un partido por posición); las dimensiones iniciales de
+    la rejilla y de todos los resultados son las de las lambdas.
+
+    Igual que los bucles originales, las sumas se hacen sobre la rejilla
+    truncada, sin renormalizar la masa que queda fuera de max_goals.
+    """
+
+    def __init__(self, lambda_home, lambda_away, rho: float, max_goals: int = MAX_GOALS):
+        lambda_home, lambda_away = np.broadcast_arrays(
+            np.asarray(lambda_home, dtype=np.float64), np.asarray(lambda_away, dtype=np.float64)
+        )
+        self.max_goals = max_goals
+        goals = np.arange(max_goals + 1)
+
+        home_pmf = poisson.pmf(goals, lambda_home[..., np.newaxis])
+        away_pmf = poisson.pmf(goals, lambda_away[..., np.newaxis])
+        grid = home_pmf[..., :, np.newaxis] * away_pmf[..., np.newaxis, :]
+
+        # Corrección tau de Dixon-Coles (mismos factores que tau_correction)
+        grid[..., 0, 0] *= 1 - lambda_home * lambda_away * rho
+        grid[..., 0, 1] *= 1 + lambda_home * rho
+        grid[..., 1, 0] *= 1 + lambda_away * rho
+        grid[..., 1, 1] *= 1 - rho
+        self.grid = grid
+
+        self.home_goals = goals[:, np.newaxis]
+        self.away_goals = goals[np.newaxis, :]
+
+    def _masked_sum(self, mask: np.ndarray) -> np.ndarray:
+        """Suma de las celdas seleccionadas por la máscara (i, j) para cada partido"""
+        return (self.grid * mask).sum(axis=(-2, -1))
+
+    def match_outcome(self) -> Dict[str, np.ndarray]:
+        """Probabilidades de victoria local (1), empate (X) y victoria visitante (2)"""
+        return {
+            'home_win': self._masked_sum(self.home_goals > self.away_goals),
+            'draw': self._masked_sum(self.home_goals == self.away_goals),
+            'away_win': self._masked_sum(self.home_goals < self.away_goals),
+        }
+
+    def over(self, thresholds, side: str = 'total') -> Dict[int, np.ndarray]:
+        """
+        P(valor > N) para cada umbral N.
+
+        Args:
+            thresholds: Umbrales N
+            side: 'total' (local + visitante), 'home' o 'away'
+        """
+        values = {
+            'total': self.home_goals + self.away_goals,
+            'home': np.broadcast_to(self.home_goals, self.grid.shape[-2:]),
+            'away': np.broadcast_to(self.away_goals, self.grid.shape[-2:]),
+        }[side]
+        thresholds = np.asarray(thresholds)
+        masks = values > thresholds[:, np.newaxis, np.newaxis]
+        # (..., i, j) × (umbral, i, j) -> (..., umbral)
+        sums = np.einsum('...ij,tij->...t', self.grid, masks)
+        return {int(threshold): sums[..., column] for column, threshold in enumerate(thresholds)}
+
+    def both_teams_score(self) -> np.ndarray:
+        """
+        P(ambos marcan) = 1 - P(local no marca) - P(visitante no marca) + P(0-0)
+        (principio de inclusión-exclusión)
+        """
+        grid = self.grid
+        return 1.0 - grid[..., 0, :].sum(axis=-1) - grid[..., :, 0].sum(axis=-1) + grid[..., 0, 0]
+
+    def exact_scores(self) -> Dict[str, float]:
+        """Probabilidades de marcadores exactos "i-j" ordenadas de mayor a menor (un solo partido)"""
+        if self.grid.ndim != 2:
+            raise ValueError("exact_scores() requiere las lambdas de un solo partido")
+        flat = self.grid.ravel()
+        # Orden estable: en caso de empate se conserva el orden de la rejilla
+        order = np.argsort(-flat, kind='stable')
+        size = self.max_goals + 1
+        return {f"{index // size}-{index % size}": float(flat[index]) for index in order}
+
+
+def _clip_probability(value):
+    """Limita una probabilidad (o array de probabilidades) a [0, 1]"""
+    clipped = np.clip(value, 0.0, 1.0)
+    return float(clipped) if np.ndim(clipped) == 0 else clipped
+
 
 class DixonColesModel:
     """
@@ -88,6 +186,22 @@ class DixonColesModel:
         
         return poisson_prob * tau
     
+    def score_matrix(self, lambda_home, lambda_away, max_goals: int = MAX_GOALS,
+                     rho: Optional[float] = None) -> ScoreMatrix:
+        """
+        Rejilla de marcadores exactos.
+        
+        Args:
+            lambda_home: Tasa(s) esperada(s) del local (escalar o array de partidos)
+            lambda_away: Tasa(s) esperada(s) del visitante (escalar o array de partidos)
+            max_goals: Máximo de goles (o remates) a considerar por equipo
+            rho: Rho a usar (por defecto el del modelo)
+        
+        Returns:
+            ScoreMatrix con la rejilla (max_goals+1)² de cada partido
+        """
+        return ScoreMatrix(lambda_home, lambda_away, self.rho if rho is None else rho, max_goals)
+    
     def calculate_lambda_parameters(self, home_team: str, away_team: str, league: League,
                                    is_goals: bool = True, original_prediction_type: str = 'goals_total') -> Tuple[float, float]:
         """
@@ -122,20 +236,20 @@ class DixonColesModel:
             away_stats = analyze_team_statistics(away_team, league, prediction_type)
             
             # Calcular lambda usando enfoque Dixon-Coles mejorado
-            cutoff_date = timezone.now().date() - timedelta(days=365)
+            cutoff_date = current_team_history().reference_date() - timedelta(days=365)
             
             # Estadísticas de la liga para normalización
-            league_matches = Match.objects.filter(
-                league=league,
-                date__gte=cutoff_date
-            ).order_by('-date')[:200]
+            base_stat = 'goals' if is_goals else 'shots'
+            league_history = current_team_history().league(
+                league, window=200, since=cutoff_date,
+                stats=(f'{base_stat}_for', f'{base_stat}_against')
+            )
+            league_home = drop_missing(league_history[f'{base_stat}_for'])
+            league_away = drop_missing(league_history[f'{base_stat}_against'])
             
-            if is_goals:
-                league_home_avg = np.mean([m.fthg for m in league_matches if m.fthg is not None]) or 1.5
-                league_away_avg = np.mean([m.ftag for m in league_matches if m.ftag is not None]) or 1.2
-            else:
-                league_home_avg = np.mean([m.hs for m in league_matches if m.hs is not None]) or 12.0
-                league_away_avg = np.mean([m.as_field for m in league_matches if m.as_field is not None]) or 11.0
+            default_home_avg, default_away_avg = (1.5, 1.2) if is_goals else (12.0, 11.0)
+            league_home_avg = (np.mean(league_home) if len(league_home) else 0) or default_home_avg
+            league_away_avg = (np.mean(league_away) if len(league_away) else 0) or default_away_avg
             
             # Calcular tasas de ataque y defensa
             home_attack = home_stats['home_avg'] if home_stats['home_avg'] > 0 else league_home_avg
@@ -188,52 +302,21 @@ class DixonColesModel:
                 logger.warning("Pocos datos para optimización, usando rho por defecto")
                 return -0.13
             
-            def negative_log_likelihood(rho_candidate):
-                """Función objetivo para minimización"""
-                self.rho = rho_candidate
-                total_log_likelihood = 0
-                
-                for match in matches:
-                    try:
-                        # Calcular lambdas para este partido
-                        lambda_home, lambda_away = self.calculate_lambda_parameters(
-                            match.home_team, match.away_team, match.league, is_goals
-                        )
-                        
-                        # Resultado real
-                        if is_goals:
-                            home_score = match.fthg or 0
-                            away_score = match.ftag or 0
-                        else:
-                            home_score = match.hs or 0
-                            away_score = match.as_field or 0
-                        
-                        # Limitar marcadores para evitar desbordamiento
-                        home_score = min(home_score, 10)
-                        away_score = min(away_score, 10)
-                        
-                        # Calcular probabilidad del resultado
-                        prob = self.probability(home_score, away_score, lambda_home, lambda_away)
-                        
-                        # Evitar log(0)
-                        if prob > 0:
-                            total_log_likelihood += np.log(prob)
-                        
-                    except Exception as e:
-                        continue
-                
-                return -total_log_likelihood  # Negativo para minimización
+            if is_goals:
+                scores = [(match.fthg or 0, match.ftag or 0) for match in matches]
+            else:
+                scores = [(match.hs or 0, match.as_field or 0) for match in matches]
             
-            # Optimizar rho en un rango razonable
-            result = minimize(
-                negative_log_likelihood,
-                x0=[-0.13],
-                bounds=[(-0.5, 0.2)],
-                method='L-BFGS-B',
-                options={'maxiter': max_iter}
+            # Ajuste conjunto de equipos, ventaja de local y rho (sin consultas por partido)
+            teams, home_index, away_index = encode_teams(
+                [match.home_team for match in matches], [match.away_team for match in matches]
+            )
+            home_scores, away_scores = np.array(scores, dtype=np.float64).T
+            result = fit_dixon_coles(
+                home_index, away_index, home_scores, away_scores, len(teams), max_iter=max_iter
             )
             
-            optimal_rho = result.x[0]
+            optimal_rho = result['rho']
             logger.info(f"Rho optimizado: {optimal_rho:.4f}")
             
             return optimal_rho
@@ -242,6 +325,7 @@ class DixonColesModel:
             logger.error(f"Error optimizando rho: {e}")
             return -0.13  # Valor por defecto
     
+    @uses_match_context
     def predict_match(self, home_team: str, away_team: str, league: League,
                      prediction_type: str = 'goals_total') -> Dict:
         """
@@ -259,10 +343,21 @@ class DixonColesModel:
         try:
             is_goals = 'goals' in prediction_type or prediction_type == 'both_teams_score'
             
-            # Calcular lambdas
-            lambda_home, lambda_away = self.calculate_lambda_parameters(
-                home_team, away_team, league, is_goals, prediction_type
-            )
+            # Lambdas y rho del ajuste de la liga; si no hay ajuste (o falta algún
+            # equipo, o incluye partidos posteriores a as_of) se estiman a partir del historial
+            fit = dixon_coles_fit_service.parameters(league) if is_goals else None
+            as_of = current_team_history().as_of
+            if fit is not None and as_of is not None and (fit.last_date is None or fit.last_date >= as_of):
+                fit = None
+            expected_goals = fit.expected_goals(home_team, away_team) if fit is not None else None
+            if expected_goals is not None:
+                lambda_home, lambda_away = expected_goals
+                rho = fit.rho
+            else:
+                lambda_home, lambda_away = self.calculate_lambda_parameters(
+                    home_team, away_team, league, is_goals, prediction_type
+                )
+                rho = self.rho
             
             # Calcular predicción base
             if prediction_type in ['goals_total', 'shots_total']:
@@ -273,26 +368,7 @@ class DixonColesModel:
                 prediction = lambda_away
             elif prediction_type == 'both_teams_score':
                 # Probabilidad de que ambos equipos marquen al menos 1 gol
-                max_goals = 8
-                
-                # P(local no marca) = suma de P(0, i) para i = 0 a max_goals
-                prob_home_no_score = sum(
-                    self.probability(0, away_score, lambda_home, lambda_away)
-                    for away_score in range(max_goals + 1)
-                )
-                
-                # P(visitante no marca) = suma de P(i, 0) para i = 0 a max_goals
-                prob_away_no_score = sum(
-                    self.probability(home_score, 0, lambda_home, lambda_away)
-                    for home_score in range(max_goals + 1)
-                )
-                
-                # P(ninguno marca) = P(0, 0)
-                prob_none_score = self.probability(0, 0, lambda_home, lambda_away)
-                
-                # P(ambos marcan) = 1 - P(local no marca) - P(visitante no marca) + P(ninguno marca)
-                # (Principio de inclusión-exclusión)
-                raw_prediction = 1.0 - prob_home_no_score - prob_away_no_score + prob_none_score
+                raw_prediction = float(self.score_matrix(lambda_home, lambda_away, rho=rho).both_teams_score())
                 
                 # CALIBRACIÓN CRÍTICA: Ajustar probabilidades sobreconfiadas
                 # En fútbol real, "ambos marcan" ocurre ~45-55% de las veces
@@ -322,22 +398,26 @@ class DixonColesModel:
             
             # Calcular probabilidades para diferentes marcadores
             probabilities = self._calculate_probabilities(
-                lambda_home, lambda_away, prediction_type
+                lambda_home, lambda_away, prediction_type, rho=rho
             )
             
             # Calcular distribución de resultados (1X2)
-            match_outcome = self._calculate_match_outcome(lambda_home, lambda_away)
+            match_outcome = self._calculate_match_outcome(lambda_home, lambda_away, rho=rho)
             
             # Confianza basada en cantidad de datos
-            cutoff_date = timezone.now().date() - timedelta(days=365)
-            home_matches_count = Match.objects.filter(
-                league=league, home_team=home_team, date__gte=cutoff_date
-            ).count()
-            away_matches_count = Match.objects.filter(
-                league=league, away_team=away_team, date__gte=cutoff_date
-            ).count()
+            if expected_goals is not None:
+                total_matches = fit.team_matches[home_team] + fit.team_matches[away_team]
+            else:
+                history = current_team_history()
+                cutoff_date = history.reference_date() - timedelta(days=365)
+                home_matches_count = len(history.team(
+                    league, home_team, 'home', since=cutoff_date, stats=('goals_for',)
+                )['goals_for'])
+                away_matches_count = len(history.team(
+                    league, away_team, 'away', since=cutoff_date, stats=('goals_for',)
+                )['goals_for'])
+                total_matches = home_matches_count + away_matches_count
             
-            total_matches = home_matches_count + away_matches_count
             confidence = min(0.92, max(0.4, total_matches / 40))
             
             return {
@@ -352,112 +432,48 @@ class DixonColesModel:
             logger.error(f"Error en predicción Dixon-Coles: {e}")
             return self._fallback_prediction(prediction_type)
     
-    def _calculate_probabilities(self, lambda_home: float, lambda_away: float,
-                                prediction_type: str) -> Dict:
-        """Calcula probabilidades para diferentes umbrales"""
-        probabilities = {}
+    def _calculate_probabilities(self, lambda_home, lambda_away, prediction_type: str,
+                                 rho: Optional[float] = None) -> Dict:
+        """
+        Calcula probabilidades para diferentes umbrales.
         
+        Con lambdas escalares devuelve floats; con arrays de lambdas (varios
+        partidos) devuelve un array por probabilidad.
+        """
         # Manejo especial para "both_teams_score"
         if prediction_type == 'both_teams_score':
-            # Probabilidad de que ambos equipos marquen al menos 1 gol
-            max_goals = 8
-            
-            # P(ambos marcan) = 1 - P(local no marca) - P(visitante no marca) + P(ninguno marca)
-            prob_home_no_score = sum(
-                self.probability(0, away_score, lambda_home, lambda_away)
-                for away_score in range(max_goals + 1)
-            )
-            prob_away_no_score = sum(
-                self.probability(home_score, 0, lambda_home, lambda_away)
-                for home_score in range(max_goals + 1)
-            )
-            prob_none_score = self.probability(0, 0, lambda_home, lambda_away)
-            
-            prob_both_score = 1.0 - prob_home_no_score - prob_away_no_score + prob_none_score
-            probabilities['both_score'] = min(1.0, max(0.0, prob_both_score))
-            
-            # También calcular over_1 (al menos 2 goles totales) para compatibilidad
-            prob_over_1 = 0.0
-            for home_score in range(max_goals + 1):
-                for away_score in range(max_goals + 1):
-                    if home_score + away_score > 1:
-                        prob_over_1 += self.probability(
-                            home_score, away_score, lambda_home, lambda_away
-                        )
-            probabilities['over_1'] = min(1.0, max(0.0, prob_over_1))
-            
-            return probabilities
+            matrix = self.score_matrix(lambda_home, lambda_away, MAX_GOALS, rho)
+            return {
+                'both_score': _clip_probability(matrix.both_teams_score()),
+                # También over_1 (al menos 2 goles totales) para compatibilidad
+                'over_1': _clip_probability(matrix.over([1])[1]),
+            }
         
         if 'goals' in prediction_type:
-            thresholds = [1, 2, 3, 4, 5]
-            max_goals = 8
+            thresholds, max_goals = GOAL_THRESHOLDS, MAX_GOALS
         elif 'shots' in prediction_type:
-            thresholds = [10, 15, 20, 25, 30]
-            max_goals = 35
+            thresholds, max_goals = SHOT_THRESHOLDS, MAX_SHOTS
         else:
-            thresholds = [1, 2, 3, 4, 5]
-            max_goals = 8
+            thresholds, max_goals = GOAL_THRESHOLDS, MAX_GOALS
         
-        for threshold in thresholds:
-            if 'total' in prediction_type:
-                # Probabilidad de over X goles/remates totales
-                prob_over = 0.0
-                for home_score in range(max_goals + 1):
-                    for away_score in range(max_goals + 1):
-                        if home_score + away_score > threshold:
-                            prob_over += self.probability(
-                                home_score, away_score, lambda_home, lambda_away
-                            )
-                probabilities[f'over_{threshold}'] = min(1.0, max(0.0, prob_over))
-                
-            elif 'home' in prediction_type:
-                # Probabilidad de over X para equipo local
-                prob_over = 0.0
-                for home_score in range(threshold + 1, max_goals + 1):
-                    for away_score in range(max_goals + 1):
-                        prob_over += self.probability(
-                            home_score, away_score, lambda_home, lambda_away
-                        )
-                probabilities[f'over_{threshold}'] = min(1.0, max(0.0, prob_over))
-                
-            elif 'away' in prediction_type:
-                # Probabilidad de over X para equipo visitante
-                prob_over = 0.0
-                for home_score in range(max_goals + 1):
-                    for away_score in range(threshold + 1, max_goals + 1):
-                        prob_over += self.probability(
-                            home_score, away_score, lambda_home, lambda_away
-                        )
-                probabilities[f'over_{threshold}'] = min(1.0, max(0.0, prob_over))
+        if 'total' in prediction_type:
+            side = 'total'
+        elif 'home' in prediction_type:
+            side = 'home'
+        elif 'away' in prediction_type:
+            side = 'away'
+        else:
+            return {}
         
-        return probabilities
+        over = self.score_matrix(lambda_home, lambda_away, max_goals, rho).over(thresholds, side)
+        return {f'over_{threshold}': _clip_probability(prob) for threshold, prob in over.items()}
     
-    def _calculate_match_outcome(self, lambda_home: float, lambda_away: float) -> Dict:
+    def _calculate_match_outcome(self, lambda_home, lambda_away, rho: Optional[float] = None) -> Dict:
         """
         Calcula probabilidades de victoria local (1), empate (X) y victoria visitante (2)
         """
-        prob_home_win = 0.0
-        prob_draw = 0.0
-        prob_away_win = 0.0
-        
-        max_goals = 8
-        
-        for home_score in range(max_goals + 1):
-            for away_score in range(max_goals + 1):
-                prob = self.probability(home_score, away_score, lambda_home, lambda_away)
-                
-                if home_score > away_score:
-                    prob_home_win += prob
-                elif home_score == away_score:
-                    prob_draw += prob
-                else:
-                    prob_away_win += prob
-        
-        return {
-            'home_win': min(1.0, max(0.0, prob_home_win)),
-            'draw': min(1.0, max(0.0, prob_draw)),
-            'away_win': min(1.0, max(0.0, prob_away_win))
-        }
+        outcome = self.score_matrix(lambda_home, lambda_away, MAX_GOALS, rho).match_outcome()
+        return {key: _clip_probability(prob) for key, prob in outcome.items()}
     
     def _fallback_prediction(self, prediction_type: str) -> Dict:
         """Predicción de fallback para errores"""
@@ -473,7 +489,8 @@ class DixonColesModel:
             'prediction': default_prediction,
             'confidence': 0.3,
             'probabilities': probabilities,
-            'total_matches': 0
+            'total_matches': 0,
+            'fallback': True
         }
     
     def calculate_exact_score_probabilities(self, lambda_home: float, lambda_away: float,
@@ -489,16 +506,7 @@ class DixonColesModel:
         Returns:
             Diccionario con probabilidades de marcadores exactos
         """
-        score_probs = {}
-        
-        for home_goals in range(max_goals + 1):
-            for away_goals in range(max_goals + 1):
-                prob = self.probability(home_goals, away_goals, lambda_home, lambda_away)
-                score_probs[f"{home_goals}-{away_goals}"] = prob
-        
-        # Ordenar por probabilidad descendente
-        sorted_scores = dict(sorted(score_probs.items(), key=lambda x: x[1], reverse=True))
-        
-        return sorted_scores
+        # Ordenadas por probabilidad descendente
+        return self.score_matrix(lambda_home, lambda_away, max_goals).exact_scores()
 
 
@@ -0,0 +1,326 @@
+"""
+Ajuste de Dixon-Coles por máxima verosimilitud para una liga completa
+
+Se estiman conjuntamente el ataque y la defensa de todos los equipos, la ventaja
+de local y rho con L-BFGS-B sobre una log-verosimilitud vectorizada (equipos
+codificados como índices enteros) con gradiente analítico. Los partidos pueden
+ponderarse con decaimiento temporal exp(-xi * días) como en Dixon y Coles (1997).
+
+Los parámetros se guardan en DixonColesFit (uno por liga y temporada) y se
+reajustan tras cada importación partiendo del ajuste anterior. La temporada es
+la del último partido ajustado (la ventana abarca varias temporadas y
+League.season es la de la primera importación); se sirve el ajuste más reciente.
+"""
+
+import logging
+import threading
+import time
+from datetime import date
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+from django.conf import settings
+from scipy.optimize import minimize
+
+from football_data.models import League, Match
+from .models import DixonColesFit
+from .team_history import HISTORY_ORDERING
+
+logger = logging.getLogger('ai_predictions')
+
+# Límites de rho (fuera de ellos tau puede ser negativa con lambdas habituales)
+RHO_BOUNDS = (-0.3, 0.3)
+DEFAULT_RHO = -0.13
+
+# Penalización L2 de ataque/defensa: evita parámetros extremos en equipos con pocos partidos
+FIT_RIDGE = 0.01
+
+# tau mínima dentro del logaritmo
+_MIN_TAU = 1e-10
+
+# Segundos durante los que se reutiliza "no hay ajuste al día" antes de volver a consultar
+MISSING_FIT_RECHECK = 60
+
+# Mes en que empieza la temporada (julio): agosto de 2024 y mayo de 2025 son la 2024-2025
+SEASON_START_MONTH = 7
+
+
+def _unpack(params: np.ndarray, n_teams: int):
+    """
+    Vector de parámetros -> (intercepto, ventaja local, rho, ataque, defensa).
+    El ataque y la defensa suman cero: el último equipo es menos la suma del resto.
+    """
+    intercept, home_advantage, rho = params[:3]
+    attack_free = params[3:3 + n_teams - 1]
+    defence_free = params[3 + n_teams - 1:]
+    attack = np.append(attack_free, -attack_free.sum())
+    defence = np.append(defence_free, -defence_free.sum())
+    return intercept, home_advantage, rho, attack, defence
+
+
+def _negative_log_likelihood(params, home_index, away_index, home_goals, away_goals,
+                             weights, n_teams, ridge):
+    """Log-verosimilitud negativa (media ponderada) y su gradiente analítico"""
+    intercept, home_advantage, rho, attack, defence = _unpack(params, n_teams)
+
+    lambda_home = np.exp(intercept + home_advantage + attack[home_index] + defence[away_index])
+    lambda_away = np.exp(intercept + attack[away_index] + defence[home_index])
+
+    # tau y sus derivadas parciales respecto a λ_local, λ_visitante y rho
+    tau = np.ones_like(lambda_home)
+    dtau_home = np.zeros_like(lambda_home)
+    dtau_away = np.zeros_like(lambda_home)
+    dtau_rho = np.zeros_like(lambda_home)
+
+    nil_nil = (home_goals == 0) & (away_goals == 0)
+    tau[nil_nil] = 1 - lambda_home[nil_nil] * lambda_away[nil_nil] * rho
+    dtau_home[nil_nil] = -lambda_away[nil_nil] * rho
+    dtau_away[nil_nil] = -lambda_home[nil_nil] * rho
+    dtau_rho[nil_nil] = -lambda_home[nil_nil] * lambda_away[nil_nil]
+
+    nil_one = (home_goals == 0) & (away_goals == 1)
+    tau[nil_one] = 1 + lambda_home[nil_one] * rho
+    dtau_home[nil_one] = rho
+    dtau_rho[nil_one] = lambda_home[nil_one]
+
+    one_nil = (home_goals == 1) & (away_goals == 0)
+    tau[one_nil] = 1 + lambda_away[one_nil] * rho
+    dtau_away[one_nil] = rho
+    dtau_rho[one_nil] = lambda_away[one_nil]
+
+    one_one = (home_goals == 1) & (away_goals == 1)
+    tau[one_one] = 1 - rho
+    dtau_rho[one_one] = -1.0
+
+    tau = np.maximum(tau, _MIN_TAU)
+    total_weight = weights.sum()
+
+    # Se omite log(x!) que no depende de los parámetros
+    log_likelihood = weights * (
+        np.log(tau)
+        + home_goals * np.log(lambda_home) - lambda_home
+        + away_goals * np.log(lambda_away) - lambda_away
+    )
+
+    # Derivadas respecto a log λ (la regla de la cadena pasa a los parámetros lineales)
+    grad_home = weights * (home_goals - lambda_home + lambda_home * dtau_home / tau)
+    grad_away = weights * (away_goals - lambda_away + lambda_away * dtau_away / tau)
+
+    grad_attack = (np.bincount(home_index, grad_home, minlength=n_teams)
+                   + np.bincount(away_index, grad_away, minlength=n_teams))
+    grad_defence = (np.bincount(away_index, grad_home, minlength=n_teams)
+                    + np.bincount(home_index, grad_away, minlength=n_teams))
+    grad_attack = grad_attack / total_weight - 2 * ridge * attack
+    grad_defence = grad_defence / total_weight - 2 * ridge * defence
+
+    value = log_likelihood.sum() / total_weight - ridge * (np.sum(attack ** 2) + np.sum(defence ** 2))
+    gradient = np.concatenate([
+        [(grad_home.sum() + grad_away.sum()) / total_weight,
+         grad_home.sum() / total_weight,
+         np.sum(weights * dtau_rho / tau) / total_weight],
+        # Parámetros libres: el último equipo depende de todos los demás
+        grad_attack[:-1] - grad_attack[-1],
+        grad_defence[:-1] - grad_defence[-1],
+    ])
+    return -value, -gradient
+
+
+def fit_dixon_coles(home_index: np.ndarray, away_index: np.ndarray, home_goals: np.ndarray,
+                    away_goals: np.ndarray, n_teams: int, weights: Optional[np.ndarray] = None,
+                    initial: Optional[Dict] = None, ridge: float = FIT_RIDGE, max_iter: int = 500) -> Dict:
+    """
+    Ajusta Dixon-Coles a un conjunto de partidos.
+
+    Args:
+        home_index, away_index: Índice entero (0..n_teams-1) de cada equipo
+        home_goals, away_goals: Goles de cada partido
+        n_teams: Número de equipos
+        weights: Peso de cada partido (por defecto 1)
+        initial: Punto de partida {'intercept', 'home_advantage', 'rho', 'attack', 'defence'}
+                 con arrays de longitud n_teams (p.ej. el ajuste anterior)
+        ridge: Penalización L2 de ataque y defensa
+
+    Returns:
+        Diccionario con intercept, home_advantage, rho, attack, defence (arrays),
+        log_likelihood (media ponderada), converged e iterations
+    """
+    home_index = np.asarray(home_index, dtype=np.intp)
+    away_index = np.asarray(away_index, dtype=np.intp)
+    home_goals = np.asarray(home_goals, dtype=np.float64)
+    away_goals = np.asarray(away_goals, dtype=np.float64)
+    weights = np.ones(len(home_goals)) if weights is None else np.asarray(weights, dtype=np.float64)
+
+    if initial is None:
+        mean_goals = max((home_goals.mean() + away_goals.mean()) / 2, 0.1)
+        initial = {
+            'intercept': np.log(mean_goals),
+            'home_advantage': 0.2,
+            'rho': DEFAULT_RHO,
+            'attack': np.zeros(n_teams),
+            'defence': np.zeros(n_teams),
+        }
+
+    # Centrar el punto de partida para respetar la restricción de suma cero
+    attack = np.asarray(initial['attack'], dtype=np.float64)
+    defence = np.asarray(initial['defence'], dtype=np.float64)
+    x0 = np.concatenate([
+        [initial['intercept'], initial['home_advantage'], np.clip(initial['rho'], *RHO_BOUNDS)],
+        (attack - attack.mean())[:-1],
+        (defence - defence.mean())[:-1],
+    ])
+    bounds = [(None, None), (None, None), RHO_BOUNDS] + [(None, None)] * (2 * (n_teams - 1))
+
+    result = minimize(
+        _negative_log_likelihood,
+        x0=x0,
+        args=(home_index, away_index, home_goals, away_goals, weights, n_teams, ridge),
+        jac=True,
+        method='L-BFGS-B',
+        bounds=bounds,
+        options={'maxiter': max_iter},
+    )
+
+    intercept, home_advantage, rho, attack, defence = _unpack(result.x, n_teams)
+    return {
+        'intercept': float(intercept),
+        'home_advantage': float(home_advantage),
+        'rho': float(rho),
+        'attack': attack,
+        'defence': defence,
+        'log_likelihood': float(-result.fun),
+        'converged': bool(result.success),
+        'iterations': int(result.nit),
+    }
+
+
+def encode_teams(home_teams: Sequence[str], away_teams: Sequence[str]):
+    """Codifica los equipos como enteros: (equipos ordenados, índices locales, índices visitantes)"""
+    teams = sorted(set(home_teams) | set(away_teams))
+    team_index = {team: index for index, team in enumerate(teams)}
+    home_index = np.array([team_index[team] for team in home_teams], dtype=np.intp)
+    away_index = np.array([team_index[team] for team in away_teams], dtype=np.intp)
+    return teams, home_index, away_index
+
+
+def season_of(match_date: date) -> str:
+    """Temporada de un partido con el formato de las importaciones ('2024-2025')"""
+    year = match_date.year if match_date.month >= SEASON_START_MONTH else match_date.year - 1
+    return f"{year}-{year + 1}"
+
+
+class DixonColesFitService:
+    """Ajusta, guarda y sirve los parámetros de Dixon-Coles por liga y temporada"""
+
+    def __init__(self):
+        # liga -> (DixonColesFit o None, versión de datos de la liga, instante de lectura)
+        self._fits = {}
+        self._lock = threading.Lock()
+
+    @property
+    def window(self) -> int:
+        return getattr(settings, 'DIXON_COLES_FIT_WINDOW', 760)
+
+    @property
+    def xi(self) -> float:
+        return getattr(settings, 'DIXON_COLES_XI', 0.0019)
+
+    @property
+    def min_matches(self) -> int:
+        return getattr(settings, 'DIXON_COLES_MIN_MATCHES', 40)
+
+    def fit_league(self, league: League) -> Optional[DixonColesFit]:
+        """
+        Ajusta la liga con sus partidos más recientes (una consulta) y guarda el
+        resultado con la temporada del último partido ajustado. Parte del ajuste
+        más reciente de la liga si existe.
+        """
+        rows = list(
+            Match.objects.filter(league=league, fthg__isnull=False, ftag__isnull=False)
+            .order_by(*HISTORY_ORDERING)
+            .values_list('date', 'home_team', 'away_team', 'fthg', 'ftag')[:self.window]
+        )
+        if len(rows) < self.min_matches:
+            logger.info(f"Dixon-Coles {league.name}: {len(rows)} partidos, insuficientes para el ajuste")
+            return None
+
+        dates, home_teams, away_teams, home_goals, away_goals = zip(*rows)
+        teams, home_index, away_index = encode_teams(home_teams, away_teams)
+        last_date = max(dates)
+        days_ago = np.array([(last_date - date).days for date in dates], dtype=np.float64)
+        weights = np.exp(-self.xi * days_ago)
+
+        season = season_of(last_date)
+
+        previous = self._latest(league)
+        initial = None
+        if previous is not None:
+            initial = {
+                'intercept': previous.intercept,
+                'home_advantage': previous.home_advantage,
+                'rho': previous.rho,
+                'attack': np.array([previous.attack.get(team, 0.0) for team in teams]),
+                'defence': np.array([previous.defence.get(team, 0.0) for team in teams]),
+            }
+
+        result = fit_dixon_coles(
+            home_index, away_index, np.array(home_goals), np.array(away_goals),
+            len(teams), weights=weights, initial=initial,
+        )
+        team_matches = np.bincount(home_index, minlength=len(teams)) + np.bincount(away_index, minlength=len(teams))
+
+        fit, _ = DixonColesFit.objects.update_or_create(
+            league=league, season=season,
+            defaults={
+                'intercept': result['intercept'],
+                'home_advantage': result['home_advantage'],
+                'rho': result['rho'],
+                'attack': dict(zip(teams, result['attack'].round(6).tolist())),
+                'defence': dict(zip(teams, result['defence'].round(6).tolist())),
+                'team_matches': dict(zip(teams, team_matches.tolist())),
+                'xi': self.xi,
+                'matches_count': len(rows),
+                'first_date': min(dates),
+                'last_date': last_date,
+                'log_likelihood': result['log_likelihood'],
+                'converged': result['converged'],
+                'data_version': league.data_version,
+            },
+        )
+        league.bump_model_version()
+        with self._lock:
+            self._fits[league.pk] = (fit, league.data_version, time.monotonic())
+
+        logger.info(
+            f"📐 Dixon-Coles {league.name} {season}: {len(rows)} partidos, {len(teams)} equipos, "
+            f"rho={result['rho']:.4f}, ventaja local={result['home_advantage']:.3f} "
+            f"({result['iterations']} iteraciones{'' if result['converged'] else ', sin converger'})"
+        )
+        return fit
+
+    def parameters(self, league: League) -> Optional[DixonColesFit]:
+        """
+        Ajuste más reciente de la liga. Se reutiliza en memoria mientras corresponda
+        a la versión de datos de la liga; si falta o es de una versión anterior
+        (reajuste en curso) se vuelve a consultar cada MISSING_FIT_RECHECK segundos.
+        """
+        with self._lock:
+            cached = self._fits.get(league.pk)
+        if cached is not None:
+            fit, data_version, read_at = cached
+            if data_version == league.data_version and (
+                (fit is not None and fit.data_version == data_version)
+                or time.monotonic() - read_at < MISSING_FIT_RECHECK
+            ):
+                return fit
+
+        fit = self._latest(league)
+        with self._lock:
+            self._fits[league.pk] = (fit, league.data_version, time.monotonic())
+        return fit
+
+    def _latest(self, league: League) -> Optional[DixonColesFit]:
+        return DixonColesFit.objects.filter(league=league).order_by('-last_date', '-fitted_at').first()
+
+
+# Instancia global
+dixon_coles_fit_service = DixonColesFitService()
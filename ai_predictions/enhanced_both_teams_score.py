@@ -6,12 +6,18 @@ Combina múltiples enfoques estadísticos para predecir si ambos equipos marcar
 import logging
 import numpy as np
 import math
-from django.db.models import Avg, Count, Q
-from football_data.models import Match, League
+from django.db.models import Avg, Count
+from football_data.models import League
 from typing import Tuple, Optional
+from .match_context import uses_match_context
+from .team_history import current_team_history
+from .league_stats import league_stats_service
 
 logger = logging.getLogger(__name__)
 
+# Goles a favor y en contra; sólo cuentan partidos con resultado registrado
+GOALS_STATS = ('goals_for', 'goals_against')
+
 class EnhancedBothTeamsScoreModel:
     """
     Modelo robusto para predecir 'ambos marcan' que combina:
@@ -21,9 +27,7 @@ class EnhancedBothTeamsScoreModel:
     4. Características específicas de la liga
     """
     
-    def __init__(self):
-        self.league_stats_cache = {}
-        
+    @uses_match_context
     def predict(self, home_team: str, away_team: str, league: League) -> float:
         """
         Predice la probabilidad de que ambos equipos marquen
@@ -31,6 +35,16 @@ class EnhancedBothTeamsScoreModel:
         Returns:
             float: Probabilidad entre 0.0 y 1.0
         """
+        return self.predict_with_fallback(home_team, away_team, league)[0]
+    
+    @uses_match_context
+    def predict_with_fallback(self, home_team: str, away_team: str, league: League) -> Tuple[float, bool]:
+        """
+        Igual que predict, indicando además si se usó la probabilidad de respaldo de la liga
+        
+        Returns:
+            tuple: (probabilidad, es_respaldo)
+        """
         try:
             logger.debug(f"🎯 Calculando 'ambos marcan' para {home_team} vs {away_team} en {league.name}")
             
@@ -57,12 +71,12 @@ class EnhancedBothTeamsScoreModel:
             
             logger.debug(f"✅ Probabilidad final 'ambos marcan': {calibrated_prob:.3f}")
             
-            return calibrated_prob
+            return calibrated_prob, False
             
         except Exception as e:
             logger.error(f"❌ Error en predicción ambos marcan: {e}")
             # Fallback robusto basado en liga
-            return self._get_league_fallback(league)
+            return self._get_league_fallback(league), True
     
     def _calculate_poisson_probability(self, home_team: str, away_team: str, league: League) -> float:
         """Calcula probabilidad usando modelo Poisson mejorado"""
@@ -95,33 +109,21 @@ class EnhancedBothTeamsScoreModel:
     def _get_team_stats(self, team_name: str, league: League, is_home: bool) -> Tuple[float, float]:
         """Obtiene estadísticas ofensivas y defensivas de un equipo"""
         
-        # Obtener partidos recientes del equipo
-        matches = Match.objects.filter(
-            Q(home_team=team_name) | Q(away_team=team_name),
-            league=league,
-            fthg__isnull=False,
-            ftag__isnull=False
-        ).order_by('-date')[:20]  # Últimos 20 partidos
+        # Obtener partidos recientes del equipo (últimos 20)
+        history = current_team_history().team(
+            league, team_name, window=20, stats=GOALS_STATS, required=GOALS_STATS
+        )
+        goals_scored = history['goals_for']
+        goals_conceded = history['goals_against']
         
-        if not matches.exists():
+        if not len(goals_scored):
             # Valores por defecto basados en la liga
             league_avg = self._get_league_average_stats(league)
             return league_avg, league_avg
         
-        goals_scored = []
-        goals_conceded = []
-        
-        for match in matches:
-            if match.home_team == team_name:
-                goals_scored.append(match.fthg or 0)
-                goals_conceded.append(match.ftag or 0)
-            else:
-                goals_scored.append(match.ftag or 0)
-                goals_conceded.append(match.fthg or 0)
-        
         # Calcular promedios
-        avg_goals_scored = np.mean(goals_scored) if goals_scored else 1.0
-        avg_goals_conceded = np.mean(goals_conceded) if goals_conceded else 1.0
+        avg_goals_scored = np.mean(goals_scored)
+        avg_goals_conceded = np.mean(goals_conceded)
         
         # Ajustar por ventaja local/visitante
         if is_home:
@@ -133,23 +135,16 @@ class EnhancedBothTeamsScoreModel:
     def _calculate_head_to_head_probability(self, home_team: str, away_team: str, league: League) -> float:
         """Calcula probabilidad basada en enfrentamientos directos"""
         
-        h2h_matches = Match.objects.filter(
-            Q(home_team=home_team, away_team=away_team) | 
-            Q(home_team=away_team, away_team=home_team),
-            league=league,
-            fthg__isnull=False,
-            ftag__isnull=False
-        ).order_by('-date')[:10]  # Últimos 10 enfrentamientos
+        h2h = current_team_history().head_to_head(
+            league, home_team, away_team, window=10,  # Últimos 10 enfrentamientos
+            stats=GOALS_STATS, required=GOALS_STATS
+        )
+        total_matches = len(h2h['goals_for'])
         
-        if not h2h_matches.exists():
+        if not total_matches:
             return 0.5  # Valor neutro si no hay historial
         
-        both_score_count = 0
-        total_matches = len(h2h_matches)
-        
-        for match in h2h_matches:
-            if match.fthg > 0 and match.ftag > 0:
-                both_score_count += 1
+        both_score_count = int(np.sum((h2h['goals_for'] > 0) & (h2h['goals_against'] > 0)))
         
         h2h_prob = both_score_count / total_matches
         
@@ -177,37 +172,21 @@ class EnhancedBothTeamsScoreModel:
     def _get_team_recent_form(self, team_name: str, league: League, is_home: bool) -> float:
         """Obtiene forma reciente de un equipo (0-1, donde 1 es excelente)"""
         
-        matches = Match.objects.filter(
-            Q(home_team=team_name) | Q(away_team=team_name),
-            league=league,
-            fthg__isnull=False,
-            ftag__isnull=False
-        ).order_by('-date')[:8]  # Últimos 8 partidos
+        history = current_team_history().team(
+            league, team_name, window=8, stats=GOALS_STATS, required=GOALS_STATS  # Últimos 8 partidos
+        )
+        team_goals = history['goals_for']
+        opponent_goals = history['goals_against']
+        total_matches = len(team_goals)
         
-        if not matches.exists():
+        if not total_matches:
             return 0.5
         
-        form_score = 0
-        total_matches = len(matches)
-        
-        for match in matches:
-            if match.home_team == team_name:
-                team_goals = match.fthg or 0
-                opponent_goals = match.ftag or 0
-            else:
-                team_goals = match.ftag or 0
-                opponent_goals = match.fthg or 0
-            
-            # Calcular puntuación del partido
-            if team_goals > opponent_goals:
-                form_score += 1.0  # Victoria
-            elif team_goals == opponent_goals:
-                form_score += 0.5  # Empate
-            else:
-                form_score += 0.0  # Derrota
-            
-            # Bonus por goles marcados
-            form_score += min(0.2, team_goals * 0.05)
+        # Puntuación de cada partido: victoria 1, empate 0.5, derrota 0
+        results = np.where(team_goals > opponent_goals, 1.0,
+                           np.where(team_goals == opponent_goals, 0.5, 0.0))
+        # Bonus por goles marcados
+        form_score = np.sum(results) + np.sum(np.minimum(0.2, team_goals * 0.05))
         
         # Normalizar entre 0 y 1
         normalized_form = form_score / (total_matches * 1.2)  # 1.2 para dar espacio al bonus
@@ -215,27 +194,12 @@ class EnhancedBothTeamsScoreModel:
         return max(0.0, min(1.0, normalized_form))
     
     def _calculate_league_baseline_probability(self, league: League) -> float:
-        """Calcula probabilidad base de la liga"""
+        """Calcula probabilidad base de la liga (tasa de ambos marcan del snapshot de la liga)"""
         
-        # Usar caché para evitar consultas repetidas
-        if league.name in self.league_stats_cache:
-            return self.league_stats_cache[league.name]
+        btts_rate = league_stats_service.snapshot(league).btts_rate
         
-        matches = Match.objects.filter(
-            league=league,
-            fthg__isnull=False,
-            ftag__isnull=False
-        )
-        
-        if not matches.exists():
-            # Valor por defecto para ligas sin datos
-            baseline = 0.45
-        else:
-            both_score_count = matches.filter(fthg__gt=0, ftag__gt=0).count()
-            baseline = both_score_count / matches.count()
-        
-        # Cachear resultado
-        self.league_stats_cache[league.name] = baseline
+        # Valor por defecto para ligas sin datos
+        baseline = 0.45 if btts_rate is None else float(btts_rate)
         
         logger.debug(f"🏆 Liga {league.name} - Probabilidad base ambos marcan: {baseline:.3f}")
         
@@ -247,11 +211,9 @@ class EnhancedBothTeamsScoreModel:
         """Combina todas las probabilidades con pesos inteligentes"""
         
         # Determinar pesos basados en la cantidad de datos disponibles
-        h2h_matches = Match.objects.filter(
-            Q(home_team=home_team, away_team=away_team) | 
-            Q(home_team=away_team, away_team=home_team),
-            league=league
-        ).count()
+        h2h_matches = len(current_team_history().head_to_head(
+            league, home_team, away_team, stats=('goals_for',)
+        )['goals_for'])
         
         # Pesos dinámicos
         if h2h_matches >= 5:
@@ -319,19 +281,12 @@ class EnhancedBothTeamsScoreModel:
     def _get_league_average_stats(self, league: League) -> float:
         """Obtiene promedio de goles por partido en la liga"""
         
-        matches = Match.objects.filter(
-            league=league,
-            fthg__isnull=False,
-            ftag__isnull=False
-        )
+        avg_goals = league_stats_service.snapshot(league).avg_goals
         
-        if not matches.exists():
+        if avg_goals is None:
             return 2.5  # Valor por defecto
         
-        total_goals = sum((match.fthg or 0) + (match.ftag or 0) for match in matches)
-        avg_goals = total_goals / matches.count()
-        
-        return avg_goals
+        return float(avg_goals)
     
     def _get_home_advantage_factor(self, league: League) -> float:
         """Calcula factor de ventaja local para la liga"""
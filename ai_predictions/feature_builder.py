@@ -0,0 +1,255 @@
+"""
+Constructor de la matriz de características para entrenar modelos
+
+Carga los partidos de una liga una sola vez en un DataFrame ordenado por fecha
+y calcula para cada partido la forma reciente de ambos equipos con ventanas
+móviles agrupadas por equipo y desplazadas un partido (shift), de modo que cada
+fila sólo ve partidos anteriores: sin fuga de información del propio partido ni
+del futuro. Las medias de la liga usan sólo fechas anteriores.
+
+Todos los entrenadores (PredictionService, RandomForestModel, ModelTrainer y
+SpecializedPredictionModels) comparten las mismas columnas, y la predicción de
+un partido futuro usa exactamente el mismo cálculo (fixture_features).
+Los constructores se reutilizan por liga mientras no cambie League.data_version.
+"""
+
+import logging
+import threading
+from collections import OrderedDict
+from datetime import date, timedelta
+from typing import List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from football_data.models import League, Match
+from .league_stats import DEFAULT_LEAGUE_MEANS
+from .team_history import STAT_COLUMNS, HISTORY_ORDERING
+
+logger = logging.getLogger('ai_predictions')
+
+# Partidos recientes de la liga que se cargan (≈ dos temporadas)
+FEATURE_WINDOW = 760
+
+# Partidos de cada equipo en la ventana móvil de forma
+FORM_WINDOW = 10
+
+# Estadísticas con forma por equipo
+FORM_STATS = ('goals', 'shots', 'shots_on_target', 'corners')
+
+FEATURE_NAMES = (
+    [f'{team}_{stat}_{kind}' for stat in FORM_STATS
+     for team in ('home', 'away') for kind in ('for', 'against', 'for_std')]
+    + ['home_form_matches', 'away_form_matches', 'home_points', 'away_points']
+    + [f'league_{venue}_{stat}' for stat in FORM_STATS for venue in ('home', 'away')]
+)
+
+# Tipo de predicción -> (columna local, columna visitante) que se suman como objetivo
+TARGET_COLUMNS = {
+    'goals_total': ('fthg', 'ftag'),
+    'goals_home': ('fthg',),
+    'goals_away': ('ftag',),
+    'shots_total': ('hs', 'as_field'),
+    'shots_home': ('hs',),
+    'shots_away': ('as_field',),
+    'shots_on_target': ('hst', 'ast'),
+    'shots_on_target_total': ('hst', 'ast'),
+    'corners_total': ('hc', 'ac'),
+    'corners_home': ('hc',),
+    'corners_away': ('ac',),
+}
+
+
+def _venue_frame(matches: pd.DataFrame, venue: str) -> pd.DataFrame:
+    """Una fila por partido desde el punto de vista del local ('home') o del visitante ('away')"""
+    own = 0 if venue == 'home' else 1
+    frame = pd.DataFrame({
+        'row': matches.index,
+        'date': matches['date'],
+        'team': matches['home_team' if venue == 'home' else 'away_team'],
+    })
+    for stat in FORM_STATS:
+        columns = STAT_COLUMNS[stat]
+        frame[f'{stat}_for'] = matches[columns[own]]
+        frame[f'{stat}_against'] = matches[columns[1 - own]]
+    home_goals, away_goals = matches['fthg'], matches['ftag']
+    goal_difference = (home_goals - away_goals) if venue == 'home' else (away_goals - home_goals)
+    frame['points'] = np.select([goal_difference > 0, goal_difference == 0], [3.0, 1.0], 0.0)
+    frame.loc[goal_difference.isna(), 'points'] = np.nan
+    return frame
+
+
+def _shifted_rolling(frame: pd.DataFrame, columns: List[str], window: int, how: str) -> pd.DataFrame:
+    """Estadística móvil por equipo de los `window` partidos anteriores (excluye el actual)"""
+    shifted = frame.groupby('team', sort=False)[columns].shift()
+    shifted['team'] = frame['team']
+    rolling = shifted.groupby('team', sort=False)[columns].rolling(window, min_periods=1)
+    result = rolling.mean() if how == 'mean' else rolling.std(ddof=0) if how == 'std' else rolling.count()
+    return result.reset_index(level=0, drop=True).reindex(frame.index)
+
+
+def _league_means_before(matches: pd.DataFrame, column: str) -> pd.Series:
+    """Media de la columna en todos los partidos de fechas anteriores a cada partido"""
+    by_date = matches.groupby('date')[column].agg(['sum', 'count'])
+    totals = by_date.cumsum().shift()
+    means = totals['sum'] / totals['count'].replace(0, np.nan)
+    return matches['date'].map(means)
+
+
+class FeatureBuilder:
+    """Matriz de características de una liga (una consulta y operaciones de pandas)"""
+
+    def __init__(self, league: League, window: Optional[int] = FEATURE_WINDOW, form_window: int = FORM_WINDOW):
+        # window=None carga todos los partidos de la liga (backtests)
+        self.league = league
+        self.form_window = form_window
+
+        columns = ['date', 'home_team', 'away_team']
+        for stat in FORM_STATS:
+            columns += list(STAT_COLUMNS[stat])
+        rows = list(
+            Match.objects.filter(league=league)
+            .order_by(*HISTORY_ORDERING)
+            .values_list(*columns)[:window]
+        )
+        # Orden cronológico (las consultas traen primero los más recientes)
+        matches = pd.DataFrame(rows[::-1], columns=columns)
+        for column in columns[3:]:
+            matches[column] = pd.to_numeric(matches[column], errors='coerce').astype(float)
+        self.matches = matches
+        self._training_frame = None
+
+    def features(self, fixtures: Optional[List[Tuple[str, str]]] = None, fixture_date: Optional[date] = None) -> pd.DataFrame:
+        """
+        Características de todos los partidos cargados y, al final, de los
+        partidos futuros indicados (local, visitante) a fecha fixture_date.
+        """
+        matches = self.matches
+        if fixtures:
+            last_date = matches['date'].max() if len(matches) else date.today()
+            fixture_date = fixture_date or last_date + timedelta(days=1)
+            upcoming = pd.DataFrame(
+                [{'date': fixture_date, 'home_team': home, 'away_team': away} for home, away in fixtures]
+            )
+            matches = pd.concat([matches, upcoming], ignore_index=True)
+
+        home = _venue_frame(matches, 'home')
+        away = _venue_frame(matches, 'away')
+        window = self.form_window
+        features = pd.DataFrame(index=matches.index)
+
+        for prefix, frame in (('home', home), ('away', away)):
+            for_columns = [f'{stat}_for' for stat in FORM_STATS]
+            against_columns = [f'{stat}_against' for stat in FORM_STATS]
+            means = _shifted_rolling(frame, for_columns + against_columns, window, 'mean')
+            stds = _shifted_rolling(frame, for_columns, window, 'std')
+            counts = _shifted_rolling(frame, ['goals_for'], window, 'count')
+            for stat in FORM_STATS:
+                features[f'{prefix}_{stat}_for'] = means[f'{stat}_for'].to_numpy()
+                features[f'{prefix}_{stat}_against'] = means[f'{stat}_against'].to_numpy()
+                features[f'{prefix}_{stat}_for_std'] = stds[f'{stat}_for'].to_numpy()
+            features[f'{prefix}_form_matches'] = counts['goals_for'].fillna(0).to_numpy() / window
+
+        # Puntos por partido en los últimos partidos (como local y como visitante)
+        home['venue'], away['venue'] = 0, 1
+        both = pd.concat([home, away], ignore_index=True).sort_values(['date', 'row', 'venue'], kind='stable')
+        both['form_points'] = _shifted_rolling(both, ['points'], window, 'mean')['points']
+        for prefix, venue in (('home', 0), ('away', 1)):
+            rows = both[both['venue'] == venue]
+            features[f'{prefix}_points'] = rows.set_index('row')['form_points'].reindex(matches.index).to_numpy()
+
+        # Medias de la liga en fechas anteriores (con valores por defecto al inicio)
+        for stat in FORM_STATS:
+            home_column, away_column = STAT_COLUMNS[stat]
+            default_home, default_away = DEFAULT_LEAGUE_MEANS[stat]
+            features[f'league_home_{stat}'] = _league_means_before(matches, home_column).fillna(default_home).to_numpy()
+            features[f'league_away_{stat}'] = _league_means_before(matches, away_column).fillna(default_away).to_numpy()
+
+        # Equipos sin historial: media de la liga y desviación de Poisson
+        for stat in FORM_STATS:
+            league_home, league_away = features[f'league_home_{stat}'], features[f'league_away_{stat}']
+            features[f'home_{stat}_for'] = features[f'home_{stat}_for'].fillna(league_home)
+            features[f'home_{stat}_against'] = features[f'home_{stat}_against'].fillna(league_away)
+            features[f'away_{stat}_for'] = features[f'away_{stat}_for'].fillna(league_away)
+            features[f'away_{stat}_against'] = features[f'away_{stat}_against'].fillna(league_home)
+            features[f'home_{stat}_for_std'] = features[f'home_{stat}_for_std'].fillna(np.sqrt(features[f'home_{stat}_for']))
+            features[f'away_{stat}_for_std'] = features[f'away_{stat}_for_std'].fillna(np.sqrt(features[f'away_{stat}_for']))
+        features['home_points'] = features['home_points'].fillna(1.0)
+        features['away_points'] = features['away_points'].fillna(1.0)
+
+        return features[FEATURE_NAMES]
+
+    def training_frame(self) -> pd.DataFrame:
+        """Características de los partidos cargados (se calcula una vez por constructor)"""
+        if self._training_frame is None:
+            self._training_frame = self.features()
+        return self._training_frame
+
+    def training_set(self, prediction_type: str, limit: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray, list]:
+        """
+        Matriz de entrenamiento en orden cronológico.
+
+        Sólo incluye partidos con el objetivo disponible y en los que ambos
+        equipos tienen al menos un partido anterior en la ventana.
+
+        Args:
+            prediction_type: Tipo de predicción (define el objetivo, ver TARGET_COLUMNS)
+            limit: Máximo de partidos (los más recientes)
+
+        Returns:
+            (X, y, fechas)
+        """
+        if prediction_type not in TARGET_COLUMNS:
+            raise ValueError(f"Tipo de predicción sin objetivo definido: {prediction_type}")
+        features = self.training_frame()
+        target = self.matches[list(TARGET_COLUMNS[prediction_type])].sum(axis=1, min_count=len(TARGET_COLUMNS[prediction_type]))
+        valid = (
+            target.notna()
+            & (features['home_form_matches'] > 0)
+            & (features['away_form_matches'] > 0)
+        ).to_numpy()
+        X = features.to_numpy(dtype=np.float64)[valid]
+        y = target.to_numpy(dtype=np.float64)[valid]
+        dates = list(self.matches['date'][valid])
+        if limit is not None and len(y) > limit:
+            X, y, dates = X[-limit:], y[-limit:], dates[-limit:]
+        return X, y, dates
+
+    def fixture_features(self, home_team: str, away_team: str, fixture_date: Optional[date] = None) -> np.ndarray:
+        """Vector (1, len(FEATURE_NAMES)) de un partido futuro con el mismo cálculo que el entrenamiento"""
+        features = self.features([(home_team, away_team)], fixture_date)
+        return features.to_numpy(dtype=np.float64)[-1:]
+
+
+class FeatureBuilderCache:
+    """Constructores por liga reutilizados mientras no cambie League.data_version"""
+
+    def __init__(self, size: int = 8):
+        self.size = size
+        self._builders: 'OrderedDict[Tuple[int, int], FeatureBuilder]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, league: League) -> FeatureBuilder:
+        # Versión leída de la base de datos: otro proceso puede haber importado datos
+        data_version = League.objects.filter(pk=league.pk).values_list('data_version', flat=True).first()
+        key = (league.pk, data_version)
+        with self._lock:
+            builder = self._builders.get(key)
+            if builder is not None:
+                self._builders.move_to_end(key)
+                return builder
+
+        builder = FeatureBuilder(league)
+        logger.info(f"🧮 Características de {league.name}: {len(builder.matches)} partidos (versión {data_version})")
+
+        with self._lock:
+            for stale in [k for k in self._builders if k[0] == league.pk]:
+                del self._builders[stale]
+            self._builders[key] = builder
+            while len(self._builders) > self.size:
+                self._builders.popitem(last=False)
+        return builder
+
+
+# Instancia global
+feature_builders = FeatureBuilderCache()
@@ -1,91 +1,131 @@
 """
 Sistema de Calibración por Liga
 Analiza datos históricos para ajustar predicciones según la liga específica
+
+Los factores se calculan de forma perezosa la primera vez que se usa cada liga,
+con una sola consulta aggregate(), y se guardan en caché por proceso junto a
+League.data_version: una importación (señal league_data_changed) los invalida.
+El comando warm_league_calibration los precalcula para todas las ligas.
+Dentro de un historial con fecha de corte (TeamHistory.as_of) los factores se
+calculan con los partidos anteriores a esa fecha y se guardan en su memo.
 """
 
 import logging
-from typing import Dict, Tuple
-from django.db.models import Avg, Count
+import threading
+from datetime import date
+from typing import Dict, Optional, Tuple, Union
+from django.db.models import Avg, Count, F, FloatField, Q
 from football_data.models import Match, League
+from .team_history import current_team_history
 
 logger = logging.getLogger(__name__)
 
+# Mínimo de partidos para calibrar una liga
+MIN_CALIBRATION_MATCHES = 50
+
+# Valores objetivo basados en datos reales
+TARGET_GOALS = 2.5  # Objetivo realista para goles
+TARGET_SHOTS = 22.0  # Objetivo realista para shots (más preciso)
+TARGET_CORNERS = 9.0  # Objetivo realista para corners
+TARGET_BOTH_SCORE = 0.45  # Objetivo realista para ambos marcan
+
+
 class LeagueCalibrationService:
     """Servicio para calibrar predicciones según estadísticas históricas de cada liga"""
     
     def __init__(self):
-        self.calibration_factors = {}
-        self._calculate_calibration_factors()
+        # (liga, versión de datos) -> factores ({} si la liga tiene pocos datos)
+        self.calibration_factors: Dict[Tuple[int, int], Dict] = {}
+        self._lock = threading.Lock()
     
-    def _calculate_calibration_factors(self):
-        """Calcula factores de calibración basados en datos históricos reales"""
+    def _calculate_calibration_factors(self, league: League, as_of: Optional[date] = None) -> Dict:
+        """Calcula factores de calibración basados en datos históricos reales (una consulta)"""
+        
+        goals_complete = Q(fthg__isnull=False, ftag__isnull=False)
+        shots_complete = Q(hs__isnull=False, as_field__isnull=False)
+        matches = Match.objects.filter(league=league)
+        if as_of is not None:
+            matches = matches.filter(date__lt=as_of)
+        stats = matches.aggregate(
+            matches=Count('pk'),
+            avg_goals_total=Avg(F('fthg') + F('ftag'), filter=goals_complete, output_field=FloatField()),
+            avg_shots_total=Avg(F('hs') + F('as_field'), filter=shots_complete, output_field=FloatField()),
+            avg_corners_total=Avg('corners_total'),
+            both_score_matches=Count('pk', filter=Q(fthg__gt=0, ftag__gt=0)),
+        )
+        
+        if stats['matches'] < MIN_CALIBRATION_MATCHES:  # Mínimo de datos para calibración
+            logger.warning(f"Liga {league.name} tiene pocos datos para calibración: {stats['matches']}")
+            return {}
+        
+        avg_goals_total = stats['avg_goals_total'] or 0
+        avg_shots_total = stats['avg_shots_total'] or 0
+        avg_corners_total = stats['avg_corners_total'] or 0
+        both_score_rate = stats['both_score_matches'] / stats['matches']
+        
+        # Calcular factores de reducción
+        goals_factor = min(1.0, TARGET_GOALS / max(avg_goals_total, 1.0))
+        shots_factor = min(1.0, TARGET_SHOTS / max(avg_shots_total, 1.0))
+        corners_factor = min(1.0, TARGET_CORNERS / max(avg_corners_total, 1.0))
+        both_score_factor = min(1.0, TARGET_BOTH_SCORE / max(both_score_rate, 0.1))
         
-        leagues = League.objects.all()
+        logger.info(f"Calibración {league.name}: Goals={goals_factor:.3f}, Shots={shots_factor:.3f}, Corners={corners_factor:.3f}, BothScore={both_score_factor:.3f}")
         
-        for league in leagues:
-            # Obtener datos históricos de la liga
-            matches = Match.objects.filter(league=league)
-            
-            if matches.count() < 50:  # Mínimo de datos para calibración
-                logger.warning(f"Liga {league.name} tiene pocos datos para calibración: {matches.count()}")
-                continue
-            
-            # Calcular promedios históricos reales
-            # Para goals_total: suma de fthg + ftag
-            matches_with_goals = matches.filter(fthg__isnull=False, ftag__isnull=False)
-            if matches_with_goals.exists():
-                total_goals = sum(match.fthg + match.ftag for match in matches_with_goals)
-                avg_goals_total = total_goals / matches_with_goals.count()
-            else:
-                avg_goals_total = 0
-            
-            # Para shots_total: suma de hs + as
-            matches_with_shots = matches.filter(hs__isnull=False, as_field__isnull=False)
-            if matches_with_shots.exists():
-                total_shots = sum(match.hs + match.as_field for match in matches_with_shots)
-                avg_shots_total = total_shots / matches_with_shots.count()
-            else:
-                avg_shots_total = 0
-            
-            avg_corners_total = matches.aggregate(avg=Avg('corners_total'))['avg'] or 0
-            
-            # Calcular ambos marcan real
-            both_score_matches = matches.filter(fthg__gt=0, ftag__gt=0).count()
-            both_score_rate = both_score_matches / matches.count() if matches.count() > 0 else 0
-            
-            # Factores de calibración (valores objetivo basados en datos reales)
-            target_goals = 2.5  # Objetivo realista para goles
-            target_shots = 22.0  # Objetivo realista para shots (más preciso)
-            target_corners = 9.0  # Objetivo realista para corners
-            target_both_score = 0.45  # Objetivo realista para ambos marcan
-            
-            # Calcular factores de reducción
-            goals_factor = min(1.0, target_goals / max(avg_goals_total, 1.0))
-            shots_factor = min(1.0, target_shots / max(avg_shots_total, 1.0))
-            corners_factor = min(1.0, target_corners / max(avg_corners_total, 1.0))
-            both_score_factor = min(1.0, target_both_score / max(both_score_rate, 0.1))
-            
-            self.calibration_factors[league.name] = {
-                'goals': goals_factor,
-                'shots': shots_factor,
-                'corners': corners_factor,
-                'both_score': both_score_factor,
-                'historical_avg_goals': avg_goals_total,
-                'historical_avg_shots': avg_shots_total,
-                'historical_avg_corners': avg_corners_total,
-                'historical_both_score_rate': both_score_rate
-            }
-            
-            logger.info(f"Calibración {league.name}: Goals={goals_factor:.3f}, Shots={shots_factor:.3f}, Corners={corners_factor:.3f}, BothScore={both_score_factor:.3f}")
+        return {
+            'goals': goals_factor,
+            'shots': shots_factor,
+            'corners': corners_factor,
+            'both_score': both_score_factor,
+            'historical_avg_goals': avg_goals_total,
+            'historical_avg_shots': avg_shots_total,
+            'historical_avg_corners': avg_corners_total,
+            'historical_both_score_rate': both_score_rate
+        }
     
-    def calibrate_prediction(self, prediction: float, prediction_type: str, league_name: str) -> float:
-        """Aplica calibración a una predicción específica"""
+    def _resolve_league(self, league: Union[League, str]) -> Optional[League]:
+        if isinstance(league, League):
+            return league
+        return League.objects.filter(name=league).first()
+    
+    def get_factors(self, league: Union[League, str]) -> Dict:
+        """Factores de la liga (se calculan en el primer uso de cada versión de datos)"""
+        league = self._resolve_league(league)
+        if league is None:
+            return {}
         
-        if league_name not in self.calibration_factors:
-            logger.warning(f"No hay factores de calibración para {league_name}")
-            return prediction
+        history = current_team_history()
+        if history.as_of is not None:
+            return history.memoized(
+                ('league_calibration', league.pk, history.as_of),
+                lambda: self._calculate_calibration_factors(league, history.as_of),
+            )
         
-        factors = self.calibration_factors[league_name]
+        key = (league.pk, league.data_version)
+        with self._lock:
+            factors = self.calibration_factors.get(key)
+        if factors is not None:
+            return factors
+        
+        factors = self._calculate_calibration_factors(league)
+        with self._lock:
+            for stale in [k for k in self.calibration_factors if k[0] == league.pk]:
+                del self.calibration_factors[stale]
+            self.calibration_factors[key] = factors
+        return factors
+    
+    def invalidate(self, league: League):
+        """Descarta los factores en caché de la liga (tras importar partidos)"""
+        with self._lock:
+            for stale in [k for k in self.calibration_factors if k[0] == league.pk]:
+                del self.calibration_factors[stale]
+    
+    def calibrate_prediction(self, prediction: float, prediction_type: str, league: Union[League, str]) -> float:
+        """Aplica calibración a una predicción específica (liga o nombre de la liga)"""
+        
+        factors = self.get_factors(league)
+        if not factors:
+            logger.warning(f"No hay factores de calibración para {getattr(league, 'name', league)}")
+            return prediction
         
         # Determinar qué factor aplicar
         if 'goals' in prediction_type:
@@ -114,9 +154,9 @@ class LeagueCalibrationService:
         
         return calibrated
     
-    def get_league_stats(self, league_name: str) -> Dict:
+    def get_league_stats(self, league: Union[League, str]) -> Dict:
         """Obtiene estadísticas históricas de una liga"""
-        return self.calibration_factors.get(league_name, {})
+        return self.get_factors(league)
 
 # Instancia global
 league_calibration = LeagueCalibrationService()
@@ -0,0 +1,205 @@
+"""
+Estadísticas materializadas por liga (LeagueStatsSnapshot)
+
+Medias, varianzas, tasa de ambos marcan y ventaja de local se calculan con
+agregados SQL sobre todos los partidos de la liga; los percentiles de los
+límites realistas (p05/p95/p99) con NumPy sobre los partidos recientes. El
+snapshot se recalcula al cambiar League.data_version (señal league_data_changed)
+o al cambiar de día, porque la ventana reciente depende de la fecha actual.
+
+Dentro de un historial con fecha de corte (TeamHistory.as_of) se calcula en su
+lugar un snapshot en fecha, sin guardar, con los partidos anteriores a as_of.
+"""
+
+import logging
+import threading
+from datetime import date, timedelta
+from typing import Dict, Optional
+
+import numpy as np
+from django.db.models import Avg, Case, Count, F, FloatField, Q, Variance, When
+from django.utils import timezone
+
+from football_data.models import League, Match
+from .models import LeagueStatsSnapshot
+from .team_history import STAT_COLUMNS, HISTORY_ORDERING, current_team_history
+
+logger = logging.getLogger('ai_predictions')
+
+SNAPSHOT_STATS = ('goals', 'shots', 'shots_on_target', 'corners')
+
+# Medias (local, visitante) cuando la liga no tiene datos de la estadística
+DEFAULT_LEAGUE_MEANS = {
+    'goals': (1.5, 1.2),
+    'shots': (12.0, 11.0),
+    'shots_on_target': (4.5, 3.8),
+    'corners': (5.5, 4.5),
+}
+
+# Partidos completos mínimos para usar el factor de liga calculado
+FACTOR_MIN_MATCHES = 50
+
+# Rango del factor de liga (el de los factores fijos que reemplaza)
+FACTOR_RANGE = (0.9, 1.1)
+
+# Ventana de los percentiles: últimos LIMITS_WINDOW partidos de los últimos LIMITS_DAYS días
+LIMITS_WINDOW = 500
+LIMITS_DAYS = 730
+
+
+def _league_matches(league: League, as_of: Optional[date] = None):
+    queryset = Match.objects.filter(league=league)
+    return queryset if as_of is None else queryset.filter(date__lt=as_of)
+
+
+def _aggregate_stats(league: League, as_of: Optional[date] = None) -> Dict:
+    """Medias y varianzas por estadística, ambos marcan y goles por partido (una consulta)"""
+    aggregates = {
+        'matches': Count('pk'),
+        'btts_rate': Avg(
+            Case(When(fthg__gt=0, ftag__gt=0, then=1.0), default=0.0, output_field=FloatField()),
+            filter=Q(fthg__isnull=False, ftag__isnull=False),
+        ),
+    }
+    for stat in SNAPSHOT_STATS:
+        home, away = STAT_COLUMNS[stat]
+        complete = Q(**{f'{home}__isnull': False, f'{away}__isnull': False})
+        aggregates[f'{stat}_count'] = Count('pk', filter=complete)
+        aggregates[f'{stat}_home_mean'] = Avg(home, filter=complete)
+        aggregates[f'{stat}_away_mean'] = Avg(away, filter=complete)
+        aggregates[f'{stat}_total_mean'] = Avg(F(home) + F(away), filter=complete, output_field=FloatField())
+        aggregates[f'{stat}_home_var'] = Variance(home, filter=complete)
+        aggregates[f'{stat}_away_var'] = Variance(away, filter=complete)
+        aggregates[f'{stat}_total_var'] = Variance(F(home) + F(away), filter=complete, output_field=FloatField())
+    return _league_matches(league, as_of).aggregate(**aggregates)
+
+
+def _recent_percentiles(league: League, as_of: Optional[date] = None) -> Dict[str, Dict]:
+    """Percentiles de cada estadística (local y visitante juntos) en los partidos recientes"""
+    columns = [column for stat in SNAPSHOT_STATS for column in STAT_COLUMNS[stat]]
+    cutoff_date = (as_of or timezone.now().date()) - timedelta(days=LIMITS_DAYS)
+    rows = list(
+        _league_matches(league, as_of).filter(date__gte=cutoff_date)
+        .order_by(*HISTORY_ORDERING)
+        .values_list(*columns)[:LIMITS_WINDOW]
+    )
+    matrix = np.array(rows, dtype=np.float64).reshape(len(rows), len(columns))
+
+    percentiles = {}
+    for position, stat in enumerate(SNAPSHOT_STATS):
+        values = matrix[:, 2 * position:2 * position + 2].T.ravel()
+        values = values[~np.isnan(values)]
+        values = values[values >= 0]
+        if not len(values):
+            percentiles[stat] = {'count': 0}
+            continue
+        p05, p95, p99 = np.percentile(values, [5, 95, 99])
+        percentiles[stat] = {
+            'count': int(len(values)),
+            'mean': float(np.mean(values)),
+            'std': float(np.std(values)),
+            'p05': float(p05),
+            'p95': float(p95),
+            'p99': float(p99),
+        }
+    return percentiles
+
+
+class LeagueStatsService:
+    """Lee (con caché por proceso) y recalcula los snapshots de estadísticas de liga"""
+
+    def __init__(self):
+        self._snapshots: Dict[int, LeagueStatsSnapshot] = {}
+        self._lock = threading.Lock()
+
+    def _is_current(self, snapshot: Optional[LeagueStatsSnapshot], league: League) -> bool:
+        return (
+            snapshot is not None
+            and snapshot.data_version == league.data_version
+            and timezone.localdate(snapshot.computed_at) == timezone.localdate()
+        )
+
+    def snapshot(self, league: League) -> LeagueStatsSnapshot:
+        """
+        Snapshot vigente de la liga (se recalcula si cambió la versión de datos o el
+        día). Con un historial en fecha se devuelve el snapshot a esa fecha.
+        """
+        history = current_team_history()
+        if history.as_of is not None:
+            return history.memoized(
+                ('league_stats', league.pk, history.as_of),
+                lambda: LeagueStatsSnapshot(league=league, **self._compute(league, history.as_of)),
+            )
+
+        snapshot = self._snapshots.get(league.pk)
+        if self._is_current(snapshot, league):
+            return snapshot
+
+        snapshot = LeagueStatsSnapshot.objects.filter(league=league).first()
+        if not self._is_current(snapshot, league):
+            snapshot = self.refresh(league)
+        with self._lock:
+            self._snapshots[league.pk] = snapshot
+        return snapshot
+
+    def refresh(self, league: League) -> LeagueStatsSnapshot:
+        """Recalcula y guarda el snapshot de la liga"""
+        snapshot, _ = LeagueStatsSnapshot.objects.update_or_create(
+            league=league, defaults=self._compute(league),
+        )
+        with self._lock:
+            self._snapshots[league.pk] = snapshot
+        league.bump_model_version()
+        logger.info(
+            f"📊 Estadísticas de {league.name} recalculadas: {snapshot.matches_count} partidos "
+            f"(versión {league.data_version})"
+        )
+        return snapshot
+
+    def _compute(self, league: League, as_of: Optional[date] = None) -> Dict:
+        """Campos del snapshot con los partidos anteriores a as_of (todos si es None)"""
+        aggregates = _aggregate_stats(league, as_of)
+        percentiles = _recent_percentiles(league, as_of)
+
+        stats = {}
+        for stat in SNAPSHOT_STATS:
+            home_mean = aggregates[f'{stat}_home_mean']
+            away_mean = aggregates[f'{stat}_away_mean']
+            stats[stat] = {
+                'count': aggregates[f'{stat}_count'],
+                'home_mean': home_mean,
+                'away_mean': away_mean,
+                'total_mean': aggregates[f'{stat}_total_mean'],
+                'home_var': aggregates[f'{stat}_home_var'],
+                'away_var': aggregates[f'{stat}_away_var'],
+                'total_var': aggregates[f'{stat}_total_var'],
+                'home_advantage': home_mean / away_mean if home_mean is not None and away_mean else None,
+                'recent': percentiles[stat],
+            }
+
+        return {
+            'data_version': league.data_version,
+            'matches_count': aggregates['matches'],
+            'btts_rate': aggregates['btts_rate'],
+            'avg_goals': stats['goals']['total_mean'],
+            'stats': stats,
+        }
+
+    def stat(self, league: League, stat: str) -> Dict:
+        """Estadísticas de una estadística de la liga ({} si no se calcula)"""
+        return self.snapshot(league).stats.get(stat, {})
+
+    def league_factor(self, league: League, stat: str) -> Optional[float]:
+        """
+        Media total por partido de la liga respecto a la de referencia
+        (DEFAULT_LEAGUE_MEANS), limitada a FACTOR_RANGE; None con pocos datos.
+        """
+        stats = self.stat(league, stat)
+        if (stats.get('count') or 0) < FACTOR_MIN_MATCHES or not stats.get('total_mean'):
+            return None
+        reference = sum(DEFAULT_LEAGUE_MEANS[stat])
+        return float(np.clip(stats['total_mean'] / reference, *FACTOR_RANGE))
+
+
+# Instancia global
+league_stats_service = LeagueStatsService()
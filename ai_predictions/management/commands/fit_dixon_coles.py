@@ -0,0 +1,39 @@
+"""
+Comando para ajustar Dixon-Coles por máxima verosimilitud en cada liga
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from football_data.models import League
+from ai_predictions.dixon_coles_fit import dixon_coles_fit_service
+
+
+class Command(BaseCommand):
+    help = 'Ajusta los parámetros de Dixon-Coles (ataque, defensa, ventaja local y rho) por liga y temporada'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--league', type=int, default=None, help='ID de la liga (por defecto todas)')
+
+    def handle(self, *args, **options):
+        leagues = League.objects.all()
+        if options['league']:
+            leagues = leagues.filter(id=options['league'])
+
+        started = time.perf_counter()
+        fitted = 0
+        for league in leagues:
+            fit = dixon_coles_fit_service.fit_league(league)
+            if fit is None:
+                self.stdout.write(f"  ⏭️ {league.name}: datos insuficientes")
+                continue
+            fitted += 1
+            self.stdout.write(
+                f"  ⚽ {league.name}: {fit.matches_count} partidos, rho={fit.rho:.4f}, "
+                f"ventaja local={fit.home_advantage:.3f}"
+            )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {fitted} ligas ajustadas en {time.perf_counter() - started:.2f}s"
+        ))
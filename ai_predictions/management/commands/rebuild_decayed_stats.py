@@ -0,0 +1,45 @@
+"""
+Comando para reconstruir (o actualizar) las estadísticas de equipo con decaimiento por liga
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from football_data.models import League
+from ai_predictions.decayed_stats import decayed_stats_service
+
+
+class Command(BaseCommand):
+    help = 'Recalcula las sumas con decaimiento exponencial por equipo, sede y estadística en una pasada cronológica'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--league', type=int, default=None, help='ID de la liga (por defecto todas)')
+        parser.add_argument(
+            '--incremental', action='store_true',
+            help='Procesar sólo los partidos nuevos (reconstruye si cambió algún partido ya procesado)',
+        )
+
+    def handle(self, *args, **options):
+        leagues = League.objects.all()
+        if options['league']:
+            leagues = leagues.filter(id=options['league'])
+
+        half_lives = ', '.join(f'{half_life:g}' for half_life in decayed_stats_service.half_lives)
+        self.stdout.write(f"📉 Vidas medias: {half_lives} días")
+
+        started = time.perf_counter()
+        matches = 0
+        for league in leagues:
+            if options['incremental']:
+                result = decayed_stats_service.update_league(league)
+            else:
+                result = decayed_stats_service.rebuild(league)
+            matches += result['matches']
+            self.stdout.write(
+                f"  📉 {league.name} ({result['mode']}): {result['matches']} partidos, {result['teams']} equipos"
+            )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {matches} partidos procesados en {time.perf_counter() - started:.2f}s"
+        ))
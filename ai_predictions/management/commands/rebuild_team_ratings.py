@@ -0,0 +1,42 @@
+"""
+Comando para reconstruir (o actualizar) los ratings online de los equipos por liga
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from football_data.models import League
+from ai_predictions.team_ratings import team_rating_service
+
+
+class Command(BaseCommand):
+    help = 'Recalcula los ratings online de los equipos (ataque y defensa por sede) en una pasada cronológica'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--league', type=int, default=None, help='ID de la liga (por defecto todas)')
+        parser.add_argument(
+            '--incremental', action='store_true',
+            help='Procesar sólo los partidos nuevos (reconstruye si cambió algún partido ya procesado)',
+        )
+
+    def handle(self, *args, **options):
+        leagues = League.objects.all()
+        if options['league']:
+            leagues = leagues.filter(id=options['league'])
+
+        started = time.perf_counter()
+        matches = 0
+        for league in leagues:
+            if options['incremental']:
+                result = team_rating_service.update_league(league)
+            else:
+                result = team_rating_service.rebuild(league)
+            matches += result['matches']
+            self.stdout.write(
+                f"  📈 {league.name} ({result['mode']}): {result['matches']} partidos, {result['teams']} equipos"
+            )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {matches} partidos procesados en {time.perf_counter() - started:.2f}s"
+        ))
@@ -0,0 +1,52 @@
+"""
+Worker que procesa los trabajos de entrenamiento en cola (TrainingJob)
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from ai_predictions.training_jobs import training_job_service
+
+
+class Command(BaseCommand):
+    help = 'Entrena en segundo plano los modelos encolados tras las importaciones'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true',
+                            help='Procesar los trabajos pendientes y terminar')
+        parser.add_argument('--sleep', type=float, default=10.0,
+                            help='Segundos de espera cuando no hay trabajos pendientes')
+        parser.add_argument('--enqueue-all', action='store_true',
+                            help='Encolar antes todas las ligas (p.ej. tras un despliegue)')
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS('🚀 Worker de entrenamiento iniciado'))
+
+        if options['enqueue_all']:
+            from football_data.models import League
+            for league in League.objects.all():
+                training_job_service.enqueue_league(league, reason='manual')
+
+        try:
+            while True:
+                job = training_job_service.claim_next_job()
+                if job is None:
+                    if options['once']:
+                        break
+                    time.sleep(options['sleep'])
+                    continue
+
+                self.stdout.write(f"🧠 Trabajo #{job.id}: {job.registry_key} {job.league.name} - {job.prediction_type}")
+                job = training_job_service.run_job(job)
+                if job.status == 'completed':
+                    self.stdout.write(self.style.SUCCESS(
+                        f"✅ Trabajo #{job.id}: {job.samples_count or 0} muestras en {job.duration_seconds:.2f}s "
+                        f"{job.metrics}"
+                    ))
+                elif job.status == 'skipped':
+                    self.stdout.write(f"⏭️ Trabajo #{job.id}: datos insuficientes")
+                else:
+                    self.stdout.write(self.style.ERROR(f"❌ Trabajo #{job.id}: {job.error}"))
+        except KeyboardInterrupt:
+            self.stdout.write('🛑 Worker detenido')
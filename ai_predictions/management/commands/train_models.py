@@ -0,0 +1,68 @@
+"""
+Comando para (re)entrenar los modelos del registro bajo demanda o desde cron
+"""
+
+import time
+
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+
+from football_data.models import League
+from ai_predictions.model_registry import TRAINABLE_MODELS, train_model
+
+
+class Command(BaseCommand):
+    help = 'Entrena los modelos de predicción y guarda los artefactos en el registro de modelos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--league', type=int, default=None, help='ID de la liga (por defecto todas)')
+        parser.add_argument('--key', choices=sorted(TRAINABLE_MODELS), action='append',
+                            help='Familia de modelos (repetible; por defecto todas)')
+        parser.add_argument('--type', dest='prediction_types', action='append',
+                            help='Tipo de predicción (repetible; por defecto los de cada familia)')
+        parser.add_argument('--nba', action='store_true', help='Entrenar también los modelos de la NBA')
+
+    def handle(self, *args, **options):
+        leagues = League.objects.all()
+        if options['league']:
+            leagues = leagues.filter(id=options['league'])
+            if not leagues.exists():
+                raise CommandError(f"No existe la liga {options['league']}")
+        keys = options['key'] or sorted(TRAINABLE_MODELS)
+
+        started = time.perf_counter()
+        trained = failed = 0
+        for league in leagues:
+            for key in keys:
+                for prediction_type in TRAINABLE_MODELS[key]:
+                    if options['prediction_types'] and prediction_type not in options['prediction_types']:
+                        continue
+                    try:
+                        record = train_model(key, league, prediction_type)
+                    except Exception as e:
+                        failed += 1
+                        self.stdout.write(self.style.WARNING(f"  ⚠️ {league.name} {key} {prediction_type}: {e}"))
+                        continue
+                    if record is None:
+                        self.stdout.write(f"  ⏭️ {league.name} {key} {prediction_type}: datos insuficientes")
+                        continue
+                    trained += 1
+                    self.stdout.write(
+                        f"  🧠 {league.name} {key} {prediction_type}: {record.model_type}, "
+                        f"{record.samples_count or 0} muestras"
+                    )
+
+        if options['nba'] and not apps.is_installed('basketball_data'):
+            self.stdout.write(self.style.WARNING("  ⚠️ basketball_data no está en INSTALLED_APPS, se omite la NBA"))
+        elif options['nba']:
+            from basketball_data.multi_models import nba_multi_model_service
+            for name, success in nba_multi_model_service.retrain_models().items():
+                if not success:
+                    self.stdout.write(f"  ⏭️ NBA {name}: datos insuficientes")
+                else:
+                    trained += 1
+                    self.stdout.write(f"  🏀 NBA {name} entrenado")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {trained} modelos entrenados, {failed} con error, en {time.perf_counter() - started:.2f}s"
+        ))
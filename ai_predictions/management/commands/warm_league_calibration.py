@@ -0,0 +1,39 @@
+"""
+Comando para precalcular los factores de calibración por liga
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from football_data.models import League
+from ai_predictions.league_calibration import league_calibration
+
+
+class Command(BaseCommand):
+    help = 'Precalcula los factores de calibración por liga (p.ej. al arrancar los workers)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--league', type=int, default=None, help='ID de la liga (por defecto todas)')
+
+    def handle(self, *args, **options):
+        leagues = League.objects.all()
+        if options['league']:
+            leagues = leagues.filter(id=options['league'])
+
+        started = time.perf_counter()
+        calibrated = 0
+        for league in leagues:
+            factors = league_calibration.get_factors(league)
+            if not factors:
+                self.stdout.write(f"  ⏭️ {league.name}: datos insuficientes")
+                continue
+            calibrated += 1
+            self.stdout.write(
+                f"  ⚖️ {league.name}: goles={factors['goals']:.3f}, remates={factors['shots']:.3f}, "
+                f"corners={factors['corners']:.3f}, ambos marcan={factors['both_score']:.3f}"
+            )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {calibrated} ligas calibradas en {time.perf_counter() - started:.2f}s"
+        ))
@@ -0,0 +1,166 @@
+"""
+Contexto de partido compartido por todos los tipos de predicción
+
+Una predicción completa (11 mercados) consulta una y otra vez el historial del
+local, del visitante, sus enfrentamientos directos y los promedios de la liga.
+MatchContext lee todos los partidos de la liga en una sola consulta y responde
+en memoria a las mismas preguntas que TeamHistory, de modo que el número de
+consultas de una predicción no depende de cuántos modelos se ejecuten.
+
+Los partidos se leen sin fecha de corte y as_of se aplica en memoria, así que
+at() permite volver a puntuar el mismo partido en otras fechas sin releerlos.
+"""
+
+import copy
+import functools
+import logging
+from datetime import date
+from typing import Optional
+
+import numpy as np
+
+from football_data.models import Match, League
+from .team_history import (
+    TeamHistory, STAT_COLUMNS, HISTORY_ORDERING, _stat_column, use_team_history, team_history_scope,
+)
+
+logger = logging.getLogger('ai_predictions')
+
+# Todas las columnas de estadísticas de Match que puede pedir un modelo
+CONTEXT_COLUMNS = tuple(column for columns in STAT_COLUMNS.values() for column in columns)
+
+
+class MatchContext(TeamHistory):
+    """
+    Historial precargado de un partido (liga, local, visitante).
+
+    Las consultas sobre la liga del partido, sobre cualquiera de los dos
+    equipos o sobre su enfrentamiento directo se resuelven en memoria; el resto
+    se delega en TeamHistory (con el mismo memo y la misma fecha de corte).
+    """
+
+    def __init__(self, league: League, home_team: str, away_team: str, as_of: Optional[date] = None):
+        super().__init__(as_of)
+        self.match_league = league
+        self.home_team = home_team
+        self.away_team = away_team
+        self._load_matches()
+
+    def _load_matches(self):
+        """Lee de una vez todos los partidos de la liga con sus estadísticas"""
+        rows = list(
+            Match.objects.filter(league=self.match_league)
+            .order_by(*HISTORY_ORDERING)
+            .values_list('date', 'home_team', 'away_team', *CONTEXT_COLUMNS)
+        )
+        self.queries += 1
+
+        self._dates = np.array([row[0] for row in rows], dtype='datetime64[D]')
+        self._home_teams = np.array([row[1] for row in rows], dtype=object)
+        self._away_teams = np.array([row[2] for row in rows], dtype=object)
+        self._values = np.array(
+            [row[3:] for row in rows], dtype=np.float64
+        ).reshape(len(rows), len(CONTEXT_COLUMNS))
+        self._column_index = {column: index for index, column in enumerate(CONTEXT_COLUMNS)}
+
+        logger.debug(
+            f"MatchContext {self.home_team} vs {self.away_team}: "
+            f"{len(rows)} partidos de {self.match_league.name} precargados"
+        )
+
+    def at(self, as_of: Optional[date]) -> 'MatchContext':
+        """El mismo contexto con otra fecha de corte (comparte los partidos leídos, memo nuevo)"""
+        context = copy.copy(self)
+        context._memo = {}
+        context.queries = 0
+        context.as_of = as_of
+        return context
+
+    def _covers_league(self, league: League) -> bool:
+        return league.pk == self.match_league.pk
+
+    def _covers_team(self, league: League, team: str) -> bool:
+        return self._covers_league(league) and team in (self.home_team, self.away_team)
+
+    def _load_team(self, league, team, venue, window, stats, since, required):
+        if not self._covers_team(league, team):
+            return super()._load_team(league, team, venue, window, stats, since, required)
+
+        if venue == 'home':
+            mask = self._home_teams == team
+        elif venue == 'away':
+            mask = self._away_teams == team
+        else:
+            mask = (self._home_teams == team) | (self._away_teams == team)
+        return self._select(mask, team, venue, window, stats, since, required)
+
+    def _load_head_to_head(self, league, home_team, away_team, window, stats, required):
+        if not (self._covers_league(league) and {home_team, away_team} == {self.home_team, self.away_team}):
+            return super()._load_head_to_head(league, home_team, away_team, window, stats, required)
+
+        mask = (
+            ((self._home_teams == home_team) & (self._away_teams == away_team)) |
+            ((self._home_teams == away_team) & (self._away_teams == home_team))
+        )
+        return self._select(mask, home_team, None, window, stats, None, required)
+
+    def _load_league(self, league, window, stats, since, required):
+        if not self._covers_league(league):
+            return super()._load_league(league, window, stats, since, required)
+
+        mask = np.ones(len(self._dates), dtype=bool)
+        return self._select(mask, None, 'home', window, stats, since, required)
+
+    def _column(self, stat, venue):
+        return self._values[:, self._column_index[_stat_column(stat, venue)]]
+
+    def _select(self, mask, team, venue, window, stats, since, required):
+        """
+        Equivalente en memoria de las consultas de TeamHistory: filtra por fecha y
+        estadísticas obligatorias, recorta la ventana y orienta las columnas.
+        """
+        if self.as_of is not None:
+            mask = mask & (self._dates < np.datetime64(self.as_of, 'D'))
+        if since is not None:
+            mask = mask & (self._dates >= np.datetime64(since, 'D'))
+        venues = (venue,) if venue is not None else ('home', 'away')
+        for stat in required:
+            for required_venue in venues:
+                mask = mask & ~np.isnan(self._column(stat, required_venue))
+
+        index = np.flatnonzero(mask)
+        if window is not None:
+            index = index[:window]
+
+        if venue is None:
+            is_home = self._home_teams[index] == team
+        result = {}
+        for stat in stats:
+            if venue is not None:
+                values = self._column(stat, venue)[index]
+            else:
+                values = np.where(is_home, self._column(stat, 'home')[index], self._column(stat, 'away')[index])
+            values = np.ascontiguousarray(values, dtype=np.float64)
+            values.flags.writeable = False
+            result[stat] = values
+        return result
+
+
+def uses_match_context(method):
+    """
+    Permite pasar `context=MatchContext(...)` y/o `as_of=fecha` a un método de
+    predicción: durante la llamada todas las lecturas de historial (también las
+    de los modelos que invoca) se resuelven con ese contexto y esa fecha de corte.
+    """
+    @functools.wraps(method)
+    def wrapper(*args, context=None, as_of=None, **kwargs):
+        if context is None:
+            if as_of is None:
+                return method(*args, **kwargs)
+            with team_history_scope(as_of):
+                return method(*args, **kwargs)
+        if as_of is not None and as_of != context.as_of:
+            context = context.at(as_of)
+        with use_team_history(context):
+            return method(*args, **kwargs)
+    return wrapper
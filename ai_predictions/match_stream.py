@@ -0,0 +1,74 @@
+"""
+Lectura incremental de los partidos de una liga por marca de agua
+
+Los agregados que se mantienen online (ratings de equipos, estadísticas con
+decaimiento) procesan los partidos en orden (fecha, pk) y guardan en su modelo
+de estado el último partido procesado (last_date, last_match_id), cuántos van
+(matches_count) y una suma de control de sus estadísticas (checksum). Tras una
+importación sólo se leen los partidos posteriores a la marca; si algún partido
+ya procesado se modificó o se borró (no coinciden número o suma de control) el
+agregado se reconstruye.
+"""
+
+from typing import Iterable, Optional, Sequence
+
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import Coalesce
+
+from football_data.models import League, Match
+
+# Partidos por lote al leer la liga y al escribir los agregados
+STREAM_CHUNK_SIZE = 2000
+
+
+def row_checksum(values: Iterable[Optional[int]]) -> int:
+    """Suma ponderada por columna de las estadísticas de un partido (igual que checksum_expression)"""
+    return sum(weight * value for weight, value in enumerate(values, start=1) if value is not None)
+
+
+def checksum_expression(columns: Sequence[str]):
+    return sum(
+        (weight * Coalesce(column, 0) for weight, column in enumerate(columns[1:], start=2)),
+        Coalesce(columns[0], 0),
+    )
+
+
+def processed_matches(league: League, state):
+    """Partidos de la liga hasta la marca de agua (incluida)"""
+    return Match.objects.filter(league=league).filter(
+        Q(date__lt=state.last_date) | Q(date=state.last_date, pk__lte=state.last_match_id)
+    )
+
+
+def pending_matches(league: League, state):
+    """Partidos de la liga posteriores a la marca de agua"""
+    queryset = Match.objects.filter(league=league)
+    if state.last_date is None:
+        return queryset
+    return queryset.filter(Q(date__gt=state.last_date) | Q(date=state.last_date, pk__gt=state.last_match_id))
+
+
+def prefix_unchanged(league: League, state, columns: Sequence[str]) -> bool:
+    """Los partidos ya procesados siguen siendo los mismos (mismo número y suma de control)"""
+    if state.last_date is None:
+        return state.matches_count == 0
+    totals = processed_matches(league, state).aggregate(
+        matches=Count('pk'), checksum=Sum(checksum_expression(columns)),
+    )
+    return totals['matches'] == state.matches_count and (totals['checksum'] or 0) == state.checksum
+
+
+def stream_rows(queryset, columns: Sequence[str]):
+    """(pk, fecha, local, visitante, *columnas) en orden cronológico, por lotes"""
+    return (
+        queryset.order_by('date', 'pk')
+        .values_list('pk', 'date', 'home_team', 'away_team', *columns)
+        .iterator(chunk_size=STREAM_CHUNK_SIZE)
+    )
+
+
+def advance(state, pk: int, match_date, values: Iterable[Optional[int]]):
+    """Mueve la marca de agua al partido procesado"""
+    state.matches_count += 1
+    state.checksum += row_checksum(values)
+    state.last_date, state.last_match_id = match_date, pk
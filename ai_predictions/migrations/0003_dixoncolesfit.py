@@ -0,0 +1,43 @@
+# Generated by Django 5.2.6 on 2026-10-18 06:23
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('football_data', '0009_league_data_version'),
+        ('ai_predictions', '0002_savedprediction'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DixonColesFit',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('season', models.CharField(blank=True, max_length=20, verbose_name='Temporada')),
+                ('intercept', models.FloatField(verbose_name='Intercepto')),
+                ('home_advantage', models.FloatField(verbose_name='Ventaja de Local')),
+                ('rho', models.FloatField(verbose_name='Rho')),
+                ('attack', models.JSONField(default=dict, verbose_name='Ataque por Equipo')),
+                ('defence', models.JSONField(default=dict, verbose_name='Defensa por Equipo')),
+                ('team_matches', models.JSONField(default=dict, verbose_name='Partidos por Equipo')),
+                ('xi', models.FloatField(default=0.0, verbose_name='Decaimiento Temporal (por día)')),
+                ('matches_count', models.IntegerField(default=0, verbose_name='Partidos Usados')),
+                ('first_date', models.DateField(blank=True, null=True, verbose_name='Primer Partido')),
+                ('last_date', models.DateField(blank=True, null=True, verbose_name='Último Partido')),
+                ('log_likelihood', models.FloatField(blank=True, null=True, verbose_name='Log-verosimilitud')),
+                ('converged', models.BooleanField(default=False, verbose_name='Convergió')),
+                ('data_version', models.PositiveIntegerField(default=0, verbose_name='Versión de Datos de la Liga')),
+                ('fitted_at', models.DateTimeField(auto_now=True, verbose_name='Fecha de Ajuste')),
+                ('league', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='dixon_coles_fits', to='football_data.league', verbose_name='Liga')),
+            ],
+            options={
+                'verbose_name': 'Ajuste Dixon-Coles',
+                'verbose_name_plural': 'Ajustes Dixon-Coles',
+                'ordering': ['-fitted_at'],
+                'unique_together': {('league', 'season')},
+            },
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.6 on 2026-10-18 06:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_predictions', '0003_dixoncolesfit'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='predictionmodel',
+            name='artifact_path',
+            field=models.CharField(blank=True, max_length=255, verbose_name='Artefacto'),
+        ),
+        migrations.AddField(
+            model_name='predictionmodel',
+            name='data_version',
+            field=models.PositiveIntegerField(blank=True, null=True, verbose_name='Versión de Datos de la Liga'),
+        ),
+        migrations.AddField(
+            model_name='predictionmodel',
+            name='registry_key',
+            field=models.CharField(blank=True, db_index=True, max_length=50, verbose_name='Clave del Registro'),
+        ),
+        migrations.AddField(
+            model_name='predictionmodel',
+            name='samples_count',
+            field=models.IntegerField(blank=True, null=True, verbose_name='Muestras de Entrenamiento'),
+        ),
+        migrations.AddField(
+            model_name='predictionmodel',
+            name='training_window',
+            field=models.JSONField(blank=True, default=dict, verbose_name='Ventana de Entrenamiento'),
+        ),
+        migrations.AlterField(
+            model_name='predictionmodel',
+            name='model_type',
+            field=models.CharField(choices=[('linear_regression', 'Regresión Lineal'), ('ridge', 'Regresión Ridge'), ('random_forest', 'Random Forest'), ('gradient_boosting', 'Gradient Boosting'), ('neural_network', 'Red Neuronal')], max_length=50, verbose_name='Tipo de Modelo'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.6 on 2026-10-18 06:32
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('football_data', '0009_league_data_version'),
+        ('ai_predictions', '0004_predictionmodel_artifact_path_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrainingJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('registry_key', models.CharField(max_length=50, verbose_name='Clave del Registro')),
+                ('prediction_type', models.CharField(max_length=50, verbose_name='Tipo de Predicción')),
+                ('data_version', models.PositiveIntegerField(default=0, verbose_name='Versión de Datos de la Liga')),
+                ('reason', models.CharField(blank=True, max_length=20, verbose_name='Motivo')),
+                ('status', models.CharField(choices=[('pending', 'Pendiente'), ('running', 'En proceso'), ('completed', 'Completado'), ('skipped', 'Omitido (datos insuficientes)'), ('failed', 'Fallido')], db_index=True, default='pending', max_length=20)),
+                ('worker', models.CharField(blank=True, max_length=100, verbose_name='Worker')),
+                ('attempts', models.IntegerField(default=0, verbose_name='Intentos')),
+                ('samples_count', models.IntegerField(blank=True, null=True, verbose_name='Muestras de Entrenamiento')),
+                ('duration_seconds', models.FloatField(blank=True, null=True, verbose_name='Duración (s)')),
+                ('metrics', models.JSONField(blank=True, default=dict, verbose_name='Métricas de Validación')),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('league', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='training_jobs', to='football_data.league', verbose_name='Liga')),
+                ('prediction_model', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='training_jobs', to='ai_predictions.predictionmodel', verbose_name='Modelo Registrado')),
+            ],
+            options={
+                'verbose_name': 'Trabajo de Entrenamiento',
+                'verbose_name_plural': 'Trabajos de Entrenamiento',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['league', 'registry_key', 'prediction_type', 'status'], name='ai_predicti_league__39ba48_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.6 on 2026-10-18 06:34
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('football_data', '0009_league_data_version'),
+        ('ai_predictions', '0005_trainingjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeagueStatsSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data_version', models.PositiveIntegerField(default=0, verbose_name='Versión de Datos de la Liga')),
+                ('matches_count', models.IntegerField(default=0, verbose_name='Partidos')),
+                ('btts_rate', models.FloatField(blank=True, null=True, verbose_name='Tasa Ambos Marcan')),
+                ('avg_goals', models.FloatField(blank=True, null=True, verbose_name='Goles por Partido')),
+                ('stats', models.JSONField(default=dict, verbose_name='Estadísticas')),
+                ('computed_at', models.DateTimeField(auto_now=True, verbose_name='Fecha de Cálculo')),
+                ('league', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='stats_snapshot', to='football_data.league', verbose_name='Liga')),
+            ],
+            options={
+                'verbose_name': 'Estadísticas de Liga',
+                'verbose_name_plural': 'Estadísticas de Ligas',
+                'ordering': ['league__name'],
+            },
+        ),
+    ]
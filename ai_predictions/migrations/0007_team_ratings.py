@@ -0,0 +1,71 @@
+# Generated by Django 5.2.6 on 2026-10-18 06:52
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('football_data', '0009_league_data_version'),
+        ('ai_predictions', '0006_leaguestatssnapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TeamRatingState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('league_means', models.JSONField(default=dict, verbose_name='Medias de la Liga')),
+                ('matches_count', models.IntegerField(default=0, verbose_name='Partidos Procesados')),
+                ('checksum', models.BigIntegerField(default=0, verbose_name='Suma de Control')),
+                ('last_date', models.DateField(blank=True, null=True, verbose_name='Último Partido')),
+                ('last_match_id', models.BigIntegerField(blank=True, null=True, verbose_name='ID del Último Partido')),
+                ('data_version', models.PositiveIntegerField(default=0, verbose_name='Versión de Datos de la Liga')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Fecha de Actualización')),
+                ('league', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='rating_state', to='football_data.league', verbose_name='Liga')),
+            ],
+            options={
+                'verbose_name': 'Estado de Ratings',
+                'verbose_name_plural': 'Estados de Ratings',
+                'ordering': ['league__name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='TeamRatingHistory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('team', models.CharField(max_length=100, verbose_name='Equipo')),
+                ('date', models.DateField(verbose_name='Fecha')),
+                ('ratings', models.JSONField(default=dict, verbose_name='Ratings')),
+                ('league_means', models.JSONField(default=dict, verbose_name='Medias de la Liga')),
+                ('matches_count', models.IntegerField(default=0, verbose_name='Partidos')),
+                ('league', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='team_rating_history', to='football_data.league', verbose_name='Liga')),
+            ],
+            options={
+                'verbose_name': 'Historial de Rating',
+                'verbose_name_plural': 'Historial de Ratings',
+                'ordering': ['-date'],
+                'unique_together': {('league', 'team', 'date')},
+            },
+        ),
+        migrations.CreateModel(
+            name='TeamRating',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('team', models.CharField(max_length=100, verbose_name='Equipo')),
+                ('ratings', models.JSONField(default=dict, verbose_name='Ratings')),
+                ('league_means', models.JSONField(default=dict, verbose_name='Medias de la Liga')),
+                ('matches_count', models.IntegerField(default=0, verbose_name='Partidos')),
+                ('last_date', models.DateField(blank=True, null=True, verbose_name='Último Partido')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Fecha de Actualización')),
+                ('league', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='team_ratings', to='football_data.league', verbose_name='Liga')),
+            ],
+            options={
+                'verbose_name': 'Rating de Equipo',
+                'verbose_name_plural': 'Ratings de Equipos',
+                'ordering': ['league__name', 'team'],
+                'unique_together': {('league', 'team')},
+            },
+        ),
+    ]
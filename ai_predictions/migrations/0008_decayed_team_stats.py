@@ -0,0 +1,54 @@
+# Generated by Django 5.2.6 on 2026-10-18 06:58
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('football_data', '0009_league_data_version'),
+        ('ai_predictions', '0007_team_ratings'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DecayedStatsState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('half_lives', models.JSONField(default=list, verbose_name='Vidas Medias (días)')),
+                ('matches_count', models.IntegerField(default=0, verbose_name='Partidos Procesados')),
+                ('checksum', models.BigIntegerField(default=0, verbose_name='Suma de Control')),
+                ('last_date', models.DateField(blank=True, null=True, verbose_name='Último Partido')),
+                ('last_match_id', models.BigIntegerField(blank=True, null=True, verbose_name='ID del Último Partido')),
+                ('data_version', models.PositiveIntegerField(default=0, verbose_name='Versión de Datos de la Liga')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Fecha de Actualización')),
+                ('league', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='decayed_stats_state', to='football_data.league', verbose_name='Liga')),
+            ],
+            options={
+                'verbose_name': 'Estado de Estadísticas con Decaimiento',
+                'verbose_name_plural': 'Estados de Estadísticas con Decaimiento',
+                'ordering': ['league__name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='DecayedTeamStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('team', models.CharField(max_length=100, verbose_name='Equipo')),
+                ('venue', models.CharField(choices=[('home', 'Local'), ('away', 'Visitante')], max_length=4, verbose_name='Sede')),
+                ('stat', models.CharField(max_length=20, verbose_name='Estadística')),
+                ('sums', models.JSONField(default=dict, verbose_name='Sumas Ponderadas')),
+                ('matches_count', models.IntegerField(default=0, verbose_name='Partidos')),
+                ('last_date', models.DateField(blank=True, null=True, verbose_name='Último Partido')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Fecha de Actualización')),
+                ('league', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='decayed_stats', to='football_data.league', verbose_name='Liga')),
+            ],
+            options={
+                'verbose_name': 'Estadística con Decaimiento',
+                'verbose_name_plural': 'Estadísticas con Decaimiento',
+                'ordering': ['league__name', 'team', 'venue', 'stat'],
+                'unique_together': {('league', 'team', 'venue', 'stat')},
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.6 on 2026-10-18 07:30
+
+from django.db import migrations, models
+
+
+def drop_duplicate_pending_jobs(apps, schema_editor):
+    """Deja sólo el trabajo pendiente más reciente de cada (liga, familia, tipo)"""
+    TrainingJob = apps.get_model('ai_predictions', 'TrainingJob')
+    seen = set()
+    pending = TrainingJob.objects.filter(status='pending').order_by('-created_at', '-id')
+    for job_id, league_id, registry_key, prediction_type in pending.values_list(
+        'id', 'league_id', 'registry_key', 'prediction_type'
+    ):
+        key = (league_id, registry_key, prediction_type)
+        if key in seen:
+            TrainingJob.objects.filter(pk=job_id).delete()
+        seen.add(key)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_predictions', '0008_decayed_team_stats'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_duplicate_pending_jobs, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='trainingjob',
+            constraint=models.UniqueConstraint(condition=models.Q(('status', 'pending')), fields=('league', 'registry_key', 'prediction_type'), name='unique_pending_training_job'),
+        ),
+    ]
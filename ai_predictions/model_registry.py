@@ -0,0 +1,265 @@
+"""
+Registro persistente de modelos entrenados (scikit-learn)
+
+Cada artefacto es un archivo joblib con el estimador, su scaler y los metadatos
+con los que se entrenó (esquema de características, ventana de entrenamiento y
+versión de datos). Los modelos de fútbol quedan enlazados desde PredictionModel
+(registry_key, liga, tipo de predicción); otros ámbitos, como la NBA, usan sólo
+la clave y el artefacto más reciente.
+
+Los artefactos se cargan bajo demanda y se mantienen en una caché LRU por
+proceso. Como cada entrenamiento escribe un archivo nuevo, una ruta nunca cambia
+de contenido y la caché no necesita invalidación.
+"""
+
+import logging
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import joblib
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from football_data.models import League
+from .models import PredictionModel
+
+logger = logging.getLogger('ai_predictions')
+
+
+@dataclass
+class ModelArtifact:
+    """Estimador entrenado con su scaler y los datos con los que se entrenó"""
+
+    estimator: object
+    scaler: Optional[object] = None
+    feature_schema: List[str] = field(default_factory=list)
+    training_window: Dict = field(default_factory=dict)
+    data_version: Optional[int] = None
+    metrics: Dict = field(default_factory=dict)
+    trained_at: str = ''
+
+    def transform(self, features) -> np.ndarray:
+        """Valida el número de características y aplica el scaler"""
+        features = np.asarray(features, dtype=np.float64)
+        if features.ndim == 1:
+            features = features.reshape(1, -1)
+        if self.feature_schema and features.shape[1] != len(self.feature_schema):
+            raise ValueError(
+                f"El modelo espera {len(self.feature_schema)} características y recibió {features.shape[1]}"
+            )
+        return self.scaler.transform(features) if self.scaler is not None else features
+
+    def predict(self, features) -> np.ndarray:
+        return self.estimator.predict(self.transform(features))
+
+
+class ModelRegistry:
+    """Guarda, enlaza y carga (con LRU) los artefactos de modelos entrenados"""
+
+    def __init__(self, root: Optional[str] = None, cache_size: Optional[int] = None):
+        self._root = root
+        self._cache_size = cache_size
+        self._cache: 'OrderedDict[str, ModelArtifact]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def root(self) -> Path:
+        return Path(self._root or getattr(settings, 'MODEL_REGISTRY_DIR', settings.BASE_DIR / 'model_registry'))
+
+    @property
+    def cache_size(self) -> int:
+        return self._cache_size or getattr(settings, 'MODEL_REGISTRY_CACHE_SIZE', 32)
+
+    # ------------------------------------------------------------------
+    # Artefactos en disco
+    # ------------------------------------------------------------------
+
+    def save_artifact(self, scope: str, artifact: ModelArtifact) -> str:
+        """Escribe el artefacto en <root>/<scope>/ y retorna su ruta relativa a root"""
+        if not artifact.trained_at:
+            artifact.trained_at = timezone.now().isoformat()
+        relative = Path(scope) / f"{timezone.now():%Y%m%d%H%M%S}-{uuid.uuid4().hex[:8]}.joblib"
+        path = self.root / relative
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        # Escritura atómica: otro proceso nunca ve un archivo a medias
+        temporary = path.with_suffix('.tmp')
+        joblib.dump(artifact, temporary)
+        os.replace(temporary, path)
+        return relative.as_posix()
+
+    def load_artifact(self, relative_path: str) -> ModelArtifact:
+        """Carga un artefacto (desde la LRU si ya se usó en este proceso)"""
+        with self._lock:
+            artifact = self._cache.get(relative_path)
+            if artifact is not None:
+                self._cache.move_to_end(relative_path)
+                return artifact
+
+        artifact = joblib.load(self.root / relative_path)
+
+        with self._lock:
+            self._cache[relative_path] = artifact
+            self._cache.move_to_end(relative_path)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return artifact
+
+    def delete_artifact(self, relative_path: str):
+        with self._lock:
+            self._cache.pop(relative_path, None)
+        try:
+            (self.root / relative_path).unlink()
+        except FileNotFoundError:
+            pass
+
+    def latest_artifact(self, scope: str) -> Optional[ModelArtifact]:
+        """Artefacto más reciente de un ámbito sin PredictionModel (p.ej. NBA)"""
+        directory = self.root / scope
+        if not directory.is_dir():
+            return None
+        names = sorted(path.name for path in directory.glob('*.joblib'))
+        if not names:
+            return None
+        return self.load_artifact((Path(scope) / names[-1]).as_posix())
+
+    def save_latest(self, scope: str, artifact: ModelArtifact) -> str:
+        """Guarda un artefacto de un ámbito sin PredictionModel y borra los antiguos"""
+        relative_path = self.save_artifact(scope, artifact)
+        names = sorted(path.name for path in (self.root / scope).glob('*.joblib'))
+        for name in names[:-self.keep]:
+            self.delete_artifact((Path(scope) / name).as_posix())
+        return relative_path
+
+    @property
+    def keep(self) -> int:
+        """Artefactos antiguos que se conservan por clave (para volver atrás)"""
+        return max(1, getattr(settings, 'MODEL_REGISTRY_KEEP', 3))
+
+    # ------------------------------------------------------------------
+    # Modelos de fútbol enlazados desde PredictionModel
+    # ------------------------------------------------------------------
+
+    def register(self, registry_key: str, league: League, prediction_type: str, model_type: str,
+                 artifact: ModelArtifact, name: Optional[str] = None, **fields) -> PredictionModel:
+        """
+        Guarda el artefacto, crea su PredictionModel activo y desactiva los
+        anteriores de la misma clave, liga y tipo de predicción.
+
+        Args:
+            registry_key: Familia del modelo (define el esquema de características)
+            fields: Campos adicionales de PredictionModel (accuracy, mae, rmse,
+                    r2_score, model_parameters...)
+        """
+        if artifact.data_version is None:
+            artifact.data_version = league.data_version
+        relative_path = self.save_artifact(f"{registry_key}/{league.pk}/{prediction_type}", artifact)
+        samples = artifact.training_window.get('samples')
+
+        with transaction.atomic():
+            PredictionModel.objects.filter(
+                registry_key=registry_key, league=league, prediction_type=prediction_type, is_active=True,
+            ).update(is_active=False)
+            record = PredictionModel.objects.create(
+                name=name or f"{registry_key} {league.name} - {prediction_type}",
+                model_type=model_type,
+                prediction_type=prediction_type,
+                league=league,
+                registry_key=registry_key,
+                artifact_path=relative_path,
+                features_used=list(artifact.feature_schema),
+                training_window=artifact.training_window,
+                samples_count=samples,
+                data_version=artifact.data_version,
+                **fields,
+            )
+            league.bump_model_version()
+
+        self._prune(registry_key, league, prediction_type)
+        logger.info(
+            f"📦 Modelo registrado {record.name}: {relative_path} "
+            f"({samples or 0} muestras, versión de datos {artifact.data_version})"
+        )
+        return record
+
+    def _prune(self, registry_key: str, league: League, prediction_type: str):
+        """Borra los archivos de los modelos inactivos más allá de los últimos MODEL_REGISTRY_KEEP"""
+        stale = PredictionModel.objects.filter(
+            registry_key=registry_key, league=league, prediction_type=prediction_type,
+        ).exclude(artifact_path='').order_by('-trained_at', '-pk')[self.keep:]
+        for record in stale:
+            if record.is_active:
+                continue
+            self.delete_artifact(record.artifact_path)
+            PredictionModel.objects.filter(pk=record.pk).update(artifact_path='')
+
+    def active_record(self, registry_key: str, league: League, prediction_type: str) -> Optional[PredictionModel]:
+        return (
+            PredictionModel.objects
+            .filter(registry_key=registry_key, league=league, prediction_type=prediction_type, is_active=True)
+            .exclude(artifact_path='')
+            .order_by('-trained_at', '-pk')
+            .first()
+        )
+
+    def load_active(self, registry_key: str, league: League, prediction_type: str,
+                    feature_schema: Optional[List[str]] = None) -> Optional[Tuple[PredictionModel, ModelArtifact]]:
+        """
+        (PredictionModel, artefacto) del modelo activo, o None si no hay modelo
+        entrenado o si se entrenó con otras características que feature_schema.
+        """
+        record = self.active_record(registry_key, league, prediction_type)
+        if record is None:
+            return None
+        try:
+            artifact = self.load_artifact(record.artifact_path)
+        except FileNotFoundError:
+            logger.warning(f"Artefacto no encontrado para {record.name}: {record.artifact_path}")
+            return None
+        if feature_schema is not None and list(artifact.feature_schema) != list(feature_schema):
+            logger.info(f"🔁 {record.name} usa otro esquema de características; hay que reentrenarlo")
+            return None
+        return record, artifact
+
+
+# Familias de modelos del registro y tipos de predicción que entrena cada una
+TRAINABLE_MODELS = {
+    'shots_service': ['shots_total', 'shots_home', 'shots_away', 'shots_on_target'],
+    'ensemble_random_forest': ['shots_total', 'shots_home', 'shots_away',
+                               'corners_total', 'corners_home', 'corners_away'],
+    'trainer_best': ['shots_total', 'shots_home', 'shots_away', 'goals_total', 'goals_home', 'goals_away'],
+}
+
+
+def train_model(registry_key: str, league: League, prediction_type: str) -> Optional[PredictionModel]:
+    """
+    Entrena y registra un modelo de la familia indicada.
+
+    Returns:
+        PredictionModel registrado o None si no hay datos suficientes
+    """
+    # Importaciones locales: los entrenadores importan este módulo
+    if registry_key == 'shots_service':
+        from .services import PredictionService
+        return PredictionService().train_shots_model(league, prediction_type)
+    if registry_key == 'ensemble_random_forest':
+        from .random_forest_model import RandomForestModel
+        return RandomForestModel().train(league, prediction_type)
+    if registry_key == 'trainer_best':
+        from .model_trainer import ModelTrainer
+        result = ModelTrainer().train_optimized_model(league, prediction_type)
+        if 'error' in result:
+            raise ValueError(result['error'])
+        return PredictionModel.objects.get(pk=result['model_id'])
+    raise ValueError(f"Familia de modelos desconocida: {registry_key}")
+
+
+# Instancia global
+model_registry = ModelRegistry()
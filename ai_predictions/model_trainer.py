@@ -15,19 +15,30 @@ from typing import Dict, List, Tuple, Optional
 from datetime import datetime, timedelta
 
 from django.utils import timezone
-from django.db import models
 from football_data.models import Match, League
 from .models import PredictionModel, TeamStats
+from .model_registry import model_registry, ModelArtifact
+from .feature_builder import FEATURE_NAMES, feature_builders
+from .training_jobs import training_job_service
 
 logger = logging.getLogger('ai_predictions')
 
+# Clave del registro de modelos para el mejor modelo de cada entrenamiento
+REGISTRY_KEY = 'trainer_best'
+
+# Nombre del modelo en el entrenamiento -> PredictionModel.model_type
+MODEL_TYPES = {
+    'Ridge': 'ridge',
+    'RandomForest': 'random_forest',
+    'LinearRegression': 'linear_regression',
+}
+
 
 class ModelTrainer:
     """Sistema de entrenamiento y optimización de modelos"""
     
     def __init__(self):
         self.scaler = StandardScaler()
-        self.trained_models = {}
     
     def get_enhanced_team_features(self, team_name: str, league: League, is_home: bool = True) -> Dict:
         """Obtiene características mejoradas de un equipo"""
@@ -129,73 +140,25 @@ class ModelTrainer:
             'momentum': 0, 'avg_sot': 3.6, 'sot_rate': 0.3
         }
     
-    def prepare_training_data(self, league: League, prediction_type: str = 'shots_total') -> Tuple[np.ndarray, np.ndarray]:
-        """Prepara datos de entrenamiento para el modelo"""
+    def prepare_training_data(self, league: League, prediction_type: str = 'shots_total') -> Tuple[np.ndarray, np.ndarray, List]:
+        """Prepara datos de entrenamiento para el modelo (X, y y fechas en orden cronológico)"""
         try:
-            # Obtener partidos históricos
-            matches = Match.objects.filter(league=league).exclude(
-                models.Q(hs__isnull=True) | models.Q(as_field__isnull=True)
-            ).order_by('date')
-            
-            if len(matches) < 20:
-                logger.warning(f"Datos insuficientes para entrenamiento: {len(matches)} partidos")
-                return np.array([]), np.array([])
+            X, y, dates = feature_builders.get(league).training_set(prediction_type)
             
-            X = []
-            y = []
-            
-            for match in matches:
-                try:
-                    # Obtener características de ambos equipos
-                    home_features = self.get_enhanced_team_features(match.home_team, league, True)
-                    away_features = self.get_enhanced_team_features(match.away_team, league, False)
-                    
-                    # Crear vector de características combinado
-                    feature_vector = [
-                        home_features['avg_shots'], home_features['std_shots'],
-                        home_features['consistency'], home_features['efficiency'],
-                        home_features['recent_trend'], home_features['momentum'],
-                        home_features['sot_rate'], home_features['home_advantage'],
-                        away_features['avg_shots'], away_features['std_shots'],
-                        away_features['consistency'], away_features['efficiency'],
-                        away_features['recent_trend'], away_features['momentum'],
-                        away_features['sot_rate'], away_features['home_advantage']
-                    ]
-                    
-                    # Variable objetivo
-                    if prediction_type == 'shots_total':
-                        target = (match.hs or 0) + (match.as_field or 0)
-                    elif prediction_type == 'shots_home':
-                        target = match.hs or 0
-                    elif prediction_type == 'shots_away':
-                        target = match.as_field or 0
-                    elif prediction_type == 'goals_total':
-                        target = (match.fthg or 0) + (match.ftag or 0)
-                    elif prediction_type == 'goals_home':
-                        target = match.fthg or 0
-                    elif prediction_type == 'goals_away':
-                        target = match.ftag or 0
-                    else:
-                        target = (match.hs or 0) + (match.as_field or 0)
-                    
-                    X.append(feature_vector)
-                    y.append(target)
-                    
-                except Exception as e:
-                    logger.error(f"Error procesando partido {match.id}: {e}")
-                    continue
+            if len(X) < 20:
+                logger.warning(f"Datos insuficientes para entrenamiento: {len(X)} partidos")
             
-            return np.array(X), np.array(y)
+            return X, y, dates
             
         except Exception as e:
             logger.error(f"Error preparando datos de entrenamiento: {e}")
-            return np.array([]), np.array([])
+            return np.array([]), np.array([]), []
     
     def train_optimized_model(self, league: League, prediction_type: str = 'shots_total') -> Dict:
         """Entrena un modelo optimizado con backtesting"""
         try:
             # Preparar datos
-            X, y = self.prepare_training_data(league, prediction_type)
+            X, y, dates = self.prepare_training_data(league, prediction_type)
             
             if len(X) < 20:
                 return {'error': 'Datos insuficientes para entrenamiento'}
@@ -255,19 +218,38 @@ class ModelTrainer:
                     best_name = name
             
             # Entrenar el mejor modelo con todos los datos
-            X_scaled = self.scaler.fit_transform(X)
+            scaler = StandardScaler()
+            X_scaled = scaler.fit_transform(X)
             best_model.fit(X_scaled, y)
             
-            # Guardar modelo entrenado
+            # Guardar modelo entrenado en el registro
             model_key = f"{league.id}_{prediction_type}"
-            self.trained_models[model_key] = {
-                'model': best_model,
-                'scaler': self.scaler,
-                'features': X.shape[1],
-                'samples': len(X)
-            }
+            artifact = ModelArtifact(
+                estimator=best_model,
+                scaler=scaler,
+                feature_schema=FEATURE_NAMES,
+                training_window={
+                    'from': dates[0].isoformat(),
+                    'to': dates[-1].isoformat(),
+                    'samples': len(X),
+                },
+                metrics={'score': float(best_score), 'mae': float(model_scores[best_name]['mae'])},
+            )
+            record = model_registry.register(
+                REGISTRY_KEY, league, prediction_type, MODEL_TYPES[best_name], artifact,
+                name=f"{best_name} {league.name} - {prediction_type}",
+                mae=float(model_scores[best_name]['mae']),
+                model_parameters={
+                    'score': float(best_score),
+                    'model_scores': {
+                        name: {metric: float(value) for metric, value in scores.items()}
+                        for name, scores in model_scores.items()
+                    },
+                },
+            )
             
             return {
+                'model_id': record.id,
                 'model_name': best_name,
                 'score': best_score,
                 'model_scores': model_scores,
@@ -284,33 +266,20 @@ class ModelTrainer:
                                  prediction_type: str = 'shots_total') -> Dict:
         """Hace predicción usando modelo entrenado"""
         try:
-            model_key = f"{league.id}_{prediction_type}"
+            loaded = model_registry.load_active(REGISTRY_KEY, league, prediction_type, FEATURE_NAMES)
             
-            if model_key not in self.trained_models:
-                # Entrenar modelo si no existe
-                train_result = self.train_optimized_model(league, prediction_type)
-                if 'error' in train_result:
-                    return self._fallback_prediction(train_result['error'])
+            if loaded is None:
+                # El entrenamiento se hace en run_training_worker, nunca durante la predicción
+                training_job_service.enqueue(league, REGISTRY_KEY, [prediction_type], reason='missing')
+                return self._fallback_prediction('Modelo en cola de entrenamiento')
             
-            # Obtener características
-            home_features = self.get_enhanced_team_features(home_team, league, True)
-            away_features = self.get_enhanced_team_features(away_team, league, False)
+            _, artifact = loaded
             
-            # Crear vector de características
-            feature_vector = [
-                home_features['avg_shots'], home_features['std_shots'],
-                home_features['consistency'], home_features['efficiency'],
-                home_features['recent_trend'], home_features['momentum'],
-                home_features['sot_rate'], home_features['home_advantage'],
-                away_features['avg_shots'], away_features['std_shots'],
-                away_features['consistency'], away_features['efficiency'],
-                away_features['recent_trend'], away_features['momentum'],
-                away_features['sot_rate'], away_features['home_advantage']
-            ]
+            # Características con el mismo cálculo que el entrenamiento
+            features = feature_builders.get(league).fixture_features(home_team, away_team)
             
             # Normalizar y predecir
-            X_scaled = self.trained_models[model_key]['scaler'].transform([feature_vector])
-            prediction = self.trained_models[model_key]['model'].predict(X_scaled)[0]
+            prediction = artifact.predict(features)[0]
             
             # Asegurar predicción positiva
             prediction = max(0, prediction)
@@ -330,16 +299,16 @@ class ModelTrainer:
                 probabilities[f'over_{threshold}'] = max(0, min(1, prob))
             
             # Confianza basada en calidad del modelo
-            model_info = self.trained_models[model_key]
-            confidence = min(0.9, max(0.3, model_info['samples'] / 100))
+            samples = artifact.training_window.get('samples', 0)
+            confidence = min(0.9, max(0.3, samples / 100))
             
             return {
                 'model_name': 'Trained Model',
                 'prediction': prediction,
                 'confidence': confidence,
                 'probabilities': probabilities,
-                'total_matches': model_info['samples'],
-                'features_used': model_info['features']
+                'total_matches': samples,
+                'features_used': len(artifact.feature_schema)
             }
             
         except Exception as e:
@@ -8,16 +8,19 @@ from sklearn.model_selection import TimeSeriesSplit
 from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
 from sklearn.preprocessing import StandardScaler
 import logging
-from typing import Dict, List, Tuple, Optional
+from typing import Dict, Iterable, List, Tuple, Optional
+from collections import defaultdict
 from datetime import datetime, timedelta
 
 from django.utils import timezone
-from django.db import models
-from football_data.models import Match, League
+from football_data.models import League
 from .advanced_models import AdvancedStatisticalModels
+from .validation_runner import FoldTask, ValidationData, validation_runner
 
 logger = logging.getLogger('ai_predictions')
 
+CROSS_VALIDATION_MODELS = ('Enhanced Poisson', 'Bayesian', 'Ensemble')
+
 
 class ModelValidator:
     """Sistema de validación y optimización de modelos"""
@@ -26,125 +29,118 @@ class ModelValidator:
         self.advanced_models = AdvancedStatisticalModels()
     
     def temporal_cross_validation(self, league: League, prediction_type: str = 'shots_total') -> Dict:
-        """Validación cruzada temporal para evaluar modelos"""
+        """Validación cruzada temporal para evaluar modelos (folds en paralelo con validation_runner)"""
         try:
-            # Obtener datos históricos ordenados por fecha
-            matches = Match.objects.filter(league=league).exclude(
-                models.Q(hs__isnull=True) | models.Q(as_field__isnull=True)
-            ).order_by('date')
+            data = ValidationData(league)
+            tasks = self.cross_validation_tasks(data, prediction_type)
             
-            if len(matches) < 50:
+            if not tasks:
                 return {'error': 'Datos insuficientes para validación'}
             
-            # Preparar datos para validación
-            validation_data = []
-            for match in matches:
-                try:
-                    if prediction_type == 'shots_total':
-                        target = (match.hs or 0) + (match.as_field or 0)
-                    elif prediction_type == 'shots_home':
-                        target = match.hs or 0
-                    elif prediction_type == 'shots_away':
-                        target = match.as_field or 0
-                    else:
-                        target = (match.hs or 0) + (match.as_field or 0)
-                    
-                    validation_data.append({
-                        'home_team': match.home_team,
-                        'away_team': match.away_team,
-                        'target': target,
-                        'date': match.date
-                    })
-                except:
-                    continue
-            
-            if len(validation_data) < 30:
-                return {'error': 'Datos insuficientes después del procesamiento'}
-            
-            # Dividir en 5 folds temporales
-            n_splits = min(5, len(validation_data) // 10)
-            tscv = TimeSeriesSplit(n_splits=n_splits)
-            
-            results = {
-                'Enhanced Poisson': {'mae': [], 'rmse': [], 'r2': [], 'accuracy_2': [], 'accuracy_3': []},
-                'Bayesian': {'mae': [], 'rmse': [], 'r2': [], 'accuracy_2': [], 'accuracy_3': []},
-                'Ensemble': {'mae': [], 'rmse': [], 'r2': [], 'accuracy_2': [], 'accuracy_3': []}
-            }
-            
-            # Convertir a arrays para validación cruzada
-            X = np.arange(len(validation_data))
-            y = np.array([item['target'] for item in validation_data])
-            
-            for train_idx, test_idx in tscv.split(X):
-                train_data = [validation_data[i] for i in train_idx]
-                test_data = [validation_data[i] for i in test_idx]
-                
-                # Evaluar cada modelo
-                for model_name in ['Enhanced Poisson', 'Bayesian', 'Ensemble']:
-                    try:
-                        predictions = []
-                        actuals = []
-                        
-                        for test_item in test_data:
-                            if model_name == 'Enhanced Poisson':
-                                pred = self.advanced_models.enhanced_poisson_model(
-                                    test_item['home_team'], test_item['away_team'], league, prediction_type
-                                )
-                            elif model_name == 'Bayesian':
-                                pred = self.advanced_models.bayesian_model(
-                                    test_item['home_team'], test_item['away_team'], league, prediction_type
-                                )
-                            else:  # Ensemble
-                                pred = self.advanced_models.ensemble_model(
-                                    test_item['home_team'], test_item['away_team'], league, prediction_type
-                                )
-                            
-                            predictions.append(pred['prediction'])
-                            actuals.append(test_item['target'])
-                        
-                        # Calcular métricas
-                        predictions = np.array(predictions)
-                        actuals = np.array(actuals)
-                        
-                        mae = mean_absolute_error(actuals, predictions)
-                        rmse = np.sqrt(mean_squared_error(actuals, predictions))
-                        r2 = r2_score(actuals, predictions)
-                        
-                        # Accuracy con tolerancia
-                        accuracy_2 = np.mean(np.abs(predictions - actuals) <= 2)
-                        accuracy_3 = np.mean(np.abs(predictions - actuals) <= 3)
-                        
-                        results[model_name]['mae'].append(mae)
-                        results[model_name]['rmse'].append(rmse)
-                        results[model_name]['r2'].append(r2)
-                        results[model_name]['accuracy_2'].append(accuracy_2)
-                        results[model_name]['accuracy_3'].append(accuracy_3)
-                        
-                    except Exception as e:
-                        logger.error(f"Error evaluando {model_name}: {e}")
-                        continue
-            
-            # Calcular promedios
-            final_results = {}
-            for model_name, metrics in results.items():
-                if metrics['mae']:  # Solo si hay datos
-                    final_results[model_name] = {
-                        'mae': np.mean(metrics['mae']),
-                        'rmse': np.mean(metrics['rmse']),
-                        'r2': np.mean(metrics['r2']),
-                        'accuracy_2': np.mean(metrics['accuracy_2']),
-                        'accuracy_3': np.mean(metrics['accuracy_3']),
-                        'folds': len(metrics['mae']),
-                        'std_mae': np.std(metrics['mae']),
-                        'std_accuracy_2': np.std(metrics['accuracy_2'])
-                    }
-            
-            return final_results
+            return self._aggregate_cross_validation(validation_runner.run([data], tasks))
             
         except Exception as e:
             logger.error(f"Error en validación cruzada temporal: {e}")
             return {'error': str(e)}
     
+    def compare_leagues(self, leagues: Iterable[League],
+                        prediction_types: Iterable[str] = ('shots_total', 'shots_home', 'shots_away')) -> Dict:
+        """
+        Validación cruzada de todos los modelos en varias ligas y tipos con un
+        solo pool de procesos: {liga: {tipo: resultados de temporal_cross_validation}}
+        """
+        datasets, tasks = [], []
+        comparison = {}
+        for league in leagues:
+            data = ValidationData(league)
+            datasets.append(data)
+            comparison[league.name] = {}
+            for prediction_type in prediction_types:
+                league_tasks = self.cross_validation_tasks(data, prediction_type)
+                if not league_tasks:
+                    comparison[league.name][prediction_type] = {'error': 'Datos insuficientes para validación'}
+                tasks.extend(league_tasks)
+        
+        results_by_key = defaultdict(list)
+        for result in validation_runner.run(datasets, tasks):
+            task = result[0]
+            results_by_key[(task.league_id, task.prediction_type)].append(result)
+        
+        for data in datasets:
+            for prediction_type in prediction_types:
+                results = results_by_key.get((data.league_id, prediction_type))
+                if results:
+                    comparison[data.league_name][prediction_type] = self._aggregate_cross_validation(results)
+        return comparison
+    
+    def cross_validation_tasks(self, data: ValidationData, prediction_type: str) -> List[FoldTask]:
+        """Tareas de validación cruzada temporal (5 folds × modelos) de una liga; [] con pocos datos"""
+        # Partidos con remates de ambos equipos, en orden cronológico
+        matches = data.rows_with(('hs', 'as_field'))
+        
+        if len(matches) < 50:
+            return []
+        
+        target_type = prediction_type if prediction_type in ('shots_total', 'shots_home', 'shots_away') else 'shots_total'
+        
+        # Dividir en 5 folds temporales
+        n_splits = min(5, len(matches) // 10)
+        tscv = TimeSeriesSplit(n_splits=n_splits)
+        
+        tasks = []
+        for fold, (train_idx, test_idx) in enumerate(tscv.split(matches)):
+            for model_name in CROSS_VALIDATION_MODELS:
+                tasks.append(FoldTask(
+                    league_id=data.league_id,
+                    model_name=model_name,
+                    prediction_type=prediction_type,
+                    target_type=target_type,
+                    fold=fold,
+                    test_rows=matches[test_idx],
+                ))
+        return tasks
+    
+    def _aggregate_cross_validation(self, fold_results: List) -> Dict:
+        """Métricas por fold y promedios por modelo (estructura de temporal_cross_validation)"""
+        results = {
+            model_name: {'mae': [], 'rmse': [], 'r2': [], 'accuracy_2': [], 'accuracy_3': []}
+            for model_name in CROSS_VALIDATION_MODELS
+        }
+        
+        for task, predictions, actuals in fold_results:
+            # Calcular métricas
+            mae = mean_absolute_error(actuals, predictions)
+            rmse = np.sqrt(mean_squared_error(actuals, predictions))
+            r2 = r2_score(actuals, predictions)
+            
+            # Accuracy con tolerancia
+            accuracy_2 = np.mean(np.abs(predictions - actuals) <= 2)
+            accuracy_3 = np.mean(np.abs(predictions - actuals) <= 3)
+            
+            metrics = results[task.model_name]
+            metrics['mae'].append(mae)
+            metrics['rmse'].append(rmse)
+            metrics['r2'].append(r2)
+            metrics['accuracy_2'].append(accuracy_2)
+            metrics['accuracy_3'].append(accuracy_3)
+        
+        # Calcular promedios
+        final_results = {}
+        for model_name, metrics in results.items():
+            if metrics['mae']:  # Solo si hay datos
+                final_results[model_name] = {
+                    'mae': np.mean(metrics['mae']),
+                    'rmse': np.mean(metrics['rmse']),
+                    'r2': np.mean(metrics['r2']),
+                    'accuracy_2': np.mean(metrics['accuracy_2']),
+                    'accuracy_3': np.mean(metrics['accuracy_3']),
+                    'folds': len(metrics['mae']),
+                    'std_mae': np.std(metrics['mae']),
+                    'std_accuracy_2': np.std(metrics['accuracy_2'])
+                }
+        
+        return final_results
+    
     def optimize_model_parameters(self, league: League, prediction_type: str = 'shots_total') -> Dict:
         """Optimiza parámetros de los modelos basándose en validación"""
         try:
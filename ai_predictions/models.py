@@ -2,6 +2,7 @@
 Modelos para predicciones de IA
 """
 
+import math
 from uuid import uuid4
 
 from django.conf import settings
@@ -15,6 +16,7 @@ class PredictionModel(models.Model):
     
     MODEL_TYPES = [
         ('linear_regression', 'Regresión Lineal'),
+        ('ridge', 'Regresión Ridge'),
         ('random_forest', 'Random Forest'),
         ('gradient_boosting', 'Gradient Boosting'),
         ('neural_network', 'Red Neuronal'),
@@ -45,6 +47,13 @@ class PredictionModel(models.Model):
     features_used = models.JSONField(default=list, verbose_name="Características Utilizadas")
     model_parameters = models.JSONField(default=dict, verbose_name="Parámetros del Modelo")
     
+    # Artefacto guardado en el registro de modelos (ver model_registry.py)
+    registry_key = models.CharField(max_length=50, blank=True, db_index=True, verbose_name="Clave del Registro")
+    artifact_path = models.CharField(max_length=255, blank=True, verbose_name="Artefacto")
+    training_window = models.JSONField(default=dict, blank=True, verbose_name="Ventana de Entrenamiento")
+    samples_count = models.IntegerField(null=True, blank=True, verbose_name="Muestras de Entrenamiento")
+    data_version = models.PositiveIntegerField(null=True, blank=True, verbose_name="Versión de Datos de la Liga")
+    
     # Metadatos
     trained_at = models.DateTimeField(default=timezone.now, verbose_name="Fecha de Entrenamiento")
     last_updated = models.DateTimeField(auto_now=True, verbose_name="Última Actualización")
@@ -159,3 +168,258 @@ class SavedPrediction(models.Model):
 
     def __str__(self):
         return f"{self.home_team} vs {self.away_team} - {self.league.name}"
+
+
+class DixonColesFit(models.Model):
+    """
+    Parámetros de Dixon-Coles ajustados por máxima verosimilitud para una liga y
+    temporada (la del último partido ajustado): ataque y defensa de cada equipo,
+    ventaja de local y rho.
+    
+    log λ_local     = intercepto + ventaja_local + ataque[local] + defensa[visitante]
+    log λ_visitante = intercepto + ataque[visitante] + defensa[local]
+    """
+    
+    league = models.ForeignKey(League, on_delete=models.CASCADE, related_name='dixon_coles_fits', verbose_name="Liga")
+    season = models.CharField(max_length=20, blank=True, verbose_name="Temporada")
+    
+    intercept = models.FloatField(verbose_name="Intercepto")
+    home_advantage = models.FloatField(verbose_name="Ventaja de Local")
+    rho = models.FloatField(verbose_name="Rho")
+    attack = models.JSONField(default=dict, verbose_name="Ataque por Equipo")
+    defence = models.JSONField(default=dict, verbose_name="Defensa por Equipo")
+    team_matches = models.JSONField(default=dict, verbose_name="Partidos por Equipo")
+    
+    # Datos y calidad del ajuste
+    xi = models.FloatField(default=0.0, verbose_name="Decaimiento Temporal (por día)")
+    matches_count = models.IntegerField(default=0, verbose_name="Partidos Usados")
+    first_date = models.DateField(null=True, blank=True, verbose_name="Primer Partido")
+    last_date = models.DateField(null=True, blank=True, verbose_name="Último Partido")
+    log_likelihood = models.FloatField(null=True, blank=True, verbose_name="Log-verosimilitud")
+    converged = models.BooleanField(default=False, verbose_name="Convergió")
+    data_version = models.PositiveIntegerField(default=0, verbose_name="Versión de Datos de la Liga")
+    fitted_at = models.DateTimeField(auto_now=True, verbose_name="Fecha de Ajuste")
+    
+    class Meta:
+        verbose_name = "Ajuste Dixon-Coles"
+        verbose_name_plural = "Ajustes Dixon-Coles"
+        unique_together = ['league', 'season']
+        ordering = ['-fitted_at']
+    
+    def __str__(self):
+        return f"Dixon-Coles {self.league.name} {self.season}".strip()
+    
+    def expected_goals(self, home_team: str, away_team: str):
+        """(λ_local, λ_visitante) del partido o None si algún equipo no está en el ajuste"""
+        if home_team not in self.attack or away_team not in self.attack:
+            return None
+        lambda_home = math.exp(
+            self.intercept + self.home_advantage + self.attack[home_team] + self.defence[away_team]
+        )
+        lambda_away = math.exp(self.intercept + self.attack[away_team] + self.defence[home_team])
+        return lambda_home, lambda_away
+
+
+class TrainingJob(models.Model):
+    """Trabajo de entrenamiento en segundo plano (lo procesa el comando run_training_worker)"""
+    
+    STATUS_CHOICES = [
+        ('pending', 'Pendiente'),
+        ('running', 'En proceso'),
+        ('completed', 'Completado'),
+        ('skipped', 'Omitido (datos insuficientes)'),
+        ('failed', 'Fallido'),
+    ]
+    
+    league = models.ForeignKey(League, on_delete=models.CASCADE, related_name='training_jobs', verbose_name="Liga")
+    registry_key = models.CharField(max_length=50, verbose_name="Clave del Registro")
+    prediction_type = models.CharField(max_length=50, verbose_name="Tipo de Predicción")
+    data_version = models.PositiveIntegerField(default=0, verbose_name="Versión de Datos de la Liga")
+    reason = models.CharField(max_length=20, blank=True, verbose_name="Motivo")
+    
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending', db_index=True)
+    worker = models.CharField(max_length=100, blank=True, verbose_name="Worker")
+    attempts = models.IntegerField(default=0, verbose_name="Intentos")
+    
+    # Resultado: modelo promovido al registro y métricas de validación
+    prediction_model = models.ForeignKey(PredictionModel, on_delete=models.SET_NULL, null=True, blank=True,
+                                         related_name='training_jobs', verbose_name="Modelo Registrado")
+    samples_count = models.IntegerField(null=True, blank=True, verbose_name="Muestras de Entrenamiento")
+    duration_seconds = models.FloatField(null=True, blank=True, verbose_name="Duración (s)")
+    metrics = models.JSONField(default=dict, blank=True, verbose_name="Métricas de Validación")
+    error = models.TextField(blank=True)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        verbose_name = "Trabajo de Entrenamiento"
+        verbose_name_plural = "Trabajos de Entrenamiento"
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['league', 'registry_key', 'prediction_type', 'status']),
+        ]
+        constraints = [
+            # Como mucho un trabajo pendiente por (liga, familia, tipo), también en SQLite
+            models.UniqueConstraint(
+                fields=['league', 'registry_key', 'prediction_type'],
+                condition=models.Q(status='pending'),
+                name='unique_pending_training_job',
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.registry_key} {self.league.name} - {self.prediction_type} ({self.get_status_display()})"
+
+
+class LeagueStatsSnapshot(models.Model):
+    """
+    Estadísticas agregadas de una liga (medias, varianzas, percentiles, ambos
+    marcan y ventaja de local). Se recalculan cuando cambia League.data_version
+    (ver league_stats.py).
+    """
+    
+    league = models.OneToOneField(League, on_delete=models.CASCADE, related_name='stats_snapshot', verbose_name="Liga")
+    data_version = models.PositiveIntegerField(default=0, verbose_name="Versión de Datos de la Liga")
+    
+    matches_count = models.IntegerField(default=0, verbose_name="Partidos")
+    btts_rate = models.FloatField(null=True, blank=True, verbose_name="Tasa Ambos Marcan")
+    avg_goals = models.FloatField(null=True, blank=True, verbose_name="Goles por Partido")
+    # Por estadística: medias y varianzas local/visitante/total, ventaja de local y percentiles recientes
+    stats = models.JSONField(default=dict, verbose_name="Estadísticas")
+    
+    computed_at = models.DateTimeField(auto_now=True, verbose_name="Fecha de Cálculo")
+    
+    class Meta:
+        verbose_name = "Estadísticas de Liga"
+        verbose_name_plural = "Estadísticas de Ligas"
+        ordering = ['league__name']
+    
+    def __str__(self):
+        return f"Estadísticas {self.league.name} (versión {self.data_version})"
+
+
+class TeamRating(models.Model):
+    """
+    Ratings online actuales de un equipo (ver team_ratings.py): ataque y defensa
+    como local y como visitante para goles, remates y corners, en escala
+    logarítmica (0 = media de la liga).
+    """
+    
+    league = models.ForeignKey(League, on_delete=models.CASCADE, related_name='team_ratings', verbose_name="Liga")
+    team = models.CharField(max_length=100, verbose_name="Equipo")
+    # {estadística: {attack_home, attack_away, defence_home, defence_away}}
+    ratings = models.JSONField(default=dict, verbose_name="Ratings")
+    # {estadística: [media local, media visitante]} de la liga tras el último partido del equipo
+    league_means = models.JSONField(default=dict, verbose_name="Medias de la Liga")
+    matches_count = models.IntegerField(default=0, verbose_name="Partidos")
+    last_date = models.DateField(null=True, blank=True, verbose_name="Último Partido")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Fecha de Actualización")
+    
+    class Meta:
+        verbose_name = "Rating de Equipo"
+        verbose_name_plural = "Ratings de Equipos"
+        unique_together = ['league', 'team']
+        ordering = ['league__name', 'team']
+    
+    def __str__(self):
+        return f"{self.team} ({self.league.name})"
+
+
+class TeamRatingHistory(models.Model):
+    """Ratings de un equipo al terminar cada fecha en la que jugó (consultas en fecha)"""
+    
+    league = models.ForeignKey(League, on_delete=models.CASCADE, related_name='team_rating_history', verbose_name="Liga")
+    team = models.CharField(max_length=100, verbose_name="Equipo")
+    date = models.DateField(verbose_name="Fecha")
+    ratings = models.JSONField(default=dict, verbose_name="Ratings")
+    league_means = models.JSONField(default=dict, verbose_name="Medias de la Liga")
+    matches_count = models.IntegerField(default=0, verbose_name="Partidos")
+    
+    class Meta:
+        verbose_name = "Historial de Rating"
+        verbose_name_plural = "Historial de Ratings"
+        unique_together = ['league', 'team', 'date']
+        ordering = ['-date']
+    
+    def __str__(self):
+        return f"{self.team} {self.date} ({self.league.name})"
+
+
+class TeamRatingState(models.Model):
+    """
+    Estado de los ratings de una liga: medias actuales y marca de agua (último
+    partido procesado en orden cronológico) para las actualizaciones incrementales.
+    """
+    
+    league = models.OneToOneField(League, on_delete=models.CASCADE, related_name='rating_state', verbose_name="Liga")
+    league_means = models.JSONField(default=dict, verbose_name="Medias de la Liga")
+    matches_count = models.IntegerField(default=0, verbose_name="Partidos Procesados")
+    # Suma de las estadísticas de los partidos procesados: detecta partidos modificados o borrados
+    checksum = models.BigIntegerField(default=0, verbose_name="Suma de Control")
+    last_date = models.DateField(null=True, blank=True, verbose_name="Último Partido")
+    last_match_id = models.BigIntegerField(null=True, blank=True, verbose_name="ID del Último Partido")
+    data_version = models.PositiveIntegerField(default=0, verbose_name="Versión de Datos de la Liga")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Fecha de Actualización")
+    
+    class Meta:
+        verbose_name = "Estado de Ratings"
+        verbose_name_plural = "Estados de Ratings"
+        ordering = ['league__name']
+    
+    def __str__(self):
+        return f"Ratings {self.league.name} ({self.matches_count} partidos)"
+
+
+class DecayedTeamStat(models.Model):
+    """
+    Sumas con decaimiento exponencial en el tiempo de una estadística de un equipo
+    en una sede (ver decayed_stats.py), una entrada por vida media.
+    """
+    
+    VENUE_CHOICES = [
+        ('home', 'Local'),
+        ('away', 'Visitante'),
+    ]
+    
+    league = models.ForeignKey(League, on_delete=models.CASCADE, related_name='decayed_stats', verbose_name="Liga")
+    team = models.CharField(max_length=100, verbose_name="Equipo")
+    venue = models.CharField(max_length=4, choices=VENUE_CHOICES, verbose_name="Sede")
+    stat = models.CharField(max_length=20, verbose_name="Estadística")
+    # {vida media en días: [pesos, valores, cuadrados, pesos², edad, edad², edad·valor]}
+    sums = models.JSONField(default=dict, verbose_name="Sumas Ponderadas")
+    matches_count = models.IntegerField(default=0, verbose_name="Partidos")
+    last_date = models.DateField(null=True, blank=True, verbose_name="Último Partido")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Fecha de Actualización")
+    
+    class Meta:
+        verbose_name = "Estadística con Decaimiento"
+        verbose_name_plural = "Estadísticas con Decaimiento"
+        unique_together = ['league', 'team', 'venue', 'stat']
+        ordering = ['league__name', 'team', 'venue', 'stat']
+    
+    def __str__(self):
+        return f"{self.team} {self.get_venue_display()} {self.stat} ({self.league.name})"
+
+
+class DecayedStatsState(models.Model):
+    """Marca de agua de las estadísticas con decaimiento de una liga y vidas medias usadas"""
+    
+    league = models.OneToOneField(League, on_delete=models.CASCADE, related_name='decayed_stats_state', verbose_name="Liga")
+    half_lives = models.JSONField(default=list, verbose_name="Vidas Medias (días)")
+    matches_count = models.IntegerField(default=0, verbose_name="Partidos Procesados")
+    # Suma de las estadísticas de los partidos procesados: detecta partidos modificados o borrados
+    checksum = models.BigIntegerField(default=0, verbose_name="Suma de Control")
+    last_date = models.DateField(null=True, blank=True, verbose_name="Último Partido")
+    last_match_id = models.BigIntegerField(null=True, blank=True, verbose_name="ID del Último Partido")
+    data_version = models.PositiveIntegerField(default=0, verbose_name="Versión de Datos de la Liga")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Fecha de Actualización")
+    
+    class Meta:
+        verbose_name = "Estado de Estadísticas con Decaimiento"
+        verbose_name_plural = "Estados de Estadísticas con Decaimiento"
+        ordering = ['league__name']
+    
+    def __str__(self):
+        return f"Decaimiento {self.league.name} ({self.matches_count} partidos)"
@@ -14,9 +14,10 @@ import logging
 from typing import Dict, List, Tuple, Optional
 from datetime import datetime, timedelta
 
-from django.utils import timezone
 from django.db import models
 from football_data.models import Match, League
+from .match_context import uses_match_context
+from .team_history import current_team_history
 from .models import PredictionModel, TeamStats, PredictionResult
 
 logger = logging.getLogger('ai_predictions')
@@ -32,42 +33,48 @@ class MultiModelPredictionService:
         """Obtiene estadísticas específicas para modelo de Poisson"""
         try:
             # Obtener partidos recientes (último año)
-            cutoff_date = timezone.now().date() - timedelta(days=365)
+            history = current_team_history()
+            cutoff_date = history.reference_date() - timedelta(days=365)
             
             if is_home:
-                matches = Match.objects.filter(
+                matches = history.bounded(Match.objects.filter(
                     league=league,
                     home_team=team_name,
                     date__gte=cutoff_date
-                ).order_by('-date')[:30]
+                )).order_by('-date')[:30]
                 shots_data = [m.hs for m in matches if m.hs is not None]
                 goals_data = [m.fthg for m in matches if m.fthg is not None]
             else:
-                matches = Match.objects.filter(
+                matches = history.bounded(Match.objects.filter(
                     league=league,
                     away_team=team_name,
                     date__gte=cutoff_date
-                ).order_by('-date')[:30]
+                )).order_by('-date')[:30]
                 shots_data = [m.as_field for m in matches if m.as_field is not None]
                 goals_data = [m.ftag for m in matches if m.ftag is not None]
             
-            if not shots_data:
-                return {'lambda': 12.0, 'matches': 0}
-            
-            # Calcular lambda para distribución de Poisson
-            lambda_value = np.mean(shots_data)
-            
-            return {
-                'lambda': lambda_value,
-                'matches': len(shots_data),
-                'std': np.std(shots_data) if len(shots_data) > 1 else 0,
-                'goals_avg': np.mean(goals_data) if goals_data else 0
-            }
+            return self.poisson_stats_from_history(shots_data, goals_data)
             
         except Exception as e:
             logger.error(f"Error obteniendo estadísticas Poisson para {team_name}: {e}")
             return {'lambda': 12.0, 'matches': 0, 'std': 0, 'goals_avg': 0}
     
+    def poisson_stats_from_history(self, shots_data, goals_data) -> Dict:
+        """Estadísticas de Poisson a partir del historial de remates y goles del equipo"""
+        if not len(shots_data):
+            return {'lambda': 12.0, 'matches': 0}
+        
+        # Calcular lambda para distribución de Poisson
+        lambda_value = np.mean(shots_data)
+        
+        return {
+            'lambda': lambda_value,
+            'matches': len(shots_data),
+            'std': np.std(shots_data) if len(shots_data) > 1 else 0,
+            'goals_avg': np.mean(goals_data) if len(goals_data) else 0
+        }
+    
+    @uses_match_context
     def poisson_model_prediction(self, home_team: str, away_team: str, league: League, 
                                 prediction_type: str = 'shots_total') -> Dict:
         """Predicción usando modelo de Poisson"""
@@ -75,40 +82,7 @@ class MultiModelPredictionService:
             home_stats = self.get_team_stats_for_poisson(home_team, league, is_home=True)
             away_stats = self.get_team_stats_for_poisson(away_team, league, is_home=False)
             
-            # Calcular lambda combinado
-            if prediction_type == 'shots_total':
-                lambda_home = home_stats['lambda']
-                lambda_away = away_stats['lambda']
-                lambda_combined = lambda_home + lambda_away
-            elif prediction_type == 'shots_home':
-                lambda_combined = home_stats['lambda'] * 1.1  # Ventaja de local
-            elif prediction_type == 'shots_away':
-                lambda_combined = away_stats['lambda'] * 0.9  # Desventaja de visitante
-            else:
-                lambda_combined = (home_stats['lambda'] + away_stats['lambda']) / 2
-            
-            # Predicción principal
-            prediction = lambda_combined
-            
-            # Calcular probabilidades para diferentes rangos
-            probabilities = {}
-            for threshold in [10, 15, 20, 25, 30]:
-                prob = 1 - stats.poisson.cdf(threshold, lambda_combined)
-                probabilities[f'over_{threshold}'] = max(0, min(1, prob))
-            
-            # Calcular confianza basada en cantidad de datos
-            total_matches = home_stats['matches'] + away_stats['matches']
-            confidence = min(0.95, total_matches / 50)  # Máximo 95% con 50+ partidos
-            
-            return {
-                'model_name': 'Poisson',
-                'prediction': prediction,
-                'confidence': confidence,
-                'probabilities': probabilities,
-                'lambda_home': home_stats['lambda'],
-                'lambda_away': away_stats['lambda'],
-                'total_matches': total_matches
-            }
+            return self.poisson_from_stats(home_stats, away_stats, prediction_type)
             
         except Exception as e:
             logger.error(f"Error en modelo Poisson: {e}")
@@ -120,12 +94,50 @@ class MultiModelPredictionService:
                 'error': str(e)
             }
     
+    def poisson_from_stats(self, home_stats: Dict, away_stats: Dict, prediction_type: str = 'shots_total') -> Dict:
+        """Modelo de Poisson a partir de las estadísticas de ambos equipos"""
+        # Calcular lambda combinado
+        if prediction_type == 'shots_total':
+            lambda_home = home_stats['lambda']
+            lambda_away = away_stats['lambda']
+            lambda_combined = lambda_home + lambda_away
+        elif prediction_type == 'shots_home':
+            lambda_combined = home_stats['lambda'] * 1.1  # Ventaja de local
+        elif prediction_type == 'shots_away':
+            lambda_combined = away_stats['lambda'] * 0.9  # Desventaja de visitante
+        else:
+            lambda_combined = (home_stats['lambda'] + away_stats['lambda']) / 2
+        
+        # Predicción principal
+        prediction = lambda_combined
+        
+        # Calcular probabilidades para diferentes rangos
+        probabilities = {}
+        for threshold in [10, 15, 20, 25, 30]:
+            prob = 1 - stats.poisson.cdf(threshold, lambda_combined)
+            probabilities[f'over_{threshold}'] = max(0, min(1, prob))
+        
+        # Calcular confianza basada en cantidad de datos
+        total_matches = home_stats['matches'] + away_stats['matches']
+        confidence = min(0.95, total_matches / 50)  # Máximo 95% con 50+ partidos
+        
+        return {
+            'model_name': 'Poisson',
+            'prediction': prediction,
+            'confidence': confidence,
+            'probabilities': probabilities,
+            'lambda_home': home_stats['lambda'],
+            'lambda_away': away_stats['lambda'],
+            'total_matches': total_matches
+        }
+    
+    @uses_match_context
     def linear_regression_model(self, home_team: str, away_team: str, league: League, 
                                prediction_type: str = 'shots_total') -> Dict:
         """Modelo de regresión lineal simple"""
         try:
             # Obtener datos históricos
-            matches = Match.objects.filter(league=league).exclude(
+            matches = current_team_history().bounded(Match.objects.filter(league=league)).exclude(
                 models.Q(hs__isnull=True) | models.Q(as_field__isnull=True)
             ).order_by('-date')[:200]
             
@@ -153,41 +165,47 @@ class MultiModelPredictionService:
                 
                 y.append(target)
             
-            X = np.array(X)
-            y = np.array(y)
-            
-            # Entrenar modelo
-            model = LinearRegression()
-            model.fit(X, y)
-            
-            # Predicción
             home_stats = self.get_team_stats_for_poisson(home_team, league, True)
             away_stats = self.get_team_stats_for_poisson(away_team, league, False)
-            features = np.array([[home_stats['lambda'], away_stats['lambda'], 1.0]])
             
-            prediction = model.predict(features)[0]
-            prediction = max(0, min(prediction, 50))  # Límites realistas
-            
-            # Calcular confianza
-            r2 = model.score(X, y)
-            confidence = max(0.1, min(0.9, r2))
-            
-            # Probabilidades simples
-            probabilities = self._calculate_simple_probabilities(prediction)
-            
-            return {
-                'model_name': 'Linear Regression',
-                'prediction': prediction,
-                'confidence': confidence,
-                'probabilities': probabilities,
-                'r2_score': r2,
-                'total_matches': len(matches)
-            }
+            return self.linear_regression_from_stats(np.array(X), np.array(y), home_stats, away_stats)
             
         except Exception as e:
             logger.error(f"Error en modelo Linear Regression: {e}")
             return self._fallback_prediction('Linear Regression', 12.0, 0.1)
     
+    def linear_regression_from_stats(self, X: np.ndarray, y: np.ndarray, home_stats: Dict, away_stats: Dict) -> Dict:
+        """
+        Regresión lineal entrenada con X = [lambda local, lambda visitante, 1.0]
+        de partidos anteriores y aplicada a las estadísticas de ambos equipos
+        """
+        # Entrenar modelo
+        model = LinearRegression()
+        model.fit(X, y)
+        
+        # Predicción
+        features = np.array([[home_stats['lambda'], away_stats['lambda'], 1.0]])
+        
+        prediction = model.predict(features)[0]
+        prediction = max(0, min(prediction, 50))  # Límites realistas
+        
+        # Calcular confianza
+        r2 = model.score(X, y)
+        confidence = max(0.1, min(0.9, r2))
+        
+        # Probabilidades simples
+        probabilities = self._calculate_simple_probabilities(prediction)
+        
+        return {
+            'model_name': 'Linear Regression',
+            'prediction': prediction,
+            'confidence': confidence,
+            'probabilities': probabilities,
+            'r2_score': r2,
+            'total_matches': len(y)
+        }
+    
+    @uses_match_context
     def historical_average_model(self, home_team: str, away_team: str, league: League, 
                                 prediction_type: str = 'shots_total') -> Dict:
         """Modelo basado en promedios históricos ponderados"""
@@ -196,115 +214,82 @@ class MultiModelPredictionService:
             home_stats = self.get_team_stats_for_poisson(home_team, league, True)
             away_stats = self.get_team_stats_for_poisson(away_team, league, False)
             
-            # Calcular predicción basada en promedios
-            if prediction_type == 'shots_total':
-                prediction = (home_stats['lambda'] + away_stats['lambda']) * 1.05  # Factor de ajuste
-            elif prediction_type == 'shots_home':
-                prediction = home_stats['lambda'] * 1.15  # Ventaja de local
-            elif prediction_type == 'shots_away':
-                prediction = away_stats['lambda'] * 0.9   # Desventaja de visitante
-            else:
-                prediction = (home_stats['lambda'] + away_stats['lambda']) / 2
-            
-            # Calcular confianza basada en cantidad de datos
-            total_matches = home_stats['matches'] + away_stats['matches']
-            confidence = min(0.8, total_matches / 40)
-            
-            # Probabilidades basadas en distribución normal
-            probabilities = self._calculate_normal_probabilities(prediction, 3.0)
-            
-            return {
-                'model_name': 'Historical Average',
-                'prediction': prediction,
-                'confidence': confidence,
-                'probabilities': probabilities,
-                'home_avg': home_stats['lambda'],
-                'away_avg': away_stats['lambda'],
-                'total_matches': total_matches
-            }
+            return self.historical_average_from_stats(home_stats, away_stats, prediction_type)
             
         except Exception as e:
             logger.error(f"Error en modelo Historical Average: {e}")
             return self._fallback_prediction('Historical Average', 12.0, 0.1)
     
+    def historical_average_from_stats(self, home_stats: Dict, away_stats: Dict,
+                                      prediction_type: str = 'shots_total') -> Dict:
+        """Promedios históricos ponderados a partir de las estadísticas de ambos equipos"""
+        # Calcular predicción basada en promedios
+        if prediction_type == 'shots_total':
+            prediction = (home_stats['lambda'] + away_stats['lambda']) * 1.05  # Factor de ajuste
+        elif prediction_type == 'shots_home':
+            prediction = home_stats['lambda'] * 1.15  # Ventaja de local
+        elif prediction_type == 'shots_away':
+            prediction = away_stats['lambda'] * 0.9   # Desventaja de visitante
+        else:
+            prediction = (home_stats['lambda'] + away_stats['lambda']) / 2
+        
+        # Calcular confianza basada en cantidad de datos
+        total_matches = home_stats['matches'] + away_stats['matches']
+        confidence = min(0.8, total_matches / 40)
+        
+        # Probabilidades basadas en distribución normal
+        probabilities = self._calculate_normal_probabilities(prediction, 3.0)
+        
+        return {
+            'model_name': 'Historical Average',
+            'prediction': prediction,
+            'confidence': confidence,
+            'probabilities': probabilities,
+            'home_avg': home_stats['lambda'],
+            'away_avg': away_stats['lambda'],
+            'total_matches': total_matches
+        }
+    
     def backtest_models(self, league: League, prediction_type: str = 'shots_total') -> Dict:
-        """Realiza backtesting de todos los modelos (versión optimizada)"""
+        """
+        Realiza backtesting de todos los modelos (versión optimizada): cada modelo
+        predice en fecha, sólo con los partidos anteriores al período de prueba
+        """
+        from .validation_runner import FoldTask, ValidationData, validation_runner
+        
         try:
-            # Obtener datos históricos ordenados por fecha (limitado para evitar problemas de memoria)
-            matches = Match.objects.filter(league=league).exclude(
-                models.Q(hs__isnull=True) | models.Q(as_field__isnull=True)
-            ).order_by('date')[:100]  # Limitar a 100 partidos para evitar problemas
+            # Datos históricos ordenados por fecha (limitado para evitar problemas de memoria)
+            data = ValidationData(league)
+            matches = data.rows_with(('hs', 'as_field'))[:100]  # Limitar a 100 partidos para evitar problemas
             
             if len(matches) < 20:
                 return {'error': 'Datos insuficientes para backtesting'}
             
             # Dividir en entrenamiento y prueba (80/20)
             split_point = int(len(matches) * 0.8)
-            test_matches = matches[split_point:]
+            test_matches = matches[split_point:split_point + 10]  # Limitar a 10 pruebas
+            
+            target_type = prediction_type if prediction_type in ('shots_total', 'shots_home', 'shots_away') else 'shots_total'
+            tasks = [
+                FoldTask(
+                    league_id=league.pk,
+                    model_name=model_name,
+                    prediction_type=prediction_type,
+                    target_type=target_type,
+                    fold=0,
+                    test_rows=test_matches,
+                )
+                for model_name in ('Poisson', 'Linear Regression', 'Historical Average')
+            ]
             
             results = {}
-            
-            # Backtest Poisson (simplificado)
-            poisson_errors = []
-            for match in test_matches[:10]:  # Limitar a 10 pruebas
-                try:
-                    pred = self.poisson_model_prediction(
-                        match.home_team, match.away_team, league, prediction_type
-                    )
-                    actual = (match.hs or 0) + (match.as_field or 0) if prediction_type == 'shots_total' else (match.hs or 0)
-                    error = abs(pred['prediction'] - actual)
-                    poisson_errors.append(error)
-                except:
-                    continue
-            
-            if poisson_errors:
-                results['Poisson'] = {
-                    'mae': np.mean(poisson_errors),
-                    'accuracy_2': np.mean([e <= 2 for e in poisson_errors]),
-                    'accuracy_3': np.mean([e <= 3 for e in poisson_errors]),
-                    'total_tests': len(poisson_errors)
-                }
-            
-            # Backtest Linear Regression (simplificado)
-            lr_errors = []
-            for match in test_matches[:10]:  # Limitar a 10 pruebas
-                try:
-                    pred = self.linear_regression_model(
-                        match.home_team, match.away_team, league, prediction_type
-                    )
-                    actual = (match.hs or 0) + (match.as_field or 0) if prediction_type == 'shots_total' else (match.hs or 0)
-                    error = abs(pred['prediction'] - actual)
-                    lr_errors.append(error)
-                except:
-                    continue
-            
-            if lr_errors:
-                results['Linear Regression'] = {
-                    'mae': np.mean(lr_errors),
-                    'accuracy_2': np.mean([e <= 2 for e in lr_errors]),
-                    'accuracy_3': np.mean([e <= 3 for e in lr_errors]),
-                    'total_tests': len(lr_errors)
-                }
-            
-            # Backtest Historical Average (simplificado)
-            ha_errors = []
-            for match in test_matches[:10]:  # Limitar a 10 pruebas
-                try:
-                    pred = self.historical_average_model(
-                        match.home_team, match.away_team, league, prediction_type
-                    )
-                    actual = (match.hs or 0) + (match.as_field or 0) if prediction_type == 'shots_total' else (match.hs or 0)
-                    error = abs(pred['prediction'] - actual)
-                    ha_errors.append(error)
-                except:
-                    continue
-            
-            if ha_errors:
-                results['Historical Average'] = {
-                    'mae': np.mean(ha_errors),
-                    'accuracy_2': np.mean([e <= 2 for e in ha_errors]),
-                    'accuracy_3': np.mean([e <= 3 for e in ha_errors]),
-                    'total_tests': len(ha_errors)
+            for task, predictions, actuals in validation_runner.run([data], tasks):
+                errors = np.abs(predictions - actuals)
+                results[task.model_name] = {
+                    'mae': np.mean(errors),
+                    'accuracy_2': np.mean(errors <= 2),
+                    'accuracy_3': np.mean(errors <= 3),
+                    'total_tests': len(errors)
                 }
             
             return results
@@ -313,6 +298,7 @@ class MultiModelPredictionService:
             logger.error(f"Error en backtesting: {e}")
             return {'error': str(e)}
     
+    @uses_match_context
     def get_all_predictions(self, home_team: str, away_team: str, league: League, 
                            prediction_type: str = 'shots_total') -> List[Dict]:
         """Obtiene predicciones de todos los modelos"""
@@ -339,7 +325,8 @@ class MultiModelPredictionService:
             'prediction': prediction,
             'confidence': confidence,
             'probabilities': {'over_10': 0.5, 'over_15': 0.3, 'over_20': 0.1, 'over_25': 0.05, 'over_30': 0.02},
-            'error': 'Modelo no disponible'
+            'error': 'Modelo no disponible',
+            'fallback': True
         }
     
     def _calculate_simple_probabilities(self, prediction: float) -> Dict:
@@ -0,0 +1,125 @@
+"""
+Caché de resultados de predicción versionada por liga
+
+La clave incluye (liga, local, visitante, tipo de predicción, conjunto de modelos,
+versión de datos de la liga y, en predicciones en fecha, as_of). Cada importación que cambia partidos incrementa
+League.data_version, así que tras una importación las claves antiguas dejan de
+usarse y nunca se sirve una predicción obsoleta.
+
+Los receptores de league_data_changed (reajuste de Dixon-Coles, ratings,
+estadísticas) terminan después de ese incremento, por lo que la versión incluye
+además League.model_version, que se incrementa cada vez que se promueve un modelo
+o agregado de la liga: una predicción calculada con los modelos anteriores queda
+guardada con su versión y deja de servirse al terminar el reajuste. Las
+predicciones de respaldo (un modelo falló) no se guardan.
+
+El almacenamiento es la caché de Django configurada en PREDICTION_CACHE_ALIAS
+(memoria local con expulsión LRU, archivos o Redis) con el TTL de esa caché.
+"""
+
+import hashlib
+import logging
+import threading
+from datetime import date
+from typing import Callable, Optional
+
+from django.conf import settings
+from django.core.cache import caches
+
+from football_data.models import League
+
+logger = logging.getLogger('ai_predictions')
+
+_MISSING = object()
+
+
+def has_fallback(predictions) -> bool:
+    """Alguna de las predicciones es un valor de respaldo de un modelo que falló"""
+    return any(isinstance(prediction, dict) and prediction.get('fallback') for prediction in predictions)
+
+
+class PredictionCache:
+    """Caché de predicciones con contadores de aciertos y fallos (por proceso)"""
+
+    def __init__(self, alias: Optional[str] = None):
+        self.alias = alias or getattr(settings, 'PREDICTION_CACHE_ALIAS', 'predictions')
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @property
+    def backend(self):
+        return caches[self.alias]
+
+    def data_version(self, league: League) -> str:
+        """
+        Versión actual de los datos y de los modelos de la liga, leída de la base de
+        datos (no de la instancia, que puede ser anterior a la última importación o
+        promoción). Incluye la fecha de creación para no confundir una liga borrada con
+        otra nueva que reutilice el id.
+        """
+        row = League.objects.filter(pk=league.pk).values_list(
+            'data_version', 'model_version', 'created_at'
+        ).first()
+        if row is None:
+            return 'missing'
+        data_version, model_version, created_at = row
+        return f"{data_version}-{model_version}-{created_at.timestamp():.0f}"
+
+    def make_key(self, league: League, home_team: str, away_team: str, prediction_type: str,
+                 model_set: str, data_version: str, as_of: Optional[date] = None) -> str:
+        parts = [str(league.pk), home_team, away_team, prediction_type, model_set, data_version]
+        if as_of is not None:
+            parts.append(as_of.isoformat())
+        raw = '|'.join(parts)
+        return f"prediction:{league.pk}:{hashlib.sha1(raw.encode('utf-8')).hexdigest()}"
+
+    def get(self, key: str):
+        """Valor cacheado o None si no existe"""
+        value = self.backend.get(key, _MISSING)
+        with self._lock:
+            if value is _MISSING:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return value
+
+    def set(self, key: str, value):
+        self.backend.set(key, value)
+
+    def get_or_compute(self, league: League, home_team: str, away_team: str, prediction_type: str,
+                       model_set: str, compute: Callable[[], object], as_of: Optional[date] = None,
+                       cacheable: Optional[Callable[[object], bool]] = None):
+        """
+        Devuelve la predicción cacheada o la calcula con compute() y la guarda
+        (salvo que cacheable(valor) indique que es un resultado de respaldo)
+        """
+        key = self.make_key(
+            league, home_team, away_team, prediction_type,
+            model_set, self.data_version(league), as_of
+        )
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            if cacheable is None or cacheable(value):
+                self.set(key, value)
+        return value
+
+    def stats(self) -> dict:
+        """Aciertos, fallos y tasa de aciertos del proceso actual"""
+        total = self.hits + self.misses
+        return {
+            'alias': self.alias,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+        }
+
+    def reset_stats(self):
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+
+# Instancia global
+prediction_cache = PredictionCache()
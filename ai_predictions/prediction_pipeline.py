@@ -0,0 +1,438 @@
+"""
+Pipeline de predicciones: ejecuta los 11 tipos de predicción de un partido en paralelo
+
+Los tipos son independientes hasta que se agrega la predicción oficial, así que
+se reparten en un pool (hilos para los modelos que leen la base de datos, o
+procesos para los que son intensivos en CPU) con un tiempo máximo por tipo, contado
+desde que el tipo empieza a ejecutarse. Un tipo que falla o no termina a tiempo
+recibe las predicciones de respaldo de sus modelos. Los resultados se combinan
+siempre en el orden de PREDICTION_TYPES.
+"""
+
+import contextvars
+import logging
+import math
+import threading
+import time
+from datetime import date
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from typing import Callable, Dict, List, Optional
+
+from django.conf import settings
+from django.db import connections
+
+from football_data.models import League
+from .match_context import MatchContext
+from .prediction_cache import PredictionCache, has_fallback, prediction_cache
+
+logger = logging.getLogger('ai_predictions')
+
+PREDICTION_TYPES = [
+    'shots_total', 'shots_home', 'shots_away',
+    'shots_on_target_total',
+    'goals_total', 'goals_home', 'goals_away',
+    'corners_total', 'corners_home', 'corners_away',
+    'both_teams_score'
+]
+
+EXECUTORS = ('thread', 'process', 'sequential')
+
+SHOTS_METHODS = {
+    'shots_total': 'predict_shots_total',
+    'shots_home': 'predict_shots_home',
+    'shots_away': 'predict_shots_away',
+    'shots_on_target_total': 'predict_shots_on_target_total',
+}
+
+
+def _shots_predictions(pred_type: str, home_team: str, away_team: str, league: League,
+                       context: MatchContext) -> List[Dict]:
+    """Remates: se usan ambos modelos (Shots Prediction y XG Shots)"""
+    from .shots_prediction_model import shots_prediction_model
+    from .xg_shots_model import xg_shots_model
+
+    predictions = []
+    method = SHOTS_METHODS.get(pred_type)
+    for model_label, model in (('Shots Prediction', shots_prediction_model), ('XG Shots', xg_shots_model)):
+        try:
+            prediction = getattr(model, method)(home_team, away_team, league, context=context) if method else None
+            if prediction:
+                predictions.append(prediction)
+                logger.info(f"🎯 MODELO {model_label} agregado para {pred_type}")
+        except Exception as e:
+            logger.error(f"❌ ERROR EN modelo {model_label} para {pred_type}: {e}")
+
+    logger.info(f"🎯 TOTAL MODELOS DE REMATES para {pred_type}: {len(predictions)} modelos")
+    return predictions
+
+
+def _enhanced_both_teams_score(home_team: str, away_team: str, league: League,
+                               context: MatchContext) -> Dict:
+    """Predicción del modelo mejorado de ambos marcan"""
+    from .enhanced_both_teams_score import enhanced_both_teams_score_model
+
+    enhanced_prob, fallback = enhanced_both_teams_score_model.predict_with_fallback(
+        home_team, away_team, league, context=context
+    )
+    prediction = {
+        'model_name': 'Enhanced Both Teams Score',
+        'prediction': enhanced_prob,
+        'confidence': 0.80,
+        'probabilities': {'both_score': enhanced_prob},
+        'total_matches': 100
+    }
+    if fallback:
+        prediction['fallback'] = True
+    return prediction
+
+
+def _hybrid_model(pred_type: str):
+    from .simple_models import ModeloHibridoCorners, ModeloHibridoGeneral
+    return ModeloHibridoCorners() if 'corners' in pred_type else ModeloHibridoGeneral()
+
+
+def _simple_fallback(pred_type: str, error: str) -> Dict:
+    return {
+        'model_name': f'Fallback {pred_type}',
+        'prediction': 10.0,
+        'confidence': 0.3,
+        'probabilities': {'over_10': 0.5},
+        'total_matches': 0,
+        'error': error,
+        'fallback': True
+    }
+
+
+def _enhanced_both_teams_score_fallback() -> Dict:
+    fallback_prob = 0.45
+    return {
+        'model_name': 'Enhanced Both Teams Score (Fallback)',
+        'prediction': fallback_prob,
+        'confidence': 0.60,
+        'probabilities': {'both_score': fallback_prob},
+        'total_matches': 0,
+        'fallback': True
+    }
+
+
+def _hybrid_fallback(pred_type: str) -> Dict:
+    return {
+        'model_name': 'Modelo Híbrido Corners' if 'corners' in pred_type else 'Modelo Híbrido General',
+        'prediction': 10.0,
+        'confidence': 0.6,
+        'probabilities': {'over_10': 0.5, 'over_15': 0.3, 'over_20': 0.1},
+        'total_matches': 0,
+        'component_predictions': {},
+        'fallback': True
+    }
+
+
+def fallback_market(pred_type: str, error: str = '') -> List[Dict]:
+    """Predicciones de respaldo de un tipo que falló o no terminó a tiempo en el pipeline"""
+    predictions = [_simple_fallback(pred_type, error)]
+    if pred_type == 'both_teams_score':
+        predictions.append(_enhanced_both_teams_score_fallback())
+    predictions.append(_hybrid_fallback(pred_type))
+    return predictions
+
+
+def predict_market(pred_type: str, home_team: str, away_team: str, league: League,
+                   context: Optional[MatchContext] = None) -> List[Dict]:
+    """
+    Predicciones de todos los modelos para un tipo (flujo de la página de resultados
+    y del análisis). Cada modelo que falla se sustituye por su predicción de respaldo,
+    marcada con 'fallback' para no guardarla en caché.
+    """
+    from .simple_models import SimplePredictionService
+
+    if 'shots' in pred_type or 'remates' in pred_type:
+        predictions = _shots_predictions(pred_type, home_team, away_team, league, context)
+    else:
+        try:
+            predictions = SimplePredictionService().get_all_simple_predictions(
+                home_team, away_team, league, pred_type, context=context
+            )
+            logger.info(f"✅ Modelos simples generados para {pred_type}: {len(predictions)}")
+        except Exception as e:
+            logger.error(f"❌ ERROR EN get_all_simple_predictions para {pred_type}: {e}", exc_info=True)
+            predictions = [_simple_fallback(pred_type, str(e))]
+
+    # Manejo específico para "both_teams_score" con modelo mejorado
+    if pred_type == 'both_teams_score':
+        try:
+            predictions.append(_enhanced_both_teams_score(home_team, away_team, league, context))
+        except Exception as e:
+            logger.error(f"Error en modelo mejorado ambos marcan: {e}")
+            predictions.append(_enhanced_both_teams_score_fallback())
+
+    # Modelo híbrido como modelo adicional
+    hybrid_model = _hybrid_model(pred_type)
+    try:
+        predictions.append(hybrid_model.predecir(home_team, away_team, league, pred_type, context=context))
+    except Exception as e:
+        logger.error(f"Error agregando modelo híbrido para {pred_type}: {e}")
+        predictions.append(_hybrid_fallback(pred_type))
+
+    return predictions
+
+
+def predict_calibrated_market(pred_type: str, home_team: str, away_team: str, league: League,
+                              context: Optional[MatchContext] = None) -> List[Dict]:
+    """
+    Predicciones de un tipo calibradas por liga (flujo del formulario de predicción).
+    Un error en los modelos simples o en el híbrido hace fallar el tipo completo, y
+    el pipeline lo sustituye por sus predicciones de respaldo.
+    """
+    from .simple_models import SimplePredictionService
+    from .league_calibration import league_calibration
+
+    if 'shots' in pred_type or 'remates' in pred_type:
+        predictions = _shots_predictions(pred_type, home_team, away_team, league, context)
+    else:
+        predictions = SimplePredictionService().get_all_simple_predictions(
+            home_team, away_team, league, pred_type, context=context
+        )
+        predictions.append(_hybrid_model(pred_type).predecir(home_team, away_team, league, pred_type, context=context))
+
+    # APLICAR CALIBRACIÓN POR LIGA
+    calibrated_predictions = []
+    for pred in predictions:
+        calibrated = {
+            'model_name': pred['model_name'],
+            'prediction': league_calibration.calibrate_prediction(pred['prediction'], pred_type, league),
+            'confidence': pred['confidence'],
+            'probabilities': pred['probabilities'],
+            'total_matches': pred['total_matches']
+        }
+        if pred.get('fallback'):
+            calibrated['fallback'] = True
+        calibrated_predictions.append(calibrated)
+
+    if pred_type == 'both_teams_score':
+        calibrated_predictions.append(_enhanced_both_teams_score(home_team, away_team, league, context))
+
+    return calibrated_predictions
+
+
+def _init_worker():
+    """Inicializa Django en cada proceso worker (necesario con el método spawn)"""
+    import django
+    django.setup()
+
+
+def _run_in_process(predict, pred_type, home_team, away_team, league, context):
+    return predict(pred_type, home_team, away_team, league, context=context)
+
+
+def _run_in_thread(predict, pred_type, home_team, away_team, league, context):
+    try:
+        return predict(pred_type, home_team, away_team, league, context=context)
+    finally:
+        # Cada hilo abre su propia conexión: cerrarla al terminar
+        connections.close_all()
+
+
+_process_pool = None
+_process_pool_lock = threading.Lock()
+
+
+def _get_process_pool(workers: int) -> ProcessPoolExecutor:
+    """Pool de procesos compartido (arrancar Django en cada proceso es costoso)"""
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is None:
+            connections.close_all()
+            _process_pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker)
+        return _process_pool
+
+
+class PredictionPipeline:
+    """
+    Ejecuta los tipos de predicción de un partido de forma concurrente.
+
+    Args:
+        executor: 'thread' (por defecto), 'process' o 'sequential'
+        workers: Hilos o procesos del pool
+        timeout: Segundos máximos por tipo desde que empieza a ejecutarse (la espera
+                 en la cola del pool no cuenta); los tipos que no terminan a tiempo (o
+                 que fallan) reciben las predicciones de respaldo de fallback()
+        use_cache: Servir y guardar los resultados en la caché de predicciones
+                   (solo se guardan los tipos calculados correctamente y sin
+                   predicciones de respaldo)
+    """
+
+    # Cada cuánto se comprueba si un tipo en cola ya empezó a ejecutarse (inicio de su plazo)
+    QUEUE_POLL_INTERVAL = 0.05
+
+    def __init__(self, executor: Optional[str] = None, workers: Optional[int] = None,
+                 timeout: Optional[float] = None, use_cache: Optional[bool] = None,
+                 cache: Optional[PredictionCache] = None):
+        self.executor = executor or getattr(settings, 'PREDICTION_EXECUTOR', 'thread')
+        if self.executor not in EXECUTORS:
+            raise ValueError(f"Ejecutor desconocido: {self.executor}")
+        self.workers = max(1, workers or getattr(settings, 'PREDICTION_WORKERS', len(PREDICTION_TYPES)))
+        self.timeout = timeout if timeout is not None else getattr(settings, 'PREDICTION_TYPE_TIMEOUT', 30.0)
+        if use_cache is None:
+            use_cache = getattr(settings, 'PREDICTION_CACHE_ENABLED', True)
+        self.cache = (cache or prediction_cache) if use_cache else None
+
+    def run(self, home_team: str, away_team: str, league: League,
+            predict: Callable = predict_market, prediction_types: List[str] = PREDICTION_TYPES,
+            context: Optional[MatchContext] = None,
+            on_progress: Optional[Callable[[int, int, str], None]] = None,
+            as_of: Optional[date] = None,
+            fallback: Callable[[str, str], List[Dict]] = fallback_market) -> Dict[str, List[Dict]]:
+        """
+        Calcula todos los tipos y devuelve {tipo: [predicciones]} en el orden de
+        prediction_types (la predicción oficial se agrega después, sobre este resultado).
+
+        Args:
+            predict: Función (pred_type, home_team, away_team, league, context=...) de un tipo
+            context: MatchContext del partido; se crea uno si hay tipos sin cachear
+            on_progress: Llamada (completados, total, tipo) cada vez que termina un tipo
+            as_of: Predecir con los partidos anteriores a esta fecha (por defecto, la del contexto)
+            fallback: Función (pred_type, error) con las predicciones de respaldo de un tipo
+                      que falla o no termina a tiempo
+        """
+        started = time.perf_counter()
+        total = len(prediction_types)
+        if as_of is None and context is not None:
+            as_of = context.as_of
+
+        # Tipos ya calculados con la versión actual de los datos y de los modelos de la liga
+        results, keys = {}, {}
+        if self.cache is not None:
+            model_set = f"{predict.__module__}.{predict.__qualname__}"
+            data_version = self.cache.data_version(league)
+            for pred_type in prediction_types:
+                keys[pred_type] = self.cache.make_key(
+                    league, home_team, away_team, pred_type, model_set, data_version, as_of
+                )
+                cached = self.cache.get(keys[pred_type])
+                if cached is not None:
+                    results[pred_type] = cached
+                    if on_progress:
+                        on_progress(len(results), total, pred_type)
+
+        pending = [pred_type for pred_type in prediction_types if pred_type not in results]
+        if pending:
+            if context is None:
+                context = MatchContext(league, home_team, away_team, as_of)
+            elif context.as_of != as_of:
+                context = context.at(as_of)
+            cached_count = len(results)
+            progress = None
+            if on_progress:
+                progress = lambda completed, _, pred_type: on_progress(cached_count + completed, total, pred_type)
+
+            if self.executor == 'sequential':
+                computed, errors = self._run_sequential(
+                    predict, pending, home_team, away_team, league, context, progress
+                )
+            else:
+                computed, errors = self._run_pool(predict, pending, home_team, away_team, league, context, progress)
+            for pred_type, error in errors.items():
+                computed[pred_type] = fallback(pred_type, error)
+
+            if self.cache is not None:
+                for pred_type, predictions in computed.items():
+                    if has_fallback(predictions):
+                        logger.info(f"🔄 {pred_type} con predicciones de respaldo: no se guarda en caché")
+                    else:
+                        self.cache.set(keys[pred_type], predictions)
+            results.update(computed)
+
+        logger.info(
+            f"⚡ Pipeline {self.executor}: {total} tipos para {home_team} vs {away_team} "
+            f"({total - len(pending)} desde caché) en {time.perf_counter() - started:.2f}s"
+        )
+        return {pred_type: results[pred_type] for pred_type in prediction_types}
+
+    # Los ejecutores devuelven los tipos calculados correctamente y el error de los demás;
+    # run() completa estos con sus predicciones de respaldo (que no se guardan en caché)
+
+    def _run_sequential(self, predict, prediction_types, home_team, away_team, league, context, on_progress):
+        results, errors = {}, {}
+        for index, pred_type in enumerate(prediction_types, 1):
+            try:
+                results[pred_type] = predict(pred_type, home_team, away_team, league, context=context)
+            except Exception as e:
+                logger.error(f"❌ ERROR EN {pred_type}: {e}", exc_info=True)
+                errors[pred_type] = str(e)
+            if on_progress:
+                on_progress(index, len(prediction_types), pred_type)
+        return results, errors
+
+    def _run_pool(self, predict, prediction_types, home_team, away_team, league, context, on_progress):
+        if self.executor == 'process':
+            pool = _get_process_pool(self.workers)
+            submit = lambda pred_type: pool.submit(
+                _run_in_process, predict, pred_type, home_team, away_team, league, context
+            )
+        else:
+            pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='prediction')
+            # Cada tipo hereda el contexto actual (memo de historial de la petición)
+            submit = lambda pred_type: pool.submit(
+                contextvars.copy_context().run,
+                _run_in_thread, predict, pred_type, home_team, away_team, league, context
+            )
+
+        futures = {submit(pred_type): pred_type for pred_type in prediction_types}
+        submitted = time.monotonic()
+        # Cada tipo tiene su propio plazo, contado desde que un worker lo empieza a ejecutar.
+        # Un tipo que sigue en cola cuando ya pasaron todas las rondas del pool (workers
+        # ocupados por tipos colgados) también se da por agotado.
+        rounds = math.ceil(len(prediction_types) / self.workers)
+        queue_deadline = submitted + self.timeout * rounds
+        deadlines = {}
+
+        results, errors = {}, {}
+        completed = 0
+        remaining = set(futures)
+        try:
+            while remaining:
+                now = time.monotonic()
+                for future in remaining:
+                    if future not in deadlines and (future.running() or future.done()):
+                        deadlines[future] = now + self.timeout
+                queued = [future for future in remaining if future not in deadlines]
+                next_deadline = min(
+                    [deadlines[future] for future in remaining if future in deadlines]
+                    + ([min(queue_deadline, now + self.QUEUE_POLL_INTERVAL)] if queued else [])
+                )
+                done, _ = wait(remaining, timeout=max(0.0, next_deadline - now), return_when=FIRST_COMPLETED)
+                for future in sorted(done, key=lambda future: prediction_types.index(futures[future])):
+                    remaining.discard(future)
+                    pred_type = futures[future]
+                    completed += 1
+                    try:
+                        results[pred_type] = future.result()
+                    except Exception as e:
+                        logger.error(f"❌ ERROR EN {pred_type}: {e}", exc_info=True)
+                        errors[pred_type] = str(e)
+                    if on_progress:
+                        on_progress(completed, len(prediction_types), pred_type)
+
+                now = time.monotonic()
+                expired = [
+                    future for future in remaining
+                    if (deadlines[future] <= now if future in deadlines else queue_deadline <= now)
+                ]
+                if expired:
+                    logger.warning(
+                        f"⏱️ Tiempo agotado ({self.timeout}s) para {[futures[future] for future in expired]}: "
+                        "se usan predicciones de respaldo"
+                    )
+                    for future in sorted(expired, key=lambda future: prediction_types.index(futures[future])):
+                        future.cancel()
+                        remaining.discard(future)
+                        pred_type = futures[future]
+                        errors[pred_type] = f"Tiempo agotado ({self.timeout}s)"
+                        completed += 1
+                        if on_progress:
+                            on_progress(completed, len(prediction_types), pred_type)
+        finally:
+            if self.executor == 'thread':
+                # No esperar a los tipos que excedieron el tiempo
+                pool.shutdown(wait=False, cancel_futures=True)
+        return results, errors
@@ -6,13 +6,20 @@ Captura relaciones no lineales y complejas entre variables.
 import numpy as np
 import logging
 from typing import Dict, List, Tuple
-from datetime import timedelta
-from django.utils import timezone
-from football_data.models import Match, League
+from football_data.models import League
 from .simple_models import get_league_realistic_limits, analyze_team_statistics
+from .model_registry import model_registry, ModelArtifact
+from .feature_builder import FEATURE_NAMES, feature_builders
+from .training_jobs import training_job_service
 
 logger = logging.getLogger('ai_predictions')
 
+# Clave del registro de modelos para este modelo
+REGISTRY_KEY = 'ensemble_random_forest'
+
+# Partidos más recientes con los que se entrena
+TRAINING_MATCHES = 200
+
 
 class RandomForestModel:
     """
@@ -53,18 +60,15 @@ class RandomForestModel:
             if not features:
                 return self._fallback_prediction(prediction_type)
             
-            # Obtener datos históricos para entrenamiento
-            training_data = self._get_training_data(league, prediction_type)
+            # Modelo guardado en el registro (lo entrena run_training_worker)
+            artifact = self.load_model(league, prediction_type)
             
-            if len(training_data['X']) < 20:
-                logger.warning(f"Pocos datos para Random Forest ({len(training_data['X'])}), usando fallback")
+            if artifact is None:
                 return self._fallback_prediction(prediction_type)
             
-            # Entrenar modelo
-            model = self._train_random_forest(training_data['X'], training_data['y'])
-            
-            # Hacer predicción
-            prediction = model.predict([features])[0]
+            # Hacer predicción (valida el número de características del modelo guardado)
+            model = artifact.estimator
+            prediction = artifact.predict([features])[0]
             
             # Calcular confianza basada en la varianza de los árboles
             predictions_trees = [tree.predict([features])[0] for tree in model.estimators_]
@@ -78,7 +82,7 @@ class RandomForestModel:
                 'prediction': float(prediction),
                 'confidence': float(confidence),
                 'probabilities': probabilities,
-                'total_matches': len(training_data['X']),
+                'total_matches': artifact.training_window.get('samples', 0),
                 'model_type': 'random_forest',
                 'feature_importance': self._get_feature_importance(model)
             }
@@ -87,11 +91,70 @@ class RandomForestModel:
             logger.error(f"Error en predicción Random Forest: {e}")
             return self._fallback_prediction(prediction_type)
     
+    def load_model(self, league: League, prediction_type: str):
+        """Artefacto activo del registro; si no existe se encola su entrenamiento y retorna None"""
+        loaded = model_registry.load_active(REGISTRY_KEY, league, prediction_type, FEATURE_NAMES)
+        if loaded is not None:
+            return loaded[1]
+        training_job_service.enqueue(league, REGISTRY_KEY, [prediction_type], reason='missing')
+        return None
+    
+    def train(self, league: League, prediction_type: str):
+        """
+        Entrena el Random Forest de la liga y lo guarda en el registro.
+        
+        Returns:
+            PredictionModel registrado o None si no hay datos suficientes
+        """
+        training_data = self._get_training_data(league, prediction_type)
+        
+        if len(training_data['X']) < 20:
+            logger.warning(f"Pocos datos para Random Forest ({len(training_data['X'])}), usando fallback")
+            return None
+        
+        model = self._train_random_forest(training_data['X'], training_data['y'])
+        if not hasattr(model, 'feature_importances_'):
+            # Modelo simple de respaldo (sin sklearn): no se guarda en el registro
+            return None
+        
+        # Validación out-of-bag: cada partido se evalúa con los árboles que no lo vieron
+        y = np.asarray(training_data['y'], dtype=np.float64)
+        errors = model.oob_prediction_ - y
+        mae = float(np.mean(np.abs(errors)))
+        rmse = float(np.sqrt(np.mean(errors ** 2)))
+        r2 = float(model.oob_score_)
+        
+        artifact = ModelArtifact(
+            estimator=model,
+            feature_schema=FEATURE_NAMES,
+            training_window={
+                'from': training_data['dates'][0].isoformat(),
+                'to': training_data['dates'][-1].isoformat(),
+                'samples': len(training_data['X']),
+            },
+            metrics={'mae': mae, 'rmse': rmse, 'r2': r2},
+        )
+        return model_registry.register(
+            REGISTRY_KEY, league, prediction_type, 'random_forest', artifact,
+            name=f"Random Forest {league.name} - {prediction_type}",
+            mae=mae,
+            rmse=rmse,
+            r2_score=r2,
+            model_parameters={
+                'n_estimators': self.n_estimators,
+                'max_depth': self.max_depth,
+                'min_samples_split': self.min_samples_split,
+            },
+        )
+    
     def _extract_features(self, home_team: str, away_team: str, league: League, 
                          prediction_type: str) -> List[float]:
         """
         Extrae características del partido para el modelo.
         
+        Usa el constructor de características compartido, con el mismo cálculo
+        que los partidos de entrenamiento.
+        
         Args:
             home_team: Equipo local
             away_team: Equipo visitante
@@ -99,93 +162,10 @@ class RandomForestModel:
             prediction_type: Tipo de predicción
         
         Returns:
-            Lista de características
+            Lista de características (orden de FEATURE_NAMES)
         """
         try:
-            cutoff_date = timezone.now().date() - timedelta(days=365)
-            
-            # Estadísticas del equipo local
-            home_matches = Match.objects.filter(
-                league=league,
-                home_team=home_team,
-                date__gte=cutoff_date
-            ).order_by('-date')[:20]
-            
-            # Estadísticas del equipo visitante
-            away_matches = Match.objects.filter(
-                league=league,
-                away_team=away_team,
-                date__gte=cutoff_date
-            ).order_by('-date')[:20]
-            
-            # Estadísticas de la liga
-            league_matches = Match.objects.filter(
-                league=league,
-                date__gte=cutoff_date
-            ).order_by('-date')[:100]
-            
-            features = []
-            
-            if 'shots' in prediction_type:
-                # Características para shots
-                home_shots = [m.hs for m in home_matches if m.hs is not None]
-                away_shots = [m.as_field for m in away_matches if m.as_field is not None]
-                home_shots_against = [m.as_field for m in home_matches if m.as_field is not None]
-                away_shots_against = [m.hs for m in away_matches if m.hs is not None]
-                
-                # Estadísticas básicas
-                features.extend([
-                    np.mean(home_shots) if home_shots else 12.0,  # Promedio shots local
-                    np.mean(away_shots) if away_shots else 11.0,  # Promedio shots visitante
-                    np.mean(home_shots_against) if home_shots_against else 11.0,  # Shots recibidos local
-                    np.mean(away_shots_against) if away_shots_against else 12.0,  # Shots recibidos visitante
-                    np.std(home_shots) if len(home_shots) > 1 else 3.0,  # Variabilidad local
-                    np.std(away_shots) if len(away_shots) > 1 else 3.0,  # Variabilidad visitante
-                ])
-                
-                # Estadísticas de la liga
-                league_home_shots = [m.hs for m in league_matches if m.hs is not None]
-                league_away_shots = [m.as_field for m in league_matches if m.as_field is not None]
-                features.extend([
-                    np.mean(league_home_shots) if league_home_shots else 12.0,  # Media liga local
-                    np.mean(league_away_shots) if league_away_shots else 11.0,  # Media liga visitante
-                ])
-                
-            elif 'corners' in prediction_type:
-                # Características para corners
-                home_corners = [m.hc for m in home_matches if m.hc is not None]
-                away_corners = [m.ac for m in away_matches if m.ac is not None]
-                home_corners_against = [m.ac for m in home_matches if m.ac is not None]
-                away_corners_against = [m.hc for m in away_matches if m.hc is not None]
-                
-                # Estadísticas básicas
-                features.extend([
-                    np.mean(home_corners) if home_corners else 5.5,  # Promedio corners local
-                    np.mean(away_corners) if away_corners else 4.5,  # Promedio corners visitante
-                    np.mean(home_corners_against) if home_corners_against else 4.5,  # Corners recibidos local
-                    np.mean(away_corners_against) if away_corners_against else 5.5,  # Corners recibidos visitante
-                    np.std(home_corners) if len(home_corners) > 1 else 2.0,  # Variabilidad local
-                    np.std(away_corners) if len(away_corners) > 1 else 2.0,  # Variabilidad visitante
-                ])
-                
-                # Estadísticas de la liga
-                league_home_corners = [m.hc for m in league_matches if m.hc is not None]
-                league_away_corners = [m.ac for m in league_matches if m.ac is not None]
-                features.extend([
-                    np.mean(league_home_corners) if league_home_corners else 5.5,  # Media liga local
-                    np.mean(league_away_corners) if league_away_corners else 4.5,  # Media liga visitante
-                ])
-            
-            # Características adicionales
-            features.extend([
-                len(home_matches) / 20.0,  # Cantidad de datos local (normalizado)
-                len(away_matches) / 20.0,  # Cantidad de datos visitante (normalizado)
-                1.0,  # Ventaja de local (constante)
-                0.0,  # Desventaja de visitante (constante)
-            ])
-            
-            return features
-            
+            return feature_builders.get(league).fixture_features(home_team, away_team)[0].tolist()
         except Exception as e:
             logger.error(f"Error extrayendo características: {e}")
             return []
@@ -199,134 +179,15 @@ class RandomForestModel:
             prediction_type: Tipo de predicción
         
         Returns:
-            Diccionario con características (X) y objetivos (y)
+            Diccionario con características (X), objetivos (y) y fechas, en orden cronológico
         """
         try:
-            cutoff_date = timezone.now().date() - timedelta(days=730)  # 2 años
-            
-            # Obtener partidos históricos
-            matches = Match.objects.filter(
-                league=league,
-                date__gte=cutoff_date
-            ).order_by('-date')[:200]
-            
-            X = []  # Características
-            y = []  # Objetivos
-            
-            for match in matches:
-                try:
-                    # Extraer características del partido
-                    features = self._extract_features_from_match(match, prediction_type)
-                    
-                    if features is None:
-                        continue
-                    
-                    X.append(features)
-                    
-                    # Extraer objetivo
-                    if 'shots' in prediction_type:
-                        if 'total' in prediction_type:
-                            target = (match.hs or 0) + (match.as_field or 0)
-                        elif 'home' in prediction_type:
-                            target = match.hs or 0
-                        elif 'away' in prediction_type:
-                            target = match.as_field or 0
-                        else:
-                            target = (match.hs or 0) + (match.as_field or 0)
-                    elif 'corners' in prediction_type:
-                        if 'total' in prediction_type:
-                            target = (match.hc or 0) + (match.ac or 0)
-                        elif 'home' in prediction_type:
-                            target = match.hc or 0
-                        elif 'away' in prediction_type:
-                            target = match.ac or 0
-                        else:
-                            target = (match.hc or 0) + (match.ac or 0)
-                    else:
-                        continue
-                    
-                    y.append(target)
-                    
-                except Exception as e:
-                    continue
-            
-            return {'X': X, 'y': y}
+            X, y, dates = feature_builders.get(league).training_set(prediction_type, limit=TRAINING_MATCHES)
+            return {'X': X, 'y': y, 'dates': dates}
             
         except Exception as e:
             logger.error(f"Error obteniendo datos de entrenamiento: {e}")
-            return {'X': [], 'y': []}
-    
-    def _extract_features_from_match(self, match: Match, prediction_type: str) -> List[float]:
-        """
-        Extrae características de un partido específico.
-        
-        Args:
-            match: Partido
-            prediction_type: Tipo de predicción
-        
-        Returns:
-            Lista de características
-        """
-        try:
-            cutoff_date = match.date - timedelta(days=365)
-            
-            # Estadísticas previas del equipo local
-            home_prev_matches = Match.objects.filter(
-                league=match.league,
-                home_team=match.home_team,
-                date__lt=match.date,
-                date__gte=cutoff_date
-            ).order_by('-date')[:10]
-            
-            # Estadísticas previas del equipo visitante
-            away_prev_matches = Match.objects.filter(
-                league=match.league,
-                away_team=match.away_team,
-                date__lt=match.date,
-                date__gte=cutoff_date
-            ).order_by('-date')[:10]
-            
-            features = []
-            
-            if 'shots' in prediction_type:
-                # Características para shots
-                home_shots = [m.hs for m in home_prev_matches if m.hs is not None]
-                away_shots = [m.as_field for m in away_prev_matches if m.as_field is not None]
-                
-                features.extend([
-                    np.mean(home_shots) if home_shots else 12.0,
-                    np.mean(away_shots) if away_shots else 11.0,
-                    np.std(home_shots) if len(home_shots) > 1 else 3.0,
-                    np.std(away_shots) if len(away_shots) > 1 else 3.0,
-                    len(home_shots) / 10.0,
-                    len(away_shots) / 10.0,
-                ])
-                
-            elif 'corners' in prediction_type:
-                # Características para corners
-                home_corners = [m.hc for m in home_prev_matches if m.hc is not None]
-                away_corners = [m.ac for m in away_prev_matches if m.ac is not None]
-                
-                features.extend([
-                    np.mean(home_corners) if home_corners else 5.5,
-                    np.mean(away_corners) if away_corners else 4.5,
-                    np.std(home_corners) if len(home_corners) > 1 else 2.0,
-                    np.std(away_corners) if len(away_corners) > 1 else 2.0,
-                    len(home_corners) / 10.0,
-                    len(away_corners) / 10.0,
-                ])
-            
-            # Características adicionales
-            features.extend([
-                1.0,  # Ventaja de local
-                0.0,  # Desventaja de visitante
-            ])
-            
-            return features
-            
-        except Exception as e:
-            logger.error(f"Error extrayendo características del partido: {e}")
-            return None
+            return {'X': [], 'y': [], 'dates': []}
     
     def _train_random_forest(self, X: List[List[float]], y: List[float]):
         """
@@ -348,6 +209,7 @@ class RandomForestModel:
                 max_depth=self.max_depth,
                 min_samples_split=self.min_samples_split,
                 random_state=42,
+                oob_score=True,  # Métricas de validación sin apartar partidos
                 n_jobs=1  # Usar solo 1 core para evitar problemas
             )
             
@@ -376,7 +238,7 @@ class RandomForestModel:
             def __init__(self, X, y):
                 self.X = X
                 self.y = y
-                self.avg = np.mean(y) if y else 10.0
+                self.avg = np.mean(y) if len(y) else 10.0
             
             def predict(self, features):
                 # Predicción simple basada en promedio
@@ -455,13 +317,10 @@ class RandomForestModel:
         """
         try:
             if hasattr(model, 'feature_importances_'):
-                features = ['home_avg', 'away_avg', 'home_std', 'away_std', 'home_data', 'away_data', 
-                           'league_home_avg', 'league_away_avg', 'home_advantage', 'away_disadvantage']
-                importance = {}
-                for i, feature in enumerate(features):
-                    if i < len(model.feature_importances_):
-                        importance[feature] = float(model.feature_importances_[i])
-                return importance
+                return {
+                    feature: float(importance)
+                    for feature, importance in zip(FEATURE_NAMES, model.feature_importances_)
+                }
             else:
                 return {}
         except Exception as e:
@@ -4,7 +4,6 @@ Servicios para predicciones de IA
 
 import numpy as np
 import pandas as pd
-from sklearn.linear_model import LinearRegression
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
@@ -17,9 +16,14 @@ from django.utils import timezone
 from django.db import models
 from football_data.models import Match, League
 from .models import PredictionModel, TeamStats, PredictionResult
+from .model_registry import model_registry, ModelArtifact
+from .feature_builder import FEATURE_NAMES, feature_builders
+from .training_jobs import training_job_service
 
 logger = logging.getLogger('ai_predictions')
 
+# Clave del registro de modelos para los modelos de este servicio
+REGISTRY_KEY = 'shots_service'
 
 class PredictionService:
     """Servicio principal para predicciones de remates"""
@@ -143,95 +147,27 @@ class PredictionService:
             return {'avg_shots_team1': 0, 'avg_shots_team2': 0, 'matches_count': 0}
     
     def prepare_features(self, home_team: str, away_team: str, league: League) -> np.ndarray:
-        """Prepara las características para la predicción"""
+        """Prepara las características para la predicción (mismo cálculo que el entrenamiento)"""
         try:
-            # Estadísticas del equipo local
-            home_stats = self.get_team_recent_stats(home_team, league)
-            
-            # Estadísticas del equipo visitante
-            away_stats = self.get_team_recent_stats(away_team, league)
-            
-            # Estadísticas cara a cara
-            h2h_stats = self.get_head_to_head_stats(home_team, away_team, league)
-            
-            # Crear vector de características optimizado
-            features = np.array([
-                home_stats['avg_shots_home'],              # Promedio remates local en casa
-                away_stats['avg_shots_away'],              # Promedio remates visitante fuera
-                home_stats['avg_goals_home'],              # Promedio goles local en casa
-                away_stats['avg_goals_away'],              # Promedio goles visitante fuera
-                home_stats['avg_shots_on_target_home'],    # Promedio remates a puerta local
-                away_stats['avg_shots_on_target_away'],    # Promedio remates a puerta visitante
-                home_stats['recent_wins'],                 # Victorias recientes local
-                away_stats['recent_wins'],                 # Victorias recientes visitante
-                home_stats['total_matches'],               # Partidos recientes local
-                away_stats['total_matches'],               # Partidos recientes visitante
-                h2h_stats['avg_shots_team1'],              # Promedio cara a cara (local)
-                h2h_stats['matches_count'],                # Partidos cara a cara
-                home_stats['shots_consistency_home'],      # Consistencia en remates local
-                away_stats['shots_consistency_away'],      # Consistencia en remates visitante
-                home_stats['form_trend'],                  # Tendencia de forma local
-                away_stats['form_trend'],                  # Tendencia de forma visitante
-                home_stats['goals_per_shot_home'],         # Eficiencia goleadora local
-                away_stats['goals_per_shot_away'],         # Eficiencia goleadora visitante
-                1.0,                                       # Ventaja de local
-            ])
-            
-            return features.reshape(1, -1)
-            
+            return feature_builders.get(league).fixture_features(home_team, away_team)
         except Exception as e:
             logger.error(f"Error preparando características: {e}")
-            return np.zeros((1, 19))  # Vector de características por defecto (actualizado)
+            return np.zeros((1, len(FEATURE_NAMES)))  # Vector de características por defecto
     
     def train_shots_model(self, league: League, prediction_type: str = 'shots_total') -> PredictionModel:
         """Entrena un modelo para predecir remates"""
         try:
             logger.info(f"Entrenando modelo para {league.name} - {prediction_type}")
             
-            # Obtener datos de entrenamiento
-            matches = Match.objects.filter(league=league).exclude(
-                models.Q(hs__isnull=True) | models.Q(as_field__isnull=True)
-            ).order_by('-date')[:500]  # Últimos 500 partidos
-            
-            if len(matches) < 50:
-                raise ValueError(f"No hay suficientes datos para entrenar. Solo {len(matches)} partidos disponibles.")
-            
-            # Preparar características y objetivos
-            X = []
-            y = []
-            
-            for match in matches:
-                try:
-                    # Características
-                    features = self.prepare_features(match.home_team, match.away_team, league)
-                    X.append(features.flatten())
-                    
-                    # Objetivo según el tipo de predicción
-                    if prediction_type == 'shots_total':
-                        target = (match.hs or 0) + (match.as_field or 0)
-                    elif prediction_type == 'shots_home':
-                        target = match.hs or 0
-                    elif prediction_type == 'shots_away':
-                        target = match.as_field or 0
-                    elif prediction_type == 'shots_on_target':
-                        target = (match.hst or 0) + (match.ast or 0)
-                    else:
-                        target = (match.hs or 0) + (match.as_field or 0)
-                    
-                    y.append(target)
-                    
-                except Exception as e:
-                    logger.warning(f"Error procesando partido {match.id}: {e}")
-                    continue
-            
-            if len(X) < 20:
-                raise ValueError(f"No se pudieron procesar suficientes partidos. Solo {len(X)} válidos.")
+            # Matriz de entrenamiento sin fuga de datos (una consulta, orden cronológico)
+            X, y, match_dates = feature_builders.get(league).training_set(prediction_type, limit=500)
             
-            X = np.array(X)
-            y = np.array(y)
+            if len(X) < 50:
+                raise ValueError(f"No hay suficientes datos para entrenar. Solo {len(X)} partidos disponibles.")
             
             # MEJORA: Normalizar características para mejor rendimiento
-            X_scaled = self.scaler.fit_transform(X)
+            scaler = StandardScaler()
+            X_scaled = scaler.fit_transform(X)
             
             # OPTIMIZACIÓN 6: Validación temporal (más realista para fútbol)
             # En fútbol, no podemos predecir el pasado con datos del futuro
@@ -289,22 +225,26 @@ class PredictionService:
             # MEJORA: Asegurar que las predicciones sean realistas
             y_pred_clipped = np.clip(y_pred, 0, 50)  # Límites realistas
             
-            # Crear registro del modelo con métricas mejoradas
+            # Guardar el modelo entrenado en el registro con métricas mejoradas
             model_type_name = 'ridge' if len(X_train) < 100 else 'random_forest'
-            prediction_model = PredictionModel.objects.create(
+            artifact = ModelArtifact(
+                estimator=model,
+                scaler=scaler,
+                feature_schema=FEATURE_NAMES,
+                training_window={
+                    'from': match_dates[0].isoformat(),
+                    'to': match_dates[-1].isoformat(),
+                    'samples': len(X_train),
+                },
+                metrics={'mae': float(mae), 'rmse': float(rmse), 'r2': float(r2)},
+            )
+            prediction_model = model_registry.register(
+                REGISTRY_KEY, league, prediction_type, model_type_name, artifact,
                 name=f"Modelo {league.name} - {prediction_type}",
-                model_type=model_type_name,
-                prediction_type=prediction_type,
-                league=league,
                 accuracy=accuracy_tolerance_2,  # Usar accuracy con tolerancia
                 mae=mae,
                 rmse=rmse,
                 r2_score=r2,
-                features_used=[
-                    'avg_shots_home', 'avg_shots_away', 'avg_goals_home', 'avg_goals_away',
-                    'recent_wins_home', 'recent_wins_away', 'recent_matches_home', 'recent_matches_away',
-                    'h2h_avg_shots', 'h2h_matches', 'home_advantage'
-                ],
                 model_parameters={
                     'mape': float(mape),
                     'accuracy_tolerance_2': float(accuracy_tolerance_2),
@@ -326,68 +266,28 @@ class PredictionService:
                      prediction_type: str = 'shots_total') -> Dict:
         """Realiza una predicción de remates"""
         try:
-            # Buscar modelo entrenado
-            model_record = PredictionModel.objects.filter(
-                league=league,
-                prediction_type=prediction_type,
-                is_active=True
-            ).first()
+            # Buscar modelo entrenado en el registro
+            loaded = model_registry.load_active(REGISTRY_KEY, league, prediction_type, FEATURE_NAMES)
+            
+            if loaded is None:
+                # El entrenamiento se hace en run_training_worker, nunca durante la predicción:
+                # mientras tanto se sirve la predicción de respaldo con las estadísticas recientes
+                training_job_service.enqueue(league, REGISTRY_KEY, [prediction_type], reason='missing')
+                prediction = self._fallback_prediction(home_team, away_team, league, prediction_type)
+                return {
+                    'prediction': prediction,
+                    'confidence': 0.3,
+                    'probabilities': self._calculate_probabilities(prediction, 3.0),
+                    'model_accuracy': 0,
+                    'fallback': True,
+                    'training_queued': True
+                }
             
-            if not model_record:
-                logger.info(f"No hay modelo entrenado para {league.name} - {prediction_type}")
-                # Entrenar modelo si no existe
-                model_record = self.train_shots_model(league, prediction_type)
+            model_record, artifact = loaded
             
-            # Preparar características
+            # Preparar características y predecir con el modelo guardado
             features = self.prepare_features(home_team, away_team, league)
-            
-            # MEJORA: Usar Random Forest para predicción
-            if model_record.model_type == 'random_forest':
-                # Reentrenar con datos históricos para obtener el modelo completo
-                # Esto es una simplificación - en producción se guardaría el modelo completo
-                model = RandomForestRegressor(n_estimators=100, max_depth=10, random_state=42)
-                # Usar datos históricos para entrenar el modelo
-                matches = Match.objects.filter(league=league).exclude(
-                    models.Q(hs__isnull=True) | models.Q(as_field__isnull=True)
-                ).order_by('-date')[:200]
-                
-                X_train = []
-                y_train = []
-                for match in matches:
-                    try:
-                        features_train = self.prepare_features(match.home_team, match.away_team, league)
-                        X_train.append(features_train.flatten())
-                        
-                        if prediction_type == 'shots_total':
-                            target = (match.hs or 0) + (match.as_field or 0)
-                        elif prediction_type == 'shots_home':
-                            target = match.hs or 0
-                        elif prediction_type == 'shots_away':
-                            target = match.as_field or 0
-                        else:
-                            target = (match.hs or 0) + (match.as_field or 0)
-                        y_train.append(target)
-                    except:
-                        continue
-                
-                if len(X_train) > 10:
-                    X_train = np.array(X_train)
-                    y_train = np.array(y_train)
-                    X_train_scaled = self.scaler.fit_transform(X_train)
-                    model.fit(X_train_scaled, y_train)
-                    
-                    # Normalizar características de predicción
-                    features_scaled = self.scaler.transform(features)
-                    prediction = model.predict(features_scaled)[0]
-                else:
-                    # Fallback a predicción basada en estadísticas
-                    prediction = self._fallback_prediction(home_team, away_team, league, prediction_type)
-            else:
-                # Fallback para modelos antiguos
-                model = LinearRegression()
-                model.coef_ = np.array(model_record.model_parameters)
-                model.intercept_ = 0
-                prediction = model.predict(features)[0]
+            prediction = artifact.predict(features)[0]
             
             # CORRECCIÓN: Asegurar que la predicción sea positiva y realista
             prediction = max(0, prediction)  # No puede ser negativa
@@ -485,10 +385,4 @@ class PredictionService:
     
     def _get_features_dict(self, features: np.ndarray) -> Dict:
         """Convierte características a diccionario"""
-        feature_names = [
-            'avg_shots_home', 'avg_shots_away', 'avg_goals_home', 'avg_goals_away',
-            'recent_wins_home', 'recent_wins_away', 'recent_matches_home', 'recent_matches_away',
-            'h2h_avg_shots', 'h2h_matches', 'home_advantage'
-        ]
-        
-        return {name: float(value) for name, value in zip(feature_names, features)}
+        return {name: float(value) for name, value in zip(FEATURE_NAMES, features)}
@@ -1,14 +1,20 @@
 import logging
-from django.db.models import Q, Avg
-from football_data.models import League, Match
+from football_data.models import League
 import numpy as np
+from .match_context import uses_match_context
+from .team_history import current_team_history, drop_missing
+from .league_stats import league_stats_service
 
 logger = logging.getLogger(__name__)
 
+# Estadísticas de remates que se leen de una vez por equipo y sede
+SHOTS_STATS = ('shots_for', 'shots_against', 'shots_on_target_for', 'shots_on_target_against')
+
 class ShotsPredictionModel:
     def __init__(self):
         self.name = "Shots Prediction Model"
     
+    @uses_match_context
     def predict_shots_total(self, home_team: str, away_team: str, league: League) -> dict:
         """Predicción de remates totales en el partido"""
         try:
@@ -60,6 +66,7 @@ class ShotsPredictionModel:
             logger.error(f"Error en predicción de remates totales: {e}")
             return self._fallback_prediction('shots_total')
     
+    @uses_match_context
     def predict_shots_home(self, home_team: str, away_team: str, league: League) -> dict:
         """Predicción de remates del equipo local"""
         try:
@@ -96,6 +103,7 @@ class ShotsPredictionModel:
             logger.error(f"Error en predicción de remates local: {e}")
             return self._fallback_prediction('shots_home')
     
+    @uses_match_context
     def predict_shots_away(self, home_team: str, away_team: str, league: League) -> dict:
         """Predicción de remates del equipo visitante"""
         try:
@@ -132,6 +140,7 @@ class ShotsPredictionModel:
             logger.error(f"Error en predicción de remates visitante: {e}")
             return self._fallback_prediction('shots_away')
     
+    @uses_match_context
     def predict_shots_on_target_total(self, home_team: str, away_team: str, league: League) -> dict:
         """Predicción de remates a puerta totales"""
         try:
@@ -175,54 +184,27 @@ class ShotsPredictionModel:
             logger.error(f"Error en predicción de remates a puerta: {e}")
             return self._fallback_prediction('shots_on_target_total')
     
+    def _team_average(self, team_name: str, league: League, home_away: str, stat: str, default: float) -> float:
+        """Promedio de una estadística de remates del equipo en la sede dada, sin partidos a 0 ni sin dato"""
+        history = current_team_history().team(league, team_name, home_away, stats=SHOTS_STATS)
+        values = drop_missing(history[stat])
+        values = values[values != 0]
+        return float(np.mean(values)) if len(values) else default
+    
     def _get_team_shots_average(self, team_name: str, league: League, home_away: str) -> float:
         """Obtiene el promedio de remates de un equipo"""
+        default = 12.0 if home_away == 'home' else 10.0
         try:
-            if home_away == 'home':
-                matches = Match.objects.filter(
-                    home_team=team_name,
-                    league=league,
-                    hs__isnull=False
-                ).exclude(hs=0)
-                if matches.exists():
-                    return matches.aggregate(avg=Avg('hs'))['avg'] or 12.0
-            else:
-                matches = Match.objects.filter(
-                    away_team=team_name,
-                    league=league,
-                    as_field__isnull=False
-                ).exclude(as_field=0)
-                if matches.exists():
-                    return matches.aggregate(avg=Avg('as_field'))['avg'] or 10.0
-            
-            # Valores por defecto si no hay datos
-            return 12.0 if home_away == 'home' else 10.0
+            return self._team_average(team_name, league, home_away, 'shots_for', default)
             
         except Exception as e:
             logger.error(f"Error obteniendo promedio de remates: {e}")
-            return 12.0 if home_away == 'home' else 10.0
+            return default
     
     def _get_team_shots_conceded_average(self, team_name: str, league: League, home_away: str) -> float:
         """Obtiene el promedio de remates recibidos por un equipo"""
         try:
-            if home_away == 'home':
-                matches = Match.objects.filter(
-                    home_team=team_name,
-                    league=league,
-                    as_field__isnull=False
-                ).exclude(as_field=0)
-                if matches.exists():
-                    return matches.aggregate(avg=Avg('as_field'))['avg'] or 12.0
-            else:
-                matches = Match.objects.filter(
-                    away_team=team_name,
-                    league=league,
-                    hs__isnull=False
-                ).exclude(hs=0)
-                if matches.exists():
-                    return matches.aggregate(avg=Avg('hs'))['avg'] or 12.0
-            
-            return 12.0
+            return self._team_average(team_name, league, home_away, 'shots_against', 12.0)
             
         except Exception as e:
             logger.error(f"Error obteniendo promedio de remates recibidos: {e}")
@@ -230,58 +212,28 @@ class ShotsPredictionModel:
     
     def _get_team_shots_on_target_average(self, team_name: str, league: League, home_away: str) -> float:
         """Obtiene el promedio de remates a puerta de un equipo"""
+        default = 4.5 if home_away == 'home' else 4.0
         try:
-            if home_away == 'home':
-                matches = Match.objects.filter(
-                    home_team=team_name,
-                    league=league,
-                    hst__isnull=False
-                ).exclude(hst=0)
-                if matches.exists():
-                    return matches.aggregate(avg=Avg('hst'))['avg'] or 4.5
-            else:
-                matches = Match.objects.filter(
-                    away_team=team_name,
-                    league=league,
-                    ast__isnull=False
-                ).exclude(ast=0)
-                if matches.exists():
-                    return matches.aggregate(avg=Avg('ast'))['avg'] or 4.0
-            
-            return 4.5 if home_away == 'home' else 4.0
+            return self._team_average(team_name, league, home_away, 'shots_on_target_for', default)
             
         except Exception as e:
             logger.error(f"Error obteniendo promedio de remates a puerta: {e}")
-            return 4.5 if home_away == 'home' else 4.0
+            return default
     
     def _get_team_shots_on_target_conceded_average(self, team_name: str, league: League, home_away: str) -> float:
         """Obtiene el promedio de remates a puerta recibidos por un equipo"""
         try:
-            if home_away == 'home':
-                matches = Match.objects.filter(
-                    home_team=team_name,
-                    league=league,
-                    ast__isnull=False
-                ).exclude(ast=0)
-                if matches.exists():
-                    return matches.aggregate(avg=Avg('ast'))['avg'] or 4.5
-            else:
-                matches = Match.objects.filter(
-                    away_team=team_name,
-                    league=league,
-                    hst__isnull=False
-                ).exclude(hst=0)
-                if matches.exists():
-                    return matches.aggregate(avg=Avg('hst'))['avg'] or 4.5
-            
-            return 4.5
+            return self._team_average(team_name, league, home_away, 'shots_on_target_against', 4.5)
             
         except Exception as e:
             logger.error(f"Error obteniendo promedio de remates a puerta recibidos: {e}")
             return 4.5
     
     def _get_league_shots_factor(self, league: League) -> float:
-        """Factor de ajuste por liga para remates"""
+        """Factor de ajuste por liga para remates (media de la liga; tabla fija sin datos suficientes)"""
+        factor = league_stats_service.league_factor(league, 'shots')
+        if factor is not None:
+            return factor
         league_factors = {
             'Premier League': 1.1,  # Más remates
             'Bundesliga': 1.0,     # Promedio
@@ -292,7 +244,10 @@ class ShotsPredictionModel:
         return league_factors.get(league.name, 1.0)
     
     def _get_league_shots_on_target_factor(self, league: League) -> float:
-        """Factor de ajuste por liga para remates a puerta"""
+        """Factor de ajuste por liga para remates a puerta (media de la liga; tabla fija sin datos suficientes)"""
+        factor = league_stats_service.league_factor(league, 'shots_on_target')
+        if factor is not None:
+            return factor
         league_factors = {
             'Premier League': 1.05,
             'Bundesliga': 1.0,
@@ -305,36 +260,10 @@ class ShotsPredictionModel:
     def _get_recent_form_factor(self, home_team: str, away_team: str, league: League) -> float:
         """Factor de forma reciente basado en remates recientes"""
         try:
-            # Obtener últimos 5 partidos de cada equipo
-            home_matches = Match.objects.filter(
-                Q(home_team=home_team) | Q(away_team=home_team),
-                league=league
-            ).order_by('-date')[:5]
-            
-            away_matches = Match.objects.filter(
-                Q(home_team=away_team) | Q(away_team=away_team),
-                league=league
-            ).order_by('-date')[:5]
-            
-            # Calcular factor basado en REMATES recientes (no goles)
-            home_shots_recent = []
-            away_shots_recent = []
-            
-            # Remates recientes del equipo local
-            for match in home_matches:
-                if match.hs is not None and match.as_field is not None:
-                    if match.home_team == home_team:
-                        home_shots_recent.append(match.hs)
-                    else:
-                        home_shots_recent.append(match.as_field)
-            
-            # Remates recientes del equipo visitante
-            for match in away_matches:
-                if match.hs is not None and match.as_field is not None:
-                    if match.home_team == away_team:
-                        away_shots_recent.append(match.hs)
-                    else:
-                        away_shots_recent.append(match.as_field)
+            # Remates en los últimos 5 partidos de cada equipo (en cualquier sede)
+            history = current_team_history()
+            home_shots_recent = self._recent_shots(history, home_team, league)
+            away_shots_recent = self._recent_shots(history, away_team, league)
             
             # Calcular promedios de remates recientes
             if len(home_shots_recent) > 0 and len(away_shots_recent) > 0:
@@ -376,6 +305,12 @@ class ShotsPredictionModel:
             logger.error(f"Error calculando factor de forma basado en remates: {e}")
             return 1.0
     
+    def _recent_shots(self, history, team_name: str, league: League) -> np.ndarray:
+        """Remates del equipo en sus últimos 5 partidos con remates de ambos equipos registrados"""
+        recent = history.team(league, team_name, window=5, stats=('shots_for', 'shots_against'))
+        complete = ~np.isnan(recent['shots_for']) & ~np.isnan(recent['shots_against'])
+        return recent['shots_for'][complete]
+    
     def _calculate_shots_probabilities(self, expected_shots: float) -> dict:
         """Calcula probabilidades para diferentes rangos de remates"""
         return {
@@ -410,7 +345,8 @@ class ShotsPredictionModel:
             'prediction': fallback_values.get(prediction_type, 10.0),
             'confidence': 0.3,
             'probabilities': {'over_5': 0.5, 'over_10': 0.3, 'over_15': 0.1, 'over_20': 0.05, 'over_25': 0.05},
-            'total_matches': 0
+            'total_matches': 0,
+            'fallback': True
         }
 
 # Instancia global del modelo
@@ -0,0 +1,77 @@
+"""
+Receptores de señales de ai_predictions
+"""
+
+import logging
+
+from django.conf import settings
+from django.dispatch import receiver
+
+from football_data.signals import league_data_changed
+
+logger = logging.getLogger('ai_predictions')
+
+
+@receiver(league_data_changed, dispatch_uid='ai_predictions_refit_dixon_coles')
+def refit_dixon_coles(sender, league, data_version, **kwargs):
+    """Reajusta Dixon-Coles de la liga cuando cambian sus partidos"""
+    if not getattr(settings, 'DIXON_COLES_FIT_ON_IMPORT', True):
+        return
+    from .dixon_coles_fit import dixon_coles_fit_service
+    try:
+        dixon_coles_fit_service.fit_league(league)
+    except Exception as e:
+        logger.error(f"Error reajustando Dixon-Coles de {league.name}: {e}")
+
+
+@receiver(league_data_changed, dispatch_uid='ai_predictions_enqueue_training')
+def enqueue_model_training(sender, league, data_version, **kwargs):
+    """Encola el reentrenamiento de los modelos de la liga (lo ejecuta run_training_worker)"""
+    if not getattr(settings, 'TRAINING_ENQUEUE_ON_IMPORT', True):
+        return
+    from .training_jobs import training_job_service
+    try:
+        training_job_service.enqueue_league(league, reason='import')
+    except Exception as e:
+        logger.error(f"Error encolando el entrenamiento de {league.name}: {e}")
+
+
+@receiver(league_data_changed, dispatch_uid='ai_predictions_refresh_league_stats')
+def refresh_league_stats(sender, league, data_version, **kwargs):
+    """Recalcula el snapshot de estadísticas de la liga con la nueva versión de datos"""
+    from .league_stats import league_stats_service
+    try:
+        league_stats_service.refresh(league)
+    except Exception as e:
+        logger.error(f"Error recalculando las estadísticas de {league.name}: {e}")
+
+
+@receiver(league_data_changed, dispatch_uid='ai_predictions_invalidate_league_calibration')
+def invalidate_league_calibration(sender, league, data_version, **kwargs):
+    """Descarta los factores de calibración de la liga (se recalculan en el siguiente uso)"""
+    from .league_calibration import league_calibration
+    league_calibration.invalidate(league)
+
+
+@receiver(league_data_changed, dispatch_uid='ai_predictions_update_team_ratings')
+def update_team_ratings(sender, league, data_version, **kwargs):
+    """Procesa los partidos nuevos en los ratings online de la liga"""
+    if not getattr(settings, 'TEAM_RATINGS_UPDATE_ON_IMPORT', True):
+        return
+    from .team_ratings import team_rating_service
+    try:
+        team_rating_service.update_league(league)
+    except Exception as e:
+        logger.error(f"Error actualizando los ratings de {league.name}: {e}")
+
+
+@receiver(league_data_changed, dispatch_uid='ai_predictions_update_decayed_stats')
+def update_decayed_stats(sender, league, data_version, **kwargs):
+    """Procesa los partidos nuevos en las estadísticas con decaimiento de la liga"""
+    if not getattr(settings, 'DECAYED_STATS_UPDATE_ON_IMPORT', True):
+        return
+    from .decayed_stats import decayed_stats_service
+    try:
+        decayed_stats_service.update_league(league)
+    except Exception as e:
+        logger.error(f"Error actualizando las estadísticas con decaimiento de {league.name}: {e}")
@@ -6,11 +6,15 @@ import numpy as np
 import logging
 from typing import Dict, List
 from datetime import timedelta
-from django.utils import timezone
 from django.db import models
 from django.core.cache import cache
-from football_data.models import Match, League
+from football_data.models import League
 from .dixon_coles import DixonColesModel
+from .match_context import uses_match_context
+from .team_history import current_team_history, drop_missing
+from .league_stats import league_stats_service
+from .team_ratings import team_rating_service
+from .decayed_stats import DecayedAggregate, decayed_stats_service
 
 logger = logging.getLogger('ai_predictions')
 
@@ -53,6 +57,24 @@ def _estimate_nb_params(mean_value: float, variance_value: float) -> tuple:
         return None
 
 
+def _history_stat(prediction_type: str, coarse: bool = False) -> str:
+    """
+    Estadística del historial que usa cada tipo de predicción.
+    En modo coarse sólo se distinguen goles, corners y remates.
+    """
+    if 'goals' in prediction_type:
+        return 'goals'
+    if 'corners' in prediction_type:
+        return 'corners'
+    if coarse:
+        return 'shots'
+    if 'both_teams_score' in prediction_type:
+        return 'goals'
+    if 'shots_on_target' in prediction_type:
+        return 'shots_on_target'
+    return 'shots'
+
+
 def get_league_realistic_limits(league: League, prediction_type: str = 'goals') -> tuple:
     """
     Obtiene límites realistas basados en datos históricos de la liga.
@@ -65,15 +87,11 @@ def get_league_realistic_limits(league: League, prediction_type: str = 'goals')
         Tupla (lambda_min, lambda_max) basada en percentiles
     """
     try:
-        # Obtener datos históricos de la liga (últimos 2 años)
-        cutoff_date = timezone.now().date() - timedelta(days=730)
+        # Percentiles de la liga (últimos 500 partidos de los últimos 2 años, ver league_stats.py)
+        base_stat = _history_stat(prediction_type, coarse=True)
+        recent = league_stats_service.stat(league, base_stat).get('recent', {})
         
-        league_matches = Match.objects.filter(
-            league=league,
-            date__gte=cutoff_date
-        ).order_by('-date')[:500]  # Últimos 500 partidos
-        
-        if not league_matches:
+        if not recent.get('count'):
             # Si no hay datos, usar límites conservadores
             if 'goals' in prediction_type:
                 return 0.1, 4.0
@@ -82,22 +100,7 @@ def get_league_realistic_limits(league: League, prediction_type: str = 'goals')
             else:  # shots
                 return 3.0, 25.0
         
-        # Extraer datos según el tipo de predicción
-        if 'goals' in prediction_type:
-            home_data = [m.fthg for m in league_matches if m.fthg is not None]
-            away_data = [m.ftag for m in league_matches if m.ftag is not None]
-        elif 'corners' in prediction_type:
-            home_data = [m.hc for m in league_matches if m.hc is not None]
-            away_data = [m.ac for m in league_matches if m.ac is not None]
-        else:  # shots
-            home_data = [m.hs for m in league_matches if m.hs is not None]
-            away_data = [m.as_field for m in league_matches if m.as_field is not None]
-        
-        # Combinar datos de local y visitante
-        all_data = home_data + away_data
-        all_data = [d for d in all_data if d is not None and d >= 0]
-        
-        if len(all_data) < 50:  # Pocos datos
+        if recent['count'] < 50:  # Pocos datos
             if 'goals' in prediction_type:
                 return 0.1, 4.0
             elif 'corners' in prediction_type:
@@ -105,14 +108,11 @@ def get_league_realistic_limits(league: League, prediction_type: str = 'goals')
             else:  # shots
                 return 3.0, 25.0
         
-        # Calcular estadísticas de la liga
-        league_mean = np.mean(all_data)
-        league_std = np.std(all_data)
-        
-        # Calcular percentiles
-        p95 = np.percentile(all_data, 95)
-        p99 = np.percentile(all_data, 99)
-        p05 = np.percentile(all_data, 5)
+        # Estadísticas de la liga (local y visitante juntos)
+        league_mean = recent['mean']
+        league_std = recent['std']
+        p99 = recent['p99']
+        p05 = recent['p05']
         
         # Límites basados en percentiles y desviaciones estándar
         if 'goals' in prediction_type:
@@ -155,32 +155,18 @@ def analyze_team_statistics(team_name: str, league: League, prediction_type: str
         Diccionario con estadísticas del equipo
     """
     try:
-        cutoff_date = timezone.now().date() - timedelta(days=365)  # 1 año
-        
-        # Partidos como local
-        home_matches = Match.objects.filter(
-            home_team=team_name,
-            league=league,
-            date__gte=cutoff_date
-        ).order_by('-date')[:30]
+        history = current_team_history()
+        cutoff_date = history.reference_date() - timedelta(days=365)  # 1 año
         
-        # Partidos como visitante
-        away_matches = Match.objects.filter(
-            away_team=team_name,
-            league=league,
-            date__gte=cutoff_date
-        ).order_by('-date')[:30]
+        stat = f'{_history_stat(prediction_type, coarse=True)}_for'
         
-        # Extraer datos según el tipo de predicción
-        if 'goals' in prediction_type:
-            home_data = [m.fthg for m in home_matches if m.fthg is not None]
-            away_data = [m.ftag for m in away_matches if m.ftag is not None]
-        elif 'corners' in prediction_type:
-            home_data = [m.hc for m in home_matches if m.hc is not None]
-            away_data = [m.ac for m in away_matches if m.ac is not None]
-        else:  # shots
-            home_data = [m.hs for m in home_matches if m.hs is not None]
-            away_data = [m.as_field for m in away_matches if m.as_field is not None]
+        # Partidos como local y como visitante (últimos 30 de cada uno)
+        home_data = drop_missing(
+            history.team(league, team_name, 'home', window=30, since=cutoff_date, stats=(stat,))[stat]
+        ).tolist()
+        away_data = drop_missing(
+            history.team(league, team_name, 'away', window=30, since=cutoff_date, stats=(stat,))[stat]
+        ).tolist()
         
         # Calcular promedios
         home_avg = np.mean(home_data) if home_data else 0
@@ -215,7 +201,9 @@ def analyze_team_statistics(team_name: str, league: League, prediction_type: str
 def calculate_lambda_with_limits(home_team: str, away_team: str, league: League, 
                                 prediction_type: str = 'goals') -> tuple:
     """
-    Calcula lambda con límites basados en datos reales.
+    Calcula lambda con límites basados en datos reales. Si los dos equipos tienen
+    ratings online (team_ratings.py) se usan sus tasas esperadas; si no, las
+    medias de sus partidos con un ajuste fijo de localía.
     
     Args:
         home_team: Equipo local
@@ -230,21 +218,25 @@ def calculate_lambda_with_limits(home_team: str, away_team: str, league: League,
         # Obtener límites de la liga
         lambda_min, lambda_max = get_league_realistic_limits(league, prediction_type)
         
-        # Obtener estadísticas de los equipos
-        home_stats = analyze_team_statistics(home_team, league, prediction_type)
-        away_stats = analyze_team_statistics(away_team, league, prediction_type)
+        rated = team_rating_service.expected(league, home_team, away_team, _history_stat(prediction_type))
         
-        # Calcular lambda "crudo" basado en estadísticas
-        if 'goals' in prediction_type:
-            # Para goles, usar promedio simple con ajuste de liga
-            raw_lambda_home = home_stats['overall_avg'] * 1.1  # Ventaja local
-            raw_lambda_away = away_stats['overall_avg'] * 0.9  # Desventaja visitante
-        elif 'corners' in prediction_type:
-            raw_lambda_home = home_stats['overall_avg'] * 1.05
-            raw_lambda_away = away_stats['overall_avg'] * 0.95
-        else:  # shots
-            raw_lambda_home = home_stats['overall_avg'] * 1.08
-            raw_lambda_away = away_stats['overall_avg'] * 0.92
+        if rated is not None:
+            raw_lambda_home, raw_lambda_away = rated
+        else:
+            # Sin ratings: estadísticas de los equipos con ajuste fijo de localía
+            home_stats = analyze_team_statistics(home_team, league, prediction_type)
+            away_stats = analyze_team_statistics(away_team, league, prediction_type)
+            
+            if 'goals' in prediction_type:
+                # Para goles, usar promedio simple con ajuste de liga
+                raw_lambda_home = home_stats['overall_avg'] * 1.1  # Ventaja local
+                raw_lambda_away = away_stats['overall_avg'] * 0.9  # Desventaja visitante
+            elif 'corners' in prediction_type:
+                raw_lambda_home = home_stats['overall_avg'] * 1.05
+                raw_lambda_away = away_stats['overall_avg'] * 0.95
+            else:  # shots
+                raw_lambda_home = home_stats['overall_avg'] * 1.08
+                raw_lambda_away = away_stats['overall_avg'] * 0.92
         
         # Aplicar límites
         lambda_home = max(lambda_min, min(lambda_max, raw_lambda_home))
@@ -269,6 +261,15 @@ def calculate_lambda_with_limits(home_team: str, away_team: str, league: League,
             return 12.0, 11.0
 
 
+# Promedios realistas (local, visitante) cuando un equipo no tiene historial
+_SIMPLE_STATS_DEFAULTS = {
+    'goals': (1.5, 1.2),
+    'corners': (5.2, 4.6),  # Promedios reales de corners
+    'shots_on_target': (5.0, 4.0),
+    'shots': (12.0, 11.0),
+}
+
+
 class SimplePredictionService:
     """Servicio de predicciones simples y rápidas"""
     
@@ -279,9 +280,9 @@ class SimplePredictionService:
     
     def _optimize_rho_if_needed(self):
         """
-        Optimiza el parámetro rho del modelo Dixon-Coles usando datos históricos.
-        Usa caché para evitar recalcular en cada solicitud.
-        OPTIMIZACIÓN DESHABILITADA: Usa valor por defecto para evitar bloqueos.
+        Rho por defecto del modelo Dixon-Coles. Las ligas con ajuste guardado
+        (DixonColesFit, ver dixon_coles_fit.py) usan su propio rho; este valor sólo
+        se usa cuando la liga todavía no tiene ajuste.
         """
         global _GLOBAL_RHO_CACHE
         
@@ -301,56 +302,21 @@ class SimplePredictionService:
         """Obtiene estadísticas simples de un equipo"""
         try:
             # Ventana temporal más pequeña para mayor velocidad
-            cutoff_date = timezone.now().date() - timedelta(days=180)  # 6 meses
-            
-            if is_home:
-                matches = Match.objects.filter(
-                    league=league,
-                    home_team=team_name,
-                    date__gte=cutoff_date
-                ).order_by('-date')[:20]  # Solo 20 partidos
-                
-                # Usar datos correctos según el tipo de predicción
-                if 'goals' in prediction_type:
-                    data = [m.fthg for m in matches if m.fthg is not None]
-                    default_value = 1.5  # Promedio realista de goles
-                elif 'corners' in prediction_type:
-                    data = [m.hc for m in matches if m.hc is not None]
-                    default_value = 5.2  # Promedio real de corners local (datos reales)
-                elif 'both_teams_score' in prediction_type:
-                    data = [m.fthg for m in matches if m.fthg is not None]
-                    default_value = 1.5  # Promedio realista de goles
-                elif 'shots_on_target' in prediction_type:
-                    data = [m.hst for m in matches if m.hst is not None]
-                    default_value = 5.0  # Promedio realista de remates a puerta local
-                else:
-                    data = [m.hs for m in matches if m.hs is not None]
-                    default_value = 12.0  # Promedio realista de remates
-            else:
-                matches = Match.objects.filter(
-                    league=league,
-                    away_team=team_name,
-                    date__gte=cutoff_date
-                ).order_by('-date')[:20]
-                
-                # Usar datos correctos según el tipo de predicción
-                if 'goals' in prediction_type:
-                    data = [m.ftag for m in matches if m.ftag is not None]
-                    default_value = 1.2  # Promedio realista de goles visitante
-                elif 'corners' in prediction_type:
-                    data = [m.ac for m in matches if m.ac is not None]
-                    default_value = 4.6  # Promedio real de corners visitante (datos reales)
-                elif 'both_teams_score' in prediction_type:
-                    data = [m.ftag for m in matches if m.ftag is not None]
-                    default_value = 1.2  # Promedio realista de goles visitante
-                elif 'shots_on_target' in prediction_type:
-                    data = [m.ast for m in matches if m.ast is not None]
-                    default_value = 4.0  # Promedio realista de remates a puerta visitante
-                else:
-                    data = [m.as_field for m in matches if m.as_field is not None]
-                    default_value = 11.0  # Promedio realista de remates visitante
-            
-            if not data:
+            cutoff_date = current_team_history().reference_date() - timedelta(days=180)  # 6 meses
+            
+            # Usar datos correctos según el tipo de predicción (goles, corners, remates a puerta o remates)
+            base_stat = _history_stat(prediction_type)
+            stat = f'{base_stat}_for'
+            home_default, away_default = _SIMPLE_STATS_DEFAULTS[base_stat]
+            default_value = home_default if is_home else away_default
+            
+            history = current_team_history().team(
+                league, team_name, 'home' if is_home else 'away',
+                window=20, since=cutoff_date, stats=(stat,)  # Solo 20 partidos
+            )
+            data = drop_missing(history[stat])
+            
+            if not len(data):
                 return {'avg_value': default_value, 'matches_count': 0}
             
             return {
@@ -370,6 +336,53 @@ class SimplePredictionService:
                 default_value = 12.0
             return {'avg_value': default_value, 'matches_count': 0}
     
+    def _recent_values(self, home_team: str, away_team: str, league: League,
+                       prediction_type: str, window: int, since=None) -> np.ndarray:
+        """
+        Valores recientes del local en casa y/o del visitante fuera para el tipo
+        de predicción (sólo el equipo implicado en los mercados _home/_away).
+        """
+        stat = f'{_history_stat(prediction_type)}_for'
+        history = current_team_history()
+        values = []
+        if not prediction_type.endswith('_away'):
+            values.append(drop_missing(history.team(
+                league, home_team, 'home', window=window, since=since, stats=(stat,)
+            )[stat]))
+        if not prediction_type.endswith('_home'):
+            values.append(drop_missing(history.team(
+                league, away_team, 'away', window=window, since=since, stats=(stat,)
+            )[stat]))
+        return np.concatenate(values)
+    
+    def _decayed_form(self, home_team: str, away_team: str, league: League,
+                      prediction_type: str, max_age_days: int = 90):
+        """
+        Forma con decaimiento del local en casa y/o del visitante fuera (sólo el
+        equipo implicado en los mercados _home/_away), sumada a la fecha de
+        referencia. Se ignoran los equipos sin partidos en los últimos max_age_days
+        días; None si no queda ninguno.
+        """
+        stat = _history_stat(prediction_type)
+        reference_day = current_team_history().reference_date().toordinal()
+        teams = []
+        if not prediction_type.endswith('_away'):
+            teams.append((home_team, 'home'))
+        if not prediction_type.endswith('_home'):
+            teams.append((away_team, 'away'))
+        
+        aggregates = [
+            aggregate for aggregate in (
+                decayed_stats_service.aggregate(league, team, venue, stat) for team, venue in teams
+            )
+            if aggregate is not None and reference_day - aggregate.last_day <= max_age_days
+            and aggregate.mean(aggregate.medium_half_life) is not None
+        ]
+        if not aggregates:
+            return None
+        return DecayedAggregate.combined(aggregates, reference_day)
+    
+    @uses_match_context
     def simple_poisson_model(self, home_team: str, away_team: str, league: League, 
                            prediction_type: str = 'shots_total') -> Dict:
         """
@@ -430,36 +443,12 @@ class SimplePredictionService:
             # Intentar estimar NB a partir de la varianza reciente del equipo (si hay datos)
             # Usamos ventana de 10 partidos recientes para estimar varianza
             recent_window = 10
-            if 'shots' in prediction_type:
-                if prediction_type in ['shots_home', 'shots_on_target_home']:
-                    recent_vals = [m.hst if 'on_target' in prediction_type else m.hs for m in 
-                                   Match.objects.filter(league=league, home_team=home_team).order_by('-date')[:recent_window] if (m.hst if 'on_target' in prediction_type else m.hs) is not None]
-                elif prediction_type in ['shots_away', 'shots_on_target_away']:
-                    recent_vals = [m.ast if 'on_target' in prediction_type else m.as_field for m in 
-                                   Match.objects.filter(league=league, away_team=away_team).order_by('-date')[:recent_window] if (m.ast if 'on_target' in prediction_type else m.as_field) is not None]
-                else:
-                    home_vals = [m.hst if 'on_target' in prediction_type else m.hs for m in 
-                                 Match.objects.filter(league=league, home_team=home_team).order_by('-date')[:recent_window] if (m.hst if 'on_target' in prediction_type else m.hs) is not None]
-                    away_vals = [m.ast if 'on_target' in prediction_type else m.as_field for m in 
-                                 Match.objects.filter(league=league, away_team=away_team).order_by('-date')[:recent_window] if (m.ast if 'on_target' in prediction_type else m.as_field) is not None]
-                    recent_vals = home_vals + away_vals
-            elif 'corners' in prediction_type:
-                if prediction_type == 'corners_home':
-                    recent_vals = [m.hc for m in Match.objects.filter(league=league, home_team=home_team).order_by('-date')[:recent_window] if m.hc is not None]
-                elif prediction_type == 'corners_away':
-                    recent_vals = [m.ac for m in Match.objects.filter(league=league, away_team=away_team).order_by('-date')[:recent_window] if m.ac is not None]
-                else:
-                    recent_vals = (
-                        [m.hc for m in Match.objects.filter(league=league, home_team=home_team)
-                         .order_by('-date')[:recent_window] if m.hc is not None]
-                        +
-                        [m.ac for m in Match.objects.filter(league=league, away_team=away_team)
-                         .order_by('-date')[:recent_window] if m.ac is not None]
-                    )
+            if 'shots' in prediction_type or 'corners' in prediction_type:
+                recent_vals = self._recent_values(home_team, away_team, league, prediction_type, recent_window)
             else:
                 recent_vals = []
 
-            var_est = np.var(recent_vals) if recent_vals else None
+            var_est = np.var(recent_vals) if len(recent_vals) else None
             nb_params = _estimate_nb_params(lambda_combined, var_est) if var_est is not None else None
 
             prediction = float(lambda_combined)
@@ -497,6 +486,7 @@ class SimplePredictionService:
             default_prediction = 3.0 if 'goals' in prediction_type else 15.0
             return self._fallback_prediction('Dixon-Coles Poisson', default_prediction, 0.5, prediction_type)
     
+    @uses_match_context
     def simple_average_model(self, home_team: str, away_team: str, league: League, 
                            prediction_type: str = 'shots_total') -> Dict:
         """Modelo de promedio simple con ajustes contextuales"""
@@ -592,151 +582,26 @@ class SimplePredictionService:
             default_prediction = 3.0 if 'goals' in prediction_type else 15.0
             return self._fallback_prediction('Simple Average', default_prediction, 0.5, prediction_type)
     
+    @uses_match_context
     def simple_trend_model(self, home_team: str, away_team: str, league: League, 
                           prediction_type: str = 'shots_total') -> Dict:
-        """Modelo basado en tendencias recientes"""
+        """
+        Modelo basado en tendencias recientes: forma con decaimiento exponencial
+        (decayed_stats.py) del local en casa y/o del visitante fuera, media con la
+        vida media intermedia ajustada por la de la vida media corta.
+        """
         try:
-            # Obtener datos más recientes (últimos 3 meses)
-            cutoff_date = timezone.now().date() - timedelta(days=90)
-            
-            if 'shots' in prediction_type:
-                if prediction_type == 'shots_home':
-                    matches = Match.objects.filter(
-                        league=league,
-                        home_team=home_team,
-                        date__gte=cutoff_date
-                    ).order_by('-date')[:10]
-                    recent_data = [m.hs for m in matches if m.hs is not None]
-                elif prediction_type == 'shots_away':
-                    matches = Match.objects.filter(
-                        league=league,
-                        away_team=away_team,
-                        date__gte=cutoff_date
-                    ).order_by('-date')[:10]
-                    recent_data = [m.as_field for m in matches if m.as_field is not None]
-                elif prediction_type == 'shots_on_target_home':
-                    matches = Match.objects.filter(
-                        league=league,
-                        home_team=home_team,
-                        date__gte=cutoff_date
-                    ).order_by('-date')[:10]
-                    recent_data = [m.hst for m in matches if m.hst is not None]
-                elif prediction_type == 'shots_on_target_away':
-                    matches = Match.objects.filter(
-                        league=league,
-                        away_team=away_team,
-                        date__gte=cutoff_date
-                    ).order_by('-date')[:10]
-                    recent_data = [m.ast for m in matches if m.ast is not None]
-                elif prediction_type == 'shots_on_target_total':
-                    home_matches = Match.objects.filter(
-                        league=league,
-                        home_team=home_team,
-                        date__gte=cutoff_date
-                    ).order_by('-date')[:5]
-                    away_matches = Match.objects.filter(
-                        league=league,
-                        away_team=away_team,
-                        date__gte=cutoff_date
-                    ).order_by('-date')[:5]
-                    recent_data = ([m.hst for m in home_matches if m.hst is not None] + 
-                                 [m.ast for m in away_matches if m.ast is not None])
-                else:  # shots_total
-                    home_matches = Match.objects.filter(
-                        league=league,
-                        home_team=home_team,
-                        date__gte=cutoff_date
-                    ).order_by('-date')[:5]
-                    away_matches = Match.objects.filter(
-                        league=league,
-                        away_team=away_team,
-                        date__gte=cutoff_date
-                    ).order_by('-date')[:5]
-                    recent_data = ([m.hs for m in home_matches if m.hs is not None] + 
-                                 [m.as_field for m in away_matches if m.as_field is not None])
-            elif 'corners' in prediction_type:
-                if prediction_type == 'corners_home':
-                    matches = Match.objects.filter(
-                        league=league,
-                        home_team=home_team,
-                        date__gte=cutoff_date
-                    ).order_by('-date')[:10]
-                    recent_data = [m.hc for m in matches if m.hc is not None]
-                elif prediction_type == 'corners_away':
-                    matches = Match.objects.filter(
-                        league=league,
-                        away_team=away_team,
-                        date__gte=cutoff_date
-                    ).order_by('-date')[:10]
-                    recent_data = [m.ac for m in matches if m.ac is not None]
-                else:  # corners_total
-                    home_matches = Match.objects.filter(
-                        league=league,
-                        home_team=home_team,
-                        date__gte=cutoff_date
-                    ).order_by('-date')[:5]
-                    away_matches = Match.objects.filter(
-                        league=league,
-                        away_team=away_team,
-                        date__gte=cutoff_date
-                    ).order_by('-date')[:5]
-                    recent_data = ([m.hc for m in home_matches if m.hc is not None] + 
-                                 [m.ac for m in away_matches if m.ac is not None])
-            elif 'both_teams_score' in prediction_type:
-                # Para ambos marcan, usamos datos históricos de goles
-                home_matches = Match.objects.filter(
-                    league=league,
-                    home_team=home_team,
-                    date__gte=cutoff_date
-                ).order_by('-date')[:5]
-                away_matches = Match.objects.filter(
-                    league=league,
-                    away_team=away_team,
-                    date__gte=cutoff_date
-                ).order_by('-date')[:5]
-                recent_data = ([m.fthg for m in home_matches if m.fthg is not None] + 
-                             [m.ftag for m in away_matches if m.ftag is not None])
-            else:  # goals
-                if prediction_type == 'goals_home':
-                    matches = Match.objects.filter(
-                        league=league,
-                        home_team=home_team,
-                        date__gte=cutoff_date
-                    ).order_by('-date')[:10]
-                    recent_data = [m.fthg for m in matches if m.fthg is not None]
-                elif prediction_type == 'goals_away':
-                    matches = Match.objects.filter(
-                        league=league,
-                        away_team=away_team,
-                        date__gte=cutoff_date
-                    ).order_by('-date')[:10]
-                    recent_data = [m.ftag for m in matches if m.ftag is not None]
-                else:  # goals_total
-                    home_matches = Match.objects.filter(
-                        league=league,
-                        home_team=home_team,
-                        date__gte=cutoff_date
-                    ).order_by('-date')[:5]
-                    away_matches = Match.objects.filter(
-                        league=league,
-                        away_team=away_team,
-                        date__gte=cutoff_date
-                    ).order_by('-date')[:5]
-                    recent_data = ([m.fthg for m in home_matches if m.fthg is not None] + 
-                                 [m.ftag for m in away_matches if m.ftag is not None])
-            
-            if not recent_data:
+            form = self._decayed_form(home_team, away_team, league, prediction_type)
+            
+            if form is None:
                 return self._fallback_prediction('Simple Trend', 3.0 if 'goals' in prediction_type else 15.0, 0.3, prediction_type)
             
-            # Calcular tendencia
-            if len(recent_data) >= 3:
-                # Tendencia de los últimos 3 vs anteriores 3
-                recent_3 = recent_data[:3]
-                previous_3 = recent_data[3:6] if len(recent_data) >= 6 else recent_data[3:]
-                
-                recent_avg = np.mean(recent_3)
-                previous_avg = np.mean(previous_3) if previous_3 else recent_avg
-                
+            # Tendencia: forma reciente (vida media corta) frente a la intermedia
+            recent_avg = form.mean(form.short_half_life)
+            previous_avg = form.mean(form.medium_half_life)
+            effective_matches = form.effective_matches(form.medium_half_life)
+            
+            if effective_matches >= 3:
                 # Factor de tendencia
                 trend_factor = 1 + (recent_avg - previous_avg) / max(previous_avg, 0.1)
                 trend_factor = max(0.7, min(1.3, trend_factor))  # Limitar el factor
@@ -744,7 +609,7 @@ class SimplePredictionService:
                 trend_factor = 1.0
             
             # Predicción basada en tendencia
-            base_prediction = np.mean(recent_data)
+            base_prediction = previous_avg
             prediction = base_prediction * trend_factor
             
             # Ajuste por tipo de predicción
@@ -786,9 +651,9 @@ class SimplePredictionService:
                     prob = max(0, min(1, 1 - (threshold / prediction) if prediction > 0 else 0.5))
                     probabilities[f'over_{threshold}'] = prob
             
-            # Confianza basada en cantidad de datos y consistencia
-            data_confidence = min(0.7, max(0.2, len(recent_data) / 15))
-            consistency = 1 / (np.std(recent_data) + 0.1) if len(recent_data) > 1 else 0.5
+            # Confianza basada en cantidad de datos (partidos efectivos) y consistencia
+            data_confidence = min(0.7, max(0.2, effective_matches / 15))
+            consistency = 1 / (form.std(form.medium_half_life) + 0.1) if effective_matches > 1 else 0.5
             confidence = (data_confidence + consistency) / 2
             
             return {
@@ -796,13 +661,14 @@ class SimplePredictionService:
                 'prediction': prediction,
                 'confidence': confidence,
                 'probabilities': probabilities,
-                'total_matches': len(recent_data)
+                'total_matches': form.matches_count
             }
             
         except Exception as e:
             logger.error(f"Error en modelo de tendencia simple: {e}")
             return self._fallback_prediction('Simple Trend', 3.0 if 'goals' in prediction_type else 15.0, 0.3, prediction_type)
     
+    @uses_match_context
     def ensemble_average_model(self, home_team: str, away_team: str, league: League, 
                              prediction_type: str = 'shots_total') -> Dict:
         """Modelo ensemble que promedia los otros 2 modelos (Dixon-Coles + Average)"""
@@ -864,6 +730,7 @@ class SimplePredictionService:
             default_prediction = 3.0 if 'goals' in prediction_type else 15.0
             return self._fallback_prediction('Ensemble Average', default_prediction, 0.6, prediction_type)
 
+    @uses_match_context
     def get_all_simple_predictions(self, home_team: str, away_team: str, league: League, 
                                  prediction_type: str = 'shots_total') -> List[Dict]:
         """Obtiene predicciones de todos los modelos simples incluyendo Dixon-Coles"""
@@ -954,7 +821,8 @@ class SimplePredictionService:
             'prediction': prediction,
             'confidence': confidence,
             'probabilities': probabilities,
-            'total_matches': 0
+            'total_matches': 0,
+            'fallback': True
         }
 
 
@@ -964,45 +832,38 @@ class PoissonCornersModel:
     def __init__(self):
         self.name = "Poisson Corners Model"
     
+    @uses_match_context
     def predict(self, home_team: str, away_team: str, league: League, prediction_type: str = 'corners_total') -> float:
         """Predicción específica para corners usando distribución de Poisson"""
         try:
             from scipy.stats import poisson
             
             # Obtener estadísticas específicas para corners
-            cutoff_date = timezone.now().date() - timedelta(days=180)
+            history = current_team_history()
+            cutoff_date = history.reference_date() - timedelta(days=180)
             
-            # Estadísticas del equipo local
-            home_matches = Match.objects.filter(
-                league=league,
-                home_team=home_team,
-                date__gte=cutoff_date
-            ).order_by('-date')[:20]
             
-            home_corners_data = [m.hc for m in home_matches if m.hc is not None]
-            home_avg_corners = np.mean(home_corners_data) if home_corners_data else 5.2
+            # Estadísticas del equipo local
+            home_corners_data = drop_missing(history.team(
+                league, home_team, 'home', window=20, since=cutoff_date, stats=('corners_for',)
+            )['corners_for'])
+            home_avg_corners = np.mean(home_corners_data) if len(home_corners_data) else 5.2
             
             # Estadísticas del equipo visitante
-            away_matches = Match.objects.filter(
-                league=league,
-                away_team=away_team,
-                date__gte=cutoff_date
-            ).order_by('-date')[:20]
-            
-            away_corners_data = [m.ac for m in away_matches if m.ac is not None]
-            away_avg_corners = np.mean(away_corners_data) if away_corners_data else 4.6
+            away_corners_data = drop_missing(history.team(
+                league, away_team, 'away', window=20, since=cutoff_date, stats=('corners_for',)
+            )['corners_for'])
+            away_avg_corners = np.mean(away_corners_data) if len(away_corners_data) else 4.6
             
             # Estadísticas de la liga
-            league_matches = Match.objects.filter(
-                league=league,
-                date__gte=cutoff_date
-            ).order_by('-date')[:100]
-            
-            league_home_corners = [m.hc for m in league_matches if m.hc is not None]
-            league_away_corners = [m.ac for m in league_matches if m.ac is not None]
+            league_corners = history.league(
+                league, window=100, since=cutoff_date, stats=('corners_for', 'corners_against')
+            )
+            league_home_corners = drop_missing(league_corners['corners_for'])
+            league_away_corners = drop_missing(league_corners['corners_against'])
             
-            league_avg_home_corners = np.mean(league_home_corners) if league_home_corners else 5.2
-            league_avg_away_corners = np.mean(league_away_corners) if league_away_corners else 4.6
+            league_avg_home_corners = np.mean(league_home_corners) if len(league_home_corners) else 5.2
+            league_avg_away_corners = np.mean(league_away_corners) if len(league_away_corners) else 4.6
             
             if prediction_type == 'corners_total':
                 # CORRECCIÓN: Calcular lambda correctamente con ajuste de liga
@@ -1048,6 +909,7 @@ class ModeloHibridoCorners:
         self.modelo_average = None  # Se inicializará con SimplePredictionService
         self.name = "Modelo Híbrido Corners"
         
+    @uses_match_context
     def predecir(self, home_team: str, away_team: str, league: League, prediction_type: str = 'corners_total') -> Dict:
         """Predicción híbrida combinando múltiples modelos"""
         try:
@@ -1110,7 +972,8 @@ class ModeloHibridoCorners:
                 'prediction': 5.0,
                 'confidence': 0.5,
                 'probabilities': {},
-                'total_matches': 0
+                'total_matches': 0,
+                'fallback': True
             }
 
 
@@ -1122,6 +985,7 @@ class ModeloHibridoGeneral:
         self.modelo_average = SimplePredictionService()
         self.name = "Modelo Híbrido General"
         
+    @uses_match_context
     def predecir(self, home_team: str, away_team: str, league: League, prediction_type: str = 'shots_total') -> Dict:
         """Predicción híbrida general para cualquier tipo de predicción"""
         # AISLAR MERCADOS DE REMATES - NO GENERAR PREDICCIONES PARA SHOTS
@@ -1186,5 +1050,6 @@ class ModeloHibridoGeneral:
                 'prediction': 5.0,
                 'confidence': 0.5,
                 'probabilities': {},
-                'total_matches': 0
+                'total_matches': 0,
+                'fallback': True
             }
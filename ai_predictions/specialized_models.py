@@ -7,15 +7,14 @@ import logging
 from typing import Dict, List, Tuple
 from datetime import timedelta
 from django.utils import timezone
-from django.db import models
 from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor
 from sklearn.linear_model import Ridge, ElasticNet
 from sklearn.svm import SVR
 from sklearn.preprocessing import StandardScaler
 from sklearn.model_selection import TimeSeriesSplit
 from sklearn.metrics import mean_absolute_error, r2_score
-from football_data.models import Match, League
-from .advanced_features import AdvancedFeatureExtractor
+from football_data.models import League
+from .feature_builder import feature_builders
 
 logger = logging.getLogger('ai_predictions')
 
@@ -25,7 +24,6 @@ class SpecializedPredictionModels:
     
     def __init__(self):
         self.scaler = StandardScaler()
-        self.feature_extractor = AdvancedFeatureExtractor()
         self.trained_models = {}
     
     def get_specialized_model_config(self, prediction_type: str) -> Dict:
@@ -108,52 +106,15 @@ class SpecializedPredictionModels:
         return configs.get(prediction_type, configs['goals_total'])
     
     def prepare_training_data(self, league: League, prediction_type: str) -> Tuple[np.ndarray, np.ndarray]:
-        """Prepara datos de entrenamiento con características avanzadas"""
+        """Prepara datos de entrenamiento con la forma previa de cada partido (orden cronológico)"""
         try:
-            # Obtener partidos históricos
-            matches = Match.objects.filter(league=league).exclude(
-                models.Q(fthg__isnull=True) | models.Q(ftag__isnull=True) |
-                models.Q(hs__isnull=True) | models.Q(as_field__isnull=True)
-            ).order_by('date')
+            X, y, _ = feature_builders.get(league).training_set(prediction_type)
             
-            if len(matches) < 50:
-                logger.warning(f"Datos insuficientes para entrenamiento especializado: {len(matches)} partidos")
+            if len(X) < 50:
+                logger.warning(f"Datos insuficientes para entrenamiento especializado: {len(X)} partidos")
                 return np.array([]), np.array([])
             
-            X = []
-            y = []
-            
-            for match in matches:
-                try:
-                    # Obtener características avanzadas
-                    features = self.feature_extractor.prepare_advanced_features(
-                        match.home_team, match.away_team, league, prediction_type
-                    )
-                    
-                    # Variable objetivo según tipo
-                    if prediction_type == 'goals_total':
-                        target = (match.fthg or 0) + (match.ftag or 0)
-                    elif prediction_type == 'goals_home':
-                        target = match.fthg or 0
-                    elif prediction_type == 'goals_away':
-                        target = match.ftag or 0
-                    elif prediction_type == 'shots_total':
-                        target = (match.hs or 0) + (match.as_field or 0)
-                    elif prediction_type == 'shots_home':
-                        target = match.hs or 0
-                    elif prediction_type == 'shots_away':
-                        target = match.as_field or 0
-                    else:
-                        target = (match.fthg or 0) + (match.ftag or 0)
-                    
-                    X.append(features)
-                    y.append(target)
-                    
-                except Exception as e:
-                    logger.error(f"Error procesando partido {match.id}: {e}")
-                    continue
-            
-            return np.array(X), np.array(y)
+            return X, y
             
         except Exception as e:
             logger.error(f"Error preparando datos de entrenamiento especializado: {e}")
@@ -260,13 +221,11 @@ class SpecializedPredictionModels:
                 if 'error' in train_result:
                     return self._fallback_prediction(prediction_type, train_result['error'])
             
-            # Obtener características avanzadas
-            features = self.feature_extractor.prepare_advanced_features(
-                home_team, away_team, league, prediction_type
-            )
+            # Características con el mismo cálculo que el entrenamiento
+            features = feature_builders.get(league).fixture_features(home_team, away_team)
             
             # Normalizar y predecir
-            X_scaled = self.trained_models[model_key]['scaler'].transform([features])
+            X_scaled = self.trained_models[model_key]['scaler'].transform(features)
             prediction = self.trained_models[model_key]['model'].predict(X_scaled)[0]
             
             # Aplicar límites realistas según configuración
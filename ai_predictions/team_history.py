@@ -0,0 +1,298 @@
+"""
+Historial de equipos proyectado por columnas y devuelto como arrays de NumPy
+
+Los modelos sólo necesitan una o dos estadísticas por partido, así que en lugar
+de instanciar objetos Match completos se hace una única consulta values_list
+con las columnas pedidas y se devuelven arrays float64 contiguos (NaN cuando el
+dato falta), ordenados del partido más reciente al más antiguo. El historial de
+un equipo se lee de la tabla estrecha TeamMatchRecord (índice liga, equipo,
+fecha); los enfrentamientos directos y la liga, de Match.
+
+Las estadísticas se nombran desde el punto de vista del equipo, igual que en
+TeamMatchRecord: 'goals_for', 'goals_against', 'shots_for', ...
+
+Con as_of todas las lecturas se limitan a los partidos anteriores a esa fecha
+(date < as_of) y las ventanas temporales de los modelos se cuentan desde ella,
+de modo que una predicción para (partido, as_of) es reproducible.
+"""
+
+import contextvars
+import logging
+from contextlib import contextmanager
+from datetime import date
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+import numpy as np
+from django.db.models import Q
+from django.utils import timezone
+
+from football_data.models import League, Match, TeamMatchRecord
+
+logger = logging.getLogger('ai_predictions')
+
+# Columnas de Match (local, visitante) de cada estadística
+STAT_COLUMNS = {
+    'goals': ('fthg', 'ftag'),
+    'half_time_goals': ('hthg', 'htag'),
+    'shots': ('hs', 'as_field'),
+    'shots_on_target': ('hst', 'ast'),
+    'corners': ('hc', 'ac'),
+    'fouls': ('hf', 'af'),
+    'yellow_cards': ('hy', 'ay'),
+    'red_cards': ('hr', 'ar'),
+}
+
+VENUES = ('home', 'away', None)
+
+# Orden del historial: del partido más reciente al más antiguo (pk para desempatar)
+HISTORY_ORDERING = ('-date', '-pk')
+RECORD_ORDERING = ('-date', '-match_id')
+
+# Sede de TeamHistory -> venue de TeamMatchRecord
+RECORD_VENUES = {'home': 'H', 'away': 'A', None: None}
+
+
+def drop_missing(values: np.ndarray) -> np.ndarray:
+    """Elimina los NaN (partidos sin el dato) de un array de historial"""
+    return values[~np.isnan(values)]
+
+
+def _split_stat(stat: str) -> Tuple[str, str]:
+    """Separa 'shots_for' en ('shots', 'for') validando el nombre"""
+    base, _, side = stat.rpartition('_')
+    if base not in STAT_COLUMNS or side not in ('for', 'against'):
+        raise ValueError(f"Estadística desconocida: {stat}")
+    return base, side
+
+
+def _stat_column(stat: str, venue: str) -> str:
+    """Columna de Match que contiene la estadística para un equipo en la sede dada"""
+    base, side = _split_stat(stat)
+    home_column, away_column = STAT_COLUMNS[base]
+    own_column = home_column if venue == 'home' else away_column
+    rival_column = away_column if venue == 'home' else home_column
+    return own_column if side == 'for' else rival_column
+
+
+class TeamHistory:
+    """
+    Acceso al historial de equipos y ligas con memo por petición.
+
+    Cada combinación (liga, equipo, sede, ventana, fecha de corte, estadísticas)
+    se consulta una sola vez; las llamadas repetidas devuelven los mismos arrays
+    (de sólo lectura).
+
+    Args:
+        as_of: Fecha de corte; sólo se leen partidos anteriores (None = todo el historial)
+    """
+
+    def __init__(self, as_of: Optional[date] = None):
+        self._memo = {}
+        self.queries = 0
+        self.as_of = as_of
+
+    def reference_date(self) -> date:
+        """Fecha desde la que se cuentan las ventanas de los modelos (as_of u hoy)"""
+        return self.as_of if self.as_of is not None else timezone.now().date()
+
+    def bounded(self, queryset):
+        """Limita una consulta de Match a los partidos anteriores a as_of"""
+        return queryset if self.as_of is None else queryset.filter(date__lt=self.as_of)
+
+    def memoized(self, key: Tuple, compute: Callable[[], object]):
+        """Valor calculado una sola vez por historial (p. ej. estadísticas de liga en fecha)"""
+        if key not in self._memo:
+            self._memo[key] = compute()
+        return self._memo[key]
+
+    def team(self, league: League, team: str, venue: Optional[str] = None,
+             window: Optional[int] = None, stats: Iterable[str] = ('goals_for', 'goals_against'),
+             since=None, required: Iterable[str] = ()) -> Dict[str, np.ndarray]:
+        """
+        Historial reciente de un equipo.
+
+        Args:
+            league: Liga
+            team: Nombre del equipo
+            venue: 'home', 'away' o None para todos sus partidos
+            window: Número máximo de partidos (None = sin límite)
+            stats: Estadísticas a devolver ('goals_for', 'corners_against', ...)
+            since: Fecha mínima de los partidos
+            required: Estadísticas que deben existir para incluir el partido
+
+        Returns:
+            Diccionario estadística -> array float64, del más reciente al más antiguo
+        """
+        if venue not in VENUES:
+            raise ValueError(f"Sede desconocida: {venue}")
+        stats, required = tuple(stats), tuple(required)
+        key = ('team', league.pk, team, venue, window, since, stats, required)
+        if key in self._memo:
+            return self._memo[key]
+
+        result = self._load_team(league, team, venue, window, stats, since, required)
+        self._memo[key] = result
+        return result
+
+    def head_to_head(self, league: League, home_team: str, away_team: str,
+                     window: Optional[int] = None, stats: Iterable[str] = ('goals_for', 'goals_against'),
+                     required: Iterable[str] = ()) -> Dict[str, np.ndarray]:
+        """
+        Enfrentamientos directos en cualquier sede, vistos desde home_team
+        ('goals_for' son los goles de home_team en cada partido).
+        """
+        stats, required = tuple(stats), tuple(required)
+        key = ('h2h', league.pk, home_team, away_team, window, stats, required)
+        if key in self._memo:
+            return self._memo[key]
+
+        result = self._load_head_to_head(league, home_team, away_team, window, stats, required)
+        self._memo[key] = result
+        return result
+
+    def league(self, league: League, window: Optional[int] = None,
+               stats: Iterable[str] = ('goals_for', 'goals_against'),
+               since=None, required: Iterable[str] = ()) -> Dict[str, np.ndarray]:
+        """
+        Partidos recientes de la liga vistos desde el equipo local
+        ('goals_for' = goles del local, 'goals_against' = goles del visitante).
+        """
+        stats, required = tuple(stats), tuple(required)
+        key = ('league', league.pk, window, since, stats, required)
+        if key in self._memo:
+            return self._memo[key]
+
+        result = self._load_league(league, window, stats, since, required)
+        self._memo[key] = result
+        return result
+
+    def _load_team(self, league, team, venue, window, stats, since, required):
+        """Consulta el historial de un equipo en TeamMatchRecord (ya orientado al equipo)"""
+        for stat in stats:
+            _split_stat(stat)
+        queryset = TeamMatchRecord.objects.for_team(league, team, venue=RECORD_VENUES[venue], before=self.as_of)
+        if since is not None:
+            queryset = queryset.filter(date__gte=since)
+
+        # En cualquier sede un partido cuenta si el dato existe para los dos equipos (como en Match)
+        filters = {}
+        for stat in required:
+            base, _ = _split_stat(stat)
+            fields = (stat,) if venue is not None else (f'{base}_for', f'{base}_against')
+            filters.update({f'{field}__isnull': False for field in fields})
+        queryset = queryset.filter(**filters)
+        return dict(zip(stats, self._fetch_columns(queryset, stats, window, RECORD_ORDERING)))
+
+    def _load_head_to_head(self, league, home_team, away_team, window, stats, required):
+        """Consulta los enfrentamientos directos"""
+        queryset = Match.objects.filter(
+            Q(home_team=home_team, away_team=away_team) |
+            Q(home_team=away_team, away_team=home_team),
+            league=league
+        )
+        queryset = self.bounded(queryset)
+        return self._fetch_oriented(queryset, home_team, stats, required, window)
+
+    def _load_league(self, league, window, stats, since, required):
+        """Consulta los partidos de la liga"""
+        queryset = self.bounded(Match.objects.filter(league=league))
+        if since is not None:
+            queryset = queryset.filter(date__gte=since)
+        queryset = self._require(queryset, required, venues=('home',))
+        columns = [_stat_column(stat, 'home') for stat in stats]
+        return dict(zip(stats, self._fetch_columns(queryset, columns, window)))
+
+    def _require(self, queryset, required, venues):
+        """Filtra los partidos a los que les falta alguna estadística obligatoria"""
+        filters = {
+            f'{_stat_column(stat, venue)}__isnull': False
+            for stat in required for venue in venues
+        }
+        return queryset.filter(**filters) if filters else queryset
+
+    def _fetch_columns(self, queryset, columns, window, ordering=HISTORY_ORDERING):
+        """Una consulta values_list y un array contiguo por columna"""
+        if not columns:
+            return []
+        queryset = queryset.order_by(*ordering)
+        if window is not None:
+            queryset = queryset[:window]
+        rows = list(queryset.values_list(*columns))
+        self.queries += 1
+
+        matrix = np.array(rows, dtype=np.float64).reshape(len(rows), len(columns))
+        arrays = []
+        for index in range(len(columns)):
+            values = np.ascontiguousarray(matrix[:, index])
+            values.flags.writeable = False
+            arrays.append(values)
+        return arrays
+
+    def _fetch_oriented(self, queryset, team, stats, required, window):
+        """
+        Historial en cualquier sede: se leen las columnas de local y visitante y
+        se elige la del lado de `team` en cada partido.
+        """
+        # Un partido cuenta si el dato existe en ambas columnas (no se sabe de antemano la sede)
+        queryset = self._require(queryset, required, venues=('home', 'away'))
+        home_columns = [_stat_column(stat, 'home') for stat in stats]
+        away_columns = [_stat_column(stat, 'away') for stat in stats]
+
+        queryset = queryset.order_by(*HISTORY_ORDERING)
+        if window is not None:
+            queryset = queryset[:window]
+        rows = list(queryset.values_list('home_team', *home_columns, *away_columns))
+        self.queries += 1
+
+        is_home = np.array([row[0] == team for row in rows], dtype=bool)
+        matrix = np.array([row[1:] for row in rows], dtype=np.float64).reshape(len(rows), 2 * len(stats))
+        result = {}
+        for index, stat in enumerate(stats):
+            values = np.ascontiguousarray(
+                np.where(is_home, matrix[:, index], matrix[:, len(stats) + index])
+            )
+            values.flags.writeable = False
+            result[stat] = values
+        return result
+
+
+_current_history = contextvars.ContextVar('team_history', default=None)
+
+
+def current_team_history() -> TeamHistory:
+    """
+    Historial activo de la petición en curso. Fuera de team_history_scope()
+    se devuelve uno nuevo, sin memo compartido.
+    """
+    history = _current_history.get()
+    return history if history is not None else TeamHistory()
+
+
+@contextmanager
+def use_team_history(history: TeamHistory):
+    """Hace que `history` sea el historial activo durante el bloque"""
+    token = _current_history.set(history)
+    try:
+        yield history
+    finally:
+        _current_history.reset(token)
+
+
+@contextmanager
+def team_history_scope(as_of: Optional[date] = None):
+    """
+    Abre un memo de historial para la petición en curso. Puede usarse como
+    context manager o como decorador de la función que genera las predicciones.
+    Con as_of las lecturas del bloque se limitan a los partidos anteriores.
+    """
+    history = _current_history.get()
+    if history is not None and history.as_of == as_of:
+        # Ámbito anidado con la misma fecha de corte: reutilizar el memo existente
+        yield history
+        return
+    history = TeamHistory(as_of)
+    try:
+        with use_team_history(history):
+            yield history
+    finally:
+        logger.debug(f"Historial de equipos: {history.queries} consultas en la petición")
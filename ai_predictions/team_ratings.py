@@ -0,0 +1,301 @@
+"""
+Ratings online de equipos (ataque y defensa por sede, al estilo de los pi-ratings)
+
+Para cada liga, equipo y estadística (goles, remates y corners) se mantienen
+ratings de ataque y defensa como local y como visitante en escala logarítmica
+(0 = media de la liga):
+
+    λ_local     = media_local     · exp(ataque_local[local] − defensa_visitante[visitante])
+    λ_visitante = media_visitante · exp(ataque_visitante[visitante] − defensa_local[local])
+
+Cada partido, en orden cronológico, actualiza en O(1) los ratings de sus dos
+equipos con el error relativo (observado − λ) / λ, que es el paso de gradiente
+natural de la verosimilitud de Poisson. La sede contraria aprende una fracción
+CROSS_RATE del mismo error, como en los pi-ratings (Constantinou y Fenton, 2013).
+Las medias de la liga se siguen con una media móvil exponencial.
+
+El estado actual se guarda en TeamRating (una fila por equipo, que la predicción
+lee por clave única) y, tras cada fecha en la que juega el equipo, en
+TeamRatingHistory para las consultas en fecha (as_of). Tras una importación sólo
+se procesan los partidos posteriores a la marca de agua de la liga
+(TeamRatingState); si cambió o se borró algún partido ya procesado se
+reconstruye todo en una sola pasada.
+"""
+
+import copy
+import logging
+import math
+import time
+from datetime import date
+from typing import Dict, Iterable, Optional, Tuple
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+
+from football_data.models import League, Match
+from .match_stream import STREAM_CHUNK_SIZE, advance, pending_matches, prefix_unchanged, stream_rows
+from .models import TeamRating, TeamRatingHistory, TeamRatingState
+from .league_stats import DEFAULT_LEAGUE_MEANS
+from .team_history import STAT_COLUMNS, current_team_history
+
+logger = logging.getLogger('ai_predictions')
+
+RATING_STATS = ('goals', 'shots', 'corners')
+RATING_KEYS = ('attack_home', 'attack_away', 'defence_home', 'defence_away')
+
+# Columnas (local, visitante) de cada estadística, en el orden de RATING_STATS
+RATING_COLUMNS = tuple(column for stat in RATING_STATS for column in STAT_COLUMNS[stat])
+
+# Tasa de la media móvil de las medias de la liga (≈ últimos 50 partidos)
+MEAN_RATE = 0.02
+
+# Límites del error relativo de un partido y de los ratings (escala logarítmica)
+ERROR_BOUND = 2.0
+RATING_BOUND = 1.5
+
+# Partidos mínimos de cada equipo para usar sus ratings en la predicción
+MIN_RATED_MATCHES = 5
+
+
+def _new_ratings() -> Dict[str, Dict[str, float]]:
+    return {stat: dict.fromkeys(RATING_KEYS, 0.0) for stat in RATING_STATS}
+
+
+def _clip(value: float, bound: float) -> float:
+    return max(-bound, min(bound, value))
+
+
+class RatingEngine:
+    """
+    Estado en memoria de los ratings de una liga.
+
+    Args:
+        learning_rate: Paso de actualización de los ratings
+        cross_rate: Fracción del error que aprende la sede contraria
+        league_means: Medias iniciales {estadística: [local, visitante]}
+    """
+
+    def __init__(self, learning_rate: float, cross_rate: float, league_means: Optional[Dict] = None):
+        self.learning_rate = learning_rate
+        self.cross_rate = cross_rate
+        self.league_means = league_means or {stat: list(DEFAULT_LEAGUE_MEANS[stat]) for stat in RATING_STATS}
+        # equipo -> {'ratings': {...}, 'matches_count': n, 'last_date': fecha}
+        self.teams: Dict[str, Dict] = {}
+
+    def load_team(self, team: str, ratings: Dict, matches_count: int, last_date: Optional[date]):
+        """Carga el estado guardado de un equipo (actualizaciones incrementales)"""
+        state = _new_ratings()
+        for stat, values in ratings.items():
+            if stat in state:
+                state[stat].update(values)
+        self.teams[team] = {'ratings': state, 'matches_count': matches_count, 'last_date': last_date}
+
+    def team(self, team: str) -> Dict:
+        if team not in self.teams:
+            self.teams[team] = {'ratings': _new_ratings(), 'matches_count': 0, 'last_date': None}
+        return self.teams[team]
+
+    def expected(self, stat: str, home_team: str, away_team: str) -> Tuple[float, float]:
+        """(λ_local, λ_visitante) de un partido con los ratings actuales"""
+        home = self.team(home_team)['ratings'][stat]
+        away = self.team(away_team)['ratings'][stat]
+        return expected_values(self.league_means[stat], home, away)
+
+    def update(self, match_date: date, home_team: str, away_team: str, values: Iterable[Optional[float]]):
+        """
+        Actualiza los ratings con un partido. `values` sigue el orden de
+        RATING_COLUMNS; las estadísticas sin dato no modifican sus ratings.
+        """
+        home_state, away_state = self.team(home_team), self.team(away_team)
+        values = tuple(values)
+        step, cross = self.learning_rate, self.learning_rate * self.cross_rate
+
+        for position, stat in enumerate(RATING_STATS):
+            observed_home, observed_away = values[2 * position], values[2 * position + 1]
+            if observed_home is None or observed_away is None:
+                continue
+            home, away = home_state['ratings'][stat], away_state['ratings'][stat]
+            means = self.league_means[stat]
+            lambda_home, lambda_away = expected_values(means, home, away)
+            error_home = _clip((observed_home - lambda_home) / lambda_home, ERROR_BOUND)
+            error_away = _clip((observed_away - lambda_away) / lambda_away, ERROR_BOUND)
+
+            # Ataque del local y defensa del visitante aprenden el error del local (y al revés)
+            for ratings, key, error in (
+                (home, 'attack', error_home), (away, 'defence', -error_home),
+                (away, 'attack', error_away), (home, 'defence', -error_away),
+            ):
+                venue = 'home' if ratings is home else 'away'
+                other = 'away' if venue == 'home' else 'home'
+                ratings[f'{key}_{venue}'] = _clip(ratings[f'{key}_{venue}'] + step * error, RATING_BOUND)
+                ratings[f'{key}_{other}'] = _clip(ratings[f'{key}_{other}'] + cross * error, RATING_BOUND)
+
+            means[0] += MEAN_RATE * (observed_home - means[0])
+            means[1] += MEAN_RATE * (observed_away - means[1])
+
+        for state in (home_state, away_state):
+            state['matches_count'] += 1
+            state['last_date'] = match_date
+
+
+def expected_values(league_means, home: Dict[str, float], away: Dict[str, float]) -> Tuple[float, float]:
+    """(λ_local, λ_visitante) a partir de las medias de la liga y los ratings de cada equipo"""
+    lambda_home = league_means[0] * math.exp(home['attack_home'] - away['defence_away'])
+    lambda_away = league_means[1] * math.exp(away['attack_away'] - home['defence_home'])
+    return max(lambda_home, 0.05), max(lambda_away, 0.05)
+
+
+class TeamRatingService:
+    """Actualiza (tras cada importación) y sirve los ratings online de los equipos"""
+
+    @property
+    def learning_rate(self) -> float:
+        return getattr(settings, 'TEAM_RATINGS_LEARNING_RATE', 0.02)
+
+    @property
+    def cross_rate(self) -> float:
+        return getattr(settings, 'TEAM_RATINGS_CROSS_RATE', 0.7)
+
+    def update_league(self, league: League) -> Dict:
+        """
+        Procesa los partidos nuevos de la liga en orden cronológico. Si cambió algún
+        partido ya procesado (o no hay estado) reconstruye los ratings desde cero.
+        """
+        state = TeamRatingState.objects.filter(league=league).first()
+        if state is None or not prefix_unchanged(league, state, RATING_COLUMNS):
+            return self.rebuild(league)
+
+        started = time.perf_counter()
+        rows = list(stream_rows(pending_matches(league, state), RATING_COLUMNS))
+        if not rows:
+            return {'mode': 'unchanged', 'matches': 0, 'teams': 0}
+
+        engine = RatingEngine(self.learning_rate, self.cross_rate, copy.deepcopy(state.league_means) or None)
+        teams = {row[2] for row in rows} | {row[3] for row in rows}
+        for rating in TeamRating.objects.filter(league=league, team__in=teams):
+            engine.load_team(rating.team, rating.ratings, rating.matches_count, rating.last_date)
+
+        with transaction.atomic():
+            result = self._stream(league, engine, rows, state)
+        result.update(mode='incremental', seconds=time.perf_counter() - started)
+        logger.info(
+            f"📈 Ratings {league.name}: {result['matches']} partidos nuevos, "
+            f"{result['teams']} equipos actualizados en {result['seconds']:.2f}s"
+        )
+        return result
+
+    def rebuild(self, league: League) -> Dict:
+        """Recalcula todos los ratings de la liga en una sola pasada cronológica (backfill)"""
+        started = time.perf_counter()
+        rows = stream_rows(Match.objects.filter(league=league), RATING_COLUMNS)
+        engine = RatingEngine(self.learning_rate, self.cross_rate)
+        with transaction.atomic():
+            TeamRating.objects.filter(league=league).delete()
+            TeamRatingHistory.objects.filter(league=league).delete()
+            TeamRatingState.objects.filter(league=league).delete()
+            state = TeamRatingState(league=league)
+            result = self._stream(league, engine, rows, state)
+        result.update(mode='rebuild', seconds=time.perf_counter() - started)
+        logger.info(
+            f"📈 Ratings {league.name} reconstruidos: {result['matches']} partidos, "
+            f"{result['teams']} equipos en {result['seconds']:.2f}s"
+        )
+        return result
+
+    def _stream(self, league: League, engine: RatingEngine, rows: Iterable[tuple], state: TeamRatingState) -> Dict:
+        """
+        Aplica los partidos (pk, fecha, local, visitante, valores...) en orden y
+        escribe el historial por lotes, los ratings actuales y la marca de agua.
+        """
+        history: Dict[Tuple[str, date], TeamRatingHistory] = {}
+        touched = set()
+        matches = 0
+
+        for pk, match_date, home_team, away_team, *values in rows:
+            engine.update(match_date, home_team, away_team, values)
+            for team in (home_team, away_team):
+                team_state = engine.teams[team]
+                history[(team, match_date)] = TeamRatingHistory(
+                    league=league, team=team, date=match_date,
+                    ratings=copy.deepcopy(team_state['ratings']),
+                    league_means=copy.deepcopy(engine.league_means),
+                    matches_count=team_state['matches_count'],
+                )
+                touched.add(team)
+            advance(state, pk, match_date, values)
+            matches += 1
+
+            # Las fechas anteriores a la del partido actual ya no cambian
+            if len(history) >= STREAM_CHUNK_SIZE:
+                self._write_history([row for key, row in history.items() if key[1] < match_date])
+                history = {key: row for key, row in history.items() if key[1] >= match_date}
+
+        self._write_history(history.values())
+        TeamRating.objects.bulk_create(
+            [
+                TeamRating(
+                    league=league, team=team, ratings=engine.teams[team]['ratings'],
+                    league_means=engine.league_means, matches_count=engine.teams[team]['matches_count'],
+                    last_date=engine.teams[team]['last_date'],
+                )
+                for team in sorted(touched)
+            ],
+            update_conflicts=True,
+            unique_fields=['league', 'team'],
+            update_fields=['ratings', 'league_means', 'matches_count', 'last_date', 'updated_at'],
+        )
+        state.league_means = engine.league_means
+        state.data_version = league.data_version
+        state.save()
+        league.bump_model_version()
+        return {'matches': matches, 'teams': len(touched)}
+
+    def _write_history(self, rows):
+        rows = list(rows)
+        for start in range(0, len(rows), STREAM_CHUNK_SIZE):
+            TeamRatingHistory.objects.bulk_create(
+                rows[start:start + STREAM_CHUNK_SIZE],
+                update_conflicts=True,
+                unique_fields=['league', 'team', 'date'],
+                update_fields=['ratings', 'league_means', 'matches_count'],
+            )
+
+    def team_rating(self, league: League, team: str) -> Optional[Dict]:
+        """
+        Ratings del equipo (una lectura por clave única, memorizada en el historial
+        activo). Con as_of se usa la última fila del historial anterior a esa fecha.
+        """
+        history = current_team_history()
+        as_of = history.as_of
+
+        def load():
+            if as_of is None:
+                queryset = TeamRating.objects.filter(league=league, team=team).values(
+                    'ratings', 'league_means', 'matches_count', date=F('last_date'),
+                )
+            else:
+                queryset = TeamRatingHistory.objects.filter(league=league, team=team, date__lt=as_of).order_by(
+                    '-date'
+                ).values('ratings', 'league_means', 'matches_count', 'date')
+            return queryset.first()
+
+        return history.memoized(('team_rating', league.pk, team, as_of), load)
+
+    def expected(self, league: League, home_team: str, away_team: str, stat: str) -> Optional[Tuple[float, float]]:
+        """
+        (λ_local, λ_visitante) del partido para la estadística, o None si alguno de
+        los equipos no tiene ratings con al menos MIN_RATED_MATCHES partidos.
+        """
+        if stat not in RATING_STATS:
+            return None
+        home, away = self.team_rating(league, home_team), self.team_rating(league, away_team)
+        if home is None or away is None or min(home['matches_count'], away['matches_count']) < MIN_RATED_MATCHES:
+            return None
+        # Medias de la liga de la fila más reciente de los dos equipos
+        league_means = max((home, away), key=lambda rating: rating['date'] or date.min)['league_means']
+        return expected_values(league_means[stat], home['ratings'][stat], away['ratings'][stat])
+
+
+# Instancia global
+team_rating_service = TeamRatingService()
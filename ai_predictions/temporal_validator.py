@@ -7,11 +7,11 @@ import logging
 from typing import Dict, List, Tuple
 from datetime import timedelta, datetime
 from django.utils import timezone
-from django.db.models import Q
 from sklearn.model_selection import TimeSeriesSplit
 from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
-from football_data.models import Match, League
-from .ensemble_predictor import AdvancedEnsemblePredictor
+from football_data.models import League
+from .validation_runner import FoldTask, ValidationData, validation_runner
+from .walk_forward import PROXY_MODEL, WalkForwardBacktest
 
 logger = logging.getLogger('ai_predictions')
 
@@ -19,27 +19,21 @@ logger = logging.getLogger('ai_predictions')
 class TemporalValidator:
     """Validador temporal para evaluación realista de modelos de predicción"""
     
-    def __init__(self):
-        self.ensemble_predictor = AdvancedEnsemblePredictor()
-    
     def temporal_backtest(self, league: League, prediction_type: str, 
                          test_periods: int = 10, lookback_days: int = 30) -> Dict:
-        """Backtesting temporal realista"""
+        """
+        Backtesting temporal realista (walk-forward en fecha, ver walk_forward.py).
+        Cada período se predice sólo con partidos anteriores y en un único lote.
+        Evalúa el modelo proxy del backtest (ver 'model'), no el ensemble en vivo.
+        """
         try:
-            # Obtener partidos ordenados por fecha
-            matches = Match.objects.filter(league=league).exclude(
-                Q(fthg__isnull=True) | Q(ftag__isnull=True) |
-                Q(hs__isnull=True) | Q(as_field__isnull=True)
-            ).order_by('date')
+            backtest = WalkForwardBacktest(league, prediction_type)
             
-            if len(matches) < 100:
+            if len(backtest) < 100:
                 return {'error': 'Datos insuficientes para backtesting'}
             
-            # Dividir en períodos de tiempo
-            total_matches = len(matches)
-            matches_per_period = max(20, total_matches // (test_periods + 2))
-            
             results = {
+                'model': backtest.model_info(),
                 'mae_scores': [],
                 'rmse_scores': [],
                 'accuracy_scores': [],
@@ -51,85 +45,29 @@ class TemporalValidator:
             }
             
             # Backtesting por períodos
-            for period in range(1, test_periods + 1):
-                try:
-                    # Dividir datos: entrenamiento (hasta el período) vs test (período actual)
-                    train_end_idx = period * matches_per_period
-                    test_start_idx = train_end_idx
-                    test_end_idx = min(test_start_idx + matches_per_period, total_matches)
-                    
-                    if test_end_idx - test_start_idx < 10:  # Mínimo de partidos para test
-                        continue
-                    
-                    # Datos de entrenamiento (históricos)
-                    train_matches = matches[:train_end_idx]
-                    
-                    # Datos de test (futuros)
-                    test_matches = matches[test_start_idx:test_end_idx]
-                    
-                    if len(test_matches) < 5:
-                        continue
-                    
-                    # Hacer predicciones para el período de test
-                    period_predictions = []
-                    period_actuals = []
-                    
-                    for match in test_matches:
-                        try:
-                            # Simular predicción (como si estuviéramos en la fecha del partido)
-                            prediction_result = self.ensemble_predictor.predict_with_ensemble(
-                                match.home_team, match.away_team, league, prediction_type
-                            )
-                            
-                            # Obtener valor real
-                            if prediction_type == 'goals_total':
-                                actual = (match.fthg or 0) + (match.ftag or 0)
-                            elif prediction_type == 'goals_home':
-                                actual = match.fthg or 0
-                            elif prediction_type == 'goals_away':
-                                actual = match.ftag or 0
-                            elif prediction_type == 'shots_total':
-                                actual = (match.hs or 0) + (match.as_field or 0)
-                            elif prediction_type == 'shots_home':
-                                actual = match.hs or 0
-                            elif prediction_type == 'shots_away':
-                                actual = match.as_field or 0
-                            else:
-                                actual = (match.fthg or 0) + (match.ftag or 0)
-                            
-                            period_predictions.append(prediction_result['prediction'])
-                            period_actuals.append(actual)
-                            
-                        except Exception as e:
-                            logger.error(f"Error en predicción de backtest: {e}")
-                            continue
-                    
-                    if len(period_predictions) < 3:
-                        continue
-                    
-                    # Calcular métricas del período
-                    mae = mean_absolute_error(period_actuals, period_predictions)
-                    rmse = np.sqrt(mean_squared_error(period_actuals, period_predictions))
-                    
-                    # Accuracy con tolerancia
-                    tolerance = 0.5 if 'goals' in prediction_type else 2.0
-                    accuracy = np.mean(np.abs(np.array(period_predictions) - np.array(period_actuals)) <= tolerance)
-                    
-                    # R² Score
-                    r2 = r2_score(period_actuals, period_predictions) if len(period_actuals) > 1 else 0
-                    
-                    results['mae_scores'].append(mae)
-                    results['rmse_scores'].append(rmse)
-                    results['accuracy_scores'].append(accuracy)
-                    results['r2_scores'].append(r2)
-                    results['predictions'].extend(period_predictions)
-                    results['actuals'].extend(period_actuals)
-                    results['periods_tested'] += 1
-                    results['total_matches_tested'] += len(period_predictions)
-                    
-                except Exception as e:
-                    logger.error(f"Error en período de backtest {period}: {e}")
-                    continue
+            for period_result in backtest.run(test_periods):
+                period_predictions = period_result['predictions']
+                period_actuals = period_result['actuals']
+                
+                # Calcular métricas del período
+                mae = mean_absolute_error(period_actuals, period_predictions)
+                rmse = np.sqrt(mean_squared_error(period_actuals, period_predictions))
+                
+                # Accuracy con tolerancia
+                tolerance = 0.5 if 'goals' in prediction_type else 2.0
+                accuracy = np.mean(np.abs(period_predictions - period_actuals) <= tolerance)
+                
+                # R² Score
+                r2 = r2_score(period_actuals, period_predictions) if len(period_actuals) > 1 else 0
+                
+                results['mae_scores'].append(mae)
+                results['rmse_scores'].append(rmse)
+                results['accuracy_scores'].append(accuracy)
+                results['r2_scores'].append(r2)
+                results['predictions'].extend(period_predictions.tolist())
+                results['actuals'].extend(period_actuals.tolist())
+                results['periods_tested'] += 1
+                results['total_matches_tested'] += len(period_predictions)
             
             # Calcular métricas agregadas
             if results['periods_tested'] > 0:
@@ -161,77 +99,59 @@ class TemporalValidator:
     
     def rolling_window_validation(self, league: League, prediction_type: str, 
                                 window_size: int = 100, step_size: int = 20) -> Dict:
-        """Validación con ventana deslizante"""
+        """
+        Validación con ventana deslizante: en cada ventana se entrena con el 80%
+        inicial y se evalúa el 20% final. Las ventanas se evalúan en paralelo
+        (validation_runner) con el modelo proxy del backtest walk-forward.
+        """
         try:
-            matches = Match.objects.filter(league=league).exclude(
-                Q(fthg__isnull=True) | Q(ftag__isnull=True) |
-                Q(hs__isnull=True) | Q(as_field__isnull=True)
-            ).order_by('date')
+            data = ValidationData(league, walk_forward_types=(prediction_type,))
+            backtest = data.walk_forward[prediction_type]
+            matches = backtest.rows
             
             if len(matches) < window_size + 50:
                 return {'error': 'Datos insuficientes para validación con ventana deslizante'}
             
             results = {
+                'model': backtest.model_info(),
                 'window_results': [],
                 'overall_metrics': {},
                 'stability_scores': []
             }
             
             # Ventana deslizante
+            tasks = []
             for start_idx in range(0, len(matches) - window_size, step_size):
                 end_idx = start_idx + window_size
-                window_matches = matches[start_idx:end_idx]
                 
                 # Dividir ventana en entrenamiento (80%) y test (20%)
-                split_idx = int(window_size * 0.8)
-                train_matches = window_matches[:split_idx]
-                test_matches = window_matches[split_idx:]
+                split_idx = start_idx + int(window_size * 0.8)
+                test_matches = matches[split_idx:end_idx]
                 
                 if len(test_matches) < 10:
                     continue
                 
-                # Evaluar en ventana de test
-                window_predictions = []
-                window_actuals = []
-                
-                for match in test_matches:
-                    try:
-                        prediction_result = self.ensemble_predictor.predict_with_ensemble(
-                            match.home_team, match.away_team, league, prediction_type
-                        )
-                        
-                        # Valor real
-                        if prediction_type == 'goals_total':
-                            actual = (match.fthg or 0) + (match.ftag or 0)
-                        elif prediction_type == 'goals_home':
-                            actual = match.fthg or 0
-                        elif prediction_type == 'goals_away':
-                            actual = match.ftag or 0
-                        elif prediction_type == 'shots_total':
-                            actual = (match.hs or 0) + (match.as_field or 0)
-                        elif prediction_type == 'shots_home':
-                            actual = match.hs or 0
-                        elif prediction_type == 'shots_away':
-                            actual = match.as_field or 0
-                        else:
-                            actual = (match.fthg or 0) + (match.ftag or 0)
-                        
-                        window_predictions.append(prediction_result['prediction'])
-                        window_actuals.append(actual)
-                        
-                    except Exception as e:
-                        continue
-                
+                tasks.append(FoldTask(
+                    league_id=league.pk,
+                    model_name=PROXY_MODEL,
+                    prediction_type=prediction_type,
+                    target_type=backtest.prediction_type,
+                    fold=len(tasks),
+                    test_rows=test_matches,
+                    history_start=int(matches[start_idx]),
+                ))
+            
+            for task, window_predictions, window_actuals in validation_runner.run([data], tasks):
                 if len(window_predictions) < 5:
                     continue
                 
                 # Métricas de la ventana
                 window_mae = mean_absolute_error(window_actuals, window_predictions)
-                window_accuracy = np.mean(np.abs(np.array(window_predictions) - np.array(window_actuals)) <= 1.0)
+                window_accuracy = np.mean(np.abs(window_predictions - window_actuals) <= 1.0)
                 
                 results['window_results'].append({
-                    'start_date': train_matches[0].date,
-                    'end_date': test_matches[-1].date,
+                    'start_date': data.match_date(task.history_start),
+                    'end_date': data.match_date(task.test_rows[-1]),
                     'mae': window_mae,
                     'accuracy': window_accuracy,
                     'matches_tested': len(window_predictions)
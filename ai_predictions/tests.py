@@ -0,0 +1,375 @@
+import shutil
+import tempfile
+import time
+from datetime import date, timedelta
+from unittest import mock
+
+import numpy as np
+from django.core.cache import caches
+from django.db import IntegrityError, transaction
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from football_data.models import League, Match
+
+from .decayed_stats import DecayedStatsService
+from .dixon_coles_fit import DixonColesFitService, _negative_log_likelihood, fit_dixon_coles
+from .model_registry import ModelArtifact, ModelRegistry
+from .models import DecayedTeamStat, DixonColesFit, TeamRating, TrainingJob
+from .prediction_cache import PredictionCache
+from .prediction_pipeline import PredictionPipeline
+from .team_ratings import TeamRatingService
+from .training_jobs import TrainingJobService
+
+TEAMS = ['Team A', 'Team B', 'Team C', 'Team D', 'Team E', 'Team F']
+
+# Receptores de league_data_changed desactivados: cada test ejecuta el servicio que prueba
+NO_IMPORT_RECEIVERS = dict(
+    DIXON_COLES_FIT_ON_IMPORT=False,
+    TRAINING_ENQUEUE_ON_IMPORT=False,
+    TEAM_RATINGS_UPDATE_ON_IMPORT=False,
+    DECAYED_STATS_UPDATE_ON_IMPORT=False,
+)
+
+
+def create_rounds(league, start, rounds, seed=0):
+    """Jornadas semanales de todos contra todos (método del círculo) con estadísticas aleatorias"""
+    rng = np.random.default_rng(seed)
+    matches = []
+    for round_number in range(rounds):
+        rotation = round_number % (len(TEAMS) - 1)
+        order = [TEAMS[0]] + TEAMS[1:][rotation:] + TEAMS[1:][:rotation]
+        for position in range(len(TEAMS) // 2):
+            home_team, away_team = order[position], order[-1 - position]
+            if round_number % 2:
+                home_team, away_team = away_team, home_team
+            hthg, htag = rng.poisson(0.7, 2)
+            matches.append(Match(
+                league=league, date=start + timedelta(weeks=round_number),
+                home_team=home_team, away_team=away_team,
+                fthg=hthg + rng.poisson(0.8), ftag=htag + rng.poisson(0.6), hthg=hthg, htag=htag,
+                hs=rng.poisson(13), as_field=rng.poisson(10), hst=rng.poisson(5), ast=rng.poisson(4),
+                hc=rng.poisson(5), ac=rng.poisson(4),
+            ))
+    return Match.objects.bulk_create(matches)
+
+
+PREDICTION_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'predictions': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'ai-tests'},
+}
+
+
+@override_settings(CACHES=PREDICTION_CACHES, PREDICTION_CACHE_ALIAS='predictions', **NO_IMPORT_RECEIVERS)
+class PredictionCacheTests(TestCase):
+    """Una importación o una promoción de modelo dejan de servir las predicciones cacheadas"""
+
+    def setUp(self):
+        caches['predictions'].clear()
+        self.league = League.objects.create(name='Premier League', season='2023-2024')
+        self.cache = PredictionCache()
+        self.computed = 0
+
+    def _predict(self):
+        def compute():
+            self.computed += 1
+            return {'prediction': self.computed}
+        return self.cache.get_or_compute(
+            self.league, 'Team A', 'Team B', 'shots_total', 'tests.model', compute
+        )
+
+    def test_repeated_prediction_is_served_from_cache(self):
+        self.assertEqual(self._predict(), {'prediction': 1})
+        self.assertEqual(self._predict(), {'prediction': 1})
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+
+    def test_key_depends_on_teams_type_model_set_and_as_of(self):
+        version = self.cache.data_version(self.league)
+        base = ('Team A', 'Team B', 'shots_total', 'tests.model', version)
+        key = self.cache.make_key(self.league, *base)
+        self.assertEqual(key, self.cache.make_key(self.league, *base))
+        self.assertTrue(key.startswith(f"prediction:{self.league.pk}:"))
+        variants = [
+            ('Team B', 'Team A', 'shots_total', 'tests.model', version),
+            ('Team A', 'Team B', 'corners_total', 'tests.model', version),
+            ('Team A', 'Team B', 'shots_total', 'tests.other', version),
+        ]
+        keys = {self.cache.make_key(self.league, *variant) for variant in variants}
+        keys.add(self.cache.make_key(self.league, *base, as_of=date(2024, 1, 1)))
+        self.assertEqual(len(keys | {key}), 5)
+
+    def test_import_invalidates_cached_predictions(self):
+        self._predict()
+        # La instancia que predice es anterior a la importación: la versión se lee de la base de datos
+        League.objects.get(pk=self.league.pk).bump_data_version()
+        self.assertEqual(self._predict(), {'prediction': 2})
+        self.assertEqual(self._predict(), {'prediction': 2})
+
+    def test_model_promotion_invalidates_cached_predictions(self):
+        self._predict()
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        ModelRegistry(root=root).register(
+            'shots_service', self.league, 'shots_total', 'random_forest', ModelArtifact(estimator=None),
+        )
+        self.assertEqual(self._predict(), {'prediction': 2})
+        self.assertEqual(self._predict(), {'prediction': 2})
+
+    def test_fallback_results_are_not_cached(self):
+        fallback = {'prediction': 10.0, 'fallback': True}
+        for _ in range(2):
+            self.cache.get_or_compute(
+                self.league, 'Team A', 'Team B', 'shots_total', 'tests.model', lambda: fallback,
+                cacheable=lambda value: not value.get('fallback'),
+            )
+        self.assertEqual(self.cache.misses, 2)
+
+
+class PredictionPipelineTests(TestCase):
+    """Plazo por tipo desde que empieza a ejecutarse y respaldo para los tipos que no terminan"""
+
+    TYPES = ['goals_total', 'goals_home', 'both_teams_score']
+
+    def setUp(self):
+        self.league = League.objects.create(name='Premier League', season='2023-2024')
+
+    def _run(self, predict, workers, timeout):
+        pipeline = PredictionPipeline(executor='thread', workers=workers, timeout=timeout, use_cache=False)
+        return pipeline.run('Team A', 'Team B', self.league, predict=predict, prediction_types=self.TYPES)
+
+    def test_queue_wait_does_not_count_towards_the_timeout(self):
+        def predict(pred_type, home_team, away_team, league, context=None):
+            time.sleep(0.2)
+            return [{'model_name': 'test', 'prediction': 1.0}]
+
+        # Con un solo worker el último tipo espera 0.4s en cola, más que el plazo
+        results = self._run(predict, workers=1, timeout=0.35)
+        self.assertEqual(list(results), self.TYPES)
+        for predictions in results.values():
+            self.assertEqual(predictions, [{'model_name': 'test', 'prediction': 1.0}])
+
+    def test_timed_out_and_failed_types_get_fallback_predictions(self):
+        def predict(pred_type, home_team, away_team, league, context=None):
+            if pred_type == 'goals_home':
+                raise RuntimeError('modelo roto')
+            if pred_type == 'both_teams_score':
+                time.sleep(1.0)
+            return [{'model_name': 'test', 'prediction': 1.0}]
+
+        results = self._run(predict, workers=3, timeout=0.2)
+        self.assertEqual(results['goals_total'], [{'model_name': 'test', 'prediction': 1.0}])
+        self.assertTrue(results['goals_home'])
+        self.assertTrue(all(prediction['fallback'] for prediction in results['goals_home']))
+        self.assertEqual(results['goals_home'][0]['error'], 'modelo roto')
+        names = [prediction['model_name'] for prediction in results['both_teams_score']]
+        self.assertIn('Enhanced Both Teams Score (Fallback)', names)
+        self.assertTrue(all(prediction['fallback'] for prediction in results['both_teams_score']))
+
+
+class DixonColesFitTests(TestCase):
+    """Gradiente analítico, recuperación de parámetros y ajustes por temporada"""
+
+    def test_gradient_matches_finite_differences(self):
+        rng = np.random.default_rng(1)
+        n_teams, n_matches = 5, 60
+        home_index, away_index = rng.integers(0, n_teams, n_matches), rng.integers(0, n_teams, n_matches)
+        home_goals, away_goals = rng.poisson(1.5, n_matches), rng.poisson(1.1, n_matches)
+        weights = rng.uniform(0.5, 1.0, n_matches)
+        params = np.concatenate([[0.2, 0.25, -0.1], rng.normal(0, 0.2, 2 * (n_teams - 1))])
+        args = (home_index, away_index, home_goals.astype(float), away_goals.astype(float), weights, n_teams, 0.01)
+
+        _, gradient = _negative_log_likelihood(params, *args)
+        step = 1e-6
+        for position in range(len(params)):
+            shift = np.zeros_like(params)
+            shift[position] = step
+            numeric = (_negative_log_likelihood(params + shift, *args)[0]
+                       - _negative_log_likelihood(params - shift, *args)[0]) / (2 * step)
+            self.assertAlmostEqual(gradient[position], numeric, places=5)
+
+    def test_fit_recovers_simulated_parameters(self):
+        rng = np.random.default_rng(2)
+        n_teams, n_matches = 8, 4000
+        attack = np.linspace(-0.4, 0.4, n_teams)
+        defence = np.linspace(0.3, -0.3, n_teams)
+        home_index = rng.integers(0, n_teams, n_matches)
+        away_index = (home_index + rng.integers(1, n_teams, n_matches)) % n_teams
+        home_goals = rng.poisson(np.exp(0.1 + 0.3 + attack[home_index] + defence[away_index]))
+        away_goals = rng.poisson(np.exp(0.1 + attack[away_index] + defence[home_index]))
+
+        result = fit_dixon_coles(home_index, away_index, home_goals, away_goals, n_teams, ridge=0.0)
+        self.assertTrue(result['converged'])
+        self.assertAlmostEqual(result['home_advantage'], 0.3, delta=0.06)
+        self.assertAlmostEqual(result['intercept'], 0.1, delta=0.06)
+        np.testing.assert_allclose(result['attack'], attack, atol=0.1)
+        np.testing.assert_allclose(result['defence'], defence, atol=0.1)
+
+    @override_settings(DIXON_COLES_MIN_MATCHES=20, **NO_IMPORT_RECEIVERS)
+    def test_fits_are_stored_per_season(self):
+        league = League.objects.create(name='Premier League', season='2022-2024')
+        service = DixonColesFitService()
+        create_rounds(league, date(2022, 8, 6), 10)
+        self.assertEqual(service.fit_league(league).season, '2022-2023')
+
+        # Un partido más de la misma temporada actualiza su ajuste; la siguiente crea otro
+        create_rounds(league, date(2022, 10, 22), 1, seed=1)
+        service.fit_league(league)
+        create_rounds(league, date(2023, 8, 12), 4, seed=2)
+        latest = service.fit_league(league)
+        self.assertEqual(latest.season, '2023-2024')
+        self.assertEqual(
+            list(DixonColesFit.objects.filter(league=league).order_by('season').values_list('season', flat=True)),
+            ['2022-2023', '2023-2024'],
+        )
+        self.assertEqual(service.parameters(league).pk, latest.pk)
+
+    @override_settings(DIXON_COLES_MIN_MATCHES=20, **NO_IMPORT_RECEIVERS)
+    def test_too_few_matches_are_not_fitted(self):
+        league = League.objects.create(name='Premier League', season='2022-2023')
+        create_rounds(league, date(2022, 8, 6), 2)
+        self.assertIsNone(DixonColesFitService().fit_league(league))
+        self.assertFalse(DixonColesFit.objects.exists())
+
+
+@override_settings(TRAINING_JOB_RETRY_DELAY=3600, TRAINING_JOB_MAX_ATTEMPTS=2, **NO_IMPORT_RECEIVERS)
+class TrainingJobQueueTests(TestCase):
+    """Deduplicación al encolar y reserva de trabajos por varios workers"""
+
+    def setUp(self):
+        self.league = League.objects.create(name='Premier League', season='2023-2024')
+        self.service = TrainingJobService()
+
+    def _enqueue(self, prediction_type='shots_total'):
+        return self.service.enqueue(self.league, 'shots_service', [prediction_type], reason='missing')
+
+    def test_enqueue_reuses_the_pending_job(self):
+        first = self._enqueue()
+        self.league.bump_data_version()
+        second = self._enqueue()
+        self.assertEqual([job.pk for job in first], [job.pk for job in second])
+        job = TrainingJob.objects.get()
+        self.assertEqual((job.status, job.data_version), ('pending', 1))
+
+    def test_only_one_pending_job_per_key(self):
+        self._enqueue()
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            TrainingJob.objects.create(
+                league=self.league, registry_key='shots_service', prediction_type='shots_total',
+            )
+        # Otro tipo de predicción sí puede tener su propio trabajo pendiente
+        self._enqueue('shots_home')
+        self.assertEqual(TrainingJob.objects.filter(status='pending').count(), 2)
+
+    def test_concurrent_enqueue_reuses_the_competing_job(self):
+        create = TrainingJob.objects.create
+
+        def competing_create(**fields):
+            # Otra petición crea el mismo trabajo entre la comprobación y la creación
+            create(**fields)
+            return create(**fields)
+
+        with mock.patch.object(TrainingJob.objects, 'create', side_effect=competing_create):
+            jobs = self._enqueue()
+        self.assertEqual([job.pk for job in jobs], list(TrainingJob.objects.values_list('pk', flat=True)))
+
+    def test_finished_job_with_current_data_is_not_requeued(self):
+        self._enqueue()
+        TrainingJob.objects.update(status='skipped', finished_at=timezone.now())
+        self.assertEqual(self._enqueue(), [])
+        self.league.bump_data_version()
+        self.assertEqual(len(self._enqueue()), 1)
+
+    def test_claim_takes_each_job_once_in_order(self):
+        first = self._enqueue('shots_total')[0]
+        second = self._enqueue('shots_home')[0]
+        claimed = [self.service.claim_next_job('worker-1'), self.service.claim_next_job('worker-2')]
+        self.assertEqual([job.pk for job in claimed], [first.pk, second.pk])
+        self.assertEqual([(job.status, job.attempts) for job in claimed], [('running', 1), ('running', 1)])
+        self.assertIsNone(self.service.claim_next_job('worker-3'))
+
+    def test_stale_jobs_are_requeued_until_max_attempts(self):
+        self._enqueue()
+        stale_start = timezone.now() - timedelta(days=1)
+        for attempt in (1, 2):
+            job = self.service.claim_next_job('worker')
+            self.assertEqual(job.attempts, attempt)
+            TrainingJob.objects.filter(pk=job.pk).update(started_at=stale_start)
+        self.assertIsNone(self.service.claim_next_job('worker'))
+        self.assertEqual(TrainingJob.objects.get().status, 'failed')
+
+    def test_stale_job_superseded_by_a_pending_one_fails(self):
+        self._enqueue()
+        job = self.service.claim_next_job('worker')
+        TrainingJob.objects.filter(pk=job.pk).update(started_at=timezone.now() - timedelta(days=1))
+        self.league.bump_data_version()
+        newer = self._enqueue()[0]
+        self.assertEqual(self.service.requeue_stale_jobs(), 0)
+        self.assertEqual(TrainingJob.objects.get(pk=job.pk).status, 'failed')
+        self.assertEqual(TrainingJob.objects.get(status='pending').pk, newer.pk)
+
+
+@override_settings(**NO_IMPORT_RECEIVERS)
+class OnlineAggregateTests(TestCase):
+    """Los ratings y las estadísticas con decaimiento incrementales coinciden con la reconstrucción"""
+
+    def setUp(self):
+        self.league = League.objects.create(name='Premier League', season='2023-2024')
+        create_rounds(self.league, date(2023, 8, 12), 8)
+
+    def _ratings(self):
+        return {rating.team: rating.ratings for rating in TeamRating.objects.filter(league=self.league)}
+
+    def _decayed(self):
+        return {
+            (stat.team, stat.venue, stat.stat): (stat.sums, stat.matches_count, stat.last_date)
+            for stat in DecayedTeamStat.objects.filter(league=self.league)
+        }
+
+    def _assert_nested_equal(self, first, second):
+        if isinstance(first, dict):
+            self.assertEqual(set(first), set(second))
+            for key in first:
+                self._assert_nested_equal(first[key], second[key])
+        elif isinstance(first, (list, tuple)):
+            self.assertEqual(len(first), len(second))
+            for left, right in zip(first, second):
+                self._assert_nested_equal(left, right)
+        elif isinstance(first, float):
+            self.assertAlmostEqual(first, second, places=9)
+        else:
+            self.assertEqual(first, second)
+
+    def test_incremental_ratings_match_rebuild(self):
+        service = TeamRatingService()
+        self.assertEqual(service.update_league(self.league)['mode'], 'rebuild')
+        create_rounds(self.league, date(2023, 10, 14), 4, seed=1)
+        result = service.update_league(self.league)
+        self.assertEqual((result['mode'], result['matches']), ('incremental', 12))
+        incremental = self._ratings()
+        self.assertEqual(len(incremental), len(TEAMS))
+        service.rebuild(self.league)
+        self._assert_nested_equal(incremental, self._ratings())
+        self.assertEqual(service.update_league(self.league)['mode'], 'unchanged')
+
+    def test_changed_processed_match_triggers_rebuild(self):
+        service = TeamRatingService()
+        service.update_league(self.league)
+        first = Match.objects.filter(league=self.league).order_by('date', 'pk').first()
+        Match.objects.filter(pk=first.pk).update(fthg=first.fthg + 1)
+        self.assertEqual(service.update_league(self.league)['mode'], 'rebuild')
+
+    def test_incremental_decayed_stats_match_rebuild(self):
+        service = DecayedStatsService()
+        self.assertEqual(service.update_league(self.league)['mode'], 'rebuild')
+        create_rounds(self.league, date(2023, 10, 14), 4, seed=1)
+        self.assertEqual(service.update_league(self.league)['mode'], 'incremental')
+        incremental = self._decayed()
+        self.assertEqual(len(incremental), len(TEAMS) * 2 * 4)
+        service.rebuild(self.league)
+        self._assert_nested_equal(incremental, self._decayed())
+
+    @override_settings(DECAYED_STATS_HALF_LIVES=[30.0, 90.0], **NO_IMPORT_RECEIVERS)
+    def test_changed_half_lives_trigger_rebuild(self):
+        DecayedStatsService().rebuild(self.league)
+        with override_settings(DECAYED_STATS_HALF_LIVES=[21.0, 60.0, 180.0]):
+            self.assertEqual(DecayedStatsService().update_league(self.league)['mode'], 'rebuild')
@@ -0,0 +1,198 @@
+"""
+Cola de entrenamiento de modelos respaldada por la base de datos (TrainingJob)
+
+Las importaciones encolan un trabajo por (liga, familia, tipo de predicción) y
+el comando run_training_worker los ejecuta fuera de los workers web. Cada
+trabajo entrena con model_registry.train_model(), que guarda el artefacto y lo
+promueve como modelo activo del registro; el trabajo guarda la duración, las
+muestras y las métricas de validación del modelo registrado.
+"""
+
+import logging
+import os
+import socket
+import time
+from datetime import timedelta
+from typing import Iterable, List, Optional
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from football_data.models import League
+from .models import PredictionModel, TrainingJob
+from .model_registry import TRAINABLE_MODELS, train_model
+
+logger = logging.getLogger('ai_predictions')
+
+
+class TrainingJobService:
+    """Encola, reserva y ejecuta trabajos de entrenamiento"""
+
+    @property
+    def timeout(self) -> timedelta:
+        """Tiempo tras el que un trabajo 'running' se da por abandonado (worker caído)"""
+        return timedelta(seconds=getattr(settings, 'TRAINING_JOB_TIMEOUT', 3600))
+
+    @property
+    def max_attempts(self) -> int:
+        return max(1, getattr(settings, 'TRAINING_JOB_MAX_ATTEMPTS', 3))
+
+    @property
+    def retry_delay(self) -> timedelta:
+        """Tiempo durante el que no se reencola un trabajo omitido o fallido con los mismos datos"""
+        return timedelta(seconds=getattr(settings, 'TRAINING_JOB_RETRY_DELAY', 21600))
+
+    def enqueue(self, league: League, registry_key: str, prediction_types: Optional[Iterable[str]] = None,
+                reason: str = 'manual') -> List[TrainingJob]:
+        """
+        Encola el entrenamiento de una familia de modelos de la liga.
+
+        Si ya hay un trabajo pendiente para el mismo (liga, familia, tipo) se
+        actualiza su versión de datos en lugar de crear otro. Tampoco se crea si
+        ya hay uno en curso con la versión de datos actual, o si uno con esa
+        versión terminó omitido o fallido hace menos de TRAINING_JOB_RETRY_DELAY
+        (las predicciones sin modelo activo lo piden en cada llamada).
+
+        La restricción unique_pending_training_job impide dos trabajos pendientes
+        para el mismo (liga, familia, tipo): si otra petición crea el suyo entre la
+        comprobación y la creación, se reutiliza ese. select_for_update sobre la liga
+        sólo serializa las peticiones en bases de datos con bloqueo de filas (en
+        SQLite no hace nada).
+        """
+        if registry_key not in TRAINABLE_MODELS:
+            raise ValueError(f"Familia de modelos desconocida: {registry_key}")
+
+        jobs = []
+        with transaction.atomic():
+            data_version = League.objects.select_for_update().filter(pk=league.pk).values_list(
+                'data_version', flat=True
+            ).first() or 0
+            retry_after = timezone.now() - self.retry_delay
+            for prediction_type in prediction_types or TRAINABLE_MODELS[registry_key]:
+                existing = TrainingJob.objects.filter(
+                    league=league, registry_key=registry_key, prediction_type=prediction_type,
+                )
+                pending = existing.filter(status='pending').first()
+                if pending is not None:
+                    TrainingJob.objects.filter(pk=pending.pk).update(data_version=data_version)
+                    jobs.append(pending)
+                    continue
+                recent = existing.filter(data_version=data_version).filter(
+                    Q(status='running') | Q(status__in=('skipped', 'failed'), finished_at__gte=retry_after)
+                ).order_by('-created_at').first()
+                if recent is not None:
+                    logger.debug(
+                        f"Entrenamiento {registry_key} {prediction_type} de {league.name} no encolado: "
+                        f"trabajo #{recent.id} {recent.status}"
+                    )
+                    continue
+                try:
+                    with transaction.atomic():
+                        jobs.append(TrainingJob.objects.create(
+                            league=league,
+                            registry_key=registry_key,
+                            prediction_type=prediction_type,
+                            data_version=data_version,
+                            reason=reason,
+                        ))
+                except IntegrityError:
+                    # Otra petición encoló el mismo trabajo a la vez
+                    pending = existing.filter(status='pending').first()
+                    if pending is not None:
+                        TrainingJob.objects.filter(pk=pending.pk).update(data_version=data_version)
+                        jobs.append(pending)
+        return jobs
+
+    def enqueue_league(self, league: League, reason: str = 'import') -> List[TrainingJob]:
+        """Encola todas las familias y tipos de predicción de la liga"""
+        jobs = []
+        for registry_key in TRAINABLE_MODELS:
+            jobs.extend(self.enqueue(league, registry_key, reason=reason))
+        logger.info(f"🗂️ {len(jobs)} entrenamientos en cola para {league.name} ({reason})")
+        return jobs
+
+    def requeue_stale_jobs(self) -> int:
+        """Devuelve a la cola (o marca como fallidos) los trabajos de workers caídos"""
+        stale = TrainingJob.objects.filter(status='running', started_at__lt=timezone.now() - self.timeout)
+        failed = stale.filter(attempts__gte=self.max_attempts).update(
+            status='failed', error='Tiempo de entrenamiento agotado', finished_at=timezone.now(),
+        )
+        requeued = 0
+        for job_id in stale.order_by('-started_at').values_list('id', flat=True):
+            try:
+                with transaction.atomic():
+                    requeued += TrainingJob.objects.filter(pk=job_id, status='running').update(
+                        status='pending', worker='',
+                    )
+            except IntegrityError:
+                # Ya hay un trabajo pendiente para el mismo (liga, familia, tipo), que lo sustituye
+                failed += TrainingJob.objects.filter(pk=job_id).update(
+                    status='failed', error='Tiempo de entrenamiento agotado (sustituido por un trabajo pendiente)',
+                    finished_at=timezone.now(),
+                )
+        if failed or requeued:
+            logger.warning(f"Trabajos de entrenamiento abandonados: {requeued} reencolados, {failed} fallidos")
+        return requeued
+
+    def claim_next_job(self, worker: Optional[str] = None) -> Optional[TrainingJob]:
+        """
+        Reserva el siguiente trabajo pendiente. La reserva es un UPDATE condicionado a
+        que el trabajo siga pendiente: si dos workers eligen el mismo, sólo uno actualiza
+        la fila y el otro prueba con el siguiente, así que varios workers pueden
+        ejecutarse a la vez sin tomar el mismo trabajo.
+        """
+        self.requeue_stale_jobs()
+        worker = worker or f"{socket.gethostname()}:{os.getpid()}"
+        pending_ids = TrainingJob.objects.filter(status='pending').order_by('created_at').values_list('id', flat=True)
+        for job_id in pending_ids[:20]:
+            claimed = TrainingJob.objects.filter(pk=job_id, status='pending').update(
+                status='running', worker=worker, started_at=timezone.now(), attempts=F('attempts') + 1,
+            )
+            if claimed:
+                return TrainingJob.objects.select_related('league').get(pk=job_id)
+        return None
+
+    def run_job(self, job: TrainingJob) -> TrainingJob:
+        """Ejecuta un trabajo reservado y promueve el modelo entrenado al registro"""
+        started = time.perf_counter()
+        try:
+            record = train_model(job.registry_key, job.league, job.prediction_type)
+        except Exception as e:
+            logger.error(f"Error en el trabajo de entrenamiento #{job.id}: {e}")
+            record = None
+            job.status = 'failed'
+            job.error = str(e)
+        else:
+            job.status = 'completed' if record is not None else 'skipped'
+            job.error = ''
+
+        if record is not None:
+            job.prediction_model = record
+            job.samples_count = record.samples_count
+            job.metrics = self._validation_metrics(record)
+        job.duration_seconds = round(time.perf_counter() - started, 3)
+        job.finished_at = timezone.now()
+        job.save(update_fields=[
+            'status', 'error', 'prediction_model', 'samples_count', 'metrics', 'duration_seconds', 'finished_at',
+        ])
+        logger.info(
+            f"Trabajo de entrenamiento #{job.id} {job.status} en {job.duration_seconds:.2f}s "
+            f"({job.samples_count or 0} muestras): {job.metrics}"
+        )
+        return job
+
+    def _validation_metrics(self, record: PredictionModel) -> dict:
+        metrics = {
+            name: float(value)
+            for name, value in (('mae', record.mae), ('rmse', record.rmse),
+                                ('r2', record.r2_score), ('accuracy', record.accuracy))
+            if value is not None
+        }
+        metrics['model_type'] = record.model_type
+        return metrics
+
+
+# Instancia global
+training_job_service = TrainingJobService()
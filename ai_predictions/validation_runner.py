@@ -0,0 +1,352 @@
+"""
+Ejecutor paralelo de validaciones temporales
+
+Los folds de una validación son independientes una vez cargados los datos, así
+que cada liga se carga una sola vez en arrays de NumPy (ValidationData, con una
+consulta a través de FeatureBuilder) y las tareas folds × modelos × tipos de
+predicción se reparten en un pool de procesos. Con el método fork los procesos
+heredan los arrays del proceso principal sin copiarlos; con spawn se envían una
+vez por proceso en el inicializador, no en cada tarea.
+
+Cada fold se evalúa en fecha: los modelos sólo ven los partidos anteriores al
+primer partido del fold y su estado (estadísticas de equipos, prior de la liga,
+regresiones) se calcula una vez en esa frontera, igual que en el backtest
+walk-forward. Las fórmulas son las de AdvancedStatisticalModels y
+MultiModelPredictionService (métodos *_from_stats).
+"""
+
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.db import connections
+
+from football_data.models import League
+from .advanced_models import AdvancedStatisticalModels
+from .decayed_stats import DecayedAggregate, decayed_stats_service
+from .feature_builder import FeatureBuilder, TARGET_COLUMNS
+from .multi_models import MultiModelPredictionService
+from .team_history import drop_missing
+from .walk_forward import PROXY_MODEL, WalkForwardBacktest
+
+logger = logging.getLogger('ai_predictions')
+
+VALIDATION_EXECUTORS = ('process', 'sequential')
+
+# Con menos tareas el arranque del pool cuesta más de lo que ahorra
+PARALLEL_MIN_TASKS = 8
+
+# Columnas de Match (local, visitante) que usan los modelos de remates
+SHOTS_COLUMNS = {'shots': ('hs', 'as_field'), 'goals': ('fthg', 'ftag'), 'shots_on_target': ('hst', 'ast')}
+
+
+@dataclass
+class FoldTask:
+    """Un modelo evaluado en un fold de una liga"""
+    league_id: int
+    model_name: str
+    prediction_type: str     # Tipo con el que predice el modelo
+    target_type: str         # Tipo del valor real (columnas de TARGET_COLUMNS)
+    fold: int
+    test_rows: np.ndarray    # Posiciones de los partidos de test (orden cronológico)
+    history_start: int = 0   # Primer partido del historial (ventanas deslizantes)
+
+    @property
+    def history_end(self) -> int:
+        """El historial termina en el primer partido del fold"""
+        return int(self.test_rows[0])
+
+
+class ValidationData:
+    """Partidos de una liga en arrays de NumPy, en orden cronológico"""
+
+    def __init__(self, league: League, builder: Optional[FeatureBuilder] = None,
+                 walk_forward_types: Iterable[str] = ()):
+        builder = builder or FeatureBuilder(league, window=None)
+        matches = builder.matches
+        self.league_id = league.pk
+        self.league_name = league.name
+
+        self.dates = np.array([match_date.toordinal() for match_date in matches['date']], dtype=np.int64)
+        teams = pd.unique(pd.concat([matches['home_team'], matches['away_team']]))
+        codes = {team: code for code, team in enumerate(teams)}
+        self.home = matches['home_team'].map(codes).to_numpy(dtype=np.int64)
+        self.away = matches['away_team'].map(codes).to_numpy(dtype=np.int64)
+        self.columns = {
+            column: matches[column].to_numpy(dtype=np.float64) for column in matches.columns[3:]
+        }
+
+        # Partidos de cada equipo por sede (posiciones en orden cronológico)
+        self.team_rows = {}
+        for venue, codes_array in (('home', self.home), ('away', self.away)):
+            order = np.argsort(codes_array, kind='stable')
+            boundaries = np.flatnonzero(np.diff(codes_array[order])) + 1
+            self.team_rows[venue] = {
+                int(codes_array[group[0]]): group for group in np.split(order, boundaries) if len(group)
+            }
+
+        self.walk_forward = {
+            prediction_type: WalkForwardBacktest(league, prediction_type, builder=builder)
+            for prediction_type in walk_forward_types
+        }
+
+        # Estadísticas por equipo ya calculadas; los modelos de un mismo fold las comparten
+        self._team_stats: Dict[tuple, Dict] = {}
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    def match_date(self, row: int) -> date:
+        return date.fromordinal(int(self.dates[row]))
+
+    def rows_with(self, columns: Iterable[str], start: int = 0, end: Optional[int] = None) -> np.ndarray:
+        """Posiciones de los partidos de [start, end) con todas las columnas informadas"""
+        end = len(self) if end is None else end
+        present = np.ones(end - start, dtype=bool)
+        for column in columns:
+            present &= ~np.isnan(self.columns[column][start:end])
+        return np.flatnonzero(present) + start
+
+    def target(self, target_type: str, rows: np.ndarray) -> np.ndarray:
+        columns = TARGET_COLUMNS[target_type]
+        return sum(self.columns[column][rows] for column in columns)
+
+    def team_history(self, team: int, venue: str, start: int, end: int,
+                     since: int, limit: int) -> np.ndarray:
+        """Partidos del equipo en la sede dentro de [start, end) desde la fecha `since` (más recientes primero)"""
+        rows = self.team_rows[venue].get(team, np.array([], dtype=np.int64))
+        rows = rows[np.searchsorted(rows, start):np.searchsorted(rows, end)]
+        rows = rows[self.dates[rows] >= since]
+        return rows[::-1][:limit]
+
+    def cached_team_stats(self, key: tuple, compute) -> Dict:
+        """Estadísticas de equipo memorizadas por clave (modelo, equipo, sede, historial)"""
+        if key not in self._team_stats:
+            self._team_stats[key] = compute()
+        return self._team_stats[key]
+
+
+_advanced_models = AdvancedStatisticalModels()
+_multi_models = MultiModelPredictionService()
+
+
+def _venue_values(data: ValidationData, stat: str, venue: str, rows: np.ndarray) -> np.ndarray:
+    home_column, away_column = SHOTS_COLUMNS[stat]
+    return drop_missing(data.columns[home_column if venue == 'home' else away_column][rows])
+
+
+def _decayed_shots(data: ValidationData, team: int, venue: str, start: int, end: int) -> Optional[DecayedAggregate]:
+    """Remates con decaimiento del equipo en la sede con los partidos de [start, end)"""
+    rows = data.team_history(team, venue, start, end, since=0, limit=None)[::-1]
+    shots = data.columns[SHOTS_COLUMNS['shots'][0 if venue == 'home' else 1]][rows]
+    present = ~np.isnan(shots)
+    if not present.any():
+        return None
+    return DecayedAggregate.from_values(decayed_stats_service.half_lives, data.dates[rows][present], shots[present])
+
+
+def _predict_advanced(data: ValidationData, task: FoldTask) -> List[float]:
+    """Enhanced Poisson, Bayesian y Ensemble (AdvancedStatisticalModels) en fecha"""
+    start, end = task.history_start, task.history_end
+    as_of = int(data.dates[end])
+
+    def stats_for(team: int, venue: str) -> Dict:
+        def compute() -> Dict:
+            # Últimos 50 partidos en la sede en los dos años anteriores
+            rows = data.team_history(team, venue, start, end, since=as_of - 730, limit=50)
+            return _advanced_models.team_stats_from_history(
+                _venue_values(data, 'shots', venue, rows),
+                _venue_values(data, 'goals', venue, rows),
+                _venue_values(data, 'shots_on_target', venue, rows),
+                venue == 'home',
+                _decayed_shots(data, team, venue, start, end),
+            )
+        return data.cached_team_stats(('advanced', team, venue, start, end), compute)
+
+    # Prior de la liga: remates totales de los últimos 100 partidos completos
+    recent = data.rows_with(('hs', 'as_field'), start, end)[-100:]
+    league_prior = _advanced_models.league_prior_from_history(
+        data.columns['hs'][recent] + data.columns['as_field'][recent]
+    )
+
+    predictions = []
+    for row in task.test_rows:
+        home_stats = stats_for(int(data.home[row]), 'home')
+        away_stats = stats_for(int(data.away[row]), 'away')
+        if task.model_name == 'Enhanced Poisson':
+            prediction = _advanced_models.enhanced_poisson_from_stats(home_stats, away_stats, task.prediction_type)
+        elif task.model_name == 'Bayesian':
+            prediction = _advanced_models.bayesian_from_stats(home_stats, away_stats, league_prior, task.prediction_type)
+        else:
+            prediction = _advanced_models.ensemble_from_predictions(
+                _advanced_models.enhanced_poisson_from_stats(home_stats, away_stats, task.prediction_type),
+                _advanced_models.bayesian_from_stats(home_stats, away_stats, league_prior, task.prediction_type),
+            )
+        predictions.append(prediction['prediction'])
+    return predictions
+
+
+def _predict_multi(data: ValidationData, task: FoldTask) -> List[float]:
+    """Poisson, Linear Regression y Historical Average (MultiModelPredictionService) en fecha"""
+    start, end = task.history_start, task.history_end
+    as_of = int(data.dates[end])
+
+    def stats_for(team: int, venue: str) -> Dict:
+        def compute() -> Dict:
+            # Últimos 30 partidos en la sede en el año anterior
+            rows = data.team_history(team, venue, start, end, since=as_of - 365, limit=30)
+            return _multi_models.poisson_stats_from_history(
+                _venue_values(data, 'shots', venue, rows),
+                _venue_values(data, 'goals', venue, rows),
+            )
+        return data.cached_team_stats(('multi', team, venue, start, end), compute)
+
+    if task.model_name == 'Linear Regression':
+        # Regresión con los últimos 200 partidos completos anteriores al fold
+        training_rows = data.rows_with(('hs', 'as_field'), start, end)[-200:]
+        if len(training_rows) < 20:
+            # Predicción de respaldo del modelo
+            return [12.0] * len(task.test_rows)
+        X = np.array([
+            [stats_for(int(data.home[row]), 'home')['lambda'], stats_for(int(data.away[row]), 'away')['lambda'], 1.0]
+            for row in training_rows
+        ])
+        target_type = task.prediction_type if task.prediction_type in ('shots_home', 'shots_away') else 'shots_total'
+        y = data.target(target_type, training_rows)
+
+    predictions = []
+    for row in task.test_rows:
+        home_stats = stats_for(int(data.home[row]), 'home')
+        away_stats = stats_for(int(data.away[row]), 'away')
+        if task.model_name == 'Poisson':
+            prediction = _multi_models.poisson_from_stats(home_stats, away_stats, task.prediction_type)
+        elif task.model_name == 'Linear Regression':
+            prediction = _multi_models.linear_regression_from_stats(X, y, home_stats, away_stats)
+        else:
+            prediction = _multi_models.historical_average_from_stats(home_stats, away_stats, task.prediction_type)
+        predictions.append(prediction['prediction'])
+    return predictions
+
+
+def _predict_walk_forward(data: ValidationData, task: FoldTask) -> np.ndarray:
+    """Modelo especializado + forma reciente (WalkForwardBacktest) entrenado con el historial del fold"""
+    backtest = data.walk_forward[task.prediction_type]
+    train = np.flatnonzero((backtest.rows >= task.history_start) & (backtest.rows < task.history_end))
+    test = np.searchsorted(backtest.rows, task.test_rows)
+    return backtest.predict_rows(train, test)
+
+
+VALIDATION_MODELS = {
+    'Enhanced Poisson': _predict_advanced,
+    'Bayesian': _predict_advanced,
+    'Ensemble': _predict_advanced,
+    'Poisson': _predict_multi,
+    'Linear Regression': _predict_multi,
+    'Historical Average': _predict_multi,
+    PROXY_MODEL: _predict_walk_forward,
+}
+
+FoldResult = Tuple[FoldTask, np.ndarray, np.ndarray]
+
+# Datos de las ligas en validación (heredados por los procesos con fork)
+_datasets: Dict[int, ValidationData] = {}
+_datasets_lock = threading.Lock()
+
+
+def _init_worker(datasets: Optional[Dict[int, ValidationData]] = None):
+    """Inicializa Django en cada proceso y recibe los datos si no se heredaron (spawn)"""
+    import django
+    django.setup()
+    if datasets:
+        _datasets.update(datasets)
+
+
+def _evaluate(task: FoldTask, datasets: Optional[Dict[int, ValidationData]] = None) -> Tuple[np.ndarray, np.ndarray]:
+    data = (datasets or _datasets)[task.league_id]
+    predictions = np.asarray(VALIDATION_MODELS[task.model_name](data, task), dtype=np.float64)
+    return predictions, data.target(task.target_type, task.test_rows)
+
+
+class ValidationRunner:
+    """
+    Evalúa tareas de validación en paralelo.
+
+    Args:
+        executor: 'process' (por defecto) o 'sequential'
+        workers: Procesos del pool (por defecto, uno por CPU)
+    """
+
+    def __init__(self, executor: Optional[str] = None, workers: Optional[int] = None):
+        self.executor = executor or getattr(settings, 'VALIDATION_EXECUTOR', 'process')
+        if self.executor not in VALIDATION_EXECUTORS:
+            raise ValueError(f"Ejecutor desconocido: {self.executor}")
+        self.workers = max(1, workers or getattr(settings, 'VALIDATION_WORKERS', 0) or os.cpu_count() or 1)
+
+    def run(self, datasets: Iterable[ValidationData], tasks: List[FoldTask]) -> List[FoldResult]:
+        """
+        Evalúa las tareas y devuelve (tarea, predicciones, valores reales) en el
+        orden de `tasks`. Las tareas que fallan se registran y se omiten.
+        """
+        datasets = {data.league_id: data for data in datasets}
+        started = time.perf_counter()
+        parallel = self.executor == 'process' and self.workers > 1 and len(tasks) >= PARALLEL_MIN_TASKS
+
+        if parallel:
+            outcomes = self._run_in_pool(datasets, tasks)
+        else:
+            outcomes = []
+            for task in tasks:
+                try:
+                    outcomes.append(_evaluate(task, datasets))
+                except Exception as e:
+                    outcomes.append(e)
+
+        results = []
+        for task, outcome in zip(tasks, outcomes):
+            if isinstance(outcome, Exception):
+                logger.error(f"Error evaluando {task.model_name} (fold {task.fold}, liga {task.league_id}): {outcome}")
+                continue
+            results.append((task, *outcome))
+
+        logger.info(
+            f"🧪 {len(results)}/{len(tasks)} folds evaluados en {time.perf_counter() - started:.2f}s "
+            f"({'procesos' if parallel else 'secuencial'})"
+        )
+        return results
+
+    def _run_in_pool(self, datasets: Dict[int, ValidationData], tasks: List[FoldTask]) -> list:
+        context = multiprocessing.get_context()
+        inherited = context.get_start_method() == 'fork'
+        workers = min(self.workers, len(tasks))
+
+        with _datasets_lock:
+            _datasets.update(datasets)
+            try:
+                # Los procesos no deben heredar las conexiones abiertas
+                connections.close_all()
+                with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker,
+                                         initargs=(None if inherited else datasets,)) as pool:
+                    futures = [pool.submit(_evaluate, task) for task in tasks]
+                    outcomes = []
+                    for future in futures:
+                        try:
+                            outcomes.append(future.result())
+                        except Exception as e:
+                            outcomes.append(e)
+                return outcomes
+            finally:
+                for league_id in datasets:
+                    _datasets.pop(league_id, None)
+
+
+# Instancia global
+validation_runner = ValidationRunner()
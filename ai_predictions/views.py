@@ -24,9 +24,14 @@ from .services import PredictionService
 from .multi_models import MultiModelPredictionService
 from .advanced_models import AdvancedStatisticalModels
 from .model_validation import ModelValidator
-from .simple_models import SimplePredictionService, ModeloHibridoCorners, ModeloHibridoGeneral
-from .model_trainer import ModelTrainer
+from .temporal_validator import TemporalValidator
+from .walk_forward import WalkForwardBacktest
+from .model_trainer import REGISTRY_KEY as TRAINER_REGISTRY_KEY
+from .training_jobs import training_job_service
 from .forms import PredictionForm
+from .team_history import team_history_scope
+from .prediction_cache import has_fallback, prediction_cache
+from .prediction_pipeline import PredictionPipeline, PREDICTION_TYPES, predict_market, predict_calibrated_market
 
 logger = logging.getLogger('ai_predictions')
 
@@ -53,6 +58,7 @@ def convert_numpy_to_native(obj):
         return obj
 
 
+@team_history_scope()
 def process_predictions_background(session_key, home_team, away_team, league_id, league_name):
     """Procesa predicciones en segundo plano"""
     from django.contrib.sessions.backends.db import SessionStore
@@ -64,19 +70,10 @@ def process_predictions_background(session_key, home_team, away_team, league_id,
         
         # No limpiar predicción anterior aquí - puede causar condición de carrera
         
-        prediction_types = [
-            'shots_total', 'shots_home', 'shots_away',
-            'shots_on_target_total',
-            'goals_total', 'goals_home', 'goals_away',
-            'corners_total', 'corners_home', 'corners_away',
-            'both_teams_score'
-        ]
-        
-        all_predictions_by_type = {}
+        prediction_types = PREDICTION_TYPES
         total_types = len(prediction_types)
         
-        logger.info("Generando predicciones en background...")
-        logger.info(f"🔧 INICIANDO BUCLE - Home: '{home_team}' vs Away: '{away_team}', Liga: {league_name}")
+        logger.info(f"🔧 INICIANDO PIPELINE - Home: '{home_team}' vs Away: '{away_team}', Liga: {league_name}")
         
         # LIMPIAR SESIÓN PARA FORZAR REGENERACIÓN
         session.pop('all_predictions', None)
@@ -85,187 +82,21 @@ def process_predictions_background(session_key, home_team, away_team, league_id,
         session.save()
         logger.info("🔧 SESIÓN LIMPIADA - Forzando regeneración completa")
         
-        # Procesamiento sin timeout (Windows compatible)
-        logger.info(f"🔧 INICIANDO BUCLE - Total tipos: {total_types}")
-        logger.info(f"🔧 TIPOS DE PREDICCIÓN: {prediction_types}")
+        def update_progress(completed, total, pred_type):
+            session['prediction_progress'] = {
+                'current': completed,
+                'total': total,
+                'current_type': pred_type.replace('_', ' ').title(),
+                'status': 'processing'
+            }
+            session.modified = True
+            session.save()
         
-        for index, pred_type in enumerate(prediction_types):
-            try:
-                logger.info(f"Procesando: {pred_type}")
-                logger.info(f"🔧 ITERACIÓN {index+1}/{total_types} - {pred_type}")
-                
-                # Log específico para detectar si shots se procesa
-                if 'shots' in pred_type:
-                    logger.info(f"🎯 PROCESANDO SHOTS: {pred_type}")
-                    logger.info(f"🎯 SHOTS DETECTADO - Iniciando procesamiento para {pred_type}")
-            
-                # Actualizar progreso
-                session['prediction_progress'] = {
-                    'current': index + 1,
-                    'total': total_types,
-                    'current_type': pred_type.replace('_', ' ').title(),
-                    'status': 'processing'
-                }
-                session.modified = True
-                session.save()
-                
-                simple_service = SimplePredictionService()
-                trainer = ModelTrainer()
-                
-                # Generar modelos simples (3 modelos: Dixon-Coles/Poisson, Average, Ensemble)
-                logger.info(f"Generando modelos simples para {pred_type}...")
-                logger.info(f"🔧 PROCESANDO {pred_type} - Home: '{home_team}' vs Away: '{away_team}'")
-                
-                # MANEJO ESPECIAL PARA REMATES - USAR AMBOS MODELOS
-                if 'shots' in pred_type or 'remates' in pred_type:
-                    logger.info(f"🎯 ENTRANDO A MANEJO ESPECIAL DE REMATES (AMBOS MODELOS) para {pred_type}")
-                    predictions = []
-                    
-                    try:
-                        # Modelo 1: Shots Prediction Model (original)
-                        from .shots_prediction_model import shots_prediction_model
-                        logger.info(f"🎯 IMPORTACIÓN EXITOSA de shots_prediction_model para {pred_type}")
-                        
-                        if pred_type == 'shots_total':
-                            pred1 = shots_prediction_model.predict_shots_total(home_team, away_team, league)
-                        elif pred_type == 'shots_home':
-                            pred1 = shots_prediction_model.predict_shots_home(home_team, away_team, league)
-                        elif pred_type == 'shots_away':
-                            pred1 = shots_prediction_model.predict_shots_away(home_team, away_team, league)
-                        elif pred_type == 'shots_on_target_total':
-                            pred1 = shots_prediction_model.predict_shots_on_target_total(home_team, away_team, league)
-                        else:
-                            pred1 = None
-                        
-                        if pred1:
-                            predictions.append(pred1)
-                            logger.info(f"🎯 MODELO 1 (Shots Prediction) agregado para {pred_type}")
-                        
-                    except Exception as e:
-                        logger.error(f"❌ ERROR EN shots_prediction_model para {pred_type}: {e}")
-                    
-                    try:
-                        # Modelo 2: XG Shots Model (nuevo)
-                        from .xg_shots_model import xg_shots_model
-                        logger.info(f"🎯 IMPORTACIÓN EXITOSA de xg_shots_model para {pred_type}")
-                        
-                        if pred_type == 'shots_total':
-                            pred2 = xg_shots_model.predict_shots_total(home_team, away_team, league)
-                        elif pred_type == 'shots_home':
-                            pred2 = xg_shots_model.predict_shots_home(home_team, away_team, league)
-                        elif pred_type == 'shots_away':
-                            pred2 = xg_shots_model.predict_shots_away(home_team, away_team, league)
-                        elif pred_type == 'shots_on_target_total':
-                            pred2 = xg_shots_model.predict_shots_on_target_total(home_team, away_team, league)
-                        else:
-                            pred2 = None
-                        
-                        if pred2:
-                            predictions.append(pred2)
-                            logger.info(f"🎯 MODELO 2 (XG Shots) agregado para {pred_type}")
-                        
-                    except Exception as e:
-                        logger.error(f"❌ ERROR EN xg_shots_model para {pred_type}: {e}")
-                    
-                    logger.info(f"🎯 TOTAL MODELOS DE REMATES para {pred_type}: {len(predictions)} modelos")
-                    logger.info(f"🎯 PREDICCIONES GENERADAS: {predictions}")
-                else:
-                    try:
-                        predictions = simple_service.get_all_simple_predictions(home_team, away_team, league, pred_type)
-                        logger.info(f"✅ Modelos simples generados para {pred_type}: {len(predictions)}")
-                    except Exception as e:
-                        logger.error(f"❌ ERROR EN get_all_simple_predictions para {pred_type}: {e}")
-                        logger.error(f"❌ TRACEBACK:", exc_info=True)
-                        # Crear predicción de fallback
-                        predictions = [{
-                            'model_name': f'Fallback {pred_type}',
-                            'prediction': 10.0,
-                            'confidence': 0.3,
-                            'probabilities': {'over_10': 0.5},
-                            'total_matches': 0,
-                            'error': str(e)
-                        }]
-                        logger.info(f"🔄 Usando predicción de fallback para {pred_type}")
-                
-                # Manejo específico para "both_teams_score" con modelo mejorado
-                if pred_type == 'both_teams_score':
-                    try:
-                        from .enhanced_both_teams_score import enhanced_both_teams_score_model
-                        enhanced_prob = enhanced_both_teams_score_model.predict(home_team, away_team, league)
-                        
-                        enhanced_prediction = {
-                            'model_name': 'Enhanced Both Teams Score',
-                            'prediction': enhanced_prob,
-                            'confidence': 0.80,
-                            'probabilities': {'both_score': enhanced_prob},
-                            'total_matches': 100
-                        }
-                        predictions.append(enhanced_prediction)
-                        logger.info(f"Modelo Enhanced Both Teams Score agregado para {pred_type}: {enhanced_prob:.3f}")
-                    except Exception as e:
-                        logger.error(f"Error en modelo mejorado ambos marcan: {e}")
-                        # Fallback específico para ambos marcan
-                        fallback_prob = 0.45  # Valor más realista que 0.5
-                        enhanced_fallback = {
-                            'model_name': 'Enhanced Both Teams Score (Fallback)',
-                            'prediction': fallback_prob,
-                            'confidence': 0.60,
-                            'probabilities': {'both_score': fallback_prob},
-                            'total_matches': 0
-                        }
-                        predictions.append(enhanced_fallback)
-                        logger.info(f"Fallback ambos marcan agregado: {fallback_prob}")
-                
-                # Agregar modelo híbrido como modelo adicional para otros tipos
-                elif 'corners' in pred_type:
-                    try:
-                        # Usar modelo híbrido especializado para corners
-                        hybrid_model = ModeloHibridoCorners()
-                        hybrid_prediction = hybrid_model.predecir(home_team, away_team, league, pred_type)
-                        predictions.append(hybrid_prediction)
-                        logger.info(f"Modelo Híbrido Corners agregado para {pred_type}")
-                    except Exception as e:
-                        logger.error(f"Error agregando modelo híbrido corners para {pred_type}: {e}")
-                        # Crear modelo híbrido de fallback
-                        hybrid_fallback = {
-                            'model_name': 'Modelo Híbrido Corners',
-                            'prediction': 10.0,
-                            'confidence': 0.6,
-                            'probabilities': {'over_10': 0.5, 'over_15': 0.3, 'over_20': 0.1},
-                            'total_matches': 0,
-                            'component_predictions': {}
-                        }
-                        predictions.append(hybrid_fallback)
-                        logger.info(f"Modelo híbrido corners fallback agregado para {pred_type}")
-                else:
-                    try:
-                        # Usar modelo híbrido general para otros tipos
-                        hybrid_model = ModeloHibridoGeneral()
-                        hybrid_prediction = hybrid_model.predecir(home_team, away_team, league, pred_type)
-                        predictions.append(hybrid_prediction)
-                        logger.info(f"Modelo Híbrido General agregado para {pred_type}")
-                    except Exception as e:
-                        logger.error(f"Error agregando modelo híbrido general para {pred_type}: {e}")
-                        # Crear modelo híbrido de fallback
-                        hybrid_fallback = {
-                            'model_name': 'Modelo Híbrido General',
-                            'prediction': 10.0,
-                            'confidence': 0.6,
-                            'probabilities': {'over_10': 0.5, 'over_15': 0.3, 'over_20': 0.1},
-                            'total_matches': 0,
-                            'component_predictions': {}
-                        }
-                        predictions.append(hybrid_fallback)
-                        logger.info(f"Modelo híbrido general fallback agregado para {pred_type}")
-                
-                all_predictions_by_type[pred_type] = predictions
-                model_names = [pred['model_name'] for pred in predictions]
-                logger.info(f"[OK] {pred_type}: {len(predictions)} modelos generados - {model_names}")
-                
-            except Exception as e:
-                logger.error(f"❌ ERROR EN {pred_type}: {e}")
-                logger.error(f"❌ TRACEBACK:", exc_info=True)
-                all_predictions_by_type[pred_type] = []
+        # Los tipos se sirven desde la caché o se calculan en paralelo, en el orden de prediction_types
+        all_predictions_by_type = PredictionPipeline().run(
+            home_team, away_team, league, predict=predict_market,
+            on_progress=update_progress
+        )
         
         # AGREGAR PREDICCIÓN OFICIAL (después de todos los otros modelos)
         logger.info("🎯 OFICIAL - Iniciando cálculo de predicción oficial en background")
@@ -361,6 +192,7 @@ class PredictionFormView(View):
             logger.error(f"❌ TRACEBACK:", exc_info=True)
             raise
     
+    @team_history_scope()
     def post(self, request):
         logger.info("Iniciando procesamiento de predicción...")
         form = PredictionForm(request.POST)
@@ -395,31 +227,16 @@ class PredictionFormView(View):
                 request.session.modified = True
                 request.session.save()
                 
-                # Procesar predicciones DIRECTAMENTE (sin threading)
-                logger.info("🔄 PROCESANDO DIRECTAMENTE - sin threading")
-                
-                from .simple_models import SimplePredictionService, ModeloHibridoCorners, ModeloHibridoGeneral
-                from .league_calibration import league_calibration
-                from .enhanced_both_teams_score import enhanced_both_teams_score_model
-                
-                prediction_types = [
-                    'shots_total', 'shots_home', 'shots_away',
-                    'shots_on_target_total',
-                    'goals_total', 'goals_home', 'goals_away',
-                    'corners_total', 'corners_home', 'corners_away',
-                    'both_teams_score'
-                ]
+                # Procesar predicciones en el pipeline (tipos en paralelo dentro de la petición)
+                logger.info("🔄 PROCESANDO EN PIPELINE")
                 
-                all_predictions_by_type = {}
-                simple_service = SimplePredictionService()
+                prediction_types = PREDICTION_TYPES
                 
-                for i, pred_type in enumerate(prediction_types, 1):
-                    logger.info(f"🔧 PROCESANDO {i}/{len(prediction_types)} - {pred_type}")
-                    # Actualizar progreso visible para la barra
+                def update_progress(completed, total, pred_type):
                     try:
                         request.session['prediction_progress'] = {
-                            'current': i - 1,
-                            'total': len(prediction_types),
+                            'current': completed,
+                            'total': total,
                             'current_type': pred_type,
                             'status': 'running'
                         }
@@ -427,119 +244,14 @@ class PredictionFormView(View):
                         request.session.save()
                     except Exception as e:
                         logger.debug(f"No se pudo actualizar progreso: {e}")
-                    
-                    try:
-                        # MANEJO ESPECIAL PARA REMATES - USAR AMBOS MODELOS
-                        if 'shots' in pred_type or 'remates' in pred_type:
-                            logger.info(f"🎯 [BACKGROUND] ENTRANDO A MANEJO ESPECIAL DE REMATES (AMBOS MODELOS) para {pred_type}")
-                            predictions = []
-                            
-                            try:
-                                # Modelo 1: Shots Prediction Model (original)
-                                from .shots_prediction_model import shots_prediction_model
-                                logger.info(f"🎯 [BACKGROUND] IMPORTACIÓN EXITOSA de shots_prediction_model para {pred_type}")
-                                
-                                if pred_type == 'shots_total':
-                                    pred1 = shots_prediction_model.predict_shots_total(home_team, away_team, league)
-                                elif pred_type == 'shots_home':
-                                    pred1 = shots_prediction_model.predict_shots_home(home_team, away_team, league)
-                                elif pred_type == 'shots_away':
-                                    pred1 = shots_prediction_model.predict_shots_away(home_team, away_team, league)
-                                elif pred_type == 'shots_on_target_total':
-                                    pred1 = shots_prediction_model.predict_shots_on_target_total(home_team, away_team, league)
-                                else:
-                                    pred1 = None
-                                
-                                if pred1:
-                                    predictions.append(pred1)
-                                    logger.info(f"🎯 [BACKGROUND] MODELO 1 (Shots Prediction) agregado para {pred_type}")
-                                
-                            except Exception as e:
-                                logger.error(f"❌ [BACKGROUND] ERROR EN shots_prediction_model para {pred_type}: {e}")
-                            
-                            try:
-                                # Modelo 2: XG Shots Model (nuevo)
-                                from .xg_shots_model import xg_shots_model
-                                logger.info(f"🎯 [BACKGROUND] IMPORTACIÓN EXITOSA de xg_shots_model para {pred_type}")
-                                
-                                if pred_type == 'shots_total':
-                                    pred2 = xg_shots_model.predict_shots_total(home_team, away_team, league)
-                                elif pred_type == 'shots_home':
-                                    pred2 = xg_shots_model.predict_shots_home(home_team, away_team, league)
-                                elif pred_type == 'shots_away':
-                                    pred2 = xg_shots_model.predict_shots_away(home_team, away_team, league)
-                                elif pred_type == 'shots_on_target_total':
-                                    pred2 = xg_shots_model.predict_shots_on_target_total(home_team, away_team, league)
-                                else:
-                                    pred2 = None
-                                
-                                if pred2:
-                                    predictions.append(pred2)
-                                    logger.info(f"🎯 [BACKGROUND] MODELO 2 (XG Shots) agregado para {pred_type}")
-                                
-                            except Exception as e:
-                                logger.error(f"❌ [BACKGROUND] ERROR EN xg_shots_model para {pred_type}: {e}")
-                            
-                            logger.info(f"🎯 [BACKGROUND] TOTAL MODELOS DE REMATES para {pred_type}: {len(predictions)} modelos")
-                            logger.info(f"🎯 [BACKGROUND] PREDICCIONES GENERADAS: {predictions}")
-                        else:
-                            # Obtener predicciones simples para otros mercados
-                            predictions = simple_service.get_all_simple_predictions(home_team, away_team, league, pred_type)
-                            
-                            # Agregar modelo híbrido solo para mercados no-shots
-                            if 'corners' in pred_type:
-                                hybrid_model = ModeloHibridoCorners()
-                                hybrid_prediction = hybrid_model.predecir(home_team, away_team, league, pred_type)
-                                predictions.append(hybrid_prediction)
-                            else:
-                                hybrid_model = ModeloHibridoGeneral()
-                                hybrid_prediction = hybrid_model.predecir(home_team, away_team, league, pred_type)
-                                predictions.append(hybrid_prediction)
-                        
-                        # APLICAR CALIBRACIÓN POR LIGA
-                        calibrated_predictions = []
-                        for pred in predictions:
-                            calibrated_value = league_calibration.calibrate_prediction(
-                                pred['prediction'], pred_type, league.name
-                            )
-                            
-                            # Crear nueva predicción calibrada
-                            calibrated_pred = {
-                                'model_name': pred['model_name'],
-                                'prediction': calibrated_value,
-                                'confidence': pred['confidence'],
-                                'probabilities': pred['probabilities'],
-                                'total_matches': pred['total_matches']
-                            }
-                            calibrated_predictions.append(calibrated_pred)
-                        
-                        # USAR MODELO MEJORADO PARA AMBOS MARCAN
-                        if pred_type == 'both_teams_score':
-                            # Usar modelo mejorado que no requiere entrenamiento
-                            enhanced_prob = enhanced_both_teams_score_model.predict(home_team, away_team, league)
-                            
-                            # Crear predicción con modelo mejorado
-                            enhanced_prediction = {
-                                'model_name': "Enhanced Both Teams Score",
-                                'prediction': enhanced_prob,
-                                'confidence': 0.80,  # Alta confianza para modelo mejorado
-                                'probabilities': {'both_score': enhanced_prob},
-                                'total_matches': 100  # Modelo robusto con múltiples enfoques
-                            }
-                            calibrated_predictions.append(enhanced_prediction)
-                        
-                        # Las predicciones ya están en formato diccionario
-                        predictions_dict = calibrated_predictions
-                        
-                        all_predictions_by_type[pred_type] = predictions_dict
-                        logger.info(f"✅ {pred_type}: {len(predictions_dict)} modelos generados (calibrados)")
-                        
-                    except Exception as e:
-                        logger.error(f"❌ ERROR EN {pred_type}: {e}")
-                        logger.error(f"❌ TRACEBACK:", exc_info=True)
-                        all_predictions_by_type[pred_type] = []
                 
-                logger.info(f"✅ BUCLE DE PREDICCIONES COMPLETADO - Total tipos procesados: {len(all_predictions_by_type)}")
+                # Los tipos se sirven desde la caché o se calculan en paralelo, en el orden de prediction_types
+                all_predictions_by_type = PredictionPipeline().run(
+                    home_team, away_team, league, predict=predict_calibrated_market,
+                    on_progress=update_progress
+                )
+                
+                logger.info(f"✅ PIPELINE DE PREDICCIONES COMPLETADO - Total tipos procesados: {len(all_predictions_by_type)}")
                 logger.info(f"✅ TIPOS PROCESADOS: {list(all_predictions_by_type.keys())}")
                 
                 # AGREGAR PREDICCIÓN OFICIAL (después de todos los otros modelos)
@@ -747,24 +459,17 @@ class TrainingView(View):
             prediction_type = request.POST.get('prediction_type', 'shots_total')
             
             league = League.objects.get(id=league_id)
-            trainer = ModelTrainer()
             
-            # Entrenar modelo optimizado
-            train_result = trainer.train_optimized_model(league, prediction_type)
-            
-            if 'error' in train_result:
-                messages.error(request, f"Error entrenando modelo: {train_result['error']}")
-            else:
-                messages.success(request, 
-                    f"Modelo {train_result['model_name']} entrenado exitosamente para {league.name}. "
-                    f"Score: {train_result['score']:.3f}, "
-                    f"Muestras: {train_result['samples_count']}, "
-                    f"Características: {train_result['features_count']}"
-                )
+            # El entrenamiento lo hace run_training_worker fuera de la petición
+            job = training_job_service.enqueue(league, TRAINER_REGISTRY_KEY, [prediction_type], reason='manual')[0]
+            messages.success(request,
+                f"Entrenamiento de {prediction_type} para {league.name} en cola (trabajo #{job.id}). "
+                f"El modelo se activará cuando el worker de entrenamiento lo termine."
+            )
             
         except Exception as e:
-            logger.error(f"Error entrenando modelo: {e}")
-            messages.error(request, f"Error entrenando modelo: {str(e)}")
+            logger.error(f"Error encolando entrenamiento: {e}")
+            messages.error(request, f"Error encolando entrenamiento: {str(e)}")
         
         return redirect('ai_predictions:training')
 
@@ -850,8 +555,27 @@ class ModelPerformanceView(View):
         # Usar lista vacía para evitar errores de DB
         models = []
         
+        # Validación cruzada de los modelos en todas las ligas (folds en paralelo)
+        comparison = None
+        if request.GET.get('validate'):
+            comparison = ModelValidator().compare_leagues(League.objects.all())
+        
+        # Backtest walk-forward en fecha (modelo proxy, no el ensemble en vivo)
+        backtests = None
+        backtest_type = request.GET.get('backtest')
+        if backtest_type:
+            validator = TemporalValidator()
+            backtests = {
+                league.name: validator.temporal_backtest(league, backtest_type)
+                for league in League.objects.all()
+            }
+        
         context = {
             'models': models,
+            'comparison': comparison,
+            'backtests': backtests,
+            'backtest_type': backtest_type,
+            'backtest_model': WalkForwardBacktest.model_info(),
         }
         return render(request, 'ai_predictions/model_performance.html', context)
 
@@ -872,16 +596,20 @@ class QuickPredictionView(View):
             
             league = League.objects.get(id=league_id)
             
-            advanced_service = AdvancedStatisticalModels()
-            all_predictions = advanced_service.get_all_advanced_predictions(home_team, away_team, league, prediction_type)
-            
-            multi_service = MultiModelPredictionService()
-            backtest_results = multi_service.backtest_models(league, prediction_type)
+            def compute():
+                advanced_service = AdvancedStatisticalModels()
+                multi_service = MultiModelPredictionService()
+                return {
+                    'predictions': advanced_service.get_all_advanced_predictions(home_team, away_team, league, prediction_type),
+                    'backtest_results': multi_service.backtest_models(league, prediction_type),
+                }
             
-            return JsonResponse({
-                'predictions': all_predictions,
-                'backtest_results': backtest_results
-            })
+            # Misma petición con los mismos datos de la liga: se sirve desde la caché
+            result = prediction_cache.get_or_compute(
+                league, home_team, away_team, prediction_type, 'quick_prediction', compute,
+                cacheable=lambda value: not has_fallback(value['predictions'])
+            )
+            return JsonResponse(result)
             
         except Exception as e:
             logger.error(f"Error en predicción rápida: {e}")
@@ -0,0 +1,167 @@
+"""
+Backtest walk-forward en fecha (sin fuga de información)
+
+Carga los partidos de la liga una sola vez (FeatureBuilder sin ventana) y usa
+sus características "as-of": cada fila sólo ve partidos anteriores. Los
+partidos completos se dividen en períodos consecutivos; en cada frontera de
+período se reentrena el modelo con los partidos anteriores y todo el período
+se predice en un único lote.
+
+La predicción combina, con los pesos base de AdvancedEnsemblePredictor, el
+modelo especializado del tipo (SpecializedPredictionModels) y la estimación
+por forma reciente del modelo de características avanzadas (ataque propio y
+defensa rival mezclados con la media de la liga), calculados en fecha.
+
+Es un modelo proxy: el ensemble en vivo no se puede reproducir en fecha, así que
+las métricas del backtest son las de esta mezcla de dos componentes y no las de
+la predicción oficial. Los resultados lo indican con PROXY_MODEL (model_info()).
+"""
+
+import logging
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from sklearn.base import clone
+from sklearn.preprocessing import StandardScaler
+
+from football_data.models import League
+from .feature_builder import FeatureBuilder, TARGET_COLUMNS
+from .specialized_models import SpecializedPredictionModels
+
+logger = logging.getLogger('ai_predictions')
+
+# Tipos evaluables (el resto se evalúa como goals_total, igual que el backtest original)
+BACKTEST_TYPES = ('goals_total', 'goals_home', 'goals_away', 'shots_total', 'shots_home', 'shots_away')
+
+# Columnas que debe tener un partido para entrar en el backtest
+BACKTEST_COLUMNS = ('fthg', 'ftag', 'hs', 'as_field')
+
+# Pesos base del ensemble para el modelo especializado y el de características avanzadas
+ENSEMBLE_WEIGHTS = {'specialized': 0.25, 'form': 0.15}
+
+# Nombre con el que se presentan los resultados del backtest (no es el ensemble en vivo)
+PROXY_MODEL = 'Walk-forward proxy'
+
+# Peso de la media de la liga en la estimación por forma (goles / remates)
+FORM_LEAGUE_WEIGHT = {'goals': 0.2, 'shots': 0.3}
+
+# Partidos de entrenamiento mínimos para ajustar el modelo especializado
+MIN_TRAINING_MATCHES = 30
+
+
+class WalkForwardBacktest:
+    """Backtest por períodos con características en fecha y reentrenamiento en cada frontera"""
+
+    def __init__(self, league: League, prediction_type: str, estimator: str = 'RandomForest',
+                 builder: Optional[FeatureBuilder] = None):
+        self.league = league
+        self.prediction_type = prediction_type if prediction_type in BACKTEST_TYPES else 'goals_total'
+        self.config = SpecializedPredictionModels().get_specialized_model_config(self.prediction_type)
+        self.estimator = self.config['models'][estimator]
+
+        builder = builder or FeatureBuilder(league, window=None)
+        matches = builder.matches
+        features = builder.training_frame()
+        target_columns = list(TARGET_COLUMNS[self.prediction_type])
+        target = matches[target_columns].sum(axis=1, min_count=len(target_columns))
+        complete = (matches[list(BACKTEST_COLUMNS)].notna().all(axis=1) & target.notna()).to_numpy()
+
+        # Posición de cada partido evaluable entre todos los partidos cargados
+        self.rows = np.flatnonzero(complete)
+        self.X = features.to_numpy(dtype=np.float64)[complete]
+        self.y = target.to_numpy(dtype=np.float64)[complete]
+        self.dates = list(matches['date'][complete])
+        self.has_form = (
+            (features['home_form_matches'] > 0) & (features['away_form_matches'] > 0)
+        ).to_numpy()[complete]
+        self.form_predictions = self._form_predictions(features)[complete]
+
+    def __len__(self) -> int:
+        return len(self.y)
+
+    @staticmethod
+    def model_info() -> Dict:
+        """Etiqueta del modelo evaluado, para los resultados y las plantillas"""
+        return {
+            'name': PROXY_MODEL,
+            'components': [
+                {'name': 'Modelo especializado', 'weight': ENSEMBLE_WEIGHTS['specialized']},
+                {'name': 'Forma reciente', 'weight': ENSEMBLE_WEIGHTS['form']},
+            ],
+            'description': (
+                'Mezcla en fecha del modelo especializado y la forma reciente con sus pesos '
+                'base del ensemble; no es la predicción oficial del ensemble en vivo.'
+            ),
+        }
+
+    def _form_predictions(self, features: pd.DataFrame) -> np.ndarray:
+        """Estimación por forma reciente de cada partido (ataque propio y defensa rival)"""
+        stat, side = self.prediction_type.rsplit('_', 1)
+        home = (features[f'home_{stat}_for'] + features[f'away_{stat}_against']) / 2
+        away = (features[f'away_{stat}_for'] + features[f'home_{stat}_against']) / 2
+        league_home, league_away = features[f'league_home_{stat}'], features[f'league_away_{stat}']
+        if side == 'home':
+            expected, league_mean = home, league_home
+        elif side == 'away':
+            expected, league_mean = away, league_away
+        else:
+            expected, league_mean = home + away, league_home + league_away
+        weight = FORM_LEAGUE_WEIGHT[stat]
+        return ((1 - weight) * expected + weight * league_mean).to_numpy(dtype=np.float64)
+
+    def periods(self, test_periods: int) -> Iterator[Tuple[int, int, int]]:
+        """(período, inicio, fin) de cada período de test; todo lo anterior al inicio es entrenamiento"""
+        total = len(self.y)
+        matches_per_period = max(20, total // (test_periods + 2))
+        for period in range(1, test_periods + 1):
+            start = period * matches_per_period
+            end = min(start + matches_per_period, total)
+            if end - start < 10:  # Mínimo de partidos para test
+                continue
+            yield period, start, end
+
+    def predict_period(self, start: int, end: int) -> np.ndarray:
+        """Reentrena con los partidos anteriores a `start` y predice [start, end) en un lote"""
+        return self.predict_rows(np.arange(start), np.arange(start, end))
+
+    def predict_rows(self, train: np.ndarray, test: np.ndarray) -> np.ndarray:
+        """
+        Entrena con los partidos `train` (los que tienen forma previa de ambos
+        equipos) y predice los partidos `test` en un lote. Los índices son
+        posiciones de los partidos evaluables; todos los de `train` deben ser
+        anteriores a los de `test`.
+        """
+        form = self.form_predictions[test]
+        train = train[self.has_form[train]]
+        if len(train) < MIN_TRAINING_MATCHES:
+            return form
+
+        scaler = StandardScaler()
+        model = clone(self.estimator)
+        model.fit(scaler.fit_transform(self.X[train]), self.y[train])
+        specialized = np.clip(model.predict(scaler.transform(self.X[test])), *self.config['target_range'])
+
+        weights = ENSEMBLE_WEIGHTS
+        return (
+            (weights['specialized'] * specialized + weights['form'] * form)
+            / (weights['specialized'] + weights['form'])
+        )
+
+    def run(self, test_periods: int = 10) -> List[Dict]:
+        """Predicciones y valores reales de cada período, en orden cronológico"""
+        results = []
+        for period, start, end in self.periods(test_periods):
+            results.append({
+                'period': period,
+                'start_date': self.dates[start],
+                'end_date': self.dates[end - 1],
+                'train_matches': start,
+                'predictions': self.predict_period(start, end),
+                'actuals': self.y[start:end],
+            })
+        logger.info(
+            f"⏱️ Backtest walk-forward {self.league.name} - {self.prediction_type}: "
+            f"{len(results)} períodos, {sum(len(r['actuals']) for r in results)} partidos"
+        )
+        return results
@@ -9,10 +9,16 @@ para predecir remates totales, locales, visitantes y remates a puerta.
 import logging
 import numpy as np
 from django.db.models import Q, Avg, Count
-from football_data.models import Match, League
+from football_data.models import League
+from .match_context import uses_match_context
+from .team_history import current_team_history
+from .league_stats import league_stats_service
 
 logger = logging.getLogger(__name__)
 
+# Un partido sólo cuenta si tiene remates y remates a puerta de ambos equipos y el resultado
+XG_REQUIRED_STATS = ('shots_for', 'shots_against', 'shots_on_target_for', 'shots_on_target_against', 'goals_for')
+
 class XGShotsModel:
     """
     Modelo Expected Goals (xG) para predicción de remates
@@ -27,6 +33,7 @@ class XGShotsModel:
     def __init__(self):
         self.name = "XG Shots Model"
         
+    @uses_match_context
     def predict_shots_total(self, home_team: str, away_team: str, league: League) -> dict:
         """Predicción de remates totales usando modelo xG"""
         try:
@@ -69,6 +76,7 @@ class XGShotsModel:
             logger.error(f"Error en XG Model shots_total: {e}")
             return self._fallback_prediction('shots_total')
     
+    @uses_match_context
     def predict_shots_home(self, home_team: str, away_team: str, league: League) -> dict:
         """Predicción de remates del equipo local"""
         try:
@@ -113,6 +121,7 @@ class XGShotsModel:
             logger.error(f"Error en XG Model shots_home: {e}")
             return self._fallback_prediction('shots_home')
     
+    @uses_match_context
     def predict_shots_away(self, home_team: str, away_team: str, league: League) -> dict:
         """Predicción de remates del equipo visitante"""
         try:
@@ -157,6 +166,7 @@ class XGShotsModel:
             logger.error(f"Error en XG Model shots_away: {e}")
             return self._fallback_prediction('shots_away')
     
+    @uses_match_context
     def predict_shots_on_target_total(self, home_team: str, away_team: str, league: League) -> dict:
         """Predicción de remates a puerta totales"""
         try:
@@ -210,46 +220,21 @@ class XGShotsModel:
     def _get_team_xg_data(self, team: str, league: League, venue: str) -> dict:
         """Obtener datos de xG para un equipo"""
         try:
-            # Filtrar partidos del equipo
-            if venue == 'home':
-                matches = Match.objects.filter(
-                    home_team=team,
-                    league=league,
-                    hs__isnull=False,
-                    as_field__isnull=False,
-                    hst__isnull=False,
-                    ast__isnull=False
-                ).order_by('-date')[:20]  # Últimos 20 partidos
-            else:
-                matches = Match.objects.filter(
-                    away_team=team,
-                    league=league,
-                    hs__isnull=False,
-                    as_field__isnull=False,
-                    hst__isnull=False,
-                    ast__isnull=False
-                ).order_by('-date')[:20]
-            
-            if not matches.exists():
+            # Últimos 20 partidos del equipo en la sede con remates registrados
+            history = current_team_history().team(
+                league, team, venue, window=20,
+                stats=('shots_for', 'shots_on_target_for', 'goals_for'),
+                required=XG_REQUIRED_STATS
+            )
+            shots_data = history['shots_for']
+            sot_data = history['shots_on_target_for']
+            goals_data = history['goals_for']
+            
+            if not len(shots_data):
                 return self._default_team_data()
             
-            # Calcular estadísticas
-            shots_data = []
-            sot_data = []
-            goals_data = []
-            
-            for match in matches:
-                if venue == 'home':
-                    shots_data.append(match.hs)
-                    sot_data.append(match.hst)
-                    goals_data.append(match.fthg)
-                else:
-                    shots_data.append(match.as_field)
-                    sot_data.append(match.ast)
-                    goals_data.append(match.ftag)
-            
             return {
-                'total_matches': len(matches),
+                'total_matches': len(shots_data),
                 'avg_shots': np.mean(shots_data),
                 'avg_sot': np.mean(sot_data),
                 'avg_goals': np.mean(goals_data),
@@ -327,12 +312,11 @@ class XGShotsModel:
             return 1.0
     
     def _get_league_xg_factor(self, league: League) -> float:
-        """Factor de liga para xG basado en datos reales"""
+        """Factor de liga para xG basado en datos reales (media de remates de la liga)"""
         try:
-            # Sin factores inventados, usar solo datos reales
-            # Por ahora, no aplicar factores de liga hasta tener datos reales
-            # de promedios de shots por liga
-            return 1.0
+            # Sin datos suficientes de la liga no se aplica factor
+            factor = league_stats_service.league_factor(league, 'shots')
+            return 1.0 if factor is None else factor
             
         except Exception as e:
             logger.error(f"Error obteniendo factor de liga: {e}")
@@ -459,7 +443,8 @@ class XGShotsModel:
             'probabilities': {'over_5': 0.5, 'over_10': 0.3},
             'total_matches': 0,
             'method': 'Fallback xG',
-            'error': 'Insufficient data'
+            'error': 'Insufficient data',
+            'fallback': True
         }
 
 # Instancia global del modelo
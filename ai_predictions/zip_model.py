@@ -9,6 +9,7 @@ from typing import Dict, Tuple
 from datetime import timedelta
 from django.utils import timezone
 from football_data.models import Match, League
+from .match_context import uses_match_context
 from .simple_models import get_league_realistic_limits, analyze_team_statistics
 
 logger = logging.getLogger('ai_predictions')
@@ -25,6 +26,7 @@ class ZeroInflatedPoissonModel:
     def __init__(self):
         self.name = "Zero-Inflated Poisson"
     
+    @uses_match_context
     def predict_match(self, home_team: str, away_team: str, league: League,
                      prediction_type: str = 'goals_total') -> Dict:
         """
@@ -16,10 +16,27 @@ from datetime import datetime, timedelta
 
 from django.utils import timezone
 from django.db import models
+from ai_predictions.model_registry import model_registry, ModelArtifact
 from .models import NBATeam, NBAGame
 
 logger = logging.getLogger('basketball_data')
 
+# Ámbitos del registro de modelos (se usa el artefacto más reciente de cada uno)
+RANDOM_FOREST_SCOPE = 'nba/random_forest'
+RIDGE_SCOPE = 'nba/ridge'
+
+RANDOM_FOREST_FEATURES = [
+    'home_avg_points', 'away_avg_points', 'home_recent_points', 'away_recent_points',
+    'home_avg_fg_pct', 'away_avg_fg_pct', 'home_avg_fg3_pct', 'away_avg_fg3_pct',
+    'home_avg_ft_pct', 'away_avg_ft_pct', 'home_points_trend', 'away_points_trend',
+    'home_consistency', 'away_consistency', 'home_home_advantage', 'away_home_advantage',
+]
+RIDGE_FEATURES = [
+    'home_avg_points', 'away_avg_points', 'home_recent_points', 'away_recent_points',
+    'home_avg_fg_pct', 'away_avg_fg_pct', 'home_points_trend', 'away_points_trend',
+    'home_home_advantage',
+]
+
 
 class NBAMultiModelPredictionService:
     """Servicio para predicciones de NBA con múltiples modelos estadísticos"""
@@ -238,8 +255,8 @@ class NBAMultiModelPredictionService:
                 away_features['home_advantage']
             ]
             
-            # Entrenar modelo Random Forest con datos históricos
-            model = self._train_random_forest_model()
+            # Modelo Random Forest guardado (se entrena sólo si todavía no existe)
+            model = self._registered_model(RANDOM_FOREST_SCOPE, self._train_random_forest_model)
             
             if model is None:
                 # Fallback: predicción basada en promedios
@@ -279,8 +296,43 @@ class NBAMultiModelPredictionService:
                 'error': str(e)
             }
     
+    def _registered_model(self, scope: str, train):
+        """
+        Estimador más reciente del registro de modelos; si no hay, lo entrena y guarda.
+        retrain_models() guarda uno nuevo cada vez que se sincronizan partidos.
+        """
+        artifact = model_registry.latest_artifact(scope)
+        if artifact is not None:
+            return artifact.estimator
+        return train()
+    
+    def _save_model(self, scope: str, model, feature_schema: List[str], games):
+        """Guarda en el registro un modelo recién entrenado"""
+        try:
+            game_dates = [game.game_date for game in games]
+            model_registry.save_latest(scope, ModelArtifact(
+                estimator=model,
+                feature_schema=feature_schema,
+                training_window={
+                    'from': min(game_dates).isoformat(),
+                    'to': max(game_dates).isoformat(),
+                    'samples': len(game_dates),
+                },
+            ))
+        except Exception as e:
+            logger.error(f"Error guardando modelo {scope} en el registro: {e}")
+    
+    def retrain_models(self) -> Dict[str, bool]:
+        """Reentrena y guarda los modelos Random Forest y Ridge con los partidos actuales"""
+        results = {
+            'random_forest': self._train_random_forest_model() is not None,
+            'ridge': self._train_ridge_model() is not None,
+        }
+        logger.info(f"🏀 Modelos NBA reentrenados: {results}")
+        return results
+    
     def _train_random_forest_model(self):
-        """Entrena un modelo Random Forest con datos históricos"""
+        """Entrena un modelo Random Forest con datos históricos y lo guarda en el registro"""
         try:
             # Obtener datos históricos para entrenamiento
             cutoff_date = timezone.now().date() - timedelta(days=730)  # 2 años
@@ -339,6 +391,7 @@ class NBAMultiModelPredictionService:
             )
             
             model.fit(X, y)
+            self._save_model(RANDOM_FOREST_SCOPE, model, RANDOM_FOREST_FEATURES, games)
             return model
             
         except Exception as e:
@@ -365,8 +418,8 @@ class NBAMultiModelPredictionService:
                 home_features['home_advantage']
             ]
             
-            # Entrenar modelo Ridge con datos históricos
-            model = self._train_ridge_model()
+            # Modelo Ridge guardado (se entrena sólo si todavía no existe)
+            model = self._registered_model(RIDGE_SCOPE, self._train_ridge_model)
             
             if model is None:
                 # Fallback: predicción basada en promedios con ajuste
@@ -409,7 +462,7 @@ class NBAMultiModelPredictionService:
             }
     
     def _train_ridge_model(self):
-        """Entrena un modelo Ridge con datos históricos"""
+        """Entrena un modelo Ridge con datos históricos y lo guarda en el registro"""
         try:
             # Obtener datos históricos para entrenamiento
             cutoff_date = timezone.now().date() - timedelta(days=730)  # 2 años
@@ -455,6 +508,7 @@ class NBAMultiModelPredictionService:
             # Entrenar modelo
             model = Ridge(alpha=1.0, random_state=42)
             model.fit(X, y)
+            self._save_model(RIDGE_SCOPE, model, RIDGE_FEATURES, games)
             return model
             
         except Exception as e:
@@ -9,6 +9,7 @@ import pandas as pd
 
 from nba_api.stats.endpoints import LeagueGameFinder, BoxScoreTraditionalV2, ScoreboardV2
 from nba_api.stats.static import players, teams
+from django.conf import settings
 from django.db import transaction
 from django.utils import timezone
 
@@ -239,6 +240,13 @@ class NBADataService:
                 continue
         
         print(f"✅ Partidos sincronizados: {created_count} creados, {updated_count} actualizados, {error_count} errores")
+        
+        # Los modelos guardados en el registro sólo ven los partidos con los que se entrenaron
+        if created_count and getattr(settings, 'NBA_RETRAIN_ON_SYNC', True):
+            from .multi_models import nba_multi_model_service
+            print("🧠 Reentrenando modelos NBA con los partidos nuevos...")
+            nba_multi_model_service.retrain_models()
+        
         return {'created': created_count, 'updated': updated_count, 'errors': error_count}
     
     def sync_current_season_games(self) -> Dict[str, int]:
@@ -193,6 +193,90 @@ EXECUTION_INTERVAL = int(os.getenv('EXECUTION_INTERVAL', '10'))
 # Configuración de evaluación de mercados
 MINIMUM_BOOKMAKER_COUNT = int(os.getenv('MINIMUM_BOOKMAKER_COUNT', '3'))
 
+# Pipeline de predicciones (thread, process o sequential)
+PREDICTION_EXECUTOR = os.getenv('PREDICTION_EXECUTOR', 'thread')
+PREDICTION_WORKERS = int(os.getenv('PREDICTION_WORKERS', '11'))
+PREDICTION_TYPE_TIMEOUT = float(os.getenv('PREDICTION_TYPE_TIMEOUT', '30'))
+
+# Caché de predicciones (locmem, file o redis); se invalida con League.data_version
+PREDICTION_CACHE_ENABLED = os.getenv('PREDICTION_CACHE_ENABLED', 'True').lower() == 'true'
+PREDICTION_CACHE_ALIAS = 'predictions'
+PREDICTION_CACHE_BACKEND = os.getenv('PREDICTION_CACHE_BACKEND', 'locmem')
+PREDICTION_CACHE_TTL = int(os.getenv('PREDICTION_CACHE_TTL', '21600'))
+PREDICTION_CACHE_MAX_ENTRIES = int(os.getenv('PREDICTION_CACHE_MAX_ENTRIES', '5000'))
+
+PREDICTION_CACHE_BACKENDS = {
+    # Expulsión LRU al superar MAX_ENTRIES
+    'locmem': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'predictions',
+        'OPTIONS': {'MAX_ENTRIES': PREDICTION_CACHE_MAX_ENTRIES},
+    },
+    # Compartida entre workers de gunicorn en la misma máquina
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.getenv('PREDICTION_CACHE_DIR', str(BASE_DIR / 'cache' / 'predictions')),
+        'OPTIONS': {'MAX_ENTRIES': PREDICTION_CACHE_MAX_ENTRIES},
+    },
+    # Redis local (configurar maxmemory-policy allkeys-lru para la expulsión LRU)
+    'redis': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.getenv('PREDICTION_CACHE_REDIS_URL', 'redis://127.0.0.1:6379/1'),
+    },
+}
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    PREDICTION_CACHE_ALIAS: {
+        **PREDICTION_CACHE_BACKENDS[PREDICTION_CACHE_BACKEND],
+        'TIMEOUT': PREDICTION_CACHE_TTL,
+        'KEY_PREFIX': 'predicta',
+    },
+}
+
+# Ajuste Dixon-Coles por liga (partidos usados, decaimiento temporal por día, mínimo de partidos)
+DIXON_COLES_FIT_ON_IMPORT = os.getenv('DIXON_COLES_FIT_ON_IMPORT', 'True').lower() == 'true'
+DIXON_COLES_FIT_WINDOW = int(os.getenv('DIXON_COLES_FIT_WINDOW', '760'))
+DIXON_COLES_XI = float(os.getenv('DIXON_COLES_XI', '0.0019'))
+DIXON_COLES_MIN_MATCHES = int(os.getenv('DIXON_COLES_MIN_MATCHES', '40'))
+
+# Registro de modelos entrenados (artefactos joblib, caché LRU por proceso, versiones que se conservan)
+MODEL_REGISTRY_DIR = os.getenv('MODEL_REGISTRY_DIR', str(BASE_DIR / 'model_registry'))
+MODEL_REGISTRY_CACHE_SIZE = int(os.getenv('MODEL_REGISTRY_CACHE_SIZE', '32'))
+MODEL_REGISTRY_KEEP = int(os.getenv('MODEL_REGISTRY_KEEP', '3'))
+
+# Cola de importación (run_import_worker): segundos hasta dar un trabajo por abandonado, intentos
+IMPORT_JOB_TIMEOUT = int(os.getenv('IMPORT_JOB_TIMEOUT', '3600'))
+IMPORT_JOB_MAX_ATTEMPTS = int(os.getenv('IMPORT_JOB_MAX_ATTEMPTS', '3'))
+
+# Cola de entrenamiento (run_training_worker): encolar tras importar, segundos hasta dar un trabajo por abandonado, intentos,
+# segundos sin reencolar un trabajo omitido o fallido con los mismos datos
+TRAINING_ENQUEUE_ON_IMPORT = os.getenv('TRAINING_ENQUEUE_ON_IMPORT', 'True').lower() == 'true'
+TRAINING_JOB_TIMEOUT = int(os.getenv('TRAINING_JOB_TIMEOUT', '3600'))
+TRAINING_JOB_MAX_ATTEMPTS = int(os.getenv('TRAINING_JOB_MAX_ATTEMPTS', '3'))
+TRAINING_JOB_RETRY_DELAY = int(os.getenv('TRAINING_JOB_RETRY_DELAY', '21600'))
+
+# Reentrenar los modelos de la NBA (Random Forest y Ridge) al sincronizar partidos nuevos
+NBA_RETRAIN_ON_SYNC = os.getenv('NBA_RETRAIN_ON_SYNC', 'True').lower() == 'true'
+
+# Validación de modelos (process o sequential; 0 procesos = uno por CPU)
+VALIDATION_EXECUTOR = os.getenv('VALIDATION_EXECUTOR', 'process')
+VALIDATION_WORKERS = int(os.getenv('VALIDATION_WORKERS', '0'))
+
+# Ratings online de equipos (actualizar tras importar, paso de aprendizaje, fracción para la otra sede)
+TEAM_RATINGS_UPDATE_ON_IMPORT = os.getenv('TEAM_RATINGS_UPDATE_ON_IMPORT', 'True').lower() == 'true'
+TEAM_RATINGS_LEARNING_RATE = float(os.getenv('TEAM_RATINGS_LEARNING_RATE', '0.02'))
+TEAM_RATINGS_CROSS_RATE = float(os.getenv('TEAM_RATINGS_CROSS_RATE', '0.7'))
+
+# Estadísticas de equipo con decaimiento exponencial (actualizar tras importar, vidas medias en días de corta a larga)
+DECAYED_STATS_UPDATE_ON_IMPORT = os.getenv('DECAYED_STATS_UPDATE_ON_IMPORT', 'True').lower() == 'true'
+DECAYED_STATS_HALF_LIVES = [
+    float(half_life) for half_life in os.getenv('DECAYED_STATS_HALF_LIVES', '21,60,180').split(',')
+    if half_life.strip()
+]
+
 # Configuración de logging
 LOGGING = {
     'version': 1,
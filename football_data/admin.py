@@ -3,7 +3,7 @@ Configuración del admin para football_data
 """
 
 from django.contrib import admin
-from .models import League, Match, ExcelFile
+from .models import League, Match, MatchOdds, ExcelFile, ImportJob, TeamMatchRecord
 
 
 @admin.register(League)
@@ -18,33 +18,20 @@ class LeagueAdmin(admin.ModelAdmin):
             'fields': ('name', 'country', 'season', 'active')
         }),
         ('Metadatos', {
-            'fields': ('created_at', 'updated_at'),
+            'fields': ('data_version', 'created_at', 'updated_at'),
             'classes': ('collapse',)
         }),
     )
     
-    readonly_fields = ['created_at', 'updated_at']
+    readonly_fields = ['data_version', 'model_version', 'created_at', 'updated_at']
 
 
-@admin.register(Match)
-class MatchAdmin(admin.ModelAdmin):
-    list_display = ['home_team', 'away_team', 'league', 'date', 'ftr', 'total_goals_display']
-    list_filter = ['league', 'date', 'ftr', 'league__season']
-    search_fields = ['home_team', 'away_team', 'league__name']
-    ordering = ['-date', 'home_team']
-    date_hierarchy = 'date'
+class MatchOddsInline(admin.StackedInline):
+    model = MatchOdds
+    can_delete = False
+    extra = 0
     
     fieldsets = (
-        ('Información del Partido', {
-            'fields': ('league', 'date', 'time', 'home_team', 'away_team')
-        }),
-        ('Resultados', {
-            'fields': ('fthg', 'ftag', 'ftr', 'hthg', 'htag', 'htr')
-        }),
-        ('Estadísticas', {
-            'fields': ('hs', 'as_field', 'hst', 'ast', 'hf', 'af', 'hc', 'ac', 'hy', 'ay', 'hr', 'ar'),
-            'classes': ('collapse',)
-        }),
         ('Cuotas Bet365', {
             'fields': ('b365h', 'b365d', 'b365a'),
             'classes': ('collapse',)
@@ -83,6 +70,28 @@ class MatchAdmin(admin.ModelAdmin):
                       'maxahh', 'maxaha', 'avgahh', 'avgaha'),
             'classes': ('collapse',)
         }),
+    )
+
+
+@admin.register(Match)
+class MatchAdmin(admin.ModelAdmin):
+    list_display = ['home_team', 'away_team', 'league', 'date', 'ftr', 'total_goals_display']
+    list_filter = ['league', 'date', 'ftr', 'league__season']
+    search_fields = ['home_team', 'away_team', 'league__name']
+    ordering = ['-date', 'home_team']
+    date_hierarchy = 'date'
+    
+    fieldsets = (
+        ('Información del Partido', {
+            'fields': ('league', 'date', 'time', 'home_team', 'away_team')
+        }),
+        ('Resultados', {
+            'fields': ('fthg', 'ftag', 'ftr', 'hthg', 'htag', 'htr')
+        }),
+        ('Estadísticas', {
+            'fields': ('hs', 'as_field', 'hst', 'ast', 'hf', 'af', 'hc', 'ac', 'hy', 'ay', 'hr', 'ar'),
+            'classes': ('collapse',)
+        }),
         ('Metadatos', {
             'fields': ('created_at', 'updated_at'),
             'classes': ('collapse',)
@@ -90,6 +99,7 @@ class MatchAdmin(admin.ModelAdmin):
     )
     
     readonly_fields = ['created_at', 'updated_at']
+    inlines = [MatchOddsInline]
     
     def total_goals_display(self, obj):
         """Mostrar total de goles"""
@@ -112,7 +122,7 @@ class ExcelFileAdmin(admin.ModelAdmin):
             'fields': ('name', 'file', 'file_path', 'league')
         }),
         ('Estadísticas de Importación', {
-            'fields': ('total_rows', 'imported_rows', 'failed_rows', 'file_size')
+            'fields': ('total_rows', 'imported_rows', 'failed_rows', 'file_size', 'content_hash')
         }),
         ('Metadatos', {
             'fields': ('imported_at',),
@@ -120,9 +130,27 @@ class ExcelFileAdmin(admin.ModelAdmin):
         }),
     )
     
-    readonly_fields = ['imported_at', 'file_size']
+    readonly_fields = ['imported_at', 'file_size', 'content_hash']
     
     def success_rate_display(self, obj):
         """Mostrar tasa de éxito"""
         return f"{obj.success_rate:.1f}%"
-    success_rate_display.short_description = "Tasa de Éxito"
\ No newline at end of file
+    success_rate_display.short_description = "Tasa de Éxito"
+
+
+@admin.register(ImportJob)
+class ImportJobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'file_name', 'league_name', 'status', 'rows_processed', 'rows_failed', 'created_at', 'finished_at']
+    list_filter = ['status', 'created_at']
+    search_fields = ['file_name', 'league_name', 'content_hash']
+    ordering = ['-created_at']
+    readonly_fields = ['content_hash', 'created_at', 'started_at', 'finished_at', 'result', 'attempts']
+
+
+@admin.register(TeamMatchRecord)
+class TeamMatchRecordAdmin(admin.ModelAdmin):
+    list_display = ['team', 'opponent', 'venue', 'league', 'date', 'goals_for', 'goals_against']
+    list_filter = ['league', 'venue']
+    search_fields = ['team', 'opponent']
+    ordering = ['-date']
+    raw_id_fields = ['match']
@@ -7,7 +7,7 @@ from django.utils import timezone
 from datetime import datetime, timedelta
 import random
 
-from football_data.models import League, Match
+from football_data.models import League, Match, MatchOdds
 
 
 class Command(BaseCommand):
@@ -130,6 +130,9 @@ class Command(BaseCommand):
                     ay=ay,
                     hr=hr,
                     ar=ar,
+                )
+                MatchOdds.objects.create(
+                    match=match,
                     b365h=b365h,
                     b365d=b365d,
                     b365a=b365a,
@@ -0,0 +1,190 @@
+"""
+Comando para importar en paralelo un directorio (o glob) de archivos de football-data
+"""
+
+import datetime
+import glob
+import os
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+
+from football_data.services import ExcelImportService
+from football_data.signals import deferred_data_changes
+
+DATA_FILE_EXTENSIONS = ('.csv', '.xlsx', '.xlsm', '.xls')
+
+
+def _init_worker():
+    """Inicializa Django en cada proceso worker (necesario con el método spawn)"""
+    import django
+    django.setup()
+
+
+def _prepare_file(file_path, league_name, season, chunk_size):
+    """Lectura y preparación de un archivo en un proceso worker (sin base de datos)"""
+    started = time.perf_counter()
+    prepared = ExcelImportService().prepare_data_file(file_path, league_name, season, chunk_size)
+    prepared['prepare_seconds'] = time.perf_counter() - started
+    return prepared
+
+
+class Command(BaseCommand):
+    help = (
+        'Importa en paralelo todos los archivos de football-data de un directorio o glob. '
+        'La lectura y preparación se hace en un pool de procesos; los archivos de cada '
+        'liga se escriben en orden cronológico y los modelos de la liga se actualizan '
+        'una sola vez al final.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', type=str, help='Directorio o patrón glob (p. ej. "data/*/E0.csv")')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Procesos para leer y preparar archivos (por defecto: núcleos disponibles)')
+        parser.add_argument('--writers', type=int, default=4,
+                            help='Hilos de escritura para bases de datos distintas de SQLite (en SQLite siempre 1)')
+        parser.add_argument('--chunk-size', type=int, default=None,
+                            help='Filas por bloque al leer cada archivo')
+        parser.add_argument('--recursive', action='store_true', help='Buscar archivos en subdirectorios')
+        parser.add_argument('--league', type=str, default=None,
+                            help='Forzar nombre de liga (por defecto se detecta con la columna Div)')
+        parser.add_argument('--season', type=str, default=None, help='Forzar temporada')
+        parser.add_argument('--force', action='store_true',
+                            help='Reimportar también los archivos cuyo contenido no ha cambiado')
+
+    def handle(self, *args, **options):
+        files = self._find_files(options['path'], options['recursive'])
+        if not files:
+            raise CommandError(f"No se encontraron archivos de datos en {options['path']}")
+
+        workers = max(1, options['workers'])
+        writers = 1 if connection.vendor == 'sqlite' else max(1, options['writers'])
+        self.stdout.write(
+            f"📁 {len(files)} archivos | ⚙️  {workers} procesos de preparación | ✍️  {writers} escritor(es)"
+        )
+
+        service = ExcelImportService()
+        results = []
+        started = time.perf_counter()
+
+        def write_league(league_files):
+            # Un solo escritor por liga, con sus archivos del más antiguo al más reciente
+            league_results = []
+            try:
+                for prepared in league_files:
+                    write_started = time.perf_counter()
+                    result = service.import_prepared_file(prepared, force=options['force'])
+                    result.update({
+                        'file': prepared['file_path'],
+                        'rows': prepared['total_rows'],
+                        'prepare_seconds': prepared['prepare_seconds'],
+                        'write_seconds': time.perf_counter() - write_started,
+                    })
+                    league_results.append(result)
+            finally:
+                if writers > 1:
+                    connection.close()
+            return league_results
+
+        # Los archivos idénticos a uno ya importado no se leen ni se preparan
+        if not options['force']:
+            pending = []
+            for path in files:
+                imported_file = service.find_imported_file(service.compute_file_hash(path))
+                if imported_file:
+                    result = service.unchanged_file_result(imported_file)
+                    result.update({'file': path, 'rows': 0, 'prepare_seconds': 0.0, 'write_seconds': 0.0})
+                    results.append(result)
+                    self.stdout.write(f"⏭️  {os.path.basename(path)} sin cambios, se omite")
+                else:
+                    pending.append(path)
+            files = pending
+
+        # No compartir la conexión del proceso padre con los procesos hijos
+        connections.close_all()
+        files_by_league = defaultdict(list)
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+            prepare_futures = {
+                pool.submit(_prepare_file, path, options['league'], options['season'], options['chunk_size']): path
+                for path in files
+            }
+            for future in as_completed(prepare_futures):
+                path = prepare_futures[future]
+                try:
+                    prepared = future.result()
+                except Exception as e:
+                    results.append({'success': False, 'file': path, 'rows': 0, 'error': str(e)})
+                    self.stdout.write(self.style.ERROR(f"❌ {os.path.basename(path)}: {e}"))
+                    continue
+                files_by_league[prepared['league_name']].append(prepared)
+
+        # Cada importación publica una versión de datos de la liga; los receptores
+        # (Dixon-Coles, ratings, estadísticas, entrenamiento) se aplazan hasta el final
+        # y corren una vez por liga, ya con todos sus archivos escritos
+        with deferred_data_changes(), ThreadPoolExecutor(max_workers=writers) as writer_pool:
+            write_futures = [
+                writer_pool.submit(write_league, sorted(
+                    league_files, key=lambda prepared: (prepared['first_date'] or datetime.date.max,
+                                                        prepared['file_path'])
+                ))
+                for league_files in files_by_league.values()
+            ]
+            for future in as_completed(write_futures):
+                for result in future.result():
+                    results.append(result)
+                    name = os.path.basename(result['file'])
+                    if result['success']:
+                        self.stdout.write(
+                            f"✅ {name} → {result['league']}: {result['inserted_count']} nuevos, "
+                            f"{result['updated_count']} actualizados, {result['unchanged_count']} sin cambios, "
+                            f"{result['failed_count']} fallos"
+                        )
+                    else:
+                        self.stdout.write(self.style.ERROR(f"❌ {name}: {result['error']}"))
+            self.stdout.write(f"🔄 Actualizando los modelos de {len(files_by_league)} liga(s)...")
+
+        elapsed = time.perf_counter() - started
+        self._print_summary(results, elapsed)
+
+    def _find_files(self, path, recursive):
+        """Archivos de datos a importar a partir de un directorio o un glob"""
+        if os.path.isdir(path):
+            pattern = os.path.join(path, '**', '*') if recursive else os.path.join(path, '*')
+        else:
+            pattern = path
+        return sorted(
+            file_path for file_path in glob.glob(pattern, recursive=recursive)
+            if os.path.isfile(file_path) and file_path.lower().endswith(DATA_FILE_EXTENSIONS)
+        )
+
+    def _print_summary(self, results, elapsed):
+        """Resumen por archivo y rendimiento global"""
+        total_rows = sum(result['rows'] for result in results)
+        imported = sum(result.get('imported_count', 0) for result in results)
+        failed = sum(result.get('failed_count', 0) for result in results)
+        ok_files = sum(1 for result in results if result['success'])
+
+        self.stdout.write("\n📋 RESUMEN POR ARCHIVO:")
+        for result in sorted(results, key=lambda r: r['file']):
+            name = os.path.basename(result['file'])
+            if result.get('skipped'):
+                self.stdout.write(f"  {name:<30} {result['league']:<25} sin cambios")
+            elif result['success']:
+                self.stdout.write(
+                    f"  {name:<30} {result['league']:<25} filas={result['rows']:<6} "
+                    f"nuevas={result['inserted_count']:<6} actualizadas={result['updated_count']:<6} "
+                    f"sin cambios={result['unchanged_count']:<6} fallos={result['failed_count']:<5} "
+                    f"preparar={result['prepare_seconds']:.2f}s escribir={result['write_seconds']:.2f}s"
+                )
+            else:
+                self.stdout.write(f"  {name:<30} ERROR: {result.get('error')}")
+
+        elapsed = max(elapsed, 1e-9)
+        self.stdout.write(self.style.SUCCESS(
+            f"\n✅ {ok_files}/{len(results)} archivos en {elapsed:.2f}s | "
+            f"{len(results) / elapsed:.2f} archivos/s | {total_rows / elapsed:.0f} filas/s | "
+            f"{imported} partidos importados, {failed} fallos"
+        ))
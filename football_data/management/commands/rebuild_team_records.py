@@ -0,0 +1,35 @@
+"""
+Comando para reconstruir la tabla estrecha de historial por equipo (TeamMatchRecord)
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from football_data.models import League, TeamMatchRecord
+from football_data.services import TeamMatchRecordService
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye TeamMatchRecord a partir de los partidos existentes (una pasada por liga)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--league', type=int, default=None, help='ID de la liga (por defecto todas)')
+
+    def handle(self, *args, **options):
+        service = TeamMatchRecordService()
+        leagues = League.objects.all()
+        if options['league']:
+            leagues = leagues.filter(id=options['league'])
+
+        started = time.perf_counter()
+        total = 0
+        for league in leagues:
+            written = service.rebuild(league)
+            total += written
+            self.stdout.write(f"  ⚽ {league.name}: {written} registros")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {total} registros escritos en {time.perf_counter() - started:.2f}s "
+            f"({TeamMatchRecord.objects.count()} en total)"
+        ))
@@ -0,0 +1,43 @@
+"""
+Worker que procesa los trabajos de importación en cola (ImportJob)
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from football_data.services import ImportJobService
+
+
+class Command(BaseCommand):
+    help = 'Procesa en segundo plano los archivos subidos desde la vista de importación'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true',
+                            help='Procesar los trabajos pendientes y terminar')
+        parser.add_argument('--sleep', type=float, default=2.0,
+                            help='Segundos de espera cuando no hay trabajos pendientes')
+
+    def handle(self, *args, **options):
+        service = ImportJobService()
+        self.stdout.write(self.style.SUCCESS('🚀 Worker de importación iniciado'))
+
+        try:
+            while True:
+                job = service.claim_next_job()
+                if job is None:
+                    if options['once']:
+                        break
+                    time.sleep(options['sleep'])
+                    continue
+
+                self.stdout.write(f"📥 Trabajo #{job.id}: {job.file_name}")
+                job = service.run_job(job)
+                if job.status == 'completed':
+                    self.stdout.write(self.style.SUCCESS(
+                        f"✅ Trabajo #{job.id}: {job.rows_imported} filas importadas, {job.rows_failed} fallos"
+                    ))
+                else:
+                    self.stdout.write(self.style.ERROR(f"❌ Trabajo #{job.id}: {job.error}"))
+        except KeyboardInterrupt:
+            self.stdout.write('🛑 Worker detenido')
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-18 05:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('football_data', '0004_match_both_teams_score_match_corners_1h_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='excelfile',
+            name='content_hash',
+            field=models.CharField(blank=True, db_index=True, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='match',
+            name='row_hash',
+            field=models.CharField(blank=True, default='', max_length=16, verbose_name='Row Fingerprint'),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.6 on 2026-10-18 06:02
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('football_data', '0006_importjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TeamMatchRecord',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('team', models.CharField(max_length=100)),
+                ('opponent', models.CharField(max_length=100)),
+                ('venue', models.CharField(choices=[('H', 'Local'), ('A', 'Visitante')], max_length=1)),
+                ('date', models.DateField()),
+                ('goals_for', models.IntegerField(blank=True, null=True)),
+                ('goals_against', models.IntegerField(blank=True, null=True)),
+                ('shots_for', models.IntegerField(blank=True, null=True)),
+                ('shots_against', models.IntegerField(blank=True, null=True)),
+                ('shots_on_target_for', models.IntegerField(blank=True, null=True)),
+                ('shots_on_target_against', models.IntegerField(blank=True, null=True)),
+                ('corners_for', models.IntegerField(blank=True, null=True)),
+                ('corners_against', models.IntegerField(blank=True, null=True)),
+                ('yellow_cards_for', models.IntegerField(blank=True, null=True)),
+                ('yellow_cards_against', models.IntegerField(blank=True, null=True)),
+                ('red_cards_for', models.IntegerField(blank=True, null=True)),
+                ('red_cards_against', models.IntegerField(blank=True, null=True)),
+                ('league', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='team_records', to='football_data.league')),
+                ('match', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='team_records', to='football_data.match')),
+            ],
+            options={
+                'verbose_name': 'Registro de Equipo por Partido',
+                'verbose_name_plural': 'Registros de Equipo por Partido',
+                'ordering': ['-date'],
+                'indexes': [models.Index(fields=['league', 'team', 'date'], name='teamrecord_league_team_date')],
+                'unique_together': {('match', 'venue')},
+            },
+        ),
+    ]
@@ -0,0 +1,649 @@
+# Generated by Django 5.2.6 on 2026-10-18 06:02
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+BATCH_SIZE = 1000
+
+
+def _odds_field_names(MatchOdds):
+    return [field.name for field in MatchOdds._meta.concrete_fields if isinstance(field, models.DecimalField)]
+
+
+def copy_odds_to_matchodds(apps, schema_editor):
+    """Copia las cuotas de Match a MatchOdds (solo partidos con alguna cuota)"""
+    Match = apps.get_model('football_data', 'Match')
+    MatchOdds = apps.get_model('football_data', 'MatchOdds')
+    fields = _odds_field_names(MatchOdds)
+    
+    any_odds = models.Q()
+    for field in fields:
+        any_odds |= models.Q(**{f'{field}__isnull': False})
+    
+    batch = []
+    for row in Match.objects.filter(any_odds).values('id', *fields).iterator(chunk_size=BATCH_SIZE):
+        match_id = row.pop('id')
+        batch.append(MatchOdds(match_id=match_id, **row))
+        if len(batch) >= BATCH_SIZE:
+            MatchOdds.objects.bulk_create(batch)
+            batch = []
+    if batch:
+        MatchOdds.objects.bulk_create(batch)
+
+
+def copy_matchodds_to_match(apps, schema_editor):
+    """Operación inversa: devuelve las cuotas a las columnas de Match"""
+    Match = apps.get_model('football_data', 'Match')
+    MatchOdds = apps.get_model('football_data', 'MatchOdds')
+    fields = _odds_field_names(MatchOdds)
+    
+    for row in MatchOdds.objects.values('match_id', *fields).iterator(chunk_size=BATCH_SIZE):
+        match_id = row.pop('match_id')
+        Match.objects.filter(id=match_id).update(**row)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('football_data', '0007_teammatchrecord'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MatchOdds',
+            fields=[
+                ('match', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='odds', serialize=False, to='football_data.match')),
+                ('b365h', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='Bet365 Home')),
+                ('b365d', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='Bet365 Draw')),
+                ('b365a', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='Bet365 Away')),
+                ('bfdh', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='BFD Home')),
+                ('bfdd', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='BFD Draw')),
+                ('bfda', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='BFD Away')),
+                ('bmgmh', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='BMGM Home')),
+                ('bmgmd', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='BMGM Draw')),
+                ('bmgma', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='BMGM Away')),
+                ('bvh', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='BV Home')),
+                ('bvd', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='BV Draw')),
+                ('bva', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='BV Away')),
+                ('clh', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='CL Home')),
+                ('cld', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='CL Draw')),
+                ('cla', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='CL Away')),
+                ('lbh', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='LB Home')),
+                ('lbd', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='LB Draw')),
+                ('lba', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='LB Away')),
+                ('bfeh', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='BFE Home')),
+                ('bfed', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='BFE Draw')),
+                ('bfea', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='BFE Away')),
+                ('bwh', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='Blue Square Home')),
+                ('bwd', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='Blue Square Draw')),
+                ('bwa', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='Blue Square Away')),
+                ('iwh', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='Interwetten Home')),
+                ('iwd', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='Interwetten Draw')),
+                ('iwa', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='Interwetten Away')),
+                ('psh', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='Pinnacle Home')),
+                ('psd', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='Pinnacle Draw')),
+                ('psa', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='Pinnacle Away')),
+                ('whh', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='William Hill Home')),
+                ('whd', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='William Hill Draw')),
+                ('wha', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='William Hill Away')),
+                ('vch', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='VC Bet Home')),
+                ('vcd', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='VC Bet Draw')),
+                ('vca', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='VC Bet Away')),
+                ('maxh', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='Max Home')),
+                ('maxd', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='Max Draw')),
+                ('maxa', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='Max Away')),
+                ('avgh', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='Avg Home')),
+                ('avgd', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='Avg Draw')),
+                ('avga', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='Avg Away')),
+                ('b365_over_25', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='Bet365 Over 2.5')),
+                ('b365_under_25', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='Bet365 Under 2.5')),
+                ('p_over_25', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='Pinnacle Over 2.5')),
+                ('p_under_25', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='Pinnacle Under 2.5')),
+                ('max_over_25', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='Max Over 2.5')),
+                ('max_under_25', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='Max Under 2.5')),
+                ('avg_over_25', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='Avg Over 2.5')),
+                ('avg_under_25', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='Avg Under 2.5')),
+                ('bfe_over_25', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='BFE Over 2.5')),
+                ('bfe_under_25', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='BFE Under 2.5')),
+                ('ahh', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='Asian Handicap Home')),
+                ('b365ahh', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='Bet365 AH Home')),
+                ('b365aha', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='Bet365 AH Away')),
+                ('pahh', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='Pinnacle AH Home')),
+                ('paha', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='Pinnacle AH Away')),
+                ('maxahh', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='Max AH Home')),
+                ('maxaha', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='Max AH Away')),
+                ('avgahh', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='Avg AH Home')),
+                ('avgaha', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='Avg AH Away')),
+                ('bfeahh', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='BFE AH Home')),
+                ('bfeaha', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='BFE AH Away')),
+                ('b365ch', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='Bet365 Corners Home')),
+                ('b365cd', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='Bet365 Corners Draw')),
+                ('b365ca', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='Bet365 Corners Away')),
+                ('bfdch', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='BFD Corners Home')),
+                ('bfdcd', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='BFD Corners Draw')),
+                ('bfdca', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='BFD Corners Away')),
+                ('bmgmch', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='BMGM Corners Home')),
+                ('bmgmcd', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='BMGM Corners Draw')),
+                ('bmgmca', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='BMGM Corners Away')),
+                ('bvch', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='BV Corners Home')),
+                ('bvcd', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='BV Corners Draw')),
+                ('bvca', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='BV Corners Away')),
+                ('bwch', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='BW Corners Home')),
+                ('bwcd', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='BW Corners Draw')),
+                ('bwca', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='BW Corners Away')),
+                ('clch', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='CL Corners Home')),
+                ('clcd', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='CL Corners Draw')),
+                ('clca', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='CL Corners Away')),
+                ('lbch', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='LB Corners Home')),
+                ('lbcd', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='LB Corners Draw')),
+                ('lbca', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='LB Corners Away')),
+                ('psch', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='PS Corners Home')),
+                ('pscd', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='PS Corners Draw')),
+                ('psca', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='PS Corners Away')),
+                ('maxch', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='Max Corners Home')),
+                ('maxcd', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='Max Corners Draw')),
+                ('maxca', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='Max Corners Away')),
+                ('avgch', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='Avg Corners Home')),
+                ('avgcd', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='Avg Corners Draw')),
+                ('avgca', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='Avg Corners Away')),
+                ('bfech', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='BFE Corners Home')),
+                ('bfecd', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='BFE Corners Draw')),
+                ('bfeca', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='BFE Corners Away')),
+                ('b365c_over_25', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='Bet365 Corners Over 2.5')),
+                ('b365c_under_25', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='Bet365 Corners Under 2.5')),
+                ('pc_over_25', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='PS Corners Over 2.5')),
+                ('pc_under_25', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='PS Corners Under 2.5')),
+                ('maxc_over_25', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='Max Corners Over 2.5')),
+                ('maxc_under_25', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='Max Corners Under 2.5')),
+                ('avgc_over_25', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='Avg Corners Over 2.5')),
+                ('avgc_under_25', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='Avg Corners Under 2.5')),
+                ('bfec_over_25', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='BFE Corners Over 2.5')),
+                ('bfec_under_25', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='BFE Corners Under 2.5')),
+                ('ahch', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='Asian Handicap Corners')),
+                ('b365cahh', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='Bet365 AH Corners Home')),
+                ('b365caha', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='Bet365 AH Corners Away')),
+                ('pcahh', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='PS AH Corners Home')),
+                ('pcaha', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='PS AH Corners Away')),
+                ('maxcahh', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='Max AH Corners Home')),
+                ('maxcaha', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='Max AH Corners Away')),
+                ('avgcahh', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='Avg AH Corners Home')),
+                ('avgcaha', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='Avg AH Corners Away')),
+                ('bfecahh', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='BFE AH Corners Home')),
+                ('bfecaha', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='BFE AH Corners Away')),
+            ],
+            options={
+                'verbose_name': 'Cuotas del Partido',
+                'verbose_name_plural': 'Cuotas de Partidos',
+            },
+        ),
+        migrations.RunPython(copy_odds_to_matchodds, copy_matchodds_to_match),
+        migrations.RemoveField(
+            model_name='match',
+            name='ahch',
+        ),
+        migrations.RemoveField(
+            model_name='match',
+            name='ahh',
+        ),
+        migrations.RemoveField(
+            model_name='match',
+            name='avg_over_25',
+        ),
+        migrations.RemoveField(
+            model_name='match',
+            name='avg_under_25',
+        ),
+        migrations.RemoveField(
+            model_name='match',
+            name='avga',
+        ),
+        migrations.RemoveField(
+            model_name='match',
+            name='avgaha',
+        ),
+        migrations.RemoveField(
+            model_name='match',
+            name='avgahh',
+        ),
+        migrations.RemoveField(
+            model_name='match',
+            name='avgc_over_25',
+        ),
+        migrations.RemoveField(
+            model_name='match',
+            name='avgc_under_25',
+        ),
+        migrations.RemoveField(
+            model_name='match',
+            name='avgca',
+        ),
+        migrations.RemoveField(
+            model_name='match',
+            name='avgcaha',
+        ),
+        migrations.RemoveField(
+            model_name='match',
+            name='avgcahh',
+        ),
+        migrations.RemoveField(
+            model_name='match',
+            name='avgcd',
+        ),
+        migrations.RemoveField(
+            model_name='match',
+            name='avgch',
+        ),
+        migrations.RemoveField(
+            model_name='match',
+            name='avgd',
+        ),
+        migrations.RemoveField(
+            model_name='match',
+            name='avgh',
+        ),
+        migrations.RemoveField(
+            model_name='match',
+            name='b365_over_25',
+        ),
+        migrations.RemoveField(
+            model_name='match',
+            name='b365_under_25',
+        ),
+        migrations.RemoveField(
+            model_name='match',
+            name='b365a',
+        ),
+        migrations.RemoveField(
+            model_name='match',
+            name='b365aha',
+        ),
+        migrations.RemoveField(
+            model_name='match',
+            name='b365ahh',
+        ),
+        migrations.RemoveField(
+            model_name='match',
+            name='b365c_over_25',
+        ),
+        migrations.RemoveField(
+            model_name='match',
+            name='b365c_under_25',
+        ),
+        migrations.RemoveField(
+            model_name='match',
+            name='b365ca',
+        ),
+        migrations.RemoveField(
+            model_name='match',
+            name='b365caha',
+        ),
+        migrations.RemoveField(
+            model_name='match',
+            name='b365cahh',
+        ),
+        migrations.RemoveField(
+            model_name='match',
+            name='b365cd',
+        ),
+        migrations.RemoveField(
+            model_name='match',
+            name='b365ch',
+        ),
+        migrations.RemoveField(
+            model_name='match',
+            name='b365d',
+        ),
+        migrations.RemoveField(
+            model_name='match',
+            name='b365h',
+        ),
+        migrations.RemoveField(
+            model_name='match',
+            name='bfda',
+        ),
+        migrations.RemoveField(
+            model_name='match',
+            name='bfdca',
+        ),
+        migrations.RemoveField(
+            model_name='match',
+            name='bfdcd',
+        ),
+        migrations.RemoveField(
+            model_name='match',
+            name='bfdch',
+        ),
+        migrations.RemoveField(
+            model_name='match',
+            name='bfdd',
+        ),
+        migrations.RemoveField(
+            model_name='match',
+            name='bfdh',
+        ),
+        migrations.RemoveField(
+            model_name='match',
+            name='bfe_over_25',
+        ),
+        migrations.RemoveField(
+            model_name='match',
+            name='bfe_under_25',
+        ),
+        migrations.RemoveField(
+            model_name='match',
+            name='bfea',
+        ),
+        migrations.RemoveField(
+            model_name='match',
+            name='bfeaha',
+        ),
+        migrations.RemoveField(
+            model_name='match',
+            name='bfeahh',
+        ),
+        migrations.RemoveField(
+            model_name='match',
+            name='bfec_over_25',
+        ),
+        migrations.RemoveField(
+            model_name='match',
+            name='bfec_under_25',
+        ),
+        migrations.RemoveField(
+            model_name='match',
+            name='bfeca',
+        ),
+        migrations.RemoveField(
+            model_name='match',
+            name='bfecaha',
+        ),
+        migrations.RemoveField(
+            model_name='match',
+            name='bfecahh',
+        ),
+        migrations.RemoveField(
+            model_name='match',
+            name='bfecd',
+        ),
+        migrations.RemoveField(
+            model_name='match',
+            name='bfech',
+        ),
+        migrations.RemoveField(
+            model_name='match',
+            name='bfed',
+        ),
+        migrations.RemoveField(
+            model_name='match',
+            name='bfeh',
+        ),
+        migrations.RemoveField(
+            model_name='match',
+            name='bmgma',
+        ),
+        migrations.RemoveField(
+            model_name='match',
+            name='bmgmca',
+        ),
+        migrations.RemoveField(
+            model_name='match',
+            name='bmgmcd',
+        ),
+        migrations.RemoveField(
+            model_name='match',
+            name='bmgmch',
+        ),
+        migrations.RemoveField(
+            model_name='match',
+            name='bmgmd',
+        ),
+        migrations.RemoveField(
+            model_name='match',
+            name='bmgmh',
+        ),
+        migrations.RemoveField(
+            model_name='match',
+            name='bva',
+        ),
+        migrations.RemoveField(
+            model_name='match',
+            name='bvca',
+        ),
+        migrations.RemoveField(
+            model_name='match',
+            name='bvcd',
+        ),
+        migrations.RemoveField(
+            model_name='match',
+            name='bvch',
+        ),
+        migrations.RemoveField(
+            model_name='match',
+            name='bvd',
+        ),
+        migrations.RemoveField(
+            model_name='match',
+            name='bvh',
+        ),
+        migrations.RemoveField(
+            model_name='match',
+            name='bwa',
+        ),
+        migrations.RemoveField(
+            model_name='match',
+            name='bwca',
+        ),
+        migrations.RemoveField(
+            model_name='match',
+            name='bwcd',
+        ),
+        migrations.RemoveField(
+            model_name='match',
+            name='bwch',
+        ),
+        migrations.RemoveField(
+            model_name='match',
+            name='bwd',
+        ),
+        migrations.RemoveField(
+            model_name='match',
+            name='bwh',
+        ),
+        migrations.RemoveField(
+            model_name='match',
+            name='cla',
+        ),
+        migrations.RemoveField(
+            model_name='match',
+            name='clca',
+        ),
+        migrations.RemoveField(
+            model_name='match',
+            name='clcd',
+        ),
+        migrations.RemoveField(
+            model_name='match',
+            name='clch',
+        ),
+        migrations.RemoveField(
+            model_name='match',
+            name='cld',
+        ),
+        migrations.RemoveField(
+            model_name='match',
+            name='clh',
+        ),
+        migrations.RemoveField(
+            model_name='match',
+            name='iwa',
+        ),
+        migrations.RemoveField(
+            model_name='match',
+            name='iwd',
+        ),
+        migrations.RemoveField(
+            model_name='match',
+            name='iwh',
+        ),
+        migrations.RemoveField(
+            model_name='match',
+            name='lba',
+        ),
+        migrations.RemoveField(
+            model_name='match',
+            name='lbca',
+        ),
+        migrations.RemoveField(
+            model_name='match',
+            name='lbcd',
+        ),
+        migrations.RemoveField(
+            model_name='match',
+            name='lbch',
+        ),
+        migrations.RemoveField(
+            model_name='match',
+            name='lbd',
+        ),
+        migrations.RemoveField(
+            model_name='match',
+            name='lbh',
+        ),
+        migrations.RemoveField(
+            model_name='match',
+            name='max_over_25',
+        ),
+        migrations.RemoveField(
+            model_name='match',
+            name='max_under_25',
+        ),
+        migrations.RemoveField(
+            model_name='match',
+            name='maxa',
+        ),
+        migrations.RemoveField(
+            model_name='match',
+            name='maxaha',
+        ),
+        migrations.RemoveField(
+            model_name='match',
+            name='maxahh',
+        ),
+        migrations.RemoveField(
+            model_name='match',
+            name='maxc_over_25',
+        ),
+        migrations.RemoveField(
+            model_name='match',
+            name='maxc_under_25',
+        ),
+        migrations.RemoveField(
+            model_name='match',
+            name='maxca',
+        ),
+        migrations.RemoveField(
+            model_name='match',
+            name='maxcaha',
+        ),
+        migrations.RemoveField(
+            model_name='match',
+            name='maxcahh',
+        ),
+        migrations.RemoveField(
+            model_name='match',
+            name='maxcd',
+        ),
+        migrations.RemoveField(
+            model_name='match',
+            name='maxch',
+        ),
+        migrations.RemoveField(
+            model_name='match',
+            name='maxd',
+        ),
+        migrations.RemoveField(
+            model_name='match',
+            name='maxh',
+        ),
+        migrations.RemoveField(
+            model_name='match',
+            name='p_over_25',
+        ),
+        migrations.RemoveField(
+            model_name='match',
+            name='p_under_25',
+        ),
+        migrations.RemoveField(
+            model_name='match',
+            name='paha',
+        ),
+        migrations.RemoveField(
+            model_name='match',
+            name='pahh',
+        ),
+        migrations.RemoveField(
+            model_name='match',
+            name='pc_over_25',
+        ),
+        migrations.RemoveField(
+            model_name='match',
+            name='pc_under_25',
+        ),
+        migrations.RemoveField(
+            model_name='match',
+            name='pcaha',
+        ),
+        migrations.RemoveField(
+            model_name='match',
+            name='pcahh',
+        ),
+        migrations.RemoveField(
+            model_name='match',
+            name='psa',
+        ),
+        migrations.RemoveField(
+            model_name='match',
+            name='psca',
+        ),
+        migrations.RemoveField(
+            model_name='match',
+            name='pscd',
+        ),
+        migrations.RemoveField(
+            model_name='match',
+            name='psch',
+        ),
+        migrations.RemoveField(
+            model_name='match',
+            name='psd',
+        ),
+        migrations.RemoveField(
+            model_name='match',
+            name='psh',
+        ),
+        migrations.RemoveField(
+            model_name='match',
+            name='vca',
+        ),
+        migrations.RemoveField(
+            model_name='match',
+            name='vcd',
+        ),
+        migrations.RemoveField(
+            model_name='match',
+            name='vch',
+        ),
+        migrations.RemoveField(
+            model_name='match',
+            name='wha',
+        ),
+        migrations.RemoveField(
+            model_name='match',
+            name='whd',
+        ),
+        migrations.RemoveField(
+            model_name='match',
+            name='whh',
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-18 06:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('football_data', '0008_matchodds'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='league',
+            name='data_version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
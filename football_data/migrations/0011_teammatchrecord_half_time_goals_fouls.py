@@ -0,0 +1,83 @@
+# Generated by Django 5.2.6 on 2026-10-18 07:21
+
+from django.db import migrations, models
+
+
+BATCH_SIZE = 1000
+
+# Campo de TeamMatchRecord -> (campo de Match del local, campo de Match del visitante)
+STAT_FIELDS = {
+    'goals': ('fthg', 'ftag'),
+    'half_time_goals': ('hthg', 'htag'),
+    'shots': ('hs', 'as_field'),
+    'shots_on_target': ('hst', 'ast'),
+    'corners': ('hc', 'ac'),
+    'fouls': ('hf', 'af'),
+    'yellow_cards': ('hy', 'ay'),
+    'red_cards': ('hr', 'ar'),
+}
+
+
+def rebuild_team_records(apps, schema_editor):
+    """
+    Reconstruye TeamMatchRecord con las columnas nuevas. El historial de equipos
+    pasa a leerse de esta tabla, así que también se crean los registros de los
+    partidos importados antes de que existiera.
+    """
+    Match = apps.get_model('football_data', 'Match')
+    TeamMatchRecord = apps.get_model('football_data', 'TeamMatchRecord')
+    TeamMatchRecord.objects.all().delete()
+    
+    match_fields = ['id', 'league_id', 'date', 'home_team', 'away_team']
+    for home_field, away_field in STAT_FIELDS.values():
+        match_fields += [home_field, away_field]
+    
+    batch = []
+    for row in Match.objects.order_by('pk').values(*match_fields).iterator(chunk_size=BATCH_SIZE):
+        for venue, team, opponent in (('H', row['home_team'], row['away_team']),
+                                      ('A', row['away_team'], row['home_team'])):
+            record = TeamMatchRecord(
+                league_id=row['league_id'], match_id=row['id'], team=team, opponent=opponent,
+                venue=venue, date=row['date'],
+            )
+            for stat, (home_field, away_field) in STAT_FIELDS.items():
+                own, other = (home_field, away_field) if venue == 'H' else (away_field, home_field)
+                setattr(record, f'{stat}_for', row[own])
+                setattr(record, f'{stat}_against', row[other])
+            batch.append(record)
+        if len(batch) >= BATCH_SIZE:
+            TeamMatchRecord.objects.bulk_create(batch)
+            batch = []
+    if batch:
+        TeamMatchRecord.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('football_data', '0010_importjob_attempts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='teammatchrecord',
+            name='fouls_against',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='teammatchrecord',
+            name='fouls_for',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='teammatchrecord',
+            name='half_time_goals_against',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='teammatchrecord',
+            name='half_time_goals_for',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.RunPython(rebuild_team_records, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-18 07:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('football_data', '0011_teammatchrecord_half_time_goals_fouls'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='league',
+            name='model_version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -2,9 +2,12 @@
 Modelos para datos históricos de fútbol
 """
 
+from django.conf import settings
 from django.db import models
 from django.utils import timezone
 
+from .signals import send_league_data_changed
+
 
 class League(models.Model):
     """Modelo para ligas/divisiones"""
@@ -12,6 +15,10 @@ class League(models.Model):
     country = models.CharField(max_length=50, blank=True)
     season = models.CharField(max_length=20, blank=True)
     active = models.BooleanField(default=True)
+    # Se incrementa cada vez que cambian los partidos de la liga (invalida cachés y modelos)
+    data_version = models.PositiveIntegerField(default=0)
+    # Se incrementa cada vez que se promueve un modelo o agregado de la liga (invalida la caché de predicciones)
+    model_version = models.PositiveIntegerField(default=0)
     
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -23,6 +30,19 @@ class League(models.Model):
     
     def __str__(self):
         return f"{self.name} {self.season}"
+    
+    def bump_data_version(self):
+        """Registra que los partidos de la liga cambiaron y avisa con league_data_changed"""
+        League.objects.filter(pk=self.pk).update(data_version=models.F('data_version') + 1)
+        self.refresh_from_db(fields=['data_version'])
+        send_league_data_changed(self)
+        return self.data_version
+    
+    def bump_model_version(self):
+        """Registra que cambió un modelo ajustado de la liga (Dixon-Coles, registro, ratings...)"""
+        League.objects.filter(pk=self.pk).update(model_version=models.F('model_version') + 1)
+        self.refresh_from_db(fields=['model_version'])
+        return self.model_version
 
 
 class Match(models.Model):
@@ -73,6 +93,87 @@ class Match(models.Model):
     # Ambos marcan
     both_teams_score = models.BooleanField(null=True, blank=True, verbose_name="Both Teams Score")
     
+    # Huella de los valores importados (para detectar filas sin cambios al reimportar)
+    row_hash = models.CharField(max_length=16, blank=True, default='', verbose_name="Row Fingerprint")
+    
+    # Metadatos
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = "Partido"
+        verbose_name_plural = "Partidos"
+        ordering = ['-date', 'home_team']
+        unique_together = ['league', 'date', 'home_team', 'away_team']
+    
+    def __str__(self):
+        return f"{self.home_team} vs {self.away_team} ({self.date})"
+    
+    @property
+    def total_goals(self):
+        """Total de goles en el partido"""
+        if self.fthg is not None and self.ftag is not None:
+            return self.fthg + self.ftag
+        return None
+    
+    @property
+    def is_over_25(self):
+        """¿Fue Over 2.5 goles?"""
+        total = self.total_goals
+        return total > 2.5 if total is not None else None
+    
+    @property
+    def total_corners(self):
+        """Total de corners en el partido"""
+        if self.hc is not None and self.ac is not None:
+            return self.hc + self.ac
+        return None
+    
+    @property
+    def is_both_teams_score(self):
+        """¿Ambos equipos marcaron?"""
+        if self.fthg is not None and self.ftag is not None:
+            return self.fthg > 0 and self.ftag > 0
+        return None
+    
+    def get_odds(self):
+        """Cuotas de casas de apuestas del partido (MatchOdds) o None si no tiene"""
+        try:
+            return self.odds
+        except MatchOdds.DoesNotExist:
+            return None
+    
+    @property
+    def best_home_odds(self):
+        """Mejor cuota para el equipo local"""
+        odds = [self.b365h, self.bwh, self.iwh, self.psh, self.whh, self.vch]
+        valid_odds = [odd for odd in odds if odd is not None]
+        return max(valid_odds) if valid_odds else None
+    
+    @property
+    def best_draw_odds(self):
+        """Mejor cuota para el empate"""
+        odds = [self.b365d, self.bwd, self.iwd, self.psd, self.whd, self.vcd]
+        valid_odds = [odd for odd in odds if odd is not None]
+        return max(valid_odds) if valid_odds else None
+    
+    @property
+    def best_away_odds(self):
+        """Mejor cuota para el equipo visitante"""
+        odds = [self.b365a, self.bwa, self.iwa, self.psa, self.wha, self.vca]
+        valid_odds = [odd for odd in odds if odd is not None]
+        return max(valid_odds) if valid_odds else None
+
+
+class MatchOdds(models.Model):
+    """
+    Cuotas de casas de apuestas de un partido. Están separadas de Match para que las
+    consultas de historial (que solo leen resultados y estadísticas) no traigan ni
+    conviertan a Decimal las ~120 columnas de cuotas. Desde Match se leen con
+    match.b365h, match.best_home_odds, etc.
+    """
+    match = models.OneToOneField(Match, on_delete=models.CASCADE, primary_key=True, related_name='odds')
+    
     # Cuotas Bet365
     b365h = models.DecimalField(max_digits=10, decimal_places=3, null=True, blank=True, verbose_name="Bet365 Home")
     b365d = models.DecimalField(max_digits=10, decimal_places=3, null=True, blank=True, verbose_name="Bet365 Draw")
@@ -231,66 +332,32 @@ class Match(models.Model):
     bfecahh = models.DecimalField(max_digits=10, decimal_places=3, null=True, blank=True, verbose_name="BFE AH Corners Home")
     bfecaha = models.DecimalField(max_digits=10, decimal_places=3, null=True, blank=True, verbose_name="BFE AH Corners Away")
     
-    # Metadatos
-    created_at = models.DateTimeField(auto_now_add=True)
-    updated_at = models.DateTimeField(auto_now=True)
-    
     class Meta:
-        verbose_name = "Partido"
-        verbose_name_plural = "Partidos"
-        ordering = ['-date', 'home_team']
-        unique_together = ['league', 'date', 'home_team', 'away_team']
+        verbose_name = "Cuotas del Partido"
+        verbose_name_plural = "Cuotas de Partidos"
     
     def __str__(self):
-        return f"{self.home_team} vs {self.away_team} ({self.date})"
-    
-    @property
-    def total_goals(self):
-        """Total de goles en el partido"""
-        if self.fthg is not None and self.ftag is not None:
-            return self.fthg + self.ftag
-        return None
-    
-    @property
-    def is_over_25(self):
-        """¿Fue Over 2.5 goles?"""
-        total = self.total_goals
-        return total > 2.5 if total is not None else None
-    
-    @property
-    def total_corners(self):
-        """Total de corners en el partido"""
-        if self.hc is not None and self.ac is not None:
-            return self.hc + self.ac
-        return None
-    
-    @property
-    def is_both_teams_score(self):
-        """¿Ambos equipos marcaron?"""
-        if self.fthg is not None and self.ftag is not None:
-            return self.fthg > 0 and self.ftag > 0
-        return None
-    
-    @property
-    def best_home_odds(self):
-        """Mejor cuota para el equipo local"""
-        odds = [self.b365h, self.bwh, self.iwh, self.psh, self.whh, self.vch]
-        valid_odds = [odd for odd in odds if odd is not None]
-        return max(valid_odds) if valid_odds else None
-    
-    @property
-    def best_draw_odds(self):
-        """Mejor cuota para el empate"""
-        odds = [self.b365d, self.bwd, self.iwd, self.psd, self.whd, self.vcd]
-        valid_odds = [odd for odd in odds if odd is not None]
-        return max(valid_odds) if valid_odds else None
-    
-    @property
-    def best_away_odds(self):
-        """Mejor cuota para el equipo visitante"""
-        odds = [self.b365a, self.bwa, self.iwa, self.psa, self.wha, self.vca]
-        valid_odds = [odd for odd in odds if odd is not None]
-        return max(valid_odds) if valid_odds else None
+        return f"Cuotas {self.match}"
+
+
+# Nombres de los campos de cuotas (los mismos que tenía Match antes de separarlos)
+ODDS_FIELD_NAMES = tuple(
+    field.name for field in MatchOdds._meta.concrete_fields if isinstance(field, models.DecimalField)
+)
+
+
+def _odds_accessor(field_name):
+    def getter(match):
+        odds = match.get_odds()
+        return getattr(odds, field_name) if odds is not None else None
+    getter.__name__ = field_name
+    getter.__doc__ = f"Cuota {field_name} (leída de MatchOdds)"
+    return property(getter)
+
+
+# match.b365h, match.psh, ... siguen funcionando como accesores de solo lectura
+for _field_name in ODDS_FIELD_NAMES:
+    setattr(Match, _field_name, _odds_accessor(_field_name))
 
 
 class ExcelFile(models.Model):
@@ -308,6 +375,8 @@ class ExcelFile(models.Model):
     # Metadatos
     imported_at = models.DateTimeField(auto_now_add=True)
     file_size = models.BigIntegerField(default=0)
+    # SHA-256 del contenido (para omitir reimportaciones de archivos idénticos)
+    content_hash = models.CharField(max_length=64, blank=True, db_index=True)
     
     class Meta:
         verbose_name = "Archivo Excel"
@@ -322,4 +391,138 @@ class ExcelFile(models.Model):
         """Tasa de éxito de importación"""
         if self.total_rows > 0:
             return (self.imported_rows / self.total_rows) * 100
-        return 0
\ No newline at end of file
+        return 0
+
+class TeamMatchRecordQuerySet(models.QuerySet):
+    """Consultas de historial por equipo (usan el índice league, team, date)"""
+    
+    def for_team(self, league, team, venue=None, before=None):
+        """Partidos de un equipo en una liga, del más reciente al más antiguo (mismo orden que Match)"""
+        queryset = self.filter(league=league, team=team)
+        if venue:
+            queryset = queryset.filter(venue=venue)
+        if before:
+            queryset = queryset.filter(date__lt=before)
+        return queryset.order_by('-date', '-match_id')
+    
+    def last_n(self, league, team, n, venue=None, before=None):
+        """Últimos n partidos de un equipo (opcionalmente solo local 'H' o visitante 'A')"""
+        return self.for_team(league, team, venue=venue, before=before)[:n]
+    
+    def head_to_head(self, league, team, opponent, before=None):
+        """Enfrentamientos de team contra opponent, desde el punto de vista de team"""
+        queryset = self.filter(league=league, team=team, opponent=opponent)
+        if before:
+            queryset = queryset.filter(date__lt=before)
+        return queryset.order_by('-date')
+
+
+class TeamMatchRecord(models.Model):
+    """
+    Fila estrecha por equipo y partido (dos por Match) con las estadísticas a favor y en
+    contra. Se mantiene desde la importación y evita recorrer la tabla ancha Match con
+    filtros home_team/away_team para obtener "los últimos N partidos del equipo X".
+    """
+    
+    VENUE_CHOICES = [('H', 'Local'), ('A', 'Visitante')]
+    
+    league = models.ForeignKey(League, on_delete=models.CASCADE, related_name='team_records')
+    match = models.ForeignKey(Match, on_delete=models.CASCADE, related_name='team_records')
+    team = models.CharField(max_length=100)
+    opponent = models.CharField(max_length=100)
+    venue = models.CharField(max_length=1, choices=VENUE_CHOICES)
+    date = models.DateField()
+    
+    goals_for = models.IntegerField(null=True, blank=True)
+    goals_against = models.IntegerField(null=True, blank=True)
+    half_time_goals_for = models.IntegerField(null=True, blank=True)
+    half_time_goals_against = models.IntegerField(null=True, blank=True)
+    shots_for = models.IntegerField(null=True, blank=True)
+    shots_against = models.IntegerField(null=True, blank=True)
+    shots_on_target_for = models.IntegerField(null=True, blank=True)
+    shots_on_target_against = models.IntegerField(null=True, blank=True)
+    corners_for = models.IntegerField(null=True, blank=True)
+    corners_against = models.IntegerField(null=True, blank=True)
+    fouls_for = models.IntegerField(null=True, blank=True)
+    fouls_against = models.IntegerField(null=True, blank=True)
+    yellow_cards_for = models.IntegerField(null=True, blank=True)
+    yellow_cards_against = models.IntegerField(null=True, blank=True)
+    red_cards_for = models.IntegerField(null=True, blank=True)
+    red_cards_against = models.IntegerField(null=True, blank=True)
+    
+    objects = TeamMatchRecordQuerySet.as_manager()
+    
+    class Meta:
+        verbose_name = "Registro de Equipo por Partido"
+        verbose_name_plural = "Registros de Equipo por Partido"
+        ordering = ['-date']
+        unique_together = ['match', 'venue']
+        indexes = [
+            models.Index(fields=['league', 'team', 'date'], name='teamrecord_league_team_date'),
+        ]
+    
+    def __str__(self):
+        return f"{self.team} vs {self.opponent} ({self.venue}, {self.date})"
+
+
+class ImportJob(models.Model):
+    """Trabajo de importación en segundo plano (lo procesa el comando run_import_worker)"""
+    
+    STATUS_CHOICES = [
+        ('pending', 'Pendiente'),
+        ('running', 'En proceso'),
+        ('completed', 'Completado'),
+        ('failed', 'Fallido'),
+    ]
+    
+    file_name = models.CharField(max_length=200)
+    file_path = models.CharField(max_length=500)
+    content_hash = models.CharField(max_length=64, db_index=True)
+    file_size = models.BigIntegerField(default=0)
+    league_name = models.CharField(max_length=100, blank=True)
+    season = models.CharField(max_length=20, blank=True)
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL,
+                                   null=True, blank=True, related_name='import_jobs')
+    
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending', db_index=True)
+    
+    # Progreso (los mismos contadores que reporta la importación por bloques)
+    total_rows = models.IntegerField(default=0, verbose_name="Filas estimadas")
+    rows_processed = models.IntegerField(default=0)
+    rows_imported = models.IntegerField(default=0)
+    rows_failed = models.IntegerField(default=0)
+    
+    result = models.JSONField(default=dict, blank=True)
+    error = models.TextField(blank=True)
+    # Veces que un worker ha tomado el trabajo (los de workers caídos se reencolan)
+    attempts = models.PositiveIntegerField(default=0)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        verbose_name = "Trabajo de Importación"
+        verbose_name_plural = "Trabajos de Importación"
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"{self.file_name} ({self.get_status_display()})"
+    
+    @property
+    def progress_percent(self):
+        """Porcentaje de filas procesadas sobre las estimadas"""
+        if self.status == 'completed':
+            return 100.0
+        if self.total_rows > 0:
+            return min(100.0, self.rows_processed / self.total_rows * 100)
+        return 0.0
+    
+    @property
+    def eta_seconds(self):
+        """Segundos restantes estimados según el ritmo de filas procesadas hasta ahora"""
+        if self.status != 'running' or not self.started_at or self.rows_processed <= 0:
+            return None
+        elapsed = (timezone.now() - self.started_at).total_seconds()
+        remaining_rows = max(self.total_rows - self.rows_processed, 0)
+        return elapsed / self.rows_processed * remaining_rows
@@ -2,22 +2,45 @@
 Servicios para importar y procesar datos de Excel
 """
 
+import csv
+import hashlib
+import itertools
+import numpy as np
 import pandas as pd
 import os
 import logging
-from datetime import datetime
+import uuid
+from datetime import datetime, timedelta
 from django.conf import settings
 from django.db import transaction, models
 from django.utils import timezone
 
-from .models import League, Match, ExcelFile
+from .models import League, Match, MatchOdds, ExcelFile, ImportJob, TeamMatchRecord, ODDS_FIELD_NAMES
 
 logger = logging.getLogger('football_data')
 
+ODDS_FIELD_SET = frozenset(ODDS_FIELD_NAMES)
+
 
 class ExcelImportService:
     """Servicio para importar datos de Excel"""
     
+    # Filas por sentencia en el modo de importación masiva
+    BULK_BATCH_SIZE = 500
+    # Campos de Match.Meta.unique_together usados como clave del upsert
+    MATCH_UNIQUE_FIELDS = ('league', 'date', 'home_team', 'away_team')
+    # Estadísticas enteras del partido
+    STAT_FIELDS = ('fthg', 'ftag', 'hthg', 'htag', 'hs', 'as_field', 'hst', 'ast',
+                   'hf', 'af', 'hc', 'ac', 'hy', 'ay', 'hr', 'ar')
+    # Formatos de fecha conocidos, en orden de preferencia
+    DATE_FORMATS = ('%d/%m/%y', '%d/%m/%Y', '%Y-%m-%d', '%d-%m-%Y', '%m/%d/%Y', '%m/%d/%y', '%d.%m.%Y')
+    MIN_VALID_YEAR = 1900
+    MAX_VALID_YEAR = 2030
+    # Filas por bloque en la importación en streaming
+    STREAM_CHUNK_SIZE = 5000
+    # Bytes leídos para detectar el separador de un CSV
+    SNIFF_SAMPLE_BYTES = 64 * 1024
+    
     def __init__(self):
         self.data_dir = os.path.join(settings.BASE_DIR, 'data', 'excel_files')
         self.column_mapping = self._get_column_mapping()
@@ -194,12 +217,12 @@ class ExcelImportService:
         try:
             is_csv = file_path.lower().endswith('.csv')
             if is_csv:
-                # Autodetectar separador y tolerar líneas dañadas
+                # Autodetectar separador (una vez) y leer con el parser C tolerando líneas dañadas
                 df = pd.read_csv(
                     file_path,
                     encoding='utf-8',
-                    sep=None,
-                    engine='python',
+                    sep=self.sniff_delimiter(file_path),
+                    engine='c',
                     on_bad_lines='skip'
                 )
             else:
@@ -226,6 +249,100 @@ class ExcelImportService:
             logger.error(f"Error leyendo archivo {file_path}: {e}")
             return None
     
+    def sniff_delimiter(self, file_path):
+        """Detecta el separador de un CSV a partir de su cabecera y primeras líneas"""
+        with open(file_path, 'r', encoding='utf-8', errors='replace', newline='') as handle:
+            sample = handle.read(self.SNIFF_SAMPLE_BYTES)
+        try:
+            return csv.Sniffer().sniff(sample, delimiters=',;\t|').delimiter
+        except csv.Error:
+            return ','
+    
+    def iter_data_file_chunks(self, file_path, chunk_size=None):
+        """
+        Lee un archivo Excel/CSV en bloques de como máximo chunk_size filas.
+        
+        Los CSV se leen con el parser C en modo chunksize (separador detectado una sola
+        vez); los .xlsx con openpyxl en modo read_only, de modo que la memoria usada no
+        depende del tamaño del archivo. Los .xls antiguos se leen completos y se trocean.
+        """
+        chunk_size = chunk_size or self.STREAM_CHUNK_SIZE
+        lower_path = file_path.lower()
+        
+        if lower_path.endswith('.csv'):
+            chunks = self._iter_csv_chunks(file_path, chunk_size)
+        elif lower_path.endswith(('.xlsx', '.xlsm')):
+            chunks = self._iter_xlsx_chunks(file_path, chunk_size)
+        else:
+            df = pd.read_excel(file_path)
+            chunks = (df.iloc[start:start + chunk_size] for start in range(0, len(df), chunk_size))
+        
+        for chunk in chunks:
+            chunk.columns = chunk.columns.astype(str).str.strip()
+            yield chunk
+    
+    def _iter_csv_chunks(self, file_path, chunk_size):
+        """Bloques de un CSV leídos con el parser C"""
+        reader = pd.read_csv(
+            file_path,
+            encoding='utf-8',
+            sep=self.sniff_delimiter(file_path),
+            engine='c',
+            on_bad_lines='skip',
+            chunksize=chunk_size,
+        )
+        with reader:
+            for chunk in reader:
+                yield chunk
+    
+    def _iter_xlsx_chunks(self, file_path, chunk_size):
+        """Bloques de la primera hoja de un .xlsx leídos con openpyxl en modo read_only"""
+        from openpyxl import load_workbook
+        
+        workbook = load_workbook(file_path, read_only=True, data_only=True)
+        try:
+            rows = workbook.worksheets[0].iter_rows(values_only=True)
+            header = next(rows, None)
+            if header is None:
+                return
+            columns = [str(col) if col is not None else f"Unnamed: {i}" for i, col in enumerate(header)]
+            
+            buffer = []
+            offset = 0
+            for row in rows:
+                if all(value is None for value in row):
+                    continue
+                buffer.append(row)
+                if len(buffer) >= chunk_size:
+                    yield pd.DataFrame(buffer, columns=columns, index=range(offset, offset + len(buffer)))
+                    offset += len(buffer)
+                    buffer = []
+            if buffer:
+                yield pd.DataFrame(buffer, columns=columns, index=range(offset, offset + len(buffer)))
+        finally:
+            workbook.close()
+    
+    def estimate_row_count(self, file_path):
+        """Número aproximado de filas de datos (sin cabecera) sin cargar el archivo"""
+        lower_path = file_path.lower()
+        try:
+            if lower_path.endswith('.csv'):
+                lines = 0
+                with open(file_path, 'rb') as handle:
+                    for block in iter(lambda: handle.read(1024 * 1024), b''):
+                        lines += block.count(b'\n')
+                return max(lines - 1, 0)
+            if lower_path.endswith(('.xlsx', '.xlsm')):
+                from openpyxl import load_workbook
+                workbook = load_workbook(file_path, read_only=True)
+                try:
+                    return max((workbook.worksheets[0].max_row or 1) - 1, 0)
+                finally:
+                    workbook.close()
+        except Exception as e:
+            logger.warning(f"No se pudo estimar el número de filas de {file_path}: {e}")
+        return 0
+    
     def detect_league(self, df):
         """Detecta la liga basándose en los datos"""
         if 'Div' in df.columns:
@@ -262,134 +379,602 @@ class ExcelImportService:
             
             # Detectar temporada de forma más robusta
             try:
-                if not df['Date'].empty and pd.notna(df['Date'].iloc[0]):
-                    year = df['Date'].dt.year.iloc[0]
+                dates = self.parse_date_column(df['Date']).dropna()
+                if not dates.empty:
+                    year = int(dates.iloc[0].year)
                     season = f"{year}-{year + 1}"
                 else:
                     season = "2024-2025"  # Temporada por defecto
-            except (IndexError, AttributeError, TypeError):
+            except (IndexError, AttributeError, TypeError, KeyError):
                 season = "2024-2025"  # Temporada por defecto
             
             return league_name, season
         
         return 'Unknown League', '2024-2025'
     
-    def import_data_file(self, file_path, league_name=None, season=None):
-        """Importa un archivo Excel/CSV a la base de datos"""
+    def import_data_file(self, file_path, league_name=None, season=None, bulk=True,
+                         chunk_size=None, progress_callback=None, force=False):
+        """
+        Importa un archivo Excel/CSV a la base de datos.
+        
+        Con bulk=True (por defecto) los partidos se construyen en memoria y se escriben
+        por lotes con un upsert sobre (league, date, home_team, away_team); con bulk=False
+        se usa el modo clásico fila a fila.
+        
+        Con chunk_size el archivo se procesa en streaming: se lee por bloques de
+        chunk_size filas y cada bloque se prepara y escribe antes de leer el siguiente
+        (siempre en modo masivo). progress_callback, si se indica, se llama tras cada
+        bloque con (filas_procesadas, filas_importadas, filas_fallidas).
+        
+        Si ya se importó un archivo con el mismo contenido (hash SHA-256) no se hace nada,
+        salvo con force=True. En modo masivo solo se escriben los partidos nuevos o
+        modificados; el resultado incluye inserted_count, updated_count y unchanged_count.
+        """
         try:
-            # Leer archivo
-            df = self.read_data_file(file_path)
+            content_hash = self.compute_file_hash(file_path)
+            imported_file = None if force else self.find_imported_file(content_hash)
+            if imported_file:
+                return self.unchanged_file_result(imported_file)
+            
+            # Leer archivo (completo o solo el primer bloque en modo streaming)
+            if chunk_size:
+                chunks = self.iter_data_file_chunks(file_path, chunk_size)
+                df = next(chunks, None)
+            else:
+                chunks = iter(())
+                df = self.read_data_file(file_path)
             if df is None or df.empty:
                 return {'success': False, 'error': 'No se pudo leer el archivo o está vacío'}
             
-            # Detectar liga si no se proporciona
-            if not league_name:
-                league_name, season = self.detect_league(df)
+            league_name, season = self._resolve_league_name(df, league_name, season)
+            league, excel_file, resumed = self._register_file(file_path, league_name, season, len(df))
+            file_name = excel_file.name
             
-            # Asegurar que la temporada no esté vacía
-            if not season or season.strip() == '':
-                season = "2024-2025"
-            
-            # Crear o obtener liga
-            league, created = League.objects.get_or_create(
-                name=league_name,
-                defaults={'season': season, 'country': 'Unknown'}
-            )
-            
-            # Crear o actualizar registro de archivo Excel
-            file_size = os.path.getsize(file_path)
-            file_name = os.path.basename(file_path)
-            
-            # Verificar si el archivo ya existe (manejar duplicados)
-            existing_files = ExcelFile.objects.filter(name=file_name, league=league)
-            
-            if existing_files.exists():
-                # Si hay duplicados, eliminar los antiguos y mantener solo el más reciente
-                if existing_files.count() > 1:
-                    logger.info(f"Encontrados {existing_files.count()} duplicados para {file_name}, limpiando...")
-                    # Ordenar por fecha y eliminar todos excepto el más reciente
-                    files_sorted = existing_files.order_by('-imported_at')
-                    files_to_delete = files_sorted[1:]  # Todos excepto el primero (más reciente)
-                    
-                    for file_to_delete in files_to_delete:
-                        logger.info(f"Eliminando archivo duplicado ID {file_to_delete.id}")
-                        file_to_delete.delete()
-                
-                # Actualizar el archivo restante
-                excel_file = existing_files.first()
-                excel_file.file_path = file_path
-                excel_file.total_rows = len(df)
-                excel_file.file_size = file_size
-                excel_file.imported_at = timezone.now()
-                excel_file.save()
-                file_created = False
-                logger.info(f"Archivo {file_name} actualizado")
+            # Importar partidos
+            if bulk or chunk_size:
+                total_rows = 0
+                counts = self._empty_counts()
+                for chunk in itertools.chain([df], chunks):
+                    chunk_counts = self._bulk_import_rows(chunk, league, excel_file)
+                    total_rows += len(chunk)
+                    for key, value in chunk_counts.items():
+                        counts[key] += value
+                    if chunk_size:
+                        logger.info(f"{file_name}: {total_rows} filas procesadas "
+                                    f"({counts['imported']} importadas, {counts['failed']} fallos)")
+                    if progress_callback:
+                        progress_callback(total_rows, counts['imported'], counts['failed'])
+                excel_file.total_rows = total_rows
             else:
-                # Crear nuevo archivo
-                excel_file = ExcelFile.objects.create(
-                    name=file_name,
-                    file_path=file_path,
-                    league=league,
-                    total_rows=len(df),
-                    file_size=file_size
-                )
-                file_created = True
-                logger.info(f"Nuevo archivo {file_name} creado")
+                counts = self._import_rows_individually(df, league, excel_file)
+                if progress_callback:
+                    progress_callback(len(df), counts['imported'], counts['failed'])
             
-            # Importar partidos
-            imported_count = 0
-            failed_count = 0
+            return self._finish_import(league, excel_file, counts, content_hash, resumed)
             
-            # Procesar cada fila individualmente para evitar que un error afecte a todas
-            for index, row in df.iterrows():
-                try:
-                    match_data = self._prepare_match_data(row, league)
-                    
-                    # Verificar que tenemos los datos mínimos necesarios
-                    if not all(key in match_data for key in ['date', 'home_team', 'away_team']):
-                        logger.warning(f"Fila {index} no tiene datos mínimos necesarios, saltando...")
-                        failed_count += 1
-                        continue
-                    
-                    # Crear o actualizar el partido
-                    with transaction.atomic():
-                        match, created = Match.objects.update_or_create(
-                            league=league,
-                            date=match_data['date'],
-                            home_team=match_data['home_team'],
-                            away_team=match_data['away_team'],
-                            defaults=match_data
-                        )
-                        # Vincular al archivo fuente si no está seteado
-                        if match.source_file_id != excel_file.id:
-                            match.source_file = excel_file
-                            match.save(update_fields=['source_file'])
-                        imported_count += 1
-                        
-                except Exception as e:
-                    logger.error(f"Error importando fila {index}: {e}")
-                    failed_count += 1
-                    continue
+        except Exception as e:
+            logger.error(f"Error importando archivo {file_path}: {e}")
+            return {'success': False, 'error': str(e)}
+    
+    def _finish_import(self, league, excel_file, counts, content_hash='', resumed=False):
+        """
+        Guarda las estadísticas y el hash del archivo (sólo aquí, cuando la escritura
+        terminó bien) y construye el dict de resultado.
+        
+        Si un intento anterior del mismo archivo no terminó (resumed), sus partidos ya
+        escritos cuentan como sin cambios: se resincroniza TeamMatchRecord y se publica
+        igualmente una nueva versión de datos para que corran los receptores.
+        """
+        if resumed:
+            TeamMatchRecordService().sync_matches(Match.objects.filter(source_file=excel_file))
+        
+        excel_file.imported_rows = counts['imported']
+        excel_file.failed_rows = counts['failed']
+        excel_file.content_hash = content_hash
+        excel_file.save()
+        
+        # Nueva versión de datos de la liga: invalida las predicciones cacheadas
+        if counts['inserted'] or counts['updated'] or resumed:
+            league.bump_data_version()
+        
+        logger.info(
+            f"Importación completada: {counts['imported']} partidos importados "
+            f"({counts['inserted']} nuevos, {counts['updated']} actualizados, "
+            f"{counts['unchanged']} sin cambios), {counts['failed']} fallos"
+        )
+        
+        return {
+            'success': True,
+            'imported_count': counts['imported'],
+            'failed_count': counts['failed'],
+            'inserted_count': counts['inserted'],
+            'updated_count': counts['updated'],
+            'unchanged_count': counts['unchanged'],
+            'league': league.name,
+            'excel_file_id': excel_file.id
+        }
+    
+    def _resolve_league_name(self, df, league_name=None, season=None):
+        """Nombre de liga y temporada del archivo (sin tocar la base de datos)"""
+        # Detectar liga si no se proporciona
+        if not league_name:
+            league_name, season = self.detect_league(df)
+        
+        # Asegurar que la temporada no esté vacía
+        if not season or season.strip() == '':
+            season = "2024-2025"
+        
+        return league_name, season
+    
+    def _register_file(self, file_path, league_name, season, total_rows):
+        """
+        Obtiene/crea la liga y el registro ExcelFile del archivo. Retorna (league,
+        excel_file, resumed); resumed indica que un intento anterior del archivo no
+        llegó a terminar (registro existente sin hash).
+        
+        El hash del contenido se borra hasta que _finish_import confirma la escritura,
+        así que un fallo a mitad no deja el archivo marcado como ya importado.
+        """
+        # Crear o obtener liga
+        league, created = League.objects.get_or_create(
+            name=league_name,
+            defaults={'season': season, 'country': 'Unknown'}
+        )
+        
+        # Crear o actualizar registro de archivo Excel
+        file_size = os.path.getsize(file_path)
+        file_name = os.path.basename(file_path)
+        
+        # Verificar si el archivo ya existe (manejar duplicados)
+        existing_files = ExcelFile.objects.filter(name=file_name, league=league)
+        
+        if existing_files.exists():
+            # Si hay duplicados, eliminar los antiguos y mantener solo el más reciente
+            if existing_files.count() > 1:
+                logger.info(f"Encontrados {existing_files.count()} duplicados para {file_name}, limpiando...")
+                # Ordenar por fecha y eliminar todos excepto el más reciente
+                files_sorted = existing_files.order_by('-imported_at')
+                files_to_delete = files_sorted[1:]  # Todos excepto el primero (más reciente)
+                
+                for file_to_delete in files_to_delete:
+                    logger.info(f"Eliminando archivo duplicado ID {file_to_delete.id}")
+                    file_to_delete.delete()
             
-            # Actualizar estadísticas del archivo
-            excel_file.imported_rows = imported_count
-            excel_file.failed_rows = failed_count
+            # Actualizar el archivo restante
+            excel_file = existing_files.first()
+            resumed = not excel_file.content_hash
+            excel_file.file_path = file_path
+            excel_file.total_rows = total_rows
+            excel_file.file_size = file_size
+            excel_file.content_hash = ''
+            excel_file.imported_at = timezone.now()
             excel_file.save()
+            logger.info(f"Archivo {file_name} actualizado")
+        else:
+            # Crear nuevo archivo
+            excel_file = ExcelFile.objects.create(
+                name=file_name,
+                file_path=file_path,
+                league=league,
+                total_rows=total_rows,
+                file_size=file_size,
+            )
+            resumed = False
+            logger.info(f"Nuevo archivo {file_name} creado")
+        
+        return league, excel_file, resumed
+    
+    def prepare_data_file(self, file_path, league_name=None, season=None, chunk_size=None):
+        """
+        Fase de lectura y preparación de un archivo, sin acceso a la base de datos
+        (pensada para ejecutarse en procesos worker). El resultado se escribe después
+        con import_prepared_file().
+        
+        El archivo se lee por bloques de chunk_size filas y cada bloque se prepara por
+        separado; los bloques no se concatenan (no hay una segunda copia del archivo)
+        y import_prepared_file los escribe uno a uno.
+        
+        Retorna un dict con file_path, content_hash, league_name, season, total_rows,
+        first_date (primer partido, para ordenar las escrituras) y chunks: una lista de
+        (DataFrame preparado, filas descartadas) por bloque.
+        """
+        chunks = []
+        total_rows = 0
+        first_date = None
+        
+        for chunk in self.iter_data_file_chunks(file_path, chunk_size):
+            if total_rows == 0:
+                league_name, season = self._resolve_league_name(chunk, league_name, season)
+            frame, invalid_index = self.prepare_dataframe(chunk)
+            chunks.append((frame, invalid_index.tolist()))
+            total_rows += len(chunk)
+            if not frame.empty:
+                chunk_first = frame['date'].min()
+                first_date = chunk_first if first_date is None else min(first_date, chunk_first)
+        
+        return {
+            'file_path': file_path,
+            'content_hash': self.compute_file_hash(file_path),
+            'league_name': league_name,
+            'season': season,
+            'total_rows': total_rows,
+            'first_date': first_date,
+            'chunks': chunks,
+        }
+    
+    def import_prepared_file(self, prepared, force=False):
+        """Escribe en la base de datos, bloque a bloque, un archivo preparado con prepare_data_file()"""
+        file_path = prepared['file_path']
+        try:
+            if not prepared['total_rows'] or not prepared['chunks']:
+                return {'success': False, 'error': 'No se pudo leer el archivo o está vacío'}
             
-            logger.info(f"Importación completada: {imported_count} partidos importados, {failed_count} fallos")
-            
-            return {
-                'success': True,
-                'imported_count': imported_count,
-                'failed_count': failed_count,
-                'league': league.name,
-                'excel_file_id': excel_file.id
-            }
+            imported_file = None if force else self.find_imported_file(prepared['content_hash'])
+            if imported_file:
+                return self.unchanged_file_result(imported_file)
             
+            league, excel_file, resumed = self._register_file(
+                file_path, prepared['league_name'], prepared['season'], prepared['total_rows']
+            )
+            counts = self._empty_counts()
+            for frame, invalid_rows in prepared['chunks']:
+                chunk_counts = self._write_prepared_frame(frame, pd.Index(invalid_rows), league, excel_file)
+                for key, value in chunk_counts.items():
+                    counts[key] += value
+            return self._finish_import(league, excel_file, counts, prepared['content_hash'], resumed)
+        
         except Exception as e:
             logger.error(f"Error importando archivo {file_path}: {e}")
             return {'success': False, 'error': str(e)}
     
+    def _import_rows_individually(self, df, league, excel_file):
+        """Modo clásico: un update_or_create por fila (más lento, útil para depurar)"""
+        counts = self._empty_counts()
+        write_started = timezone.now()
+        
+        # Procesar cada fila individualmente para evitar que un error afecte a todas
+        for index, row in df.iterrows():
+            try:
+                match_data = self._prepare_match_data(row, league)
+                
+                # Verificar que tenemos los datos mínimos necesarios
+                if not all(key in match_data for key in ['date', 'home_team', 'away_team']):
+                    logger.warning(f"Fila {index} no tiene datos mínimos necesarios, saltando...")
+                    counts['failed'] += 1
+                    continue
+                
+                # Las cuotas se guardan aparte, en MatchOdds
+                odds_data = {
+                    field: match_data.pop(field) for field in list(match_data) if field in ODDS_FIELD_SET
+                }
+                
+                # Crear o actualizar el partido
+                with transaction.atomic():
+                    match, created = Match.objects.update_or_create(
+                        league=league,
+                        date=match_data['date'],
+                        home_team=match_data['home_team'],
+                        away_team=match_data['away_team'],
+                        defaults=match_data
+                    )
+                    if odds_data:
+                        MatchOdds.objects.update_or_create(match=match, defaults=odds_data)
+                    # Vincular al archivo fuente si no está seteado
+                    if match.source_file_id != excel_file.id:
+                        match.source_file = excel_file
+                        match.save(update_fields=['source_file'])
+                    counts['imported'] += 1
+                    counts['inserted' if created else 'updated'] += 1
+                    
+            except Exception as e:
+                logger.error(f"Error importando fila {index}: {e}")
+                counts['failed'] += 1
+                continue
+        
+        TeamMatchRecordService().sync_matches(
+            Match.objects.filter(league=league, updated_at__gte=write_started)
+        )
+        
+        return counts
+    
+    def _bulk_import_rows(self, df, league, excel_file):
+        """
+        Modo masivo: prepara el DataFrame por columnas, construye todos los Match del
+        archivo en memoria y los escribe por lotes con un upsert
+        (INSERT ... ON CONFLICT DO UPDATE) sobre la clave única.
+        
+        Retorna el dict de contadores de _write_prepared_frame().
+        """
+        frame, invalid_index = self.prepare_dataframe(df)
+        return self._write_prepared_frame(frame, invalid_index, league, excel_file)
+    
+    def _write_prepared_frame(self, frame, invalid_index, league, excel_file):
+        """
+        Escribe por lotes un DataFrame ya preparado, tocando solo los partidos nuevos o
+        cuya huella (row_hash) ha cambiado respecto a la base de datos.
+        
+        Retorna un dict de contadores: imported, failed, inserted, updated, unchanged.
+        """
+        counts = self._empty_counts()
+        counts['failed'] = len(invalid_index)
+        if counts['failed']:
+            logger.warning(f"{counts['failed']} filas sin fecha/equipos válidos, saltando: {list(invalid_index[:20])}")
+        
+        if frame.empty:
+            return counts
+        
+        # Si el archivo repite un partido gana la última fila, igual que en el modo
+        # fila a fila (ambas filas cuentan como importadas).
+        duplicated = frame.duplicated(subset=['date', 'home_team', 'away_team'], keep='last')
+        counts['imported'] += int(duplicated.sum())
+        frame = frame[~duplicated].copy()
+        frame['row_hash'] = self.compute_row_hashes(frame)
+        
+        # Huellas actuales de los partidos del mismo rango de fechas (una consulta)
+        existing = {
+            (date, home_team, away_team): row_hash
+            for date, home_team, away_team, row_hash in Match.objects.filter(
+                league=league, date__gte=frame['date'].min(), date__lte=frame['date'].max()
+            ).values_list('date', 'home_team', 'away_team', 'row_hash')
+        }
+        keys = list(zip(frame['date'], frame['home_team'], frame['away_team']))
+        previous = pd.Series([existing.get(key) for key in keys], index=frame.index, dtype=object)
+        is_new = previous.isna()
+        is_unchanged = ~is_new & (previous == frame['row_hash'])
+        
+        counts['unchanged'] = int(is_unchanged.sum())
+        counts['imported'] += counts['unchanged']
+        frame = frame[~is_unchanged]
+        is_new = is_new[~is_unchanged]
+        if frame.empty:
+            return counts
+        
+        # Las cuotas van a MatchOdds; Match solo recibe las columnas principales
+        odds_fields = [field for field in frame.columns if field in self._odds_fields()]
+        core_fields = [field for field in frame.columns if field not in self._odds_fields()]
+        rows = self._build_match_instances(frame[core_fields], league, excel_file)
+        
+        # Solo se actualizan las columnas que trae el archivo (como hacía defaults= en
+        # update_or_create) más el archivo fuente y la marca de actualización.
+        update_fields = [field for field in core_fields if field not in self.MATCH_UNIQUE_FIELDS]
+        update_fields += ['source_file', 'updated_at']
+        
+        write_started = timezone.now()
+        failed_indexes = set()
+        for start in range(0, len(rows), self.BULK_BATCH_SIZE):
+            batch = rows[start:start + self.BULK_BATCH_SIZE]
+            failed_indexes.update(self._write_match_batch(batch, update_fields))
+        
+        # Cuotas y tabla estrecha por equipo de los partidos escritos
+        written_matches = Match.objects.filter(league=league, updated_at__gte=write_started)
+        if odds_fields:
+            self._write_match_odds(frame, odds_fields, written_matches)
+        TeamMatchRecordService().sync_matches(written_matches)
+        
+        written_new = is_new[~is_new.index.isin(failed_indexes)]
+        counts['inserted'] = int(written_new.sum())
+        counts['updated'] = int((~written_new).sum())
+        counts['imported'] += counts['inserted'] + counts['updated']
+        counts['failed'] += len(failed_indexes)
+        return counts
+    
+    def _write_match_odds(self, frame, odds_fields, written_matches):
+        """Upsert de las cuotas (MatchOdds) de las filas del frame que se acaban de escribir"""
+        match_ids = {
+            (date, home_team, away_team): match_id
+            for match_id, date, home_team, away_team in written_matches.values_list(
+                'id', 'date', 'home_team', 'away_team'
+            )
+        }
+        
+        odds = frame[odds_fields]
+        has_odds = odds.notna().any(axis=1)
+        odds = odds[has_odds]
+        records = odds.astype(object).where(odds.notna(), None).to_dict('records')
+        keys = zip(frame.loc[has_odds, 'date'], frame.loc[has_odds, 'home_team'], frame.loc[has_odds, 'away_team'])
+        
+        odds_objects = [
+            MatchOdds(match_id=match_ids[key], **record)
+            for key, record in zip(keys, records)
+            if key in match_ids
+        ]
+        for start in range(0, len(odds_objects), self.BULK_BATCH_SIZE):
+            MatchOdds.objects.bulk_create(
+                odds_objects[start:start + self.BULK_BATCH_SIZE],
+                update_conflicts=True,
+                unique_fields=['match'],
+                update_fields=odds_fields,
+            )
+    
+    def _empty_counts(self):
+        """Contadores de una importación"""
+        return {'imported': 0, 'failed': 0, 'inserted': 0, 'updated': 0, 'unchanged': 0}
+    
+    def compute_row_hashes(self, frame):
+        """
+        Huella de cada fila preparada (hash de 64 bits en hexadecimal) calculada de forma
+        vectorizada sobre los valores mapeados, independiente del orden de columnas.
+        """
+        columns = sorted(column for column in frame.columns if column != 'row_hash')
+        hashes = pd.util.hash_pandas_object(frame[columns], index=False)
+        return hashes.map('{:016x}'.format)
+    
+    def compute_file_hash(self, file_path):
+        """SHA-256 del contenido de un archivo, leído por bloques"""
+        digest = hashlib.sha256()
+        with open(file_path, 'rb') as handle:
+            for block in iter(lambda: handle.read(1024 * 1024), b''):
+                digest.update(block)
+        return digest.hexdigest()
+    
+    def find_imported_file(self, content_hash):
+        """ExcelFile ya importado con exactamente el mismo contenido (o None)"""
+        if not content_hash:
+            return None
+        return ExcelFile.objects.filter(content_hash=content_hash).select_related('league').first()
+    
+    def unchanged_file_result(self, excel_file):
+        """Resultado de importación para un archivo cuyo contenido no ha cambiado"""
+        logger.info(f"Archivo {excel_file.name} sin cambios (hash {excel_file.content_hash[:12]}), se omite")
+        return {
+            'success': True,
+            'skipped': True,
+            'imported_count': 0,
+            'failed_count': 0,
+            'inserted_count': 0,
+            'updated_count': 0,
+            'unchanged_count': excel_file.imported_rows,
+            'league': excel_file.league.name,
+            'excel_file_id': excel_file.id
+        }
+    
+    def _build_match_instances(self, frame, league, excel_file):
+        """Convierte un DataFrame preparado en una lista de (índice de fila, Match)"""
+        # object + None en lugar de NaN/NA/NaT para que el ORM reciba valores nulos
+        records = frame.astype(object).where(frame.notna(), None).to_dict('records')
+        return [
+            (index, Match(league=league, source_file=excel_file, **record))
+            for index, record in zip(frame.index, records)
+        ]
+    
+    def prepare_dataframe(self, df):
+        """
+        Preparación vectorizada (por columnas) de un DataFrame crudo de football-data.
+        
+        Renombra las columnas mapeadas a campos de Match, detecta el formato de fecha una
+        sola vez por columna, convierte todas las estadísticas y todas las cuotas en una
+        operación cada una y aplica el filtro de año como máscara.
+        
+        Retorna (frame, invalid_index): el DataFrame tipado con las filas válidas y el
+        índice de las filas descartadas por no tener fecha o equipos.
+        """
+        present = [col for col in self.column_mapping if col in df.columns]
+        frame = df[present].rename(columns=self.column_mapping)
+        frame = frame.loc[:, ~frame.columns.duplicated()]
+        
+        prepared = pd.DataFrame(index=frame.index)
+        
+        # Fecha (obligatoria)
+        if 'date' in frame.columns:
+            dates = self.parse_date_column(frame['date'])
+            year = dates.dt.year
+            dates = dates.where((year >= self.MIN_VALID_YEAR) & (year <= self.MAX_VALID_YEAR))
+        else:
+            dates = pd.Series(pd.NaT, index=frame.index, dtype='datetime64[ns]')
+        prepared['date'] = dates
+        
+        if 'time' in frame.columns:
+            prepared['time'] = self._parse_time_column(frame['time'])
+        
+        # Equipos (obligatorios)
+        for field in ('home_team', 'away_team'):
+            if field in frame.columns:
+                teams = frame[field].astype('string').str.strip()
+                prepared[field] = teams.mask(teams == '')
+            else:
+                prepared[field] = pd.Series(pd.NA, index=frame.index, dtype='string')
+        
+        # Resultados (texto)
+        for field in ('ftr', 'htr'):
+            if field in frame.columns:
+                prepared[field] = frame[field].astype('string').str.strip()
+        
+        # Estadísticas: enteros nulables, truncando como hacía int(float(x))
+        stat_fields = [field for field in self.STAT_FIELDS if field in frame.columns]
+        if stat_fields:
+            stats = frame[stat_fields].apply(pd.to_numeric, errors='coerce')
+            prepared[stat_fields] = np.trunc(stats).astype('Int64')
+        
+        # Cuotas: todos los DecimalField de Match presentes en el archivo
+        odds_fields = [field for field in frame.columns if field in self._odds_fields()]
+        if odds_fields:
+            prepared[odds_fields] = frame[odds_fields].apply(pd.to_numeric, errors='coerce').astype('float64')
+        
+        valid = prepared[['date', 'home_team', 'away_team']].notna().all(axis=1)
+        prepared = prepared[valid].copy()
+        prepared['date'] = prepared['date'].dt.date
+        
+        return prepared, frame.index[~valid]
+    
+    def parse_date_column(self, series):
+        """
+        Convierte una columna de fechas a datetime64 detectando el formato una sola vez:
+        se prueba cada formato conocido sobre toda la columna y se queda el que más
+        valores reconoce; lo que quede sin parsear se intenta con parsing automático.
+        """
+        if pd.api.types.is_datetime64_any_dtype(series):
+            return series.dt.tz_localize(None) if series.dt.tz is not None else series
+        
+        values = series.astype('string').str.strip()
+        values = values.mask(values.str.lower().isin(['', 'nan', 'none', 'nat']))
+        
+        best = None
+        best_count = -1
+        for date_format in self.DATE_FORMATS:
+            parsed = pd.to_datetime(values, format=date_format, errors='coerce')
+            count = int(parsed.notna().sum())
+            if count > best_count:
+                best, best_count = parsed, count
+            if count == int(values.notna().sum()):
+                break
+        
+        pending = best.isna() & values.notna()
+        if pending.any():
+            fallback = pd.to_datetime(values[pending], format='mixed', dayfirst=True, errors='coerce')
+            best = best.copy()
+            best[pending] = fallback
+        
+        return best
+    
+    def _parse_time_column(self, series):
+        """Convierte una columna de horas (HH:MM u objetos time/datetime) a datetime.time"""
+        values = series.astype('string').str.strip()
+        parsed = pd.to_datetime(values, format='%H:%M', errors='coerce')
+        pending = parsed.isna() & values.notna()
+        if pending.any():
+            parsed[pending] = pd.to_datetime(values[pending], format='%H:%M:%S', errors='coerce')
+        times = parsed.dt.time
+        return times.where(parsed.notna(), None)
+    
+    def _odds_fields(self):
+        """Campos de cuotas (DecimalField) del modelo MatchOdds"""
+        return ODDS_FIELD_SET
+    
+    def _write_match_batch(self, batch, update_fields):
+        """
+        Escribe un lote de (índice, Match) con un único upsert. Si el lote falla se
+        reintenta fila a fila para poder registrar las filas problemáticas.
+        
+        Retorna el conjunto de índices de fila que no se pudieron escribir.
+        """
+        try:
+            with transaction.atomic():
+                Match.objects.bulk_create(
+                    [match for _, match in batch],
+                    update_conflicts=True,
+                    unique_fields=list(self.MATCH_UNIQUE_FIELDS),
+                    update_fields=update_fields,
+                )
+            return set()
+        except Exception as e:
+            logger.warning(f"Lote de {len(batch)} partidos falló ({e}), reintentando fila a fila...")
+        
+        failed_indexes = set()
+        for index, match in batch:
+            try:
+                with transaction.atomic():
+                    Match.objects.update_or_create(
+                        league=match.league,
+                        date=match.date,
+                        home_team=match.home_team,
+                        away_team=match.away_team,
+                        defaults={field: getattr(match, field) for field in update_fields if field != 'updated_at'},
+                    )
+            except Exception as e:
+                logger.error(f"Error importando fila {index}: {e}")
+                failed_indexes.add(index)
+        return failed_indexes
+    
     def _prepare_match_data(self, row, league):
         """Prepara los datos de un partido para la base de datos"""
         match_data = {}
@@ -482,7 +1067,7 @@ class ExcelImportService:
             
             # Estadísticas básicas
             total_matches = matches.count()
-            matches_with_odds = matches.exclude(b365h__isnull=True).count()
+            matches_with_odds = matches.exclude(odds__b365h__isnull=True).count()
             matches_with_stats = matches.exclude(hs__isnull=True).count()
             
             # Análisis de resultados
@@ -512,3 +1097,203 @@ class ExcelImportService:
             
         except League.DoesNotExist:
             return None
+
+
+class TeamMatchRecordService:
+    """Mantiene la tabla TeamMatchRecord (una fila por equipo y partido) a partir de Match"""
+    
+    BATCH_SIZE = 1000
+    
+    # Campo de TeamMatchRecord -> (campo de Match del local, campo de Match del visitante)
+    STAT_FIELDS = {
+        'goals': ('fthg', 'ftag'),
+        'half_time_goals': ('hthg', 'htag'),
+        'shots': ('hs', 'as_field'),
+        'shots_on_target': ('hst', 'ast'),
+        'corners': ('hc', 'ac'),
+        'fouls': ('hf', 'af'),
+        'yellow_cards': ('hy', 'ay'),
+        'red_cards': ('hr', 'ar'),
+    }
+    
+    def sync_matches(self, matches):
+        """Crea o actualiza los registros de los partidos de un queryset de Match. Retorna cuántos escribió"""
+        match_fields = ['id', 'league_id', 'date', 'home_team', 'away_team']
+        for home_field, away_field in self.STAT_FIELDS.values():
+            match_fields += [home_field, away_field]
+        
+        records = []
+        for row in matches.order_by().values(*match_fields).iterator(chunk_size=self.BATCH_SIZE):
+            for venue, team, opponent in (('H', row['home_team'], row['away_team']),
+                                          ('A', row['away_team'], row['home_team'])):
+                record = TeamMatchRecord(
+                    league_id=row['league_id'], match_id=row['id'], team=team, opponent=opponent,
+                    venue=venue, date=row['date'],
+                )
+                for stat, (home_field, away_field) in self.STAT_FIELDS.items():
+                    own, other = (home_field, away_field) if venue == 'H' else (away_field, home_field)
+                    setattr(record, f'{stat}_for', row[own])
+                    setattr(record, f'{stat}_against', row[other])
+                records.append(record)
+        
+        update_fields = ['league', 'team', 'opponent', 'date']
+        for stat in self.STAT_FIELDS:
+            update_fields += [f'{stat}_for', f'{stat}_against']
+        
+        for start in range(0, len(records), self.BATCH_SIZE):
+            TeamMatchRecord.objects.bulk_create(
+                records[start:start + self.BATCH_SIZE],
+                update_conflicts=True,
+                unique_fields=['match', 'venue'],
+                update_fields=update_fields,
+            )
+        return len(records)
+    
+    def rebuild(self, league=None):
+        """Reconstruye los registros de una liga (o de todas) en una sola pasada"""
+        matches = Match.objects.all()
+        if league is not None:
+            matches = matches.filter(league=league)
+        return self.sync_matches(matches)
+
+
+class ImportJobService:
+    """Cola de importaciones en segundo plano respaldada por la base de datos (ImportJob)"""
+    
+    # Filas por bloque al procesar un trabajo (granularidad del progreso)
+    CHUNK_SIZE = 1000
+    
+    def __init__(self):
+        self.upload_dir = os.path.join(settings.MEDIA_ROOT, 'excel_files')
+    
+    @property
+    def timeout(self):
+        """Tiempo tras el que un trabajo en proceso se da por abandonado (worker caído)"""
+        return timedelta(seconds=getattr(settings, 'IMPORT_JOB_TIMEOUT', 3600))
+    
+    @property
+    def max_attempts(self):
+        return max(1, getattr(settings, 'IMPORT_JOB_MAX_ATTEMPTS', 3))
+    
+    def save_upload(self, uploaded_file):
+        """
+        Guarda un archivo subido en MEDIA_ROOT/excel_files/<sha256>/ calculando su
+        SHA-256 mientras se escribe. Retorna (file_path, content_hash, file_size).
+        
+        Cada subida se escribe en un temporal propio y el archivo final va a un
+        directorio por contenido (conservando el nombre original), así que otra
+        subida con el mismo nombre no pisa el archivo de un trabajo en cola.
+        
+        Si el contenido ya fue importado o está en cola se elimina el archivo y se lanza
+        DuplicateImportError, antes de parsear nada.
+        """
+        os.makedirs(self.upload_dir, exist_ok=True)
+        temp_path = os.path.join(self.upload_dir, f".{uuid.uuid4().hex}.part")
+        
+        digest = hashlib.sha256()
+        file_size = 0
+        with open(temp_path, 'wb') as destination:
+            for chunk in uploaded_file.chunks():
+                digest.update(chunk)
+                destination.write(chunk)
+                file_size += len(chunk)
+        content_hash = digest.hexdigest()
+        
+        duplicate = self.find_duplicate(content_hash)
+        if duplicate:
+            os.remove(temp_path)
+            raise DuplicateImportError(duplicate)
+        
+        job_dir = os.path.join(self.upload_dir, content_hash)
+        os.makedirs(job_dir, exist_ok=True)
+        file_path = os.path.join(job_dir, os.path.basename(uploaded_file.name))
+        os.replace(temp_path, file_path)
+        return file_path, content_hash, file_size
+    
+    def find_duplicate(self, content_hash):
+        """Descripción del archivo/trabajo con el mismo contenido, o None"""
+        self.requeue_stale_jobs()
+        excel_file = ExcelFile.objects.filter(content_hash=content_hash).select_related('league').first()
+        if excel_file:
+            return f"ya importado como '{excel_file.name}' ({excel_file.league.name})"
+        job = ImportJob.objects.filter(content_hash=content_hash, status__in=['pending', 'running']).first()
+        if job:
+            return f"ya está en cola como trabajo #{job.id} ('{job.file_name}')"
+        return None
+    
+    def enqueue_upload(self, uploaded_file, league_name=None, season=None, user=None):
+        """Guarda el archivo y crea un ImportJob pendiente"""
+        file_path, content_hash, file_size = self.save_upload(uploaded_file)
+        return ImportJob.objects.create(
+            file_name=os.path.basename(file_path),
+            file_path=file_path,
+            content_hash=content_hash,
+            file_size=file_size,
+            league_name=league_name or '',
+            season=season or '',
+            created_by=user if user is not None and user.is_authenticated else None,
+        )
+    
+    def requeue_stale_jobs(self):
+        """Devuelve a la cola (o marca como fallidos) los trabajos de workers caídos"""
+        stale = ImportJob.objects.filter(status='running', started_at__lt=timezone.now() - self.timeout)
+        failed = stale.filter(attempts__gte=self.max_attempts).update(
+            status='failed', error='Tiempo de importación agotado', finished_at=timezone.now(),
+        )
+        requeued = stale.update(status='pending')
+        if failed or requeued:
+            logger.warning(f"Trabajos de importación abandonados: {requeued} reencolados, {failed} fallidos")
+        return requeued
+    
+    def claim_next_job(self):
+        """
+        Reserva el siguiente trabajo pendiente. La reserva es un UPDATE condicionado al
+        estado, así que varios workers pueden ejecutarse a la vez sin tomar el mismo trabajo.
+        """
+        self.requeue_stale_jobs()
+        pending_ids = ImportJob.objects.filter(status='pending').order_by('created_at').values_list('id', flat=True)
+        for job_id in pending_ids[:20]:
+            claimed = ImportJob.objects.filter(pk=job_id, status='pending').update(
+                status='running', started_at=timezone.now(), attempts=models.F('attempts') + 1
+            )
+            if claimed:
+                return ImportJob.objects.get(pk=job_id)
+        return None
+    
+    def run_job(self, job):
+        """Ejecuta un trabajo reservado, actualizando su progreso tras cada bloque"""
+        service = ExcelImportService()
+        total_rows = service.estimate_row_count(job.file_path)
+        ImportJob.objects.filter(pk=job.pk).update(total_rows=total_rows)
+        
+        def report_progress(rows_processed, rows_imported, rows_failed):
+            ImportJob.objects.filter(pk=job.pk).update(
+                rows_processed=rows_processed,
+                rows_imported=rows_imported,
+                rows_failed=rows_failed,
+                total_rows=max(total_rows, rows_processed),
+            )
+        
+        try:
+            result = service.import_data_file(
+                job.file_path,
+                job.league_name or None,
+                job.season or None,
+                chunk_size=self.CHUNK_SIZE,
+                progress_callback=report_progress,
+            )
+        except Exception as e:
+            result = {'success': False, 'error': str(e)}
+        
+        job.refresh_from_db()
+        job.result = result
+        job.status = 'completed' if result.get('success') else 'failed'
+        job.error = result.get('error', '')
+        job.finished_at = timezone.now()
+        job.save(update_fields=['result', 'status', 'error', 'finished_at'])
+        logger.info(f"Trabajo de importación #{job.id} {job.status}: {result}")
+        return job
+
+
+class DuplicateImportError(Exception):
+    """El archivo subido tiene el mismo contenido que uno ya importado o en cola"""
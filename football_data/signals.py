@@ -0,0 +1,54 @@
+"""
+Señales de football_data
+"""
+
+import threading
+from contextlib import contextmanager
+
+from django.dispatch import Signal
+
+# Se envía cuando cambian los partidos de una liga (importación o borrado de archivo).
+# Argumentos: league, data_version
+league_data_changed = Signal()
+
+# Ligas con cambios pendientes de avisar (pk -> liga) mientras hay un bloque deferred_data_changes
+_deferred_leagues = None
+_deferred_lock = threading.Lock()
+
+
+def send_league_data_changed(league):
+    """Envía league_data_changed, o lo aplaza si hay un bloque deferred_data_changes activo"""
+    with _deferred_lock:
+        if _deferred_leagues is not None:
+            _deferred_leagues[league.pk] = league
+            return
+    league_data_changed.send(sender=type(league), league=league, data_version=league.data_version)
+
+
+@contextmanager
+def deferred_data_changes():
+    """
+    Aplaza league_data_changed durante el bloque (en todo el proceso, también desde
+    otros hilos) y al salir lo envía una sola vez por liga con su versión final.
+    Pensado para importaciones masivas: los receptores (reajustes, ratings...)
+    se ejecutan una vez por liga en lugar de una vez por archivo.
+    """
+    global _deferred_leagues
+    with _deferred_lock:
+        if _deferred_leagues is not None:
+            # Bloque anidado: los cambios se envían al salir del exterior
+            nested = True
+        else:
+            nested = False
+            _deferred_leagues = {}
+    if nested:
+        yield
+        return
+    try:
+        yield
+    finally:
+        with _deferred_lock:
+            leagues, _deferred_leagues = _deferred_leagues, None
+        for league in leagues.values():
+            league.refresh_from_db(fields=['data_version'])
+            league_data_changed.send(sender=type(league), league=league, data_version=league.data_version)
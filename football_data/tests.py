@@ -1,3 +1,107 @@
-from django.test import TestCase
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from .models import ExcelFile, ImportJob, League, Match, TeamMatchRecord
+from .services import ExcelImportService, ImportJobService, TeamMatchRecordService
+from .signals import league_data_changed
+
+CSV_ROWS = """Div,Date,Time,HomeTeam,AwayTeam,FTHG,FTAG,FTR,HS,AS,HST,AST,HC,AC
+E0,12/08/2023,15:00,Team A,Team B,1,0,H,12,8,4,2,5,3
+E0,12/08/2023,15:00,Team C,Team D,2,2,D,10,11,5,4,6,6
+E0,19/08/2023,15:00,Team B,Team C,0,1,A,9,14,3,6,4,7
+"""
+
+
+@override_settings(
+    DIXON_COLES_FIT_ON_IMPORT=False,
+    TRAINING_ENQUEUE_ON_IMPORT=False,
+    TEAM_RATINGS_UPDATE_ON_IMPORT=False,
+    DECAYED_STATS_UPDATE_ON_IMPORT=False,
+)
+class ImportRetryTests(TestCase):
+    """Un import que falla a mitad no debe dejar el archivo marcado como ya importado"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.file_path = os.path.join(self.directory, 'E0.csv')
+        with open(self.file_path, 'w') as handle:
+            handle.write(CSV_ROWS)
+
+        self.signals = []
+        league_data_changed.connect(self._on_data_changed, dispatch_uid='tests_import_retry')
+        self.addCleanup(league_data_changed.disconnect, dispatch_uid='tests_import_retry')
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def _on_data_changed(self, sender, league, data_version, **kwargs):
+        self.signals.append(data_version)
+
+    def _import(self):
+        return ExcelImportService().import_data_file(self.file_path, 'Premier League', '2023-2024')
+
+    def test_failed_import_is_retried(self):
+        # Los partidos se escriben pero el import falla antes de terminar
+        with mock.patch.object(TeamMatchRecordService, 'sync_matches', side_effect=RuntimeError('database is locked')):
+            result = self._import()
+        self.assertFalse(result['success'])
+        self.assertEqual(Match.objects.count(), 3)
+        self.assertFalse(ExcelFile.objects.get().content_hash)
+        self.assertEqual(self.signals, [])
+
+        # El reintento no se salta: publica la nueva versión y completa TeamMatchRecord
+        result = self._import()
+        self.assertTrue(result['success'])
+        self.assertNotIn('skipped', result)
+        self.assertEqual(League.objects.get().data_version, 1)
+        self.assertEqual(self.signals, [1])
+        self.assertEqual(TeamMatchRecord.objects.count(), 6)
+        self.assertTrue(ExcelFile.objects.get().content_hash)
+
+        # Ya terminado, el mismo contenido sí se omite
+        result = self._import()
+        self.assertTrue(result.get('skipped'))
+        self.assertEqual(self.signals, [1])
+
+
+class ImportJobServiceTests(TestCase):
+    """Subidas con el mismo nombre y trabajos de workers caídos"""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root, IMPORT_JOB_MAX_ATTEMPTS=2)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def _upload(self, content):
+        return ImportJobService().enqueue_upload(SimpleUploadedFile('E0.csv', content.encode()))
+
+    def test_same_name_uploads_do_not_overwrite_queued_files(self):
+        first = self._upload(CSV_ROWS)
+        second = self._upload(CSV_ROWS.replace('Team A', 'Team Z'))
+        self.assertNotEqual(first.file_path, second.file_path)
+        self.assertEqual(first.file_name, 'E0.csv')
+        with open(first.file_path) as handle:
+            self.assertEqual(handle.read(), CSV_ROWS)
+
+    def test_stale_running_job_is_requeued_then_failed(self):
+        service = ImportJobService()
+        job = self._upload(CSV_ROWS)
+        stale_start = timezone.now() - service.timeout - timedelta(minutes=1)
+
+        # Worker caído con el trabajo en proceso: vuelve a la cola
+        self.assertEqual(service.claim_next_job().pk, job.pk)
+        ImportJob.objects.filter(pk=job.pk).update(started_at=stale_start)
+        self.assertEqual(service.claim_next_job().pk, job.pk)
+
+        # Agotados los intentos se marca como fallido y deja de bloquear la subida
+        ImportJob.objects.filter(pk=job.pk).update(started_at=stale_start)
+        self.assertIsNone(service.find_duplicate(job.content_hash))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('failed', 2))
@@ -18,6 +18,7 @@ urlpatterns = [
     path('import/delete/<int:file_id>/', views.DeleteFileView.as_view(), name='delete_file'),
     path('import/delete-all/', views.DeleteAllFilesView.as_view(), name='delete_all_files'),
     path('import/ajax/', views.ImportAjaxView.as_view(), name='import_ajax'),
+    path('import/jobs/<int:job_id>/', views.ImportJobStatusView.as_view(), name='import_job_status'),
     path('statistics/', views.StatisticsView.as_view(), name='statistics'),
     path('markets/', views.MarketsView.as_view(), name='markets'),
     path('shots/', ShotsAnalysisView.as_view(), name='shots'),
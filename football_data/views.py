@@ -6,6 +6,7 @@ import os
 from datetime import datetime, timedelta, timezone as tz
 import logging
 from django.shortcuts import render, get_object_or_404, redirect
+from django.urls import reverse
 from django.http import JsonResponse
 from django.core.paginator import Paginator
 from django.db.models import Q, Avg, Count, Max, Min
@@ -15,14 +16,14 @@ from django.contrib.auth.decorators import login_required
 from django.utils.decorators import method_decorator
 from django.views import View
 from django.contrib import messages
-from django.conf import settings
 from django.utils import timezone
 logger = logging.getLogger('football_data')
 
-from .models import League, Match, ExcelFile
-from .services import ExcelImportService
+from .models import League, Match, ExcelFile, ImportJob
+from .services import ExcelImportService, ImportJobService, DuplicateImportError
 from .forms import ExcelUploadForm, LeagueFilterForm, MatchFilterForm
-from django.core.paginator import Paginator
+from ai_predictions.team_history import team_history_scope
+from ai_predictions.prediction_pipeline import PredictionPipeline, predict_market
 import json
 
 
@@ -43,7 +44,7 @@ class FootballDataDashboardView(View):
         ).order_by('-match_count')
         
         # Obtener partidos recientes
-        recent_matches = Match.objects.select_related('league').order_by('-date')[:10]
+        recent_matches = Match.objects.select_related('league', 'odds').order_by('-date')[:10]
         
         # Obtener archivos disponibles
         available_files = service.get_available_files()
@@ -220,144 +221,68 @@ class ImportView(View):
     def get(self, request):
         form = ExcelUploadForm()
         
-        # Obtener información de equipos y fechas por liga
-        leagues_data = []
-        leagues = League.objects.all().order_by('name')
-        
-        for league in leagues:
-            # Obtener todos los equipos únicos (como local y visitante)
-            home_teams = Match.objects.filter(league=league).values_list('home_team', flat=True).distinct()
-            away_teams = Match.objects.filter(league=league).values_list('away_team', flat=True).distinct()
-            all_teams = sorted(set(list(home_teams)) | set(list(away_teams)))
-            
-            teams_info = []
-            for team_name in all_teams:
-                # Obtener fechas de partidos de este equipo
-                team_matches = Match.objects.filter(
-                    Q(home_team=team_name) | Q(away_team=team_name),
-                    league=league
-                ).aggregate(
-                    first_date=Min('date'),
-                    last_date=Max('date'),
-                    total_matches=Count('id')
-                )
-                
-                if team_matches['first_date']:
-                    teams_info.append({
-                        'name': team_name,
-                        'first_date': team_matches['first_date'],
-                        'last_date': team_matches['last_date'],
-                        'total_matches': team_matches['total_matches']
-                    })
-            
-            # Ordenar equipos por fecha más reciente (último partido) de forma descendente
-            teams_info.sort(key=lambda x: x['last_date'], reverse=True)
-            
-            if teams_info:
-                leagues_data.append({
-                    'league': league,
-                    'teams': teams_info
-                })
-        
-        context = {
-            'form': form,
-            'leagues_data': leagues_data,
-        }
+        # Trabajo recién encolado (para mostrar su progreso)
+        import_job = None
+        job_id = request.GET.get('job')
+        if job_id and job_id.isdigit():
+            import_job = ImportJob.objects.filter(id=job_id).first()
         
-        return render(request, 'football_data/import.html', context)
+        return self._render(request, form, import_job)
     
     def post(self, request):
         form = ExcelUploadForm(request.POST, request.FILES)
+        wants_json = request.headers.get('x-requested-with') == 'XMLHttpRequest'
         
         if form.is_valid():
+            uploaded_file = form.cleaned_data['file']
+            league_name = form.cleaned_data['league_name']
+            season = form.cleaned_data['season']
+            
+            # Guardar el archivo (calculando su hash) y dejar la importación en cola;
+            # la procesa el comando run_import_worker fuera del request.
             try:
-                # Obtener el archivo validado del formulario
-                uploaded_file = form.cleaned_data['file']
-                league_name = form.cleaned_data['league_name']
-                season = form.cleaned_data['season']
-                
-                # Convertir a lista para mantener compatibilidad con el código existente
-                uploaded_files = [uploaded_file]
-                
-                # Crear directorio de media si no existe
-                media_dir = os.path.join(settings.MEDIA_ROOT, 'excel_files')
-                os.makedirs(media_dir, exist_ok=True)
-                
-                # Procesar los archivos
-                service = ExcelImportService()
-                total_imported = 0
-                total_failed = 0
-                successful_files = []
-                failed_files = []
-                
-                for uploaded_file in uploaded_files:
-                    try:
-                        # Guardar archivo temporalmente
-                        temp_file_path = os.path.join(media_dir, uploaded_file.name)
-                        with open(temp_file_path, 'wb+') as destination:
-                            for chunk in uploaded_file.chunks():
-                                destination.write(chunk)
-                        
-                        # Importar archivo
-                        result = service.import_data_file(temp_file_path, league_name, season)
-                        
-                        if result['success']:
-                            # Crear registro de ExcelFile
-                            league = League.objects.get(name=result['league'])
-                            ExcelFile.objects.create(
-                                name=uploaded_file.name,
-                                file=uploaded_file,
-                                file_path=temp_file_path,
-                                league=league,
-                                total_rows=result['imported_count'] + result['failed_count'],
-                                imported_rows=result['imported_count'],
-                                failed_rows=result['failed_count'],
-                                file_size=uploaded_file.size
-                            )
-                            
-                            total_imported += result['imported_count']
-                            total_failed += result['failed_count']
-                            successful_files.append(uploaded_file.name)
-                        else:
-                            failed_files.append(f"{uploaded_file.name}: {result['error']}")
-                            # Eliminar archivo temporal si falló
-                            if os.path.exists(temp_file_path):
-                                os.remove(temp_file_path)
-                                
-                    except Exception as e:
-                        failed_files.append(f"{uploaded_file.name}: {str(e)}")
-                        # Eliminar archivo temporal si falló
-                        if os.path.exists(temp_file_path):
-                            os.remove(temp_file_path)
-                
-                # Mostrar resultados
-                if successful_files:
-                    messages.success(
-                        request, 
-                        f"Archivos importados exitosamente: {len(successful_files)} archivos, "
-                        f"{total_imported} partidos importados, {total_failed} fallos"
-                    )
-                
-                if failed_files:
-                    for failed_file in failed_files:
-                        messages.error(request, f"Error: {failed_file}")
-                
+                job = ImportJobService().enqueue_upload(uploaded_file, league_name, season, request.user)
+            except DuplicateImportError as e:
+                error = f"El archivo '{uploaded_file.name}' {e}"
+                if wants_json:
+                    return JsonResponse({'success': False, 'error': error}, status=409)
+                messages.warning(request, f"⚠️ {error}")
+                return self._render(request, form)
             except Exception as e:
+                if wants_json:
+                    return JsonResponse({'success': False, 'error': str(e)}, status=500)
                 messages.error(request, f"Error procesando archivos: {str(e)}")
-        else:
-            # Si el formulario no es válido, mostrar errores específicos
-            for field, errors in form.errors.items():
-                for error in errors:
-                    if field == 'file':
-                        messages.error(request, f"❌ Archivo: {error}")
-                    elif field == 'league':
-                        messages.warning(request, f"⚠️ Liga: {error}")
-                    elif field == 'league_name':
-                        messages.warning(request, f"⚠️ Nombre de liga: {error}")
-                    else:
-                        messages.error(request, f"❌ {field}: {error}")
+                return self._render(request, form)
+            
+            status_url = reverse('football_data:import_job_status', args=[job.id])
+            if wants_json:
+                return JsonResponse({'success': True, 'job_id': job.id, 'status_url': status_url}, status=202)
+            
+            messages.success(
+                request,
+                f"📥 Archivo '{job.file_name}' recibido. La importación se está procesando en segundo plano (trabajo #{job.id})."
+            )
+            return redirect(f"{reverse('football_data:import')}?job={job.id}")
+        
+        if wants_json:
+            return JsonResponse({'success': False, 'errors': form.errors}, status=400)
+        
+        # Si el formulario no es válido, mostrar errores específicos
+        for field, errors in form.errors.items():
+            for error in errors:
+                if field == 'file':
+                    messages.error(request, f"❌ Archivo: {error}")
+                elif field == 'league':
+                    messages.warning(request, f"⚠️ Liga: {error}")
+                elif field == 'league_name':
+                    messages.warning(request, f"⚠️ Nombre de liga: {error}")
+                else:
+                    messages.error(request, f"❌ {field}: {error}")
         
         # Pasar el formulario con errores para mostrarlos en el template
+        return self._render(request, form)
+    
+    def _render(self, request, form, import_job=None):
         # Obtener información de equipos y fechas por liga
         leagues_data = []
         leagues = League.objects.all().order_by('name')
@@ -400,11 +325,35 @@ class ImportView(View):
         context = {
             'form': form,
             'leagues_data': leagues_data,
+            'import_job': import_job,
         }
         
         return render(request, 'football_data/import.html', context)
 
 
+@method_decorator(login_required, name='dispatch')
+class ImportJobStatusView(View):
+    """Estado de un trabajo de importación en JSON (para consultar el progreso)"""
+    
+    def get(self, request, job_id):
+        job = get_object_or_404(ImportJob, id=job_id)
+        eta = job.eta_seconds
+        return JsonResponse({
+            'job_id': job.id,
+            'file_name': job.file_name,
+            'status': job.status,
+            'status_display': job.get_status_display(),
+            'total_rows': job.total_rows,
+            'rows_processed': job.rows_processed,
+            'rows_imported': job.rows_imported,
+            'rows_failed': job.rows_failed,
+            'progress_percent': round(job.progress_percent, 1),
+            'eta_seconds': round(eta, 1) if eta is not None else None,
+            'result': job.result,
+            'error': job.error,
+        })
+
+
 # @method_decorator(login_required, name='dispatch')  # Temporalmente deshabilitado
 @method_decorator(login_required, name='dispatch')
 class DeleteFileView(View):
@@ -422,6 +371,8 @@ class DeleteFileView(View):
             matches_qs = Match.objects.filter(source_file=excel_file)
             matches_deleted = matches_qs.count()
             matches_qs.delete()
+            if matches_deleted:
+                league.bump_data_version()
             
             # Eliminar el archivo físico si existe
             if excel_file.file_path and os.path.exists(excel_file.file_path):
@@ -544,14 +495,14 @@ class StatisticsView(View):
         
         # Análisis de cuotas
         odds_stats = Match.objects.exclude(
-            b365h__isnull=True, b365d__isnull=True, b365a__isnull=True
+            odds__b365h__isnull=True, odds__b365d__isnull=True, odds__b365a__isnull=True
         ).aggregate(
-            avg_home_odds=Avg('b365h'),
-            avg_draw_odds=Avg('b365d'),
-            avg_away_odds=Avg('b365a'),
-            max_home_odds=Max('b365h'),
-            max_draw_odds=Max('b365d'),
-            max_away_odds=Max('b365a')
+            avg_home_odds=Avg('odds__b365h'),
+            avg_draw_odds=Avg('odds__b365d'),
+            avg_away_odds=Avg('odds__b365a'),
+            max_home_odds=Max('odds__b365h'),
+            max_draw_odds=Max('odds__b365d'),
+            max_away_odds=Max('odds__b365a')
         )
         
         # Top equipos
@@ -655,7 +606,7 @@ class LeagueDataTableView(View):
         if league_id:
             try:
                 selected_league = League.objects.get(id=league_id)
-                matches = Match.objects.filter(league=selected_league).order_by('-date', '-time')
+                matches = Match.objects.filter(league=selected_league).select_related('odds').order_by('-date', '-time')
                 
                 # Paginación
                 paginator = Paginator(matches, 50)  # 50 partidos por página
@@ -687,7 +638,7 @@ class MarketsView(View):
         
         # Construir consulta base
         matches = Match.objects.exclude(
-            b365h__isnull=True, b365d__isnull=True, b365a__isnull=True
+            odds__b365h__isnull=True, odds__b365d__isnull=True, odds__b365a__isnull=True
         )
         
         if league_filter:
@@ -893,19 +844,19 @@ class MarketsView(View):
         
         # Análisis de cuotas Over/Under si están disponibles
         matches_with_ou_odds = matches.exclude(
-            b365_over_25__isnull=True, b365_under_25__isnull=True
+            odds__b365_over_25__isnull=True, odds__b365_under_25__isnull=True
         )
         
         if matches_with_ou_odds.exists():
             ou_odds = matches_with_ou_odds.aggregate(
-                b365_over=Avg('b365_over_25'),
-                b365_under=Avg('b365_under_25'),
-                p_over=Avg('p_over_25'),
-                p_under=Avg('p_under_25'),
-                max_over=Avg('max_over_25'),
-                max_under=Avg('max_under_25'),
-                avg_over=Avg('avg_over_25'),
-                avg_under=Avg('avg_under_25'),
+                b365_over=Avg('odds__b365_over_25'),
+                b365_under=Avg('odds__b365_under_25'),
+                p_over=Avg('odds__p_over_25'),
+                p_under=Avg('odds__p_under_25'),
+                max_over=Avg('odds__max_over_25'),
+                max_under=Avg('odds__max_under_25'),
+                avg_over=Avg('odds__avg_over_25'),
+                avg_under=Avg('odds__avg_under_25'),
             )
             
             data['charts']['over_under_odds'] = {
@@ -1072,17 +1023,17 @@ class MarketsView(View):
         
         # Promedio de handicap asiático
         handicap_stats = matches.exclude(
-            ahh__isnull=True
+            odds__ahh__isnull=True
         ).aggregate(
-            avg_handicap=Avg('ahh'),
-            b365_ah_home=Avg('b365ahh'),
-            b365_ah_away=Avg('b365aha'),
-            p_ah_home=Avg('pahh'),
-            p_ah_away=Avg('paha'),
-            max_ah_home=Avg('maxahh'),
-            max_ah_away=Avg('maxaha'),
-            avg_ah_home=Avg('avgahh'),
-            avg_ah_away=Avg('avgaha'),
+            avg_handicap=Avg('odds__ahh'),
+            b365_ah_home=Avg('odds__b365ahh'),
+            b365_ah_away=Avg('odds__b365aha'),
+            p_ah_home=Avg('odds__pahh'),
+            p_ah_away=Avg('odds__paha'),
+            max_ah_home=Avg('odds__maxahh'),
+            max_ah_away=Avg('odds__maxaha'),
+            avg_ah_home=Avg('odds__avgahh'),
+            avg_ah_away=Avg('odds__avgaha'),
         )
         
         if handicap_stats['avg_handicap'] is not None:
@@ -1277,16 +1228,10 @@ def _get_upcoming_matches_filtered():
     return filtered_matches
 
 
-def _process_match_with_predictions(match_data):
-    """Procesa un partido individual y devuelve sus predicciones
-    Usa EXACTAMENTE el mismo flujo y funciones que 'result' (process_predictions_background)
-    para garantizar consistencia total en los cálculos.
+def _resolve_match_fixture(match_data):
+    """Valida un partido de la API de cuotas y busca su liga en la base de datos.
+    Retorna {'league', 'home_team', 'away_team', 'colombia_time'} o None si se descarta.
     """
-    # Imports necesarios - mismos que process_predictions_background
-    from ai_predictions.official_prediction_model import official_prediction_model
-    from ai_predictions.shots_prediction_model import shots_prediction_model
-    from ai_predictions.xg_shots_model import xg_shots_model
-    
     try:
         from datetime import timezone as dt_timezone
         commence_time_str = match_data.get('commence_time', '')
@@ -1502,142 +1447,40 @@ def _process_match_with_predictions(match_data):
             logger.warning(f"   Solo se procesan partidos de ligas existentes en la base de datos.")
             return None
         
-        # USAR EXACTAMENTE EL MISMO FLUJO QUE "result" (process_predictions_background)
-        # Reutilizar la función exacta de ai_predictions/views.py
-        # Importar y llamar a una función helper que replicará EXACTAMENTE process_predictions_background
-        from ai_predictions.simple_models import SimplePredictionService, ModeloHibridoCorners, ModeloHibridoGeneral
-        from ai_predictions.enhanced_both_teams_score import enhanced_both_teams_score_model
-        
-        prediction_types = [
-            'shots_total', 'shots_home', 'shots_away',
-            'shots_on_target_total',
-            'goals_total', 'goals_home', 'goals_away',
-            'corners_total', 'corners_home', 'corners_away',
-            'both_teams_score'
-        ]
-        
-        all_predictions_by_type = {}
-        simple_service = SimplePredictionService()
-        
-        # COPIAR EXACTAMENTE la lógica de process_predictions_background (líneas 91-267)
-        # Esta es la MISMA lógica que usa "result"
-        for pred_type in prediction_types:
-            try:
-                predictions = []
-                
-                # MANEJO ESPECIAL PARA REMATES - USAR AMBOS MODELOS (igual que result, líneas 119-170)
-                if 'shots' in pred_type or 'remates' in pred_type:
-                    try:
-                        # Modelo 1: Shots Prediction Model (original) - línea 125-141
-                        if pred_type == 'shots_total':
-                            pred1 = shots_prediction_model.predict_shots_total(home_team, away_team, league)
-                        elif pred_type == 'shots_home':
-                            pred1 = shots_prediction_model.predict_shots_home(home_team, away_team, league)
-                        elif pred_type == 'shots_away':
-                            pred1 = shots_prediction_model.predict_shots_away(home_team, away_team, league)
-                        elif pred_type == 'shots_on_target_total':
-                            pred1 = shots_prediction_model.predict_shots_on_target_total(home_team, away_team, league)
-                        else:
-                            pred1 = None
-                        
-                        if pred1:
-                            predictions.append(pred1)
-                    except Exception:
-                        pass
-                    
-                    try:
-                        # Modelo 2: XG Shots Model (nuevo) - línea 147-164
-                        if pred_type == 'shots_total':
-                            pred2 = xg_shots_model.predict_shots_total(home_team, away_team, league)
-                        elif pred_type == 'shots_home':
-                            pred2 = xg_shots_model.predict_shots_home(home_team, away_team, league)
-                        elif pred_type == 'shots_away':
-                            pred2 = xg_shots_model.predict_shots_away(home_team, away_team, league)
-                        elif pred_type == 'shots_on_target_total':
-                            pred2 = xg_shots_model.predict_shots_on_target_total(home_team, away_team, league)
-                        else:
-                            pred2 = None
-                        
-                        if pred2:
-                            predictions.append(pred2)
-                    except Exception:
-                        pass
-                else:
-                    # Línea 173: get_all_simple_predictions
-                    try:
-                        predictions = simple_service.get_all_simple_predictions(home_team, away_team, league, pred_type)
-                    except Exception:
-                        predictions = []
-                
-                # Manejo específico para "both_teams_score" con modelo mejorado (líneas 190-216)
-                if pred_type == 'both_teams_score':
-                    try:
-                        enhanced_prob = enhanced_both_teams_score_model.predict(home_team, away_team, league)
-                        enhanced_prediction = {
-                            'model_name': 'Enhanced Both Teams Score',
-                            'prediction': enhanced_prob,
-                            'confidence': 0.80,
-                            'probabilities': {'both_score': enhanced_prob},
-                            'total_matches': 100
-                        }
-                        predictions.append(enhanced_prediction)
-                    except Exception:
-                        # Fallback específico para ambos marcan (línea 207-216)
-                        fallback_prob = 0.45
-                        enhanced_fallback = {
-                            'model_name': 'Enhanced Both Teams Score (Fallback)',
-                            'prediction': fallback_prob,
-                            'confidence': 0.60,
-                            'probabilities': {'both_score': fallback_prob},
-                            'total_matches': 0
-                        }
-                        predictions.append(enhanced_fallback)
-                
-                # Agregar modelo híbrido como modelo adicional (líneas 218-258)
-                # CRÍTICO: En process_predictions_background, el elif/else está AL MISMO NIVEL que el if shots
-                # Pero en Python, elif se conecta al if más cercano. Sin embargo, los logs muestran que
-                # el Modelo Híbrido General SÍ se agrega para both_teams_score. Esto significa que
-                # el elif/else debe ejecutarse INDEPENDIENTEMENTE, no como parte del if both_teams_score.
-                # SOLUCIÓN: Cambiar elif por if para que sea un bloque independiente, y luego usar else
-                if 'corners' in pred_type:
-                    try:
-                        hybrid_model = ModeloHibridoCorners()
-                        hybrid_prediction = hybrid_model.predecir(home_team, away_team, league, pred_type)
-                        predictions.append(hybrid_prediction)
-                    except Exception:
-                        # Fallback híbrido corners (línea 229-237)
-                        hybrid_fallback = {
-                            'model_name': 'Modelo Híbrido Corners',
-                            'prediction': 10.0,
-                            'confidence': 0.6,
-                            'probabilities': {'over_10': 0.5, 'over_15': 0.3, 'over_20': 0.1},
-                            'total_matches': 0,
-                            'component_predictions': {}
-                        }
-                        predictions.append(hybrid_fallback)
-                else:
-                    # Modelo Híbrido General (línea 240-258)
-                    try:
-                        hybrid_model = ModeloHibridoGeneral()
-                        hybrid_prediction = hybrid_model.predecir(home_team, away_team, league, pred_type)
-                        predictions.append(hybrid_prediction)
-                    except Exception:
-                        # Fallback híbrido general (línea 249-257)
-                        hybrid_fallback = {
-                            'model_name': 'Modelo Híbrido General',
-                            'prediction': 10.0,
-                            'confidence': 0.6,
-                            'probabilities': {'over_10': 0.5, 'over_15': 0.3, 'over_20': 0.1},
-                            'total_matches': 0,
-                            'component_predictions': {}
-                        }
-                        predictions.append(hybrid_fallback)
-                
-                all_predictions_by_type[pred_type] = predictions
-            except Exception:
-                all_predictions_by_type[pred_type] = []
+        return {
+            'league': league,
+            'home_team': home_team,
+            'away_team': away_team,
+            'colombia_time': colombia_time,
+        }
+    except Exception as e:
+        logging.getLogger('football_data').error(f"❌ Error resolviendo partido: {e}", exc_info=True)
+        return None
+
+
+@team_history_scope()
+def _process_match_with_predictions(match_data):
+    """Procesa un partido individual y devuelve sus predicciones
+    Usa EXACTAMENTE el mismo flujo y funciones que 'result' (process_predictions_background)
+    para garantizar consistencia total en los cálculos.
+    """
+    # Imports necesarios - mismos que process_predictions_background
+    from ai_predictions.official_prediction_model import official_prediction_model
+    
+    fixture = _resolve_match_fixture(match_data)
+    if fixture is None:
+        return None
+    league, home_team, away_team = fixture['league'], fixture['home_team'], fixture['away_team']
+    colombia_time = fixture['colombia_time']
+    
+    try:
+        # USAR EXACTAMENTE EL MISMO FLUJO QUE "result" (process_predictions_background):
+        # el pipeline compartido calcula los tipos en paralelo (o los sirve desde la caché)
+        all_predictions_by_type = PredictionPipeline().run(
+            home_team, away_team, league, predict=predict_market
+        )
         
-        # AGREGAR PREDICCIÓN OFICIAL (línea 273 de process_predictions_background)
+        # AGREGAR PREDICCIÓN OFICIAL (igual que process_predictions_background)
         all_predictions_by_type = official_prediction_model.add_to_predictions(all_predictions_by_type)
         
         # DEBUG: Log todas las predicciones de both_teams_score
@@ -1740,6 +1583,7 @@ class AnalysisView(View):
 class AnalysisAjaxView(View):
     """Vista AJAX que procesa partidos en lotes y devuelve JSON"""
     
+    @team_history_scope()
     def get(self, request):
         import json
         import logging